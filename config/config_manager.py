@@ -18,4 +18,8 @@ class ConfigManager:
         """Returns the broker's port."""
         return self.config.getint('Network', 'broker_port', fallback=8888)
 
+    def get_broker_framing(self) -> str:
+        """Returns the chat wire format to request from the broker: 'json' or 'binary'."""
+        return self.config.get('Network', 'broker_framing', fallback='json')
+
     # You can add other getters for database paths, etc.
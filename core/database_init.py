@@ -4,6 +4,7 @@ from sqlalchemy.engine import Engine
 from sqlalchemy import create_engine
 from pathlib import Path
 from config.config import DATABASE_BASES, DATABASE_PATHS
+from core.database_migrations import SchemaMigrator
 
 
 class DatabaseInitializer:
@@ -13,6 +14,9 @@ class DatabaseInitializer:
     in-memory databases for fast, isolated testing.
     """
 
+    def __init__(self, migrator: SchemaMigrator | None = None):
+        self._migrator = migrator or SchemaMigrator()
+
     def setup_file_databases(self, absolute_paths: dict) -> dict[str, Engine]:
         """
         Creates SQLite database files, initializes schemas, and returns a
@@ -38,7 +42,8 @@ class DatabaseInitializer:
 
     def _initialize_engines(self, db_urls: dict, connect_args: dict = None) -> dict[str, Engine]:
         """
-        Private helper that takes database URLs and creates all engines and schemas.
+        Private helper that takes database URLs, creates all engines and brings
+        each schema up to date. An up-to-date database costs a single version read.
         """
         engines: dict[str, Engine] = {}
         connect_args = connect_args or {}
@@ -51,10 +56,10 @@ class DatabaseInitializer:
             engine = create_engine(url, connect_args=connect_args)
             engines[name] = engine
 
-            # Look up the correct SQLAlchemy BaseBusiness and create tables
+            # Look up the correct SQLAlchemy Base and migrate its schema
             base = DATABASE_BASES.get(name)
             if base:
-                base.metadata.create_all(engine)
+                self._migrator.upgrade(engine, name, base.metadata)
             else:
                 print(f"Warning: No SQLAlchemy Base found for database '{name}'. Schema not created.")
 
@@ -0,0 +1,329 @@
+# core/database_migrations.py
+
+"""
+Lightweight, per-database schema versioning.
+
+Every database carries a tiny ``schema_version`` table with one row per
+component ("schema" for the DDL, "seed" for the initial data). At startup the
+whole table is read once; when every component is already at its head version
+nothing else touches the database.
+
+When a database is behind, ``create_all`` is run (it only ever adds brand-new
+tables) and the pending migrations are applied in order inside a single
+transaction. ``create_all`` never alters a table that already exists, so any
+change to an existing table - new columns, indexes, rollup or FTS tables that
+need backfilling - must ship as a migration registered below.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import (
+    Column, Connection, DateTime, Engine, Integer, MetaData, String, Table,
+    inspect, insert, select, update, text
+)
+from sqlalchemy.exc import OperationalError
+
+from config.config import DATABASE_BASES
+from shared.orm_models.business_models import CUSTOMER_ID_TRIGGERS
+from shared.services.invoice_number_generator import ensure_invoice_number_counter
+from shared.services.translator_monthly_rollup import TranslatorMonthlyRollup
+from shared.services.translator_registry import TranslatorRegistry
+from shared.utils.text_utils import split_invoice_version
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_COMPONENT = "schema"
+SEED_COMPONENT = "seed"
+
+_version_metadata = MetaData()
+
+schema_version_table = Table(
+    "schema_version",
+    _version_metadata,
+    Column("component", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A single, ordered schema change for one database."""
+    version: int
+    description: str
+    upgrade: Callable[[Connection, MetaData], None]
+
+
+MIGRATIONS: dict[str, list[Migration]] = {name: [] for name in DATABASE_BASES}
+
+
+def migration(database: str, version: int, description: str):
+    """Decorator registering ``func(connection, metadata)`` as a migration of ``database``."""
+    def decorator(func: Callable[[Connection, MetaData], None]):
+        MIGRATIONS.setdefault(database, []).append(Migration(version, description, func))
+        return func
+    return decorator
+
+
+# Versions read at startup, shared by the initializer and the seeder so that
+# each database is only queried once.
+_version_cache: WeakKeyDictionary[Engine, dict[str, int]] = WeakKeyDictionary()
+
+
+class SchemaMigrator:
+    """Reads, upgrades and stamps the version table of each database."""
+
+    def __init__(self, migrations: dict[str, list[Migration]] | None = None):
+        self._migrations = {
+            name: self._validated(name, steps)
+            for name, steps in (migrations if migrations is not None else MIGRATIONS).items()
+        }
+
+    # ------------------------------------------------------------------
+    # PUBLIC INTERFACE
+    # ------------------------------------------------------------------
+
+    def head(self, database: str) -> int:
+        """Returns the latest schema version known for the given database."""
+        steps = self._migrations.get(database, [])
+        return steps[-1].version if steps else 0
+
+    def read_versions(self, engine: Engine) -> dict[str, int]:
+        """Returns {component: version} for the engine; empty if never stamped."""
+        if engine in _version_cache:
+            return _version_cache[engine]
+
+        try:
+            with engine.connect() as connection:
+                rows = connection.execute(
+                    select(schema_version_table.c.component, schema_version_table.c.version)
+                ).all()
+            versions = {component: version for component, version in rows}
+        except OperationalError:
+            # The version table does not exist yet (new or pre-versioning database).
+            versions = {}
+
+        _version_cache[engine] = versions
+        return versions
+
+    def get_version(self, engine: Engine, component: str = SCHEMA_COMPONENT) -> int:
+        return self.read_versions(engine).get(component, 0)
+
+    def upgrade(self, engine: Engine, database: str, metadata: MetaData) -> int:
+        """
+        Brings the database up to its head version and returns that version.
+        Does a single version read and nothing else when already up to date.
+        """
+        head = self.head(database)
+        versions = self.read_versions(engine)
+        current = versions.get(SCHEMA_COMPONENT)
+
+        if current is not None and current >= head:
+            return current
+
+        with engine.begin() as connection:
+            is_new_database = not inspect(connection).get_table_names()
+            _version_metadata.create_all(connection)
+            metadata.create_all(connection)
+
+            if is_new_database:
+                # create_all has just produced the current schema; nothing to migrate.
+                logger.info(f"Created '{database}' database at schema version {head}.")
+            else:
+                for step in self._pending(database, current or 0):
+                    logger.info(f"Migrating '{database}' to v{step.version}: {step.description}")
+                    step.upgrade(connection, metadata)
+
+            self._write_version(connection, SCHEMA_COMPONENT, head)
+
+        versions[SCHEMA_COMPONENT] = head
+        return head
+
+    def stamp(self, engine: Engine, component: str, version: int) -> None:
+        """Records that ``component`` of this database is now at ``version``."""
+        with engine.begin() as connection:
+            _version_metadata.create_all(connection)
+            self._write_version(connection, component, version)
+        self.read_versions(engine)[component] = version
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _validated(database: str, steps: list[Migration]) -> list[Migration]:
+        ordered = sorted(steps, key=lambda m: m.version)
+        expected = list(range(1, len(ordered) + 1))
+        if [m.version for m in ordered] != expected:
+            raise ValueError(f"Migrations for '{database}' must be numbered 1..N without gaps.")
+        return ordered
+
+    def _pending(self, database: str, current: int) -> list[Migration]:
+        return [m for m in self._migrations.get(database, []) if m.version > current]
+
+    @staticmethod
+    def _write_version(connection: Connection, component: str, version: int) -> None:
+        values = {"version": version, "applied_at": datetime.now()}
+        result = connection.execute(
+            update(schema_version_table)
+            .where(schema_version_table.c.component == component)
+            .values(**values)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(schema_version_table).values(component=component, **values))
+
+
+# ---------------------------------------------------------------------
+# HELPERS
+# ---------------------------------------------------------------------
+
+def add_column_if_missing(connection: Connection, table_name: str, column_name: str, ddl: str) -> bool:
+    """Runs ``ALTER TABLE ... ADD COLUMN`` unless the column exists. Returns True if added."""
+    existing = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    if column_name in existing:
+        return False
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
+    return True
+
+
+# ---------------------------------------------------------------------
+# MIGRATIONS
+# ---------------------------------------------------------------------
+
+def create_declared_indexes(connection: Connection, metadata: MetaData,
+                            table_names: list[str] | None = None) -> None:
+    """Creates every index declared on the models (or on ``table_names``) that the database is missing."""
+    for table in metadata.sorted_tables:
+        if table_names is not None and table.name not in table_names:
+            continue
+        for index in table.indexes:
+            try:
+                index.create(connection, checkfirst=True)
+            except OperationalError as e:
+                # Typically a column that was added to the model after the table was created.
+                logger.warning(f"Skipped index '{index.name}' on '{table.name}': {e}")
+
+
+for _database in DATABASE_BASES:
+    migration(_database, 1, "Create model-declared indexes missing from older databases")(
+        create_declared_indexes
+    )
+
+
+@migration("business", 2, "Replace the invoice_number_seq table with a single-row counter")
+def migrate_invoice_number_counter(connection: Connection, metadata: MetaData) -> None:
+    ensure_invoice_number_counter(connection)
+
+
+@migration("business", 3, "Add base_invoice_number/version to issued_invoices for edit chains")
+def migrate_invoice_versions(connection: Connection, metadata: MetaData) -> None:
+    add_column_if_missing(connection, "issued_invoices", "base_invoice_number", "TEXT")
+    add_column_if_missing(connection, "issued_invoices", "version", "INTEGER NOT NULL DEFAULT 1")
+
+    rows = connection.execute(text(
+        "SELECT id, invoice_number FROM issued_invoices WHERE base_invoice_number IS NULL"
+    )).all()
+    backfill = []
+    for invoice_id, invoice_number in rows:
+        base, version = split_invoice_version(str(invoice_number))
+        backfill.append({"id": invoice_id, "base": base, "version": version})
+    if backfill:
+        connection.execute(
+            text("UPDATE issued_invoices SET base_invoice_number = :base, version = :version WHERE id = :id"),
+            backfill,
+        )
+
+    create_declared_indexes(connection, metadata, ["issued_invoices"])
+
+
+@migration("business", 4, "Add a revision counter to issued_invoices for cached invoice aggregates")
+def migrate_invoice_revision(connection: Connection, metadata: MetaData) -> None:
+    add_column_if_missing(connection, "issued_invoices", "revision", "INTEGER NOT NULL DEFAULT 1")
+
+
+@migration("business", 5, "Add the per-translator monthly rollup used by payroll and the dashboard")
+def migrate_translator_monthly_rollup(connection: Connection, metadata: MetaData) -> None:
+    # create_all has just added the rollup tables; fill them for every month with invoices.
+    # Months left empty here are rolled up on first read (or by v6 on databases it upgrades too).
+    columns = {column["name"] for column in inspect(connection).get_columns("issued_invoices")}
+    if not {"issue_date", "translator_employee_id", "revision"} <= columns:
+        return
+    months = TranslatorMonthlyRollup().rebuild(connection)
+    logger.info(f"Rolled up translator totals for {months} months.")
+
+
+@migration("business", 6, "Key invoices and the translator rollup by translator id instead of name")
+def migrate_translator_ids(connection: Connection, metadata: MetaData) -> None:
+    add_column_if_missing(connection, "issued_invoices", "translator_employee_id",
+                          "INTEGER REFERENCES translators(id) ON DELETE SET NULL")
+    create_declared_indexes(connection, metadata, ["issued_invoices"])
+
+    columns = {column["name"] for column in inspect(connection).get_columns("issued_invoices")}
+    if not {"issue_date", "translator", "revision"} <= columns:
+        return
+    report = TranslatorRegistry().backfill(connection)
+    logger.info(f"Backfilled translator ids: {report.backfilled_invoices} invoices, "
+                f"{report.unassigned_invoices} without a translator. Run translator_registry to link employees.")
+
+    # The rollup is derived data: rebuild it keyed by translator id.
+    for table_name in ("translator_monthly_stats", "translator_rollup_months"):
+        metadata.tables[table_name].drop(connection, checkfirst=True)
+        metadata.tables[table_name].create(connection)
+    TranslatorMonthlyRollup().rebuild(connection)
+
+
+@migration("business", 7, "Add integer customer ids and key invoices to them")
+def migrate_customer_ids(connection: Connection, metadata: MetaData) -> None:
+    add_column_if_missing(connection, "customers", "id", "INTEGER")
+    add_column_if_missing(connection, "issued_invoices", "customer_id", "INTEGER REFERENCES customers(id)")
+
+    # rowids are unique at this point; new customers continue from MAX(id) through the trigger.
+    connection.execute(text("UPDATE customers SET id = rowid WHERE id IS NULL"))
+    columns = {column["name"] for column in inspect(connection).get_columns("issued_invoices")}
+    if {"national_id", "revision"} <= columns:
+        connection.execute(text(
+            "UPDATE issued_invoices SET revision = revision + 1, customer_id = "
+            "(SELECT id FROM customers WHERE customers.national_id = issued_invoices.national_id) "
+            "WHERE customer_id IS NULL AND national_id IN (SELECT national_id FROM customers)"
+        ))
+
+    create_declared_indexes(connection, metadata, ["customers", "issued_invoices"])
+    for statements in CUSTOMER_ID_TRIGGERS.values():
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+@migration("workspace", 2, "Index chat messages, read receipts and participants for paginated history")
+def migrate_chat_history_indexes(connection: Connection, metadata: MetaData) -> None:
+    # message_read_status is dropped by v3; its index is skipped once the model is gone.
+    create_declared_indexes(connection, metadata,
+                            ["messages", "message_read_status", "chat_participants", "attachments"])
+
+
+@migration("workspace", 3, "Replace per-message read receipts with a read watermark per chat and user")
+def migrate_read_watermarks(connection: Connection, metadata: MetaData) -> None:
+    if "message_read_status" not in inspect(connection).get_table_names():
+        return
+    # create_all has just added chat_read_watermarks. A reader's watermark is the newest message
+    # they had a receipt for; older messages they skipped count as read from now on.
+    connection.execute(text(
+        "INSERT OR IGNORE INTO chat_read_watermarks (chat_id, user_id, last_read_message_id, updated_at) "
+        "SELECT messages.chat_id, message_read_status.user_id, MAX(message_read_status.message_id), "
+        "MAX(message_read_status.read_at) "
+        "FROM message_read_status JOIN messages ON messages.id = message_read_status.message_id "
+        "GROUP BY messages.chat_id, message_read_status.user_id"
+    ))
+    connection.execute(text("DROP TABLE message_read_status"))
+
+
+@migration("workspace", 4, "Key attachments to their content in the attachment store")
+def migrate_attachment_digests(connection: Connection, metadata: MetaData) -> None:
+    add_column_if_missing(connection, "attachments", "sha256", "VARCHAR(64)")
+    add_column_if_missing(connection, "attachments", "size", "INTEGER")
+    create_declared_indexes(connection, metadata, ["attachments"])
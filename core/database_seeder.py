@@ -23,6 +23,7 @@ from shared.orm_models.payroll_models import (
 )
 from shared import get_resource_path
 from shared.session_provider import ManagedSessionProvider
+from core.database_migrations import SchemaMigrator, SEED_COMPONENT
 
 # Application-specific imports
 from features.Services.tab_manager.tab_manager_logic import ExcelImportLogic
@@ -35,8 +36,16 @@ from features.Services.other_services.other_services_repo import OtherServicesRe
 class DatabaseSeeder:
     """Orchestrates seeding of all application databases."""
 
-    def __init__(self, engines: Dict[str, Engine]):
+    # Bump a database's seed version when its seed data changes; databases
+    # already stamped with the current version are not re-checked at startup.
+    SEED_VERSIONS = {
+        "business": 1,
+        "payroll": 1,
+    }
+
+    def __init__(self, engines: Dict[str, Engine], migrator: SchemaMigrator | None = None):
         self.engines = engines
+        self._migrator = migrator or SchemaMigrator()
 
     # ------------------------------------------------------------------
     # PUBLIC INTERFACE
@@ -49,12 +58,27 @@ class DatabaseSeeder:
         if is_demo_mode:
             self._seed_default_user()
 
-        self._seed_fixed_prices()
-        self._seed_services_from_excel()
-        self._seed_employee_roles()
-        self._seed_payroll_system_constants()
-        self._seed_salary_components()
-        self._seed_tax_brackets()
+        seed_steps = {
+            "business": [
+                self._seed_fixed_prices,
+                self._seed_services_from_excel,
+            ],
+            "payroll": [
+                self._seed_employee_roles,
+                self._seed_payroll_system_constants,
+                self._seed_salary_components,
+                self._seed_tax_brackets,
+            ],
+        }
+
+        for engine_name, steps in seed_steps.items():
+            if self._is_seeded(engine_name):
+                print(f"⚙️ '{engine_name}' seed data is up to date. Skipping.")
+                continue
+
+            results = [step() for step in steps]
+            if all(results):
+                self._migrator.stamp(self.engines[engine_name], SEED_COMPONENT, self.SEED_VERSIONS[engine_name])
 
         print("✅ Data seeding complete.")
 
@@ -70,12 +94,21 @@ class DatabaseSeeder:
             return None
         return sessionmaker(bind=engine)()
 
-    def _safe_commit(self, session: Session) -> None:
+    def _is_seeded(self, engine_name: str) -> bool:
+        """True when the engine is already stamped with its current seed version."""
+        engine = self.engines.get(engine_name)
+        if not engine:
+            return False
+        return self._migrator.get_version(engine, SEED_COMPONENT) >= self.SEED_VERSIONS[engine_name]
+
+    def _safe_commit(self, session: Session) -> bool:
         try:
             session.commit()
+            return True
         except Exception as e:
             print(f"❌ Commit failed: {e}")
             session.rollback()
+            return False
 
     # ------------------------------------------------------------------
     # USER SEEDING
@@ -117,23 +150,24 @@ class DatabaseSeeder:
     # SERVICES SEEDING
     # ------------------------------------------------------------------
 
-    def _seed_services_from_excel(self) -> None:
+    def _seed_services_from_excel(self) -> bool:
         """Seed the services DB from an Excel file if empty."""
         print("📦 Checking business.db for seeding requirements...")
 
         session = self._get_session("business")
         if not session:
-            return
+            return False
 
         try:
             if session.query(ServicesModel).count() > 0:
                 print("⚙️ Services already populated. Skipping Excel import.")
-                return
+                return True
 
             excel_path = get_resource_path("assets", "services_datasheet.xlsx")
             if not excel_path.exists():
+                # Nothing to import; services can still be imported from the Services page.
                 print(f"⚠️ Excel file not found at {excel_path}")
-                return
+                return True
 
             managed_engine = ManagedSessionProvider(self.engines["business"])
             services_logic = ServicesLogic(ServiceRepository(), managed_engine)
@@ -146,19 +180,21 @@ class DatabaseSeeder:
             for sheet, result in results.items():
                 status = "✅" if result.failed_count == 0 else "⚠️"
                 print(f"{status} {sheet}: {result.success_count} rows, {result.failed_count} failed.")
+            return True
 
         except Exception as e:
             print(f"❌ Error during Excel import: {e}")
+            return False
         finally:
             session.close()
 
-    def _seed_fixed_prices(self) -> None:
+    def _seed_fixed_prices(self) -> bool:
         """Seed fixed service prices."""
         print("💰 Seeding fixed prices...")
 
         session = self._get_session("business")
         if not session:
-            return
+            return False
 
         prices = [
             ("کپی برابر اصل", 5000),
@@ -177,10 +213,12 @@ class DatabaseSeeder:
                     added += 1
 
             if added:
-                self._safe_commit(session)
+                if not self._safe_commit(session):
+                    return False
                 print(f"✅ Added {added} fixed prices.")
             else:
                 print("⚙️ No new fixed prices to add.")
+            return True
         finally:
             session.close()
 
@@ -188,18 +226,18 @@ class DatabaseSeeder:
     # PAYROLL SEEDING
     # ------------------------------------------------------------------
 
-    def _seed_employee_roles(self) -> None:
+    def _seed_employee_roles(self) -> bool:
         """Seed standard employee roles."""
         print("👥 Seeding employee roles...")
 
         session = self._get_session("payroll")
         if not session:
-            return
+            return False
 
         try:
             if session.query(EmployeeRoleModel).count() > 0:
                 print("⚙️ Employee roles already exist. Skipping.")
-                return
+                return True
 
             roles = [
                 EmployeeRoleModel(
@@ -247,23 +285,25 @@ class DatabaseSeeder:
             ]
 
             session.add_all(roles)
-            self._safe_commit(session)
+            if not self._safe_commit(session):
+                return False
             print("✅ Employee roles seeded.")
+            return True
         finally:
             session.close()
 
-    def _seed_payroll_system_constants(self) -> None:
+    def _seed_payroll_system_constants(self) -> bool:
         """Seed government-mandated constants and system configuration values."""
         print("🏛️ Seeding payroll system constants...")
 
         session = self._get_session("payroll")
         if not session:
-            return
+            return False
 
         try:
             if session.query(SystemConstantModel).count() > 0:
                 print("⚙️ System constants already exist. Skipping.")
-                return
+                return True
 
             constants = [
                 # Year 1404 configuration
@@ -326,23 +366,25 @@ class DatabaseSeeder:
             ]
 
             session.add_all(constants)
-            self._safe_commit(session)
+            if not self._safe_commit(session):
+                return False
             print("✅ Payroll system constants seeded.")
+            return True
         finally:
             session.close()
 
-    def _seed_salary_components(self) -> None:
+    def _seed_salary_components(self) -> bool:
         """Seed standard earning and deduction components based on Iranian Labour law."""
         print("🧾 Seeding salary components...")
 
         session = self._get_session("payroll")
         if not session:
-            return
+            return False
 
         try:
             if session.query(SalaryComponentModel).count() > 0:
                 print("⚙️ Salary components already exist. Skipping.")
-                return
+                return True
 
             components = [
                 # مزایای حقوقی (Earnings)
@@ -510,23 +552,25 @@ class DatabaseSeeder:
             ]
 
             session.add_all(components)
-            self._safe_commit(session)
+            if not self._safe_commit(session):
+                return False
             print("✅ Salary components seeded.")
+            return True
         finally:
             session.close()
 
-    def _seed_tax_brackets(self) -> None:
+    def _seed_tax_brackets(self) -> bool:
         """Seed progressive income tax brackets for the year 1404."""
         print("📈 Seeding tax brackets...")
 
         session = self._get_session("payroll")
         if not session:
-            return
+            return False
 
         try:
             if session.query(TaxBracketModel).count() > 0:
                 print("⚙️ Tax brackets already exist. Skipping.")
-                return
+                return True
 
             brackets = [
                 TaxBracketModel(
@@ -550,7 +594,9 @@ class DatabaseSeeder:
             ]
 
             session.add_all(brackets)
-            self._safe_commit(session)
+            if not self._safe_commit(session):
+                return False
             print("✅ Tax brackets seeded.")
+            return True
         finally:
             session.close()
@@ -52,8 +52,8 @@ class AdminDashboardLogic:
             if not raw_orders and not unpaid_collected:
                 return {}
 
-            national_ids = [order.national_id for order in raw_orders]
-            companion_counts = self._repo.get_companion_counts_for_customers(session, national_ids)
+            customer_ids = [order.customer_id for order in raw_orders]
+            companion_counts = self._repo.get_companion_counts_for_customers(session, customer_ids)
 
             attention_items = []
             for order in raw_orders:
@@ -66,7 +66,7 @@ class AdminDashboardLogic:
                     total_amount=order.total_amount,
                     final_amount=order.final_amount,
                     advance_payment=order.advance_payment,
-                    companion_count=companion_counts.get(order.national_id, 0)
+                    companion_count=companion_counts.get(order.customer_id, 0)
                 )
                 attention_items.append(item)
 
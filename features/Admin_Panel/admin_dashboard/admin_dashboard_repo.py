@@ -3,7 +3,8 @@
 from sqlalchemy import func, cast, Date
 from sqlalchemy.orm import Session, joinedload
 from datetime import date, timedelta, datetime, time, timezone
-from shared.orm_models.business_models import IssuedInvoiceModel, LoginLogsModel, CompanionModel
+from shared.orm_models.business_models import IssuedInvoiceModel, LoginLogsModel, CompanionModel, CustomerModel
+from shared.services.translator_monthly_rollup import TranslatorMonthlyRollup
 import jdatetime
 
 
@@ -11,6 +12,9 @@ class AdminDashboardRepository:
     """
     Stateless _repository class for fetching admin dashboard data.
     """
+    def __init__(self, rollup: TranslatorMonthlyRollup | None = None):
+        self._rollup = rollup or TranslatorMonthlyRollup()
+
     def get_revenue_today(self, session: Session) -> float:
         """
         Calculates total revenue received today (in UTC).
@@ -75,7 +79,7 @@ class AdminDashboardRepository:
         """
         today = date.today()
         start_of_month = today.replace(day=1)
-        count = session.query(func.count(IssuedInvoiceModel.national_id.distinct())).filter(
+        count = session.query(func.count(IssuedInvoiceModel.customer_id.distinct())).filter(
             IssuedInvoiceModel.issue_date >= start_of_month
         ).scalar()
         return count or 0
@@ -92,6 +96,7 @@ class AdminDashboardRepository:
             IssuedInvoiceModel.name,
             IssuedInvoiceModel.delivery_date,
             IssuedInvoiceModel.national_id,
+            IssuedInvoiceModel.customer_id,
             IssuedInvoiceModel.payment_status,
             IssuedInvoiceModel.total_amount,
             IssuedInvoiceModel.final_amount,
@@ -116,22 +121,24 @@ class AdminDashboardRepository:
             IssuedInvoiceModel.payment_status == 0
         ).order_by(IssuedInvoiceModel.collection_date.asc()).all()
 
-    def get_companion_counts_for_customers(self, session: Session, national_ids: list) -> dict:
+    def get_companion_counts_for_customers(self, session: Session, customer_ids: list) -> dict:
         """
-        Takes a list of customer national IDs and returns a dictionary
-        mapping each ID to their number of companions.
+        Takes a list of customer ids and returns a dictionary
+        mapping each id to their number of companions.
         """
-        if not national_ids:
+        if not customer_ids:
             return {}
 
         results = session.query(
-            CompanionModel.customer_national_id,
+            CustomerModel.id,
             func.count(CompanionModel.id)
+        ).join(
+            CompanionModel, CompanionModel.customer_national_id == CustomerModel.national_id
         ).filter(
-            CompanionModel.customer_national_id.in_(national_ids)
-        ).group_by(CompanionModel.customer_national_id).all()
+            CustomerModel.id.in_(customer_ids)
+        ).group_by(CustomerModel.id).all()
 
-        return {nid: count for nid, count in results}
+        return {customer_id: count for customer_id, count in results}
 
     def _get_jalali_month_range(self) -> tuple[date, date]:
         """Returns the start and end Gregorian dates for the current Jalali month."""
@@ -144,21 +151,11 @@ class AdminDashboardRepository:
 
     def get_top_translators_this_month(self, session: Session, limit: int = 3) -> list:
         """
-        Finds the top translators by summing the total_items (document count)
-        of their invoices for the current JALALI month.
+        Finds the top translators by document count for the current JALALI month,
+        read from the per-translator monthly rollup.
         """
-        start_date, end_date = self._get_jalali_month_range()
-
-        return session.query(
-            IssuedInvoiceModel.translator,
-            func.sum(IssuedInvoiceModel.total_items).label('document_count')
-        ).filter(
-            IssuedInvoiceModel.issue_date.between(start_date, end_date)
-        ).group_by(
-            IssuedInvoiceModel.translator
-        ).order_by(
-            func.sum(IssuedInvoiceModel.total_items).desc()
-        ).limit(limit).all()
+        today_j = jdatetime.date.today()
+        return self._rollup.top_translators(session, today_j.year, today_j.month, limit, order_by="document_count")
 
     def get_top_clerks_this_month(self, session: Session, limit: int = 3) -> list:
         """
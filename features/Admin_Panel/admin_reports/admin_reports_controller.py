@@ -2,6 +2,7 @@
 
 from PySide6.QtWidgets import QFileDialog
 from shared import show_information_message_box, show_error_message_box, show_warning_message_box
+from shared.widgets.export_progress import run_export_with_progress
 import jdatetime
 
 # Import all necessary components
@@ -63,15 +64,16 @@ class FinancialReportsController:
         file_path, _ = QFileDialog.getSaveFileName(self._view, "ذخیره گزارش اکسل", suggested_filename,
                                                    "Excel Files (*.xlsx)")
         if file_path:
-            try:
-                self._logic.export_year_data_to_excel(self._current_year, file_path)
-                show_information_message_box(self._view,
-                                             "موفقیت",
-                                             f"گزارش با موفقیت ذخیره شد:\n{file_path}")
-            except Exception as e:
-                show_error_message_box(self._view,
-                                       "خطا",
-                                       f"خطایی در ایجاد فایل اکسل رخ داد:\n{e}")
+            year = self._current_year
+            run_export_with_progress(
+                self._view,
+                lambda progress, is_cancelled: self._logic.export_year_data_to_excel(
+                    year, file_path, progress=progress, is_cancelled=is_cancelled),
+                "در حال ایجاد گزارش اکسل...",
+                on_finished=lambda rows: show_information_message_box(
+                    self._view, "موفقیت", f"گزارش با موفقیت ذخیره شد:\n{file_path}"),
+                on_failed=lambda error: show_error_message_box(
+                    self._view, "خطا", f"خطایی در ایجاد فایل اکسل رخ داد:\n{error}"))
 
 
 # --- Sub-Controller for the Advanced Search Tab ---
@@ -7,6 +7,7 @@ from features.Admin_Panel.admin_reports.admin_reports_view import AdminReportsVi
 from features.Admin_Panel.admin_reports.admin_reports_logic import AdminReportsLogic
 from features.Admin_Panel.admin_reports.admin_reports_repo import AdminReportsRepository
 
+from shared.services.streaming_exporter import StreamingExporter
 from shared.session_provider import ManagedSessionProvider
 
 
@@ -32,7 +33,8 @@ class AdminReportsFactory:
         # 1. Instantiate the layers, injecting dependencies
         repo = AdminReportsRepository()
         logic = AdminReportsLogic(repository=repo,
-                                  business_engine=business_session)
+                                  business_engine=business_session,
+                                  exporter=StreamingExporter(business_engine))
         view = AdminReportsView(parent=parent)
 
         # 2. Instantiate the Controller, which connects everything
@@ -3,15 +3,21 @@
 import pandas as pd
 import jdatetime
 from datetime import date
+from typing import Optional
 from features.Admin_Panel.admin_reports.admin_reports_repo import AdminReportsRepository
+from shared.orm_models.business_models import IssuedInvoiceModel, InvoiceItemModel, ExpenseModel
+from shared.services.streaming_exporter import (StreamingExporter, ExportColumn, ExportSheet, ProgressCallback,
+                                                CancelCheck, jalali_date)
 from shared.session_provider import ManagedSessionProvider
 
 
 class AdminReportsLogic:
     def __init__(self, repository: AdminReportsRepository,
-                 business_engine: ManagedSessionProvider):
+                 business_engine: ManagedSessionProvider,
+                 exporter: StreamingExporter):
         self._repo = repository
         self._business_session = business_engine
+        self._exporter = exporter
 
     def get_full_report_data(self, year: int) -> dict:
         """
@@ -66,60 +72,51 @@ class AdminReportsLogic:
     def to_jalali(self, g_date: date) -> str: return jdatetime.date.fromgregorian(date=g_date).strftime('%Y/%m/%d')
 
     # --- METHOD FOR EXCEL EXPORT ---
-    def export_year_data_to_excel(self, year: int, file_path: str):
-        """Fetches detailed data and writes it to a multi-sheet Excel file."""
-        with self._business_session() as session:
-            invoices = self._repo.get_detailed_invoices_for_year(session, year)
-            expenses = self._repo.get_detailed_expenses_for_year(session, year)
-
-            # Get companion counts in a separate query for efficiency
-            customer_nids = [inv.national_id for inv in invoices]
-            companion_counts = self._repo.get_companion_counts_for_customers(session, customer_nids)
-
-        # --- Sheet 1: درآمد (Revenue) ---
-        revenue_data = []
-        for inv in invoices:
-
-            total_jud_seals = sum(item.has_judiciary_seal for item in inv.items)
-            total_fa_seals = sum(item.has_foreign_affairs_seal for item in inv.items)
-
-            revenue_data.append({
-                "شماره فاکتور": inv.invoice_number,
-                "تاریخ صدور": jdatetime.date.fromgregorian(date=inv.issue_date).strftime('%Y/%m/%d'),
-                "نام مشتری": inv.name,
-                "کد ملی مشتری": inv.national_id,
-                "تعداد همراهان": companion_counts.get(inv.national_id, 0),
-                "مترجم": inv.translator,
-                "مبلغ کل": inv.total_amount,
-                "مبلغ نهایی": inv.final_amount,
-                "وضعیت پرداخت": "پرداخت شده" if inv.payment_status == 1 else "پرداخت نشده",
-                "مهر دادگستری": total_jud_seals,
-                "مهر خارجه": total_fa_seals,
-            })
-        df_revenue = pd.DataFrame(revenue_data)
-
-        # --- Sheet 2: هزینه‌ها (Expenses) ---
-        expense_data = [{
-            "تاریخ": jdatetime.date.fromgregorian(date=exp.expense_date).strftime('%Y/%m/%d'),
-            "شرح هزینه": exp.name,
-            "دسته‌بندی": exp.category,
-            "مبلغ": exp.amount
-        } for exp in expenses]
-        df_expenses = pd.DataFrame(expense_data)
-
-        # --- Sheet 3: سوددهی (Profitability) - Simplified for export ---
-        df_profit = pd.DataFrame({
-            "ماه": self.get_persian_month_names(),
-            "درآمد ماهانه": self.get_full_report_data(year)["revenues"],
-            "هزینه ماهانه": self.get_full_report_data(year)["expenses"],
-            "سود ماهانه": self.get_full_report_data(year)["profits"],
-        })
-
-        # --- Write to Excel file ---
-        with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-            df_revenue.to_excel(writer, sheet_name='درآمد', index=False, header=True)
-            df_expenses.to_excel(writer, sheet_name='هزینه‌ها', index=False, header=True)
-            df_profit.to_excel(writer, sheet_name='سوددهی', index=False, header=True)
+    def export_year_data_to_excel(self, year: int, file_path: str,
+                                  progress: Optional[ProgressCallback] = None,
+                                  is_cancelled: Optional[CancelCheck] = None) -> int:
+        """
+        Streams the year's invoices and expenses into a multi-sheet Excel file.
+        Per-invoice seal and companion counts are computed in the query, so no
+        invoice or item objects are loaded. Returns the number of rows written.
+        """
+        revenue_columns = [
+            ExportColumn("invoice_number", "شماره فاکتور", IssuedInvoiceModel.invoice_number),
+            ExportColumn("issue_date", "تاریخ صدور", IssuedInvoiceModel.issue_date, jalali_date),
+            ExportColumn("name", "نام مشتری", IssuedInvoiceModel.name),
+            ExportColumn("national_id", "کد ملی مشتری", IssuedInvoiceModel.national_id),
+            ExportColumn("companions", "تعداد همراهان", self._repo.companion_count_expression()),
+            ExportColumn("translator", "مترجم", IssuedInvoiceModel.translator),
+            ExportColumn("total_amount", "مبلغ کل", IssuedInvoiceModel.total_amount),
+            ExportColumn("final_amount", "مبلغ نهایی", IssuedInvoiceModel.final_amount),
+            ExportColumn("payment_status", "وضعیت پرداخت", IssuedInvoiceModel.payment_status,
+                         lambda status: "پرداخت شده" if status == 1 else "پرداخت نشده"),
+            ExportColumn("judiciary_seals", "مهر دادگستری",
+                         self._repo.revenue_seal_count_expression(InvoiceItemModel.has_judiciary_seal)),
+            ExportColumn("foreign_affairs_seals", "مهر خارجه",
+                         self._repo.revenue_seal_count_expression(InvoiceItemModel.has_foreign_affairs_seal)),
+        ]
+        expense_columns = [
+            ExportColumn("expense_date", "تاریخ", ExpenseModel.expense_date, jalali_date),
+            ExportColumn("name", "شرح هزینه", ExpenseModel.name),
+            ExportColumn("category", "دسته‌بندی", ExpenseModel.category),
+            ExportColumn("amount", "مبلغ", ExpenseModel.amount),
+        ]
+        profit_columns = [ExportColumn("month", "ماه"), ExportColumn("revenue", "درآمد ماهانه"),
+                          ExportColumn("expense", "هزینه ماهانه"), ExportColumn("profit", "سود ماهانه")]
+
+        report = self.get_full_report_data(year)
+        profit_rows = list(zip(self.get_persian_month_names(), report["revenues"],
+                               report["expenses"], report["profits"]))
+
+        sheets = [
+            ExportSheet('درآمد', revenue_columns, self._repo.detailed_invoices_statement(
+                year, [column.expression for column in revenue_columns])),
+            ExportSheet('هزینه‌ها', expense_columns, self._repo.detailed_expenses_statement(
+                year, [column.expression for column in expense_columns])),
+            ExportSheet('سوددهی', profit_columns, rows=profit_rows),
+        ]
+        return self._exporter.export(file_path, sheets, progress=progress, is_cancelled=is_cancelled)
 
     def export_table_to_excel(self, table_data: list[list], headers: list[str], file_path: str):
         """
@@ -1,11 +1,11 @@
 # features/Admin_Panel/admin_reports/admin_reports_repo.py
 
-from sqlalchemy import func, extract, case
+from sqlalchemy import Select, func, extract, case, select
 from sqlalchemy.orm import Session
 from datetime import date, timedelta
 import jdatetime
 from shared.orm_models.business_models import (IssuedInvoiceModel, InvoiceItemModel, FixedPricesModel, ExpenseModel,
-                                               CompanionModel, ServicesModel)
+                                               CompanionModel, ServicesModel, CustomerModel)
 
 
 class AdminReportsRepository:
@@ -113,36 +113,66 @@ class AdminReportsRepository:
         return monthly_costs
 
     # --- METHODS FOR EXCEL EXPORT ---
-    def get_detailed_invoices_for_year(self, session: Session, year: int) -> list:
-        """Returns a list of all raw IssuedInvoiceModel objects for a given year."""
+    # These build statements instead of loading rows: the exporter streams them with a server-side cursor.
+
+    @staticmethod
+    def revenue_seal_count_expression(seal_column):
+        """Correlated per-invoice sum of one of the item seal flags."""
+        return (
+            select(func.coalesce(func.sum(seal_column), 0))
+            .where(InvoiceItemModel.invoice_number == IssuedInvoiceModel.invoice_number)
+            .correlate(IssuedInvoiceModel)
+            .scalar_subquery()
+        )
+
+    @staticmethod
+    def companion_count_expression():
+        """Correlated number of companions of the invoice's customer."""
+        return (
+            select(func.count(CompanionModel.id))
+            .where(CompanionModel.customer_national_id == IssuedInvoiceModel.national_id)
+            .correlate(IssuedInvoiceModel)
+            .scalar_subquery()
+        )
+
+    def detailed_invoices_statement(self, year: int, columns: list) -> Select:
+        """Selects ``columns`` for every invoice issued in the given Jalali year, oldest first."""
         start_date, end_date = self._get_gregorian_date_range_for_jalali_year(year)
-        return session.query(IssuedInvoiceModel).filter(
-            IssuedInvoiceModel.issue_date.between(start_date, end_date)
-        ).order_by(IssuedInvoiceModel.issue_date).all()
+        return (
+            select(*columns)
+            .select_from(IssuedInvoiceModel)
+            .where(IssuedInvoiceModel.issue_date.between(start_date, end_date))
+            .order_by(IssuedInvoiceModel.issue_date, IssuedInvoiceModel.id)
+        )
 
-    def get_detailed_expenses_for_year(self, session: Session, year: int) -> list:
-        """Returns a list of all raw ExpenseModel objects for a given year."""
+    def detailed_expenses_statement(self, year: int, columns: list) -> Select:
+        """Selects ``columns`` for every expense of the given Jalali year, oldest first."""
         start_date, end_date = self._get_gregorian_date_range_for_jalali_year(year)
-        return session.query(ExpenseModel).filter(
-            ExpenseModel.expense_date.between(start_date, end_date)
-        ).order_by(ExpenseModel.expense_date).all()
+        return (
+            select(*columns)
+            .select_from(ExpenseModel)
+            .where(ExpenseModel.expense_date.between(start_date, end_date))
+            .order_by(ExpenseModel.expense_date, ExpenseModel.id)
+        )
 
-    def get_companion_counts_for_customers(self, session: Session, national_ids: list) -> dict:
+    def get_companion_counts_for_customers(self, session: Session, customer_ids: list[int]) -> dict:
         """
-        Takes a list of customer national IDs and returns a dictionary
-        mapping each ID to their number of companions.
+        Takes a list of customer ids and returns a dictionary
+        mapping each id to their number of companions.
         """
-        if not national_ids:
+        if not customer_ids:
             return {}
 
         results = session.query(
-            CompanionModel.customer_national_id,
+            CustomerModel.id,
             func.count(CompanionModel.id)
+        ).join(
+            CompanionModel, CompanionModel.customer_national_id == CustomerModel.national_id
         ).filter(
-            CompanionModel.customer_national_id.in_(national_ids)
-        ).group_by(CompanionModel.customer_national_id).all()
+            CustomerModel.id.in_(customer_ids)
+        ).group_by(CustomerModel.id).all()
 
-        return {nid: count for nid, count in results}
+        return {customer_id: count for customer_id, count in results}
 
     # --- METHODS FOR ADVANCED SEARCH ---
 
@@ -167,25 +197,30 @@ class AdminReportsRepository:
                                 end_date: date = None) -> list:
         """
         Finds frequent customers, now with an optional date range filter.
+        Visits are counted per customer id and the names joined afterwards.
         """
-        query = session.query(
-            IssuedInvoiceModel.name,
-            IssuedInvoiceModel.national_id,
+        visits = session.query(
+            IssuedInvoiceModel.customer_id,
             func.count(IssuedInvoiceModel.id).label('visit_count')
         )
 
         # --- NEW: Add date filter if provided ---
         if start_date and end_date:
-            query = query.filter(IssuedInvoiceModel.issue_date.between(start_date, end_date))
+            visits = visits.filter(IssuedInvoiceModel.issue_date.between(start_date, end_date))
 
-        query = query.group_by(
-            IssuedInvoiceModel.name,
-            IssuedInvoiceModel.national_id
+        visits = visits.group_by(
+            IssuedInvoiceModel.customer_id
         ).having(
             func.count(IssuedInvoiceModel.id) >= min_visits
-        ).order_by(func.count(IssuedInvoiceModel.id).desc())
-
-        return query.all()
+        ).subquery()
+
+        return session.query(
+            CustomerModel.name,
+            CustomerModel.national_id,
+            visits.c.visit_count
+        ).join(
+            visits, CustomerModel.id == visits.c.customer_id
+        ).order_by(visits.c.visit_count.desc()).all()
 
     def get_all_service_names(self, session: Session) -> list:
         """Fetches all unique service names from the services table."""
@@ -5,23 +5,28 @@ from PySide6.QtWidgets import QMessageBox, QDialog, QVBoxLayout
 
 from features.Admin_Panel.wage_calculator.wage_calculator_view import WageCalculatorView
 from features.Admin_Panel.wage_calculator.wage_calculator_logic import WageCalculatorLogic
+from features.Admin_Panel.wage_calculator.wage_calculator_models import PayrollRunReport
+from features.Admin_Panel.wage_calculator.wage_calculator_payroll_run import PayrollRunner
 from features.Admin_Panel.wage_calculator.wage_calculator_preview.wage_calculator_preview_controller import \
     WageCalculatorPreviewController
 from features.Admin_Panel.wage_calculator.wage_calculator_preview.wage_calculator_preview_view import WageCalculatorPreviewDialog
 from features.Admin_Panel.wage_calculator.wage_calculator_preview.salary_slip_viewer import SalarySlipViewer
-from shared import show_error_message_box
+from shared import show_error_message_box, show_information_message_box, show_question_message_box
+from shared.widgets.export_progress import run_export_with_progress
 
 
 class WageCalculatorController:
-    def __init__(self, view: WageCalculatorView, logic: WageCalculatorLogic):
+    def __init__(self, view: WageCalculatorView, logic: WageCalculatorLogic, payroll_runner: PayrollRunner):
         self._view = view
         self._logic = logic
+        self._payroll_runner = payroll_runner
         today = jdatetime.date.today()
         self._current_year = today.year
         self._current_month = today.month
 
         self._view.period_changed.connect(self._on_period_changed)
         self._view.run_payroll_requested.connect(self._on_run_payroll_requested)
+        self._view.run_month_requested.connect(self._on_run_month_requested)
         self._view.view_payslip_requested.connect(self._on_view_payslip_requested)
         self._view.refresh_requested.connect(self.load_page_data)
 
@@ -61,6 +66,31 @@ class WageCalculatorController:
         except Exception as e:
             show_error_message_box(self._view, "خطا", f"خطایی در حین اجرای محاسبه حقوق رخ داد:\n{e}")
 
+    def _on_run_month_requested(self):
+        """Runs the payroll of the selected month for every employee who has no payslip for it yet."""
+        year, month = self._current_year, self._current_month
+        show_question_message_box(
+            parent=self._view, title="محاسبه حقوق کل ماه",
+            message=f"فیش حقوقی همه کارمندانی که برای {year}/{month:02d} فیش ندارند محاسبه و ذخیره شود؟",
+            button_1="بله", yes_func=lambda: self._start_month_run(year, month), button_2="خیر")
+
+    def _start_month_run(self, year: int, month: int):
+        def job(progress, is_cancelled) -> PayrollRunReport:
+            return self._payroll_runner.run(year, month, progress=progress, is_cancelled=is_cancelled)
+
+        def on_finished(report: PayrollRunReport):
+            message = f"{len(report.saved)} فیش حقوقی ذخیره شد."
+            if report.skipped:
+                message += f"\n{len(report.skipped)} کارمند از قبل فیش این ماه را داشتند."
+            if report.failures:
+                message += f"\n{len(report.failures)} فیش محاسبه نشد (مثلاً کارمندان پاره‌وقت بدون ساعات کارکرد)."
+            show_information_message_box(self._view, "محاسبه حقوق", message)
+            self.load_page_data()
+
+        run_export_with_progress(
+            self._view, job, "در حال محاسبه فیش‌های حقوقی...", on_finished,
+            lambda error: show_error_message_box(self._view, "خطا", f"خطایی در محاسبه حقوق ماه رخ داد:\n{error}"))
+
     def _on_view_payslip_requested(self, payroll_id: str):
         """
         Shows the details of an existing, saved payslip in a new pop-up dialog.
@@ -5,6 +5,7 @@ from sqlalchemy.engine import Engine
 from features.Admin_Panel.wage_calculator.wage_calculator_controller import WageCalculatorController
 from features.Admin_Panel.wage_calculator.wage_calculator_view import WageCalculatorView
 from features.Admin_Panel.wage_calculator.wage_calculator_logic import WageCalculatorLogic
+from features.Admin_Panel.wage_calculator.wage_calculator_payroll_run import PayrollRunner
 from features.Admin_Panel.wage_calculator.wage_calculator_repo import (WageCalculatorRepository,
                                                                        InvoicesRepository, UsersRepository,
                                                                        PayrollRepository)
@@ -39,10 +40,13 @@ class WageCalculatorFactory:
         logic = WageCalculatorLogic(repository=repo,
                                     payroll_engine=payroll_session,
                                     business_engine=business_engine_session)
+        payroll_runner = PayrollRunner(repository=repo,
+                                       payroll_engine=payroll_session,
+                                       business_engine=business_engine_session)
         view = WageCalculatorView(parent=parent)
 
         # 2. Instantiate the Controller, which connects everything
-        controller = WageCalculatorController(view, logic)
+        controller = WageCalculatorController(view, logic, payroll_runner)
 
         return controller
 
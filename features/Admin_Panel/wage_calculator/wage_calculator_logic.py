@@ -24,6 +24,256 @@ STATUS_TRANSLATIONS = {
 }
 
 
+def current_issuer() -> str:
+    user_data = SessionManager().get_session()
+    return (user_data.full_name or user_data.user_id) if user_data else ""
+
+
+def jalali_month_range(year: int, month: int):
+    """Gregorian first and last day of a Jalali month."""
+    start_j = jdatetime.date(year, month, 1)
+    # --- MODIFIED: More robust way to find the end of a Jalali month ---
+    if month == 12 and not start_j.isleap():
+        end_j = jdatetime.date(year, month, 29)
+    elif month >= 7:
+        end_j = jdatetime.date(year, month, 30)
+    else:
+        end_j = jdatetime.date(year, month, 31)
+
+    return start_j.togregorian(), end_j.togregorian()
+
+
+def to_translation_office(translation_office_info) -> TranslationOffice | None:
+    """Converts the office row (or the list some repositories return) to the payslip DTO."""
+    if isinstance(translation_office_info, list):
+        office_model = translation_office_info[0] if translation_office_info else None
+    else:
+        office_model = translation_office_info
+
+    if not office_model:
+        return None
+    return TranslationOffice(
+        name=office_model.name,
+        registration=office_model.reg_no or "",
+        representative=office_model.representative or "",
+        manager=office_model.manager or "",
+        address=office_model.address or "",
+        phone=office_model.phone or "",
+    )
+
+
+def calculate_progressive_tax(annual_income_rials: Decimal, brackets) -> Decimal:
+    """Corrected progressive tax calculation using proper column names."""
+    tax = Decimal(0)
+    income = annual_income_rials
+    last_upper_bound = Decimal(0)
+
+    for bracket in brackets:
+        if income <= last_upper_bound:
+            break
+
+        lower = bracket.lower_bound_rials
+        upper = bracket.upper_bound_rials if bracket.upper_bound_rials is not None else income
+
+        taxable_in_bracket = min(income, upper) - lower
+        if taxable_in_bracket < 0:
+            taxable_in_bracket = 0
+
+        tax += taxable_in_bracket * bracket.rate
+        last_upper_bound = upper
+
+    return tax
+
+
+def calculate_payslip(employee_id: str, profile, start_date, end_date, work_metric, constants: dict,
+                      tax_brackets, salary_components: dict, translation_total=0, commission_invoices=()) -> dict:
+    """
+    Unified salary calculation engine (Decimal-safe).
+
+    Pure function of its inputs - the profile may be the ORM row or a PayrollProfileSnapshot,
+    and commission employees get their period's translation total (Tomans, summed in SQL)
+    passed in - so a whole payroll run can be calculated in worker processes without
+    database access. ``commission_invoices`` only fills the per-invoice lines of the
+    payslip detail view; the commission itself is taken from ``translation_total``.
+    """
+    calculated_components = {}
+    working_days = Decimal((end_date - start_date).days + 1)
+    # --- NEW: Dictionary to hold extra data for the DTO ---
+    extra_data = {}
+
+    def D(value):
+        if isinstance(value, Decimal):
+            return value
+        if value is None:
+            return Decimal("0")
+        return Decimal(str(value))
+
+    if profile.employment_type == EmploymentType.FULL_TIME:
+        base_daily_wage = max(
+            D(profile.base_salary_rials),
+            D(constants.get("MIN_DAILY_WAGE_RIAL", 0)),
+        )
+        base_salary = base_daily_wage * working_days
+        calculated_components["Basic Salary"] = base_salary
+
+        hourly_wage = base_daily_wage / D("7.33")
+        overtime_pay = D(work_metric) * hourly_wage * (D(constants.get("OVERTIME_RATE_PCT", 0.4)) + 1)
+        calculated_components["Overtime Pay"] = overtime_pay
+
+        calculated_components["Housing Allowance"] = (D(constants.get("HOUSING_ALLOWANCE_RIAL", 0)) / D(
+            30)) * working_days
+        calculated_components["Groceries Allowance"] = (D(constants.get("GROCERIES_ALLOWANCE_RIAL", 0)) / D(
+            30)) * working_days
+        calculated_components["Children Allowance"] = (
+                D(profile.children_count) * (
+                    (D(constants.get("CHILDREN_ALLOWANCE_PER_CHILD_RIAL", 0)) / D(30)) * working_days)
+        )
+    # --- MODIFIED: Implemented Part-Time logic ---
+    elif profile.employment_type == EmploymentType.PART_TIME:
+        hourly_rate = D(profile.hourly_rate_rials or constants.get("MIN_HOURLY_WAGE_RIAL", 0))
+        total_hours = D(work_metric)
+        base_salary = total_hours * hourly_rate
+        calculated_components["BaseBusiness Hourly Salary"] = base_salary
+        extra_data['hours_worked'] = total_hours
+
+    # --- MODIFIED: Implemented Commission logic ---
+    elif profile.employment_type == EmploymentType.COMMISSION:
+        commission_rate = D(profile.commission_rate_pct or 0)
+        # Invoice amounts are in Toman, convert to Rial for calculation
+        calculated_components["Commission"] = D(translation_total) * 10 * commission_rate
+        extra_data['commission_details'] = [
+            CommissionDetail(
+                invoice_number=inv.invoice_number,
+                customer_name=inv.name,
+                total_price=D(inv.total_translation_price),
+                translator_share=D(inv.total_translation_price) * commission_rate
+            ) for inv in commission_invoices
+        ]
+
+    else:
+        print(f"employee id: {employee_id}, employment type: {profile.employment_type}")
+        raise ValueError(f"شیوه پرداخت برای کارمند با شناسه {employee_id} قابل شناسایی نیست.")
+
+    insurance_base = Decimal("0")
+    gross_income = Decimal("0")
+
+    for name, amount in calculated_components.items():
+        amount = D(amount)
+        comp_def = salary_components.get(name)
+        if comp_def and comp_def.type == "Earning":
+            gross_income += amount
+            if comp_def.is_base_for_insurance_calculation:
+                insurance_base += amount
+
+    insurance_rate = D(constants.get("INSURANCE_EMP_RATE_PCT", 0.07))
+    insurance_deduction = insurance_base * insurance_rate
+    calculated_components["Employee Insurance"] = insurance_deduction
+
+    taxable_income = gross_income - insurance_deduction
+    annualized_taxable_income = taxable_income * D(12)
+    annual_tax = calculate_progressive_tax(annualized_taxable_income, tax_brackets)
+    monthly_tax = D(annual_tax) / D(12)
+    calculated_components["Income Tax"] = monthly_tax
+
+    total_deductions = insurance_deduction + monthly_tax
+    net_income = gross_income - total_deductions
+
+    employer_insurance = insurance_base * D(constants.get("INSURANCE_EMPLOYER_RATE_PCT", 0.20))
+    unemployment_insurance = insurance_base * D(constants.get("UNEMPLOYMENT_INSURANCE_RATE_PCT", 0.03))
+    total_employer_contribution = employer_insurance + unemployment_insurance
+
+    calculated_components["Employer Insurance (20%)"] = employer_insurance
+    calculated_components["Unemployment Insurance (3%)"] = unemployment_insurance
+
+    # --- MODIFIED: Merge extra_data into the return dictionary ---
+    return {
+        "payroll_id": str(uuid.uuid4()),
+        "gross_income": gross_income,
+        "total_deductions": total_deductions,
+        "net_income": net_income,
+        "taxable_income": taxable_income,
+        "tax": monthly_tax,
+        "insurance": insurance_deduction,
+        "employer_insurance": employer_insurance,
+        "unemployment_insurance": unemployment_insurance,
+        "employer_total_contribution": total_employer_contribution,
+        "components": calculated_components,
+        **extra_data
+    }
+
+
+def build_payslip_data(employee, employment_type: EmploymentType, calculated_data: dict, salary_components: dict,
+                       start_date, end_date, work_metric, translation_office: TranslationOffice | None,
+                       issuer: str) -> PayslipData:
+    """The preview DTO of a calculated payslip, converting Rials to Tomans for display."""
+    components = [
+        PayrollComponent(
+            name=name,
+            display_name=salary_components[name].display_name,
+            type=salary_components[name].type,
+            amount=amount / 10
+        )
+        for name, amount in calculated_data['components'].items() if amount != 0
+    ]
+
+    # --- MODIFIED: Populate new DTO fields ---
+    return PayslipData(
+        payroll_id=calculated_data['payroll_id'],
+        employee_code=employee.employee_code,
+        employee_name=f"{employee.first_name} {employee.last_name}",
+        employee_national_id=employee.national_id,
+        pay_period_str=(f"{jdatetime.date.fromgregorian(date=start_date):%Y/%m/%d} تا "
+                        f"{jdatetime.date.fromgregorian(date=end_date):%Y/%m/%d}"),
+        gross_income=calculated_data['gross_income'] / 10,
+        total_deductions=calculated_data['total_deductions'] / 10,
+        net_income=calculated_data['net_income'] / 10,
+        components=components,
+        issuer=issuer,
+        translation_office=translation_office,
+        employment_type=employment_type,
+        hours_worked=calculated_data.get('hours_worked'),
+        commissions=calculated_data.get('commission_details', []),
+        _raw_data_for_save={
+            'employee_id': employee.employee_id,
+            'start_date': start_date,
+            'end_date': end_date,
+            'overtime': work_metric,
+            'taxable_income': calculated_data['taxable_income'],
+            'tax': calculated_data['tax'],
+            'insurance': calculated_data['insurance'],
+        },
+    )
+
+
+def build_payroll_record(payslip_data: PayslipData, salary_components: dict) -> PayrollRecordModel:
+    """The database record of a calculated payslip, with the status in English for the DB constraint."""
+    raw = payslip_data._raw_data_for_save
+    record = PayrollRecordModel(
+        payroll_id=payslip_data.payroll_id,
+        employee_id=raw['employee_id'],
+        pay_period_start_date=raw['start_date'],
+        pay_period_end_date=raw['end_date'],
+        base_working_hours_in_period=((raw['end_date'] - raw['start_date']).days + 1) * 8,
+        overtime_hours_in_period=raw['overtime'],
+        gross_income_rials=payslip_data.gross_income * 10,
+        total_deductions_rials=payslip_data.total_deductions * 10,
+        taxable_income_rials=raw['taxable_income'],
+        calculated_tax_rials=raw['tax'],
+        calculated_insurance_rials=raw['insurance'],
+        net_income_rials=payslip_data.net_income * 10,
+        # --- FIX: Revert to the English status required by the database CHECK constraint ---
+        status='Finalized'
+    )
+
+    record.component_details = [
+        PayrollComponentDetailModel(
+            component_id=salary_components[comp.name].component_id,
+            amount_rials=comp.amount * 10
+        ) for comp in payslip_data.components
+    ]
+    return record
+
+
 class WageCalculatorLogic:
     def __init__(self, repository: WageCalculatorRepository,
                  payroll_engine: ManagedSessionProvider,
@@ -114,60 +364,10 @@ class WageCalculatorLogic:
                 tax_brackets, salary_components_map, b_session
             )
 
-            components = [
-                PayrollComponent(
-                    name=name,
-                    display_name=salary_components_map[name].display_name,
-                    type=salary_components_map[name].type,
-                    amount=amount / 10
-                )
-                for name, amount in calculated_data['components'].items() if amount != 0
-            ]
-
-            if isinstance(translation_office_info, list):
-                office_model = translation_office_info[0] if translation_office_info else None
-            else:
-                office_model = translation_office_info
-
-            tr = None
-            if office_model:
-                tr = TranslationOffice(
-                    name=office_model.name,
-                    registration=office_model.reg_no or "",
-                    representative=office_model.representative or "",
-                    manager=office_model.manager or "",
-                    address=office_model.address or "",
-                    phone=office_model.phone or "",
-                )
-
-            user_data = SessionManager().get_session()
-
-            # --- MODIFIED: Populate new DTO fields ---
-            return PayslipData(
-                payroll_id=calculated_data['payroll_id'],
-                employee_code=employee.employee_code,
-                employee_name=f"{employee.first_name} {employee.last_name}",
-                employee_national_id=employee.national_id,
-                pay_period_str=(f"{jdatetime.date.fromgregorian(date=start_date):%Y/%m/%d} تا "
-                                f"{jdatetime.date.fromgregorian(date=end_date):%Y/%m/%d}"),
-                gross_income=calculated_data['gross_income'] / 10,
-                total_deductions=calculated_data['total_deductions'] / 10,
-                net_income=calculated_data['net_income'] / 10,
-                components=components,
-                issuer=user_data.full_name or user_data.user_id,
-                translation_office=tr,
-                employment_type=employee.payroll_profile.employment_type,
-                hours_worked=calculated_data.get('hours_worked'),
-                commissions=calculated_data.get('commission_details', []),
-                _raw_data_for_save={
-                    'employee_id': employee_id,
-                    'start_date': start_date,
-                    'end_date': end_date,
-                    'overtime': work_metric,
-                    'taxable_income': calculated_data['taxable_income'],
-                    'tax': calculated_data['tax'],
-                    'insurance': calculated_data['insurance'],
-                },
+            return build_payslip_data(
+                employee, employee.payroll_profile.employment_type, calculated_data, salary_components_map,
+                start_date, end_date, work_metric,
+                to_translation_office(translation_office_info), current_issuer(),
             )
 
     def audit_payroll(self, payslip_data: PayslipData):
@@ -188,82 +388,23 @@ class WageCalculatorLogic:
 
     def save_payslip_record(self, payslip_data: PayslipData):
         """Saves a payslip to the database, ensuring the status is in English for the DB constraint."""
-        raw = payslip_data._raw_data_for_save
         with self._payroll_session() as session:
             salary_components = self._repo.payroll_repo.get_salary_components_map(session)
 
-            record = PayrollRecordModel(
-                payroll_id=payslip_data.payroll_id,
-                employee_id=raw['employee_id'],
-                pay_period_start_date=raw['start_date'],
-                pay_period_end_date=raw['end_date'],
-                base_working_hours_in_period=((raw['end_date'] - raw['start_date']).days + 1) * 8,
-                overtime_hours_in_period=raw['overtime'],
-                gross_income_rials=payslip_data.gross_income * 10,
-                total_deductions_rials=payslip_data.total_deductions * 10,
-                taxable_income_rials=raw['taxable_income'],
-                calculated_tax_rials=raw['tax'],
-                calculated_insurance_rials=raw['insurance'],
-                net_income_rials=payslip_data.net_income * 10,
-                # --- FIX: Revert to the English status required by the database CHECK constraint ---
-                status='Finalized'
-            )
-
-            record.component_details = [
-                PayrollComponentDetailModel(
-                    component_id=salary_components[comp.name].component_id,
-                    amount_rials=comp.amount * 10
-                ) for comp in payslip_data.components
-            ]
-
+            record = build_payroll_record(payslip_data, salary_components)
             session.add(record)
             session.commit()
 
     def _calculate_progressive_tax(self, annual_income_rials: Decimal, brackets: list[TaxBracketModel]) -> Decimal:
-        """Corrected progressive tax calculation using proper column names."""
-        tax = Decimal(0)
-        income = annual_income_rials
-        last_upper_bound = Decimal(0)
-
-        for bracket in brackets:
-            if income <= last_upper_bound:
-                break
-
-            lower = bracket.lower_bound_rials
-            upper = bracket.upper_bound_rials if bracket.upper_bound_rials is not None else income
-
-            taxable_in_bracket = min(income, upper) - lower
-            if taxable_in_bracket < 0:
-                taxable_in_bracket = 0
-
-            tax += taxable_in_bracket * bracket.rate
-            last_upper_bound = upper
-
-        return tax
+        return calculate_progressive_tax(annual_income_rials, brackets)
 
     def _convert_record_to_payslip_data(self, record: PayrollRecordModel) -> PayslipData:
         """Helper to convert an ORM model to a PayslipData DTO, handling Rials to Tomans conversion."""
         if not record:
             return None
 
-        with self._business_session as session:
-            translation_office_info = self._repo.users_repo.get_translation_office_info(session)
-
-        if isinstance(translation_office_info, list):
-            office_model = translation_office_info[0] if translation_office_info else None
-        else:
-            office_model = translation_office_info
-
-        tr = None
-        if office_model:
-            tr = TranslationOffice(
-                name=office_model.name,
-                registration=office_model.reg_no or "",
-                representative=office_model.representative or "",
-                manager=office_model.manager or "",
-                address=office_model.address or "",
-                phone=office_model.phone or "",
-            )
+        with self._business_session() as session:
+            tr = to_translation_office(self._repo.users_repo.get_translation_office_info(session))
 
         sorted_details = sorted(record.component_details,
                                 key=lambda d: (d.salary_component.type, d.salary_component.name))
@@ -276,8 +417,6 @@ class WageCalculatorLogic:
             ) for detail in sorted_details
         ]
 
-        user_info = SessionManager().get_session()
-
         # Note: This is a simplified conversion. A full implementation would need to
         # rebuild commission/part-time data from other sources if it's not stored
         # directly in the payroll record. For now, we set the type.
@@ -293,145 +432,27 @@ class WageCalculatorLogic:
             net_income=record.net_income_rials / 10,
             components=components,
             translation_office=tr,
-            issuer=user_info.full_name or user_info.user_id,
+            issuer=current_issuer(),
             employment_type=record.employee.payroll_profile.employment_type
         )
 
     # --- MODIFIED: Renamed overtime_hours to work_metric and expanded logic ---
     def _calculate_single_payslip(self, employee, start_date, end_date, work_metric, constants, tax_brackets,
                                   salary_components, i_session) -> dict:
-        """
-        Unified salary calculation engine (Decimal-safe).
-        """
-        profile = employee.payroll_profile
-        calculated_components = {}
-        working_days = Decimal((end_date - start_date).days + 1)
-        # --- NEW: Dictionary to hold extra data for the DTO ---
-        extra_data = {}
-
-        def D(value):
-            if isinstance(value, Decimal):
-                return value
-            if value is None:
-                return Decimal("0")
-            return Decimal(str(value))
-
-        if profile.employment_type == EmploymentType.FULL_TIME:
-            base_daily_wage = max(
-                D(profile.base_salary_rials),
-                D(constants.get("MIN_DAILY_WAGE_RIAL", 0)),
-            )
-            base_salary = base_daily_wage * working_days
-            calculated_components["Basic Salary"] = base_salary
-
-            hourly_wage = base_daily_wage / D("7.33")
-            overtime_pay = D(work_metric) * hourly_wage * (D(constants.get("OVERTIME_RATE_PCT", 0.4)) + 1)
-            calculated_components["Overtime Pay"] = overtime_pay
-
-            calculated_components["Housing Allowance"] = (D(constants.get("HOUSING_ALLOWANCE_RIAL", 0)) / D(
-                30)) * working_days
-            calculated_components["Groceries Allowance"] = (D(constants.get("GROCERIES_ALLOWANCE_RIAL", 0)) / D(
-                30)) * working_days
-            calculated_components["Children Allowance"] = (
-                    D(profile.children_count) * (
-                        (D(constants.get("CHILDREN_ALLOWANCE_PER_CHILD_RIAL", 0)) / D(30)) * working_days)
-            )
-        # --- MODIFIED: Implemented Part-Time logic ---
-        elif profile.employment_type == EmploymentType.PART_TIME:
-            hourly_rate = D(profile.hourly_rate_rials or constants.get("MIN_HOURLY_WAGE_RIAL", 0))
-            total_hours = D(work_metric)
-            base_salary = total_hours * hourly_rate
-            calculated_components["BaseBusiness Hourly Salary"] = base_salary
-            extra_data['hours_worked'] = total_hours
-
-        # --- MODIFIED: Implemented Commission logic ---
-        elif profile.employment_type == EmploymentType.COMMISSION:
-            invoices = self._repo.invoices_repo.get_translator_invoices_for_period(
-                i_session,
-                f"{employee.first_name} {employee.last_name}",
-                start_date,
-                end_date,
-            )
-            commission_rate = D(profile.commission_rate_pct or 0)
-            total_commission_earning = Decimal("0")
-            commission_details = []
-
-            for inv in invoices:
-                # Invoice amounts are in Toman, convert to Rial for calculation
-                total_translation_rials = D(inv.total_translation_price) * 10
-                translator_share_rials = total_translation_rials * commission_rate
-                total_commission_earning += translator_share_rials
-                commission_details.append(
-                    CommissionDetail(
-                        invoice_number=inv.invoice_number,
-                        customer_name=inv.name,
-                        # Convert back to Toman for display
-                        total_price=total_translation_rials / 10,
-                        translator_share=translator_share_rials / 10
-                    )
-                )
-            calculated_components["Commission"] = total_commission_earning
-            extra_data['commission_details'] = commission_details
-
-        else:
-            print(f"employee id: {employee.employee_id}, employment type: {employee.payroll_profile.employment_type}")
-            raise ValueError(f"شیوه پرداخت برای کارمند با شناسه {employee.employee_id} قابل شناسایی نیست.")
-
-        insurance_base = Decimal("0")
-        gross_income = Decimal("0")
-
-        for name, amount in calculated_components.items():
-            amount = D(amount)
-            comp_def = salary_components.get(name)
-            if comp_def and comp_def.type == "Earning":
-                gross_income += amount
-                if comp_def.is_base_for_insurance_calculation:
-                    insurance_base += amount
-
-        insurance_rate = D(constants.get("INSURANCE_EMP_RATE_PCT", 0.07))
-        insurance_deduction = insurance_base * insurance_rate
-        calculated_components["Employee Insurance"] = insurance_deduction
-
-        taxable_income = gross_income - insurance_deduction
-        annualized_taxable_income = taxable_income * D(12)
-        annual_tax = self._calculate_progressive_tax(annualized_taxable_income, tax_brackets)
-        monthly_tax = D(annual_tax) / D(12)
-        calculated_components["Income Tax"] = monthly_tax
-
-        total_deductions = insurance_deduction + monthly_tax
-        net_income = gross_income - total_deductions
-
-        employer_insurance = insurance_base * D(constants.get("INSURANCE_EMPLOYER_RATE_PCT", 0.20))
-        unemployment_insurance = insurance_base * D(constants.get("UNEMPLOYMENT_INSURANCE_RATE_PCT", 0.03))
-        total_employer_contribution = employer_insurance + unemployment_insurance
-
-        calculated_components["Employer Insurance (20%)"] = employer_insurance
-        calculated_components["Unemployment Insurance (3%)"] = unemployment_insurance
-
-        # --- MODIFIED: Merge extra_data into the return dictionary ---
-        return {
-            "payroll_id": str(uuid.uuid4()),
-            "gross_income": gross_income,
-            "total_deductions": total_deductions,
-            "net_income": net_income,
-            "taxable_income": taxable_income,
-            "tax": monthly_tax,
-            "insurance": insurance_deduction,
-            "employer_insurance": employer_insurance,
-            "unemployment_insurance": unemployment_insurance,
-            "employer_total_contribution": total_employer_contribution,
-            "components": calculated_components,
-            **extra_data
-        }
+        """Fetches the commission total and its invoice lines for the detail view, then delegates to calculate_payslip."""
+        translation_total, invoices = Decimal(0), []
+        if employee.payroll_profile.employment_type == EmploymentType.COMMISSION:
+            invoices_repo = self._repo.invoices_repo
+            translator_id = invoices_repo.get_translator_ids(
+                i_session, [(employee.employee_id, f"{employee.first_name} {employee.last_name}")]
+            ).get(employee.employee_id)
+            if translator_id is not None:
+                translation_total = invoices_repo.get_translators_translation_totals(
+                    i_session, [translator_id], start_date, end_date)[translator_id]
+                invoices = invoices_repo.get_translator_commission_invoices(
+                    i_session, translator_id, start_date, end_date)
+        return calculate_payslip(employee.employee_id, employee.payroll_profile, start_date, end_date, work_metric,
+                                 constants, tax_brackets, salary_components, translation_total, invoices)
 
     def _get_jalali_month_range(self, year, month):
-        start_j = jdatetime.date(year, month, 1)
-        # --- MODIFIED: More robust way to find the end of a Jalali month ---
-        if month == 12 and not start_j.isleap():
-            end_j = jdatetime.date(year, month, 29)
-        elif month >= 7:
-            end_j = jdatetime.date(year, month, 30)
-        else:
-            end_j = jdatetime.date(year, month, 31)
-
-        return start_j.togregorian(), end_j.togregorian()
+        return jalali_month_range(year, month)
@@ -1,6 +1,7 @@
 # features/Admin_Panel/wage_calculator/wage_calculator_models.py
 
 from dataclasses import dataclass, field
+from datetime import date
 from decimal import Decimal
 from typing import Optional, List
 from shared.orm_models.payroll_models import EmploymentType
@@ -72,3 +73,75 @@ class EmployeeInfo:
     """A simple DTO for employee selection lists."""
     employee_id: str
     full_name: str
+
+
+# --- Plain snapshots of the inputs of a whole payroll run, loaded once and shipped to the workers ---
+
+@dataclass(frozen=True)
+class PayrollProfileSnapshot:
+    """The pay-relevant fields of one employee and their payroll profile."""
+    employee_id: str
+    employee_code: str
+    first_name: str
+    last_name: str
+    national_id: str
+    employment_type: EmploymentType
+    base_salary_rials: Optional[Decimal]
+    hourly_rate_rials: Optional[Decimal]
+    commission_rate_pct: Decimal
+    children_count: int
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+
+@dataclass(frozen=True)
+class SalaryComponentInfo:
+    component_id: int
+    name: str
+    display_name: Optional[str]
+    type: str
+    is_base_for_insurance_calculation: bool
+
+
+@dataclass(frozen=True)
+class TaxBracket:
+    lower_bound_rials: Decimal
+    upper_bound_rials: Optional[Decimal]
+    rate: Decimal
+
+
+@dataclass(frozen=True)
+class CommissionInvoice:
+    """The fields of an issued invoice the commission calculation reads."""
+    invoice_number: str
+    name: str
+    total_translation_price: Decimal
+
+
+@dataclass
+class PayrollRunInputs:
+    """Everything shared by all payslips of one period."""
+    start_date: date
+    end_date: date
+    constants: dict[str, Decimal]
+    tax_brackets: list[TaxBracket]
+    salary_components: dict[str, SalaryComponentInfo]
+    translation_office: Optional[TranslationOffice]
+    issuer: str
+
+
+@dataclass
+class PayrollRunReport:
+    """Outcome of one payroll run."""
+    total: int = 0
+    saved: dict[str, str] = field(default_factory=dict)  # employee_id -> payroll_id
+    pdfs: dict[str, str] = field(default_factory=dict)  # employee_id -> payslip PDF path
+    skipped: list[str] = field(default_factory=list)  # employees already paid for the period
+    failures: dict[str, str] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (f"Saved {len(self.saved)}/{self.total} payslips ({len(self.pdfs)} PDFs) in "
+                f"{self.elapsed_seconds:.1f}s, {len(self.skipped)} already existed, {len(self.failures)} failed.")
@@ -0,0 +1,349 @@
+# features/Admin_Panel/wage_calculator/wage_calculator_payroll_run.py
+
+"""
+Month-end payroll run.
+
+Loads everything the payslips of a period share - system constants, tax
+brackets, salary components, office info and the commission employees'
+translation totals (one read of the per-translator monthly rollup) - once, calculates and renders every payslip in a process pool, and
+saves all records with their audit entries in a single transaction:
+
+    python -m features.Admin_Panel.wage_calculator.wage_calculator_payroll_run 1404 7 --workers 4
+
+Part-time payslips depend on the hours worked, so part-time employees are only
+included when their hours are passed in ``work_metrics``; the others are left
+for the single-payslip dialog.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import jdatetime
+from PySide6.QtCore import QMarginsF
+from PySide6.QtGui import QPainter, QPageSize, QPdfWriter
+
+from features.Admin_Panel.wage_calculator.wage_calculator_logic import (calculate_payslip, build_payslip_data,
+                                                                        build_payroll_record, jalali_month_range,
+                                                                        to_translation_office, current_issuer)
+from features.Admin_Panel.wage_calculator.wage_calculator_models import (PayslipData, PayrollRunInputs,
+                                                                         PayrollRunReport, PayrollProfileSnapshot,
+                                                                         SalaryComponentInfo, TaxBracket)
+from features.Admin_Panel.wage_calculator.wage_calculator_preview.salary_slip_viewer import SalarySlipPainter
+from features.Admin_Panel.wage_calculator.wage_calculator_repo import WageCalculatorRepository
+from features.Invoice_Page.invoice_preview.invoice_preview_renderer import ensure_gui_application
+from shared.orm_models.payroll_models import EmploymentType, PayrollAuditLogModel
+from shared.services.streaming_exporter import CancelCheck, ExportCancelled, ProgressCallback
+from shared.session_provider import ManagedSessionProvider
+from shared.utils.path_utils import get_user_data_path
+
+logger = logging.getLogger(__name__)
+
+# The slip is laid out at the on-screen viewer's width on an A4 portrait page.
+SLIP_WIDTH = 800
+SLIP_HEIGHT = round(SLIP_WIDTH * 297 / 210)
+PDF_RESOLUTION = 300
+
+
+@dataclass(frozen=True)
+class PayslipJob:
+    """The per-employee inputs of one payslip."""
+    employee: PayrollProfileSnapshot
+    work_metric: Decimal = Decimal("0")  # overtime hours (full-time) or hours worked (part-time)
+    translation_total: Decimal = Decimal("0")  # commission base in Tomans (commission employees)
+
+
+# ---------------------------------------------------------------------
+# WORKER SIDE (runs in the pool processes)
+# ---------------------------------------------------------------------
+
+_worker_inputs: Optional[PayrollRunInputs] = None
+_worker_pdf_dir: Optional[str] = None
+_worker_painter: Optional[SalarySlipPainter] = None
+
+
+def _init_worker(inputs: PayrollRunInputs, pdf_dir: Optional[str]) -> None:
+    """Receives the shared inputs once per worker instead of once per payslip."""
+    global _worker_inputs, _worker_pdf_dir, _worker_painter
+    _worker_inputs = inputs
+    _worker_pdf_dir = pdf_dir
+    _worker_painter = None
+
+
+def render_payslip_pdf(payslip: PayslipData, file_path: str, slip_painter: Optional[SalarySlipPainter] = None) -> bool:
+    """Writes one payslip to an A4 PDF without creating any widget. Returns True on success."""
+    ensure_gui_application()
+    slip_painter = slip_painter or SalarySlipPainter()
+    writer = QPdfWriter(file_path)
+    writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+    writer.setPageMargins(QMarginsF(0, 0, 0, 0))
+    writer.setResolution(PDF_RESOLUTION)
+    writer.setTitle(f"Payslip {payslip.employee_code}")
+
+    painter = QPainter()
+    if not painter.begin(writer):
+        logger.error(f"Could not start painting the payslip of {payslip.employee_name}.")
+        return False
+    try:
+        scale = min(writer.width() / SLIP_WIDTH, writer.height() / SLIP_HEIGHT)
+        painter.scale(scale, scale)
+        slip_painter.paint(painter, payslip, SLIP_WIDTH, SLIP_HEIGHT)
+    except Exception as e:
+        logger.error(f"Error rendering the payslip of {payslip.employee_name}: {e}")
+        return False
+    finally:
+        painter.end()
+    return True
+
+
+def process_payslip(job: PayslipJob) -> Tuple[str, PayslipData, Optional[str]]:
+    """Calculates one payslip and renders its PDF; returns (employee_id, payslip, pdf path or None)."""
+    global _worker_painter
+    inputs = _worker_inputs
+    employee = job.employee
+    calculated = calculate_payslip(employee.employee_id, employee, inputs.start_date, inputs.end_date,
+                                   job.work_metric, inputs.constants, inputs.tax_brackets,
+                                   inputs.salary_components, job.translation_total)
+    payslip = build_payslip_data(employee, employee.employment_type, calculated, inputs.salary_components,
+                                 inputs.start_date, inputs.end_date, job.work_metric,
+                                 inputs.translation_office, inputs.issuer)
+    if not _worker_pdf_dir:
+        return employee.employee_id, payslip, None
+
+    if _worker_painter is None:
+        ensure_gui_application()
+        _worker_painter = SalarySlipPainter()
+    final_path = Path(_worker_pdf_dir) / f"{employee.employee_code}.pdf"
+    temp_path = final_path.with_name(f".{final_path.name}.{os.getpid()}.tmp")
+    if not render_payslip_pdf(payslip, str(temp_path), _worker_painter):
+        temp_path.unlink(missing_ok=True)
+        return employee.employee_id, payslip, None
+    os.replace(temp_path, final_path)
+    return employee.employee_id, payslip, str(final_path)
+
+
+# ---------------------------------------------------------------------
+# COORDINATOR
+# ---------------------------------------------------------------------
+
+class PayrollRunner:
+    """Runs the payroll of a whole Jalali month."""
+
+    def __init__(self, repository: WageCalculatorRepository, payroll_engine: ManagedSessionProvider,
+                 business_engine: ManagedSessionProvider, pdf_root: Optional[Path] = None,
+                 max_workers: Optional[int] = None):
+        """
+        Args:
+            repository: Data access layer.
+            payroll_engine: Session provider of the payroll database.
+            business_engine: Session provider of the business database (office info and invoices).
+            pdf_root: Root of the payslip PDF folders; defaults to the user data folder.
+            max_workers: Pool size (None = one per CPU). 0 calculates and renders in this process.
+        """
+        self._repo = repository
+        self._payroll_session = payroll_engine
+        self._business_session = business_engine
+        self._pdf_root = pdf_root or get_user_data_path("payslips", create_dirs=False)
+        self._max_workers = max_workers
+
+    def run(self, year: int, month: int, work_metrics: Optional[Dict[str, Decimal]] = None,
+            render_pdfs: bool = True, progress: Optional[ProgressCallback] = None,
+            is_cancelled: Optional[CancelCheck] = None) -> PayrollRunReport:
+        """
+        Calculates, saves and renders the payslips of every active employee not yet paid for the month.
+
+        Args:
+            work_metrics: Overtime hours (full-time) or hours worked (part-time) by employee_id.
+            progress: Called with (payslips done, total) as payslips complete.
+            is_cancelled: Checked as payslips complete; a cancelled run raises ExportCancelled
+                before anything is saved.
+        """
+        started = time.perf_counter()
+        start_date, end_date = jalali_month_range(year, month)
+        report = PayrollRunReport()
+        inputs, jobs = self._load_inputs(year, month, start_date, end_date, work_metrics or {}, report)
+        report.total = len(jobs)
+        logger.info(f"Running payroll {year}/{month:02d} for {report.total} employees.")
+
+        # PDFs are rendered into a staging folder and only moved into the month's
+        # folder once the payslips are saved, so a cancelled or failed run leaves none behind.
+        pdf_dir = staging_dir = None
+        if render_pdfs and jobs:
+            pdf_dir = Path(self._pdf_root) / f"{year:04d}-{month:02d}"
+            pdf_dir.mkdir(parents=True, exist_ok=True)
+            staging_dir = Path(tempfile.mkdtemp(prefix=f".{pdf_dir.name}.", dir=self._pdf_root))
+
+        payslips: List[PayslipData] = []
+        try:
+            if jobs:
+                if self._max_workers == 0:
+                    results = self._process_inline(jobs, inputs, staging_dir, report)
+                else:
+                    results = self._process_in_pool(jobs, inputs, staging_dir, report)
+                staged_pdfs = {}
+                for done, (employee_id, payslip, pdf_path) in enumerate(results, start=1):
+                    payslips.append(payslip)
+                    if pdf_path:
+                        staged_pdfs[employee_id] = Path(pdf_path)
+                    if progress:
+                        progress(done, report.total)
+                    if is_cancelled and is_cancelled():
+                        results.close()
+                        raise ExportCancelled()
+                self._save(payslips, inputs, f"{year:04d}/{month:02d}")
+                report.saved = {payslip._raw_data_for_save['employee_id']: payslip.payroll_id
+                                for payslip in payslips}
+                for employee_id, staged_path in staged_pdfs.items():
+                    final_path = pdf_dir / staged_path.name
+                    os.replace(staged_path, final_path)
+                    report.pdfs[employee_id] = str(final_path)
+        finally:
+            if staging_dir:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(report.summary())
+        for employee_id, error in report.failures.items():
+            logger.warning(f"No payslip for employee {employee_id}: {error}")
+        return report
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    def _load_inputs(self, year: int, month: int, start_date, end_date, work_metrics: Dict[str, Decimal],
+                     report: PayrollRunReport) -> Tuple[PayrollRunInputs, List[PayslipJob]]:
+        """Reads every shared input once and turns the employees to pay into jobs."""
+        fiscal_year = jdatetime.date.fromgregorian(date=start_date).year
+        payroll_repo = self._repo.payroll_repo
+        with (self._payroll_session() as p_session,
+              self._business_session() as b_session):
+            employees = payroll_repo.get_all_active_employees(p_session)
+            already_paid = {record.employee_id
+                            for record in payroll_repo.get_payroll_run_for_period(p_session, start_date, end_date)}
+            inputs = PayrollRunInputs(
+                start_date=start_date, end_date=end_date,
+                constants=payroll_repo.get_system_constants(p_session, fiscal_year),
+                tax_brackets=[TaxBracket(b.lower_bound_rials, b.upper_bound_rials, b.rate)
+                              for b in payroll_repo.get_tax_brackets(p_session, fiscal_year)],
+                salary_components={
+                    name: SalaryComponentInfo(c.component_id, c.name, c.display_name, c.type,
+                                              c.is_base_for_insurance_calculation)
+                    for name, c in payroll_repo.get_salary_components_map(p_session).items()
+                },
+                translation_office=to_translation_office(self._repo.users_repo.get_translation_office_info(b_session)),
+                issuer=current_issuer(),
+            )
+
+            snapshots = []
+            for employee in employees:
+                profile = employee.payroll_profile
+                if employee.employee_id in already_paid:
+                    report.skipped.append(employee.employee_id)
+                elif not profile:
+                    report.failures[employee.employee_id] = "پروفایل حقوقی یافت نشد."
+                elif profile.employment_type == EmploymentType.PART_TIME and employee.employee_id not in work_metrics:
+                    report.failures[employee.employee_id] = "ساعات کارکرد کارمند پاره‌وقت وارد نشده است."
+                else:
+                    snapshots.append(PayrollProfileSnapshot(
+                        employee_id=employee.employee_id, employee_code=employee.employee_code,
+                        first_name=employee.first_name, last_name=employee.last_name,
+                        national_id=employee.national_id, employment_type=profile.employment_type,
+                        base_salary_rials=profile.base_salary_rials, hourly_rate_rials=profile.hourly_rate_rials,
+                        commission_rate_pct=profile.commission_rate_pct, children_count=profile.children_count,
+                    ))
+
+            invoices_repo = self._repo.invoices_repo
+            translator_ids = invoices_repo.get_translator_ids(
+                b_session, [(s.employee_id, s.full_name) for s in snapshots
+                            if s.employment_type == EmploymentType.COMMISSION])
+            translation_totals = invoices_repo.get_translators_monthly_totals(
+                b_session, list(translator_ids.values()), year, month)
+
+        jobs = [
+            PayslipJob(snapshot, Decimal(work_metrics.get(snapshot.employee_id, 0)),
+                       translation_totals.get(translator_ids.get(snapshot.employee_id), Decimal("0")))
+            for snapshot in snapshots
+        ]
+        return inputs, jobs
+
+    @staticmethod
+    def _process_inline(jobs: List[PayslipJob], inputs: PayrollRunInputs, pdf_dir: Optional[Path],
+                        report: PayrollRunReport):
+        _init_worker(inputs, str(pdf_dir) if pdf_dir else None)
+        for job in jobs:
+            try:
+                yield process_payslip(job)
+            except Exception as e:
+                report.failures[job.employee.employee_id] = str(e)
+
+    def _process_in_pool(self, jobs: List[PayslipJob], inputs: PayrollRunInputs, pdf_dir: Optional[Path],
+                         report: PayrollRunReport):
+        # 'spawn' gives every worker a clean Qt state instead of a forked copy of the GUI process.
+        with ProcessPoolExecutor(max_workers=self._max_workers, mp_context=get_context("spawn"),
+                                 initializer=_init_worker, initargs=(inputs, str(pdf_dir) if pdf_dir else None)
+                                 ) as pool:
+            futures = {pool.submit(process_payslip, job): job.employee.employee_id for job in jobs}
+            try:
+                for future in as_completed(futures):
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        report.failures[futures[future]] = str(e)
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _save(self, payslips: List[PayslipData], inputs: PayrollRunInputs, period: str) -> None:
+        """Saves every payslip and its audit entry in one transaction."""
+        if not payslips:
+            return
+        performed_at = datetime.now(timezone.utc)
+        with self._payroll_session() as session:
+            session.add_all([
+                PayrollAuditLogModel(
+                    entity_type='payslip',
+                    entity_id=payslip.payroll_id,
+                    action='create',
+                    performed_by=inputs.issuer,
+                    performed_at=performed_at,
+                    details=f"Payslip created for {payslip.employee_name} (payroll run {period})"
+                ) for payslip in payslips
+            ])
+            self._repo.payroll_repo.save_payroll_records_batch(
+                session, [build_payroll_record(payslip, inputs.salary_components) for payslip in payslips])
+
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import create_engine
+
+    from config.config import DATABASE_PATHS
+    from features.Admin_Panel.wage_calculator.wage_calculator_repo import (UsersRepository, InvoicesRepository,
+                                                                           PayrollRepository)
+
+    parser = argparse.ArgumentParser(description="Calculate, save and render the payslips of a Jalali month.")
+    parser.add_argument("year", type=int)
+    parser.add_argument("month", type=int)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--pdf-root", type=Path)
+    parser.add_argument("--no-pdfs", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    runner = PayrollRunner(
+        WageCalculatorRepository(UsersRepository(), InvoicesRepository(), PayrollRepository()),
+        ManagedSessionProvider(create_engine(f"sqlite:///{DATABASE_PATHS['payroll']}")),
+        ManagedSessionProvider(create_engine(f"sqlite:///{DATABASE_PATHS['business']}")),
+        pdf_root=args.pdf_root, max_workers=args.workers,
+    )
+    print(runner.run(args.year, args.month, render_pdfs=not args.no_pdfs).summary())
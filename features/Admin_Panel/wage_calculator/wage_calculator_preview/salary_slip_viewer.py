@@ -9,55 +9,48 @@ from features.Admin_Panel.wage_calculator.wage_calculator_models import PayslipD
 from shared.utils.persian_tools import to_persian_numbers
 
 
-class SalarySlipViewer(QWidget):
+def _font(point_size: int, bold: bool = False) -> QFont:
+    """Sized in pixels at 96 DPI, so the slip keeps its layout on high-resolution PDF writers and printers."""
+    font = QFont("B Nazanin")
+    font.setPixelSize(round(point_size * 96 / 72))
+    font.setBold(bold)
+    return font
+
+
+class SalarySlipPainter:
     """
-    Multi-type salary slip viewer supporting:
+    Paints a salary slip with any QPainter - the on-screen viewer, a printer or a
+    QPdfWriter - supporting:
     - Full-time (Earning/Deduction table)
     - Part-time (adds work hours/days)
     - Commission-based (invoice table)
     """
 
-    def __init__(self, parent=None):
-        super().__init__(parent)
+    def __init__(self):
         self.payslip_data: PayslipData | None = None
-        self.setMinimumSize(800, 700)
-        self.setStyleSheet("background-color: white;")
-
-    # -----------------------------
-    # Public API
-    # -----------------------------
-    def populate(self, data: PayslipData):
-        self.payslip_data = data
-        self.update()
+        self._fonts = {
+            "header": _font(16, bold=True),
+            "sub_header": _font(12),
+            "label": _font(11),
+            "bold_label": _font(11, bold=True),
+            "data": _font(10),
+            "total": _font(12, bold=True),
+        }
 
     # -----------------------------
     # Core Painting Logic
     # -----------------------------
-    def paintEvent(self, event):
-        if not self.payslip_data:
-            return
-
-        painter = QPainter(self)
+    def paint(self, painter: QPainter, data: PayslipData, width: int, height: int):
+        """Paints the slip into a width x height area of logical pixels."""
+        self.payslip_data = data
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
 
         # Shared dimensions
-        width = self.width()
-        height = self.height()
         margin_left = 40
         margin_right = 40
         margin_top = 20
         content_width = width - margin_left - margin_right
 
-        # Fonts
-        self._fonts = {
-            "header": QFont("B Nazanin", 16, QFont.Weight.Bold),
-            "sub_header": QFont("B Nazanin", 12),
-            "label": QFont("B Nazanin", 11),
-            "bold_label": QFont("B Nazanin", 11, QFont.Weight.Bold),
-            "data": QFont("B Nazanin", 10),
-            "total": QFont("B Nazanin", 12, QFont.Weight.Bold),
-        }
-
         y_pos = margin_top + 20
         y_pos = self._draw_header(painter, y_pos, content_width, margin_left)
         y_pos = self._draw_employee_info(painter, y_pos, content_width, margin_left, width)
@@ -291,3 +284,29 @@ class SalarySlipViewer(QWidget):
         issuer_text = f"صادر کننده: {self.payslip_data.issuer}"
         painter.drawText(QRect(width - 350, height - 50, 300, 25),
                          Qt.AlignmentFlag.AlignRight, issuer_text)
+
+
+class SalarySlipViewer(QWidget):
+    """On-screen salary slip; the drawing itself is done by SalarySlipPainter."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.payslip_data: PayslipData | None = None
+        self._painter = SalarySlipPainter()
+        self.setMinimumSize(800, 700)
+        self.setStyleSheet("background-color: white;")
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def populate(self, data: PayslipData):
+        self.payslip_data = data
+        self.update()
+
+    def paintEvent(self, event):
+        if not self.payslip_data:
+            return
+
+        painter = QPainter(self)
+        self._painter.paint(painter, self.payslip_data, self.width(), self.height())
+        painter.end()
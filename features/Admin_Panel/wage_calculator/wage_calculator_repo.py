@@ -4,13 +4,15 @@ from sqlalchemy.orm import Session, joinedload
 from datetime import date, timedelta
 from decimal import Decimal
 from sqlalchemy import func, or_
-from typing import List
 
 from shared.orm_models.payroll_models import (EmployeeModel, SystemConstantModel, TaxBracketModel,
                                               PayrollRecordModel, PayrollComponentDetailModel,
                                               SalaryComponentModel)
 from shared.orm_models.invoices_models import IssuedInvoiceModel
 from shared.orm_models.users_models import TranslationOfficeDataModel
+from features.Admin_Panel.wage_calculator.wage_calculator_models import CommissionInvoice
+from shared.services.translator_monthly_rollup import TranslatorMonthlyRollup
+from shared.services.translator_registry import TranslatorRegistry
 
 
 class UsersRepository:
@@ -25,23 +27,57 @@ class InvoicesRepository:
     """
     A repository for accessing invoice-related data.
     """
-    def get_translator_performance_rials(self, invoices_session: Session, full_name: str, start_date: date,
+    def __init__(self, rollup: TranslatorMonthlyRollup | None = None,
+                 translators: TranslatorRegistry | None = None):
+        self._rollup = rollup or TranslatorMonthlyRollup()
+        self._translators = translators or TranslatorRegistry()
+
+    def get_translator_ids(self, invoices_session: Session, employees: list[tuple[str, str]]) -> dict[str, int]:
+        """Translator ids of payroll employees given as (employee_id, full name), linking them on first use."""
+        return self._translators.link_employees(invoices_session, employees)
+
+    def get_translator_performance_rials(self, invoices_session: Session, translator_id: int, start_date: date,
                                          end_date: date) -> Decimal:
         """Calculates total translation price for a translator, converting to Rials."""
-        total_tomans = invoices_session.query(func.sum(IssuedInvoiceModel.total_translation_price)).filter(
-            IssuedInvoiceModel.translator == full_name,
-            IssuedInvoiceModel.issue_date.between(start_date, end_date)
-        ).scalar() or 0
-        return Decimal(total_tomans) * 10
-
-    # --- NEW: Method to get detailed invoices for commission calculation ---
-    def get_translator_invoices_for_period(self, invoices_session: Session, full_name: str, start_date: date,
-                                           end_date: date) -> List[IssuedInvoiceModel]:
-        """Fetches all invoices for a translator within a date range to calculate commission details."""
-        return invoices_session.query(IssuedInvoiceModel).filter(
-            IssuedInvoiceModel.translator == full_name,
-            IssuedInvoiceModel.issue_date.between(start_date, end_date)
-        ).order_by(IssuedInvoiceModel.issue_date).all()
+        return self.get_translators_translation_totals(invoices_session, [translator_id], start_date,
+                                                       end_date)[translator_id] * 10
+
+    def get_translators_translation_totals(self, invoices_session: Session, translator_ids: list[int],
+                                          start_date: date, end_date: date) -> dict[int, Decimal]:
+        """Translation totals (Tomans) of several translators over any period, in one grouped query."""
+        totals = {translator_id: Decimal(0) for translator_id in translator_ids}
+        if not translator_ids:
+            return totals
+        rows = invoices_session.query(
+            IssuedInvoiceModel.translator_employee_id, func.sum(IssuedInvoiceModel.total_translation_price)
+        ).filter(
+            IssuedInvoiceModel.translator_employee_id.in_(translator_ids),
+            IssuedInvoiceModel.issue_date >= start_date,
+            IssuedInvoiceModel.issue_date < end_date + timedelta(days=1)
+        ).group_by(IssuedInvoiceModel.translator_employee_id)
+        for translator_id, total in rows:
+            totals[translator_id] = Decimal(total or 0)
+        return totals
+
+    def get_translators_monthly_totals(self, invoices_session: Session, translator_ids: list[int],
+                                       year: int, month: int) -> dict[int, Decimal]:
+        """Translation totals (Tomans) of several translators for a Jalali month, read from the monthly rollup."""
+        stats = self._rollup.month_stats(invoices_session, year, month, translator_ids)
+        return {translator_id: Decimal(stats[translator_id].translation_total) if translator_id in stats
+                else Decimal(0) for translator_id in translator_ids}
+
+    def get_translator_commission_invoices(self, invoices_session: Session, translator_id: int, start_date: date,
+                                           end_date: date) -> list[CommissionInvoice]:
+        """The per-invoice lines of a translator's commission, for the payslip detail view."""
+        rows = invoices_session.query(
+            IssuedInvoiceModel.invoice_number, IssuedInvoiceModel.name, IssuedInvoiceModel.total_translation_price
+        ).filter(
+            IssuedInvoiceModel.translator_employee_id == translator_id,
+            IssuedInvoiceModel.issue_date >= start_date,
+            IssuedInvoiceModel.issue_date < end_date + timedelta(days=1)
+        ).order_by(IssuedInvoiceModel.issue_date)
+        return [CommissionInvoice(invoice_number, name, total_translation_price)
+                for invoice_number, name, total_translation_price in rows]
 
 
 class PayrollRepository:
@@ -18,6 +18,7 @@ class WageCalculatorView(QWidget):
     """
     period_changed = Signal(dict)
     run_payroll_requested = Signal()
+    run_month_requested = Signal()
     view_payslip_requested = Signal(str)
     refresh_requested = Signal()
 
@@ -41,6 +42,7 @@ class WageCalculatorView(QWidget):
         self.year_combo.currentIndexChanged.connect(self._on_period_changed)
         self.month_combo.currentIndexChanged.connect(self._on_period_changed)
         self.run_payroll_btn.clicked.connect(self.run_payroll_requested.emit)
+        self.run_month_btn.clicked.connect(self.run_month_requested.emit)
         self.refresh_btn.clicked.connect(self.refresh_requested.emit)
         self.employee_table.itemDoubleClicked.connect(self._on_employee_double_clicked)
 
@@ -62,6 +64,11 @@ class WageCalculatorView(QWidget):
         self.run_payroll_btn.setIcon(qta.icon('fa5s.cogs', color='white'))
         self.run_payroll_btn.setObjectName("runPayrollButton")
 
+        self.run_month_btn = QPushButton("محاسبه حقوق کل ماه")
+        self.run_month_btn.setIcon(qta.icon('fa5s.users-cog', color='white'))
+        self.run_month_btn.setObjectName("runPayrollButton")
+        self.run_month_btn.setToolTip("محاسبه، ذخیره و تهیه PDF فیش حقوقی همه کارمندانی که برای این ماه فیش ندارند.")
+
         self.refresh_btn = QPushButton(" بروزرسانی")
         self.refresh_btn.setIcon(qta.icon('fa5s.sync-alt', color='white'))
         self.refresh_btn.setObjectName("refreshButton")
@@ -71,6 +78,7 @@ class WageCalculatorView(QWidget):
         top_bar_layout.addWidget(self.month_combo)
         top_bar_layout.addStretch()
         top_bar_layout.addWidget(self.refresh_btn)
+        top_bar_layout.addWidget(self.run_month_btn)
         top_bar_layout.addWidget(self.run_payroll_btn)
         return top_bar_layout
 
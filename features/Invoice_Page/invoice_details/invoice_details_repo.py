@@ -26,6 +26,7 @@ class InvoiceDetailsRepository:
                 website=db_office.website,
                 telegram=db_office.telegram,
                 whatsapp=db_office.whatsapp,
-                logo=db_office.logo
+                logo=db_office.logo,
+                updated_at=db_office.updated_at
             )
         return PreviewOfficeInfo()
@@ -1,20 +1,21 @@
 # features/Invoice_Page/invoice_preview/invoice_preview_controller.py
 
-from PySide6.QtWidgets import QFileDialog, QApplication, QDialog
-from PySide6.QtGui import QPixmap, QPainter, QPageSize, QRegion
+from PySide6.QtWidgets import QFileDialog, QDialog
+from PySide6.QtGui import QPixmap
 from PySide6.QtPrintSupport import QPrinter, QPrintDialog
-from PySide6.QtCore import QPoint
 
 from typing import Callable, List
 
 from features.Invoice_Page.invoice_preview.invoice_preview_view import MainInvoicePreviewWidget
 from features.Invoice_Page.invoice_preview.invoice_preview_logic import InvoicePreviewLogic
+from features.Invoice_Page.invoice_preview.invoice_preview_renderer import InvoicePdfRenderer
 from features.Invoice_Page.invoice_page_state_manager import WorkflowStateManager
 from features.Invoice_Page.invoice_preview.invoice_preview_settings_dialog import SettingsDialog
 
 from shared import (show_warning_message_box, show_information_message_box, show_error_message_box,
                     show_question_message_box)
 from shared.orm_models.invoices_models import EditedInvoiceModel
+from shared.utils.text_utils import split_invoice_version
 
 
 class InvoicePreviewController:
@@ -23,10 +24,12 @@ class InvoicePreviewController:
     UI (View) with the business _logic (Logic).
     """
 
-    def __init__(self, view: MainInvoicePreviewWidget, logic: InvoicePreviewLogic, state_manager: WorkflowStateManager):
+    def __init__(self, view: MainInvoicePreviewWidget, logic: InvoicePreviewLogic, state_manager: WorkflowStateManager,
+                 renderer: InvoicePdfRenderer):
         self._state_manager = state_manager
         self._logic = logic
         self._view = view
+        self._renderer = renderer
 
         self._invoice = None
         self.current_page = 1
@@ -74,9 +77,6 @@ class InvoicePreviewController:
         settings = self._logic.settings_manager.get_current_settings()
         items = self._logic.get_items_for_page(self._invoice, self.current_page)
 
-        existing_invoice_orm = self._logic.get_issued_invoice(self._invoice.invoice_number)
-        is_issued = existing_invoice_orm is not None
-
         # 2. Call the view's update method
         self._view.update_view(self._invoice, items, self.current_page, self.total_pages, settings)
         self._view.control_panel.issue_button.setEnabled(True)
@@ -122,8 +122,7 @@ class InvoicePreviewController:
         Handles the logic for re-issuing an edited invoice using a single,
         session-safe call to the logic layer.
         """
-        import re
-        base_invoice_number = re.split(r'-v\d+', self._invoice.invoice_number)[0]
+        base_invoice_number, _ = split_invoice_version(self._invoice.invoice_number)
         assignments = self._state_manager.get_assignments()
         new_items = [item for sublist in assignments.values() for item in sublist]
 
@@ -255,13 +254,9 @@ class InvoicePreviewController:
             show_error_message_box(self._view, "خطا", "خطا در ذخیره سازی فایل.")
 
     def _save_to_pdf_file(self, file_path: str) -> bool:
-        """Renders the entire document to a PDF file."""
-        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
-        printer.setOutputFormat(QPrinter.OutputFormat.PdfFormat)
-        printer.setOutputFileName(file_path)
-        printer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
-        printer.setResolution(300)
-        return self._render_document(printer)
+        """Renders the entire document to a PDF file without paging through the view."""
+        settings = self._logic.settings_manager.get_current_settings()
+        return self._renderer.render_to_pdf(self._invoice, settings, file_path)
 
     def _save_to_png_file(self, file_path: str) -> bool:
         """Renders the currently visible page to a PNG file."""
@@ -283,38 +278,9 @@ class InvoicePreviewController:
                 show_error_message_box(self._view, "خطا", "خطا در فرآیند چاپ.")
 
     def _render_document(self, printer: QPrinter) -> bool:
-        """Renders all pages of the document to a QPrinter device (PDF or physical)."""
-        painter = QPainter()
-        if not painter.begin(printer):
-            return False
-
-        original_page = self.current_page
-        try:
-            for page in range(1, self.total_pages + 1):
-                self.current_page = page
-                self._update_view()
-                QApplication.processEvents()  # Allow UI to update before rendering
-
-                widget_to_render = self._view.get_invoice_widget_for_render()
-                page_rect = printer.pageRect(QPrinter.DevicePixel)
-                scale = min(page_rect.width() / widget_to_render.width(),
-                            page_rect.height() / widget_to_render.height())
-
-                painter.save()
-                painter.scale(scale, scale)
-                widget_to_render.render(painter, QPoint(0, 0), QRegion(widget_to_render.rect()))
-                painter.restore()
-
-                if page < self.total_pages:
-                    printer.newPage()
-        except Exception as e:
-            print(f"Error during rendering: {e}")
-            return False
-        finally:
-            painter.end()
-            self.current_page = original_page  # Restore original state
-            self._update_view()
-        return True
+        """Renders all pages of the document to a QPrinter device."""
+        settings = self._logic.settings_manager.get_current_settings()
+        return self._renderer.render(self._invoice, settings, printer)
 
     def _on_settings_requested(self):
         """Opens the settings dialog and applies changes if accepted."""
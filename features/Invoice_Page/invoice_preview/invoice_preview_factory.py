@@ -10,9 +10,11 @@ from features.Invoice_Page.invoice_preview.invoice_preview_view import MainInvoi
 from features.Invoice_Page.invoice_preview.invoice_preview_controller import InvoicePreviewController
 from features.Invoice_Page.invoice_preview.invoice_preview_logic import InvoicePreviewLogic
 from features.Invoice_Page.invoice_preview.invoice_preview_repo import InvoicePreviewRepository
+from features.Invoice_Page.invoice_preview.invoice_preview_renderer import InvoicePdfRenderer
 from features.Invoice_Page.invoice_page_state_manager import WorkflowStateManager
 from features.Invoice_Page.invoice_preview.invoice_preview_settings_manager import PreviewSettingsManager
 
+from shared.services.invoice_aggregate_loader import InvoiceAggregateLoader
 from shared.session_provider import ManagedSessionProvider
 
 
@@ -39,10 +41,11 @@ class InvoicePreviewFactory:
         settings_manager = PreviewSettingsManager()
 
         repo = InvoicePreviewRepository()
-        logic = InvoicePreviewLogic(repo=repo, business_engine=business_session, settings_manager=settings_manager)
+        logic = InvoicePreviewLogic(repo=repo, business_engine=business_session, settings_manager=settings_manager,
+                                    aggregate_loader=InvoiceAggregateLoader(business_engine))
         view = MainInvoicePreviewWidget(parent=parent)
 
-        controller = InvoicePreviewController(view, logic, state_manager)
+        controller = InvoicePreviewController(view, logic, state_manager, InvoicePdfRenderer())
 
         return controller
 
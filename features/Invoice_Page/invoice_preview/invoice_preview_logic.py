@@ -10,8 +10,10 @@ from features.Invoice_Page.invoice_details.invoice_details_models import Invoice
 from features.Invoice_Page.document_selection.document_selection_models import InvoiceItem
 from features.Invoice_Page.invoice_preview.invoice_preview_settings_manager import PreviewSettingsManager
 
+from shared.services.invoice_aggregate_loader import InvoiceAggregateLoader, InvoiceAggregate
 from shared.session_provider import ManagedSessionProvider, SessionManager
 from shared.utils.date_utils import to_gregorian
+from shared.utils.text_utils import split_invoice_version, format_invoice_version
 from shared.orm_models.invoices_models import IssuedInvoiceModel, InvoiceItemModel, EditedInvoiceModel
 
 
@@ -21,10 +23,16 @@ class InvoicePreviewLogic:
     """
     def __init__(self, repo: InvoicePreviewRepository,
                  business_engine: ManagedSessionProvider,
-                 settings_manager: PreviewSettingsManager):
+                 settings_manager: PreviewSettingsManager,
+                 aggregate_loader: InvoiceAggregateLoader):
         self._repo = repo
         self._business_session = business_engine
         self.settings_manager = settings_manager
+        self._aggregate_loader = aggregate_loader
+        # Pages of the last paginated invoice, so paging through it is a list lookup.
+        self._paged_invoice: Invoice | None = None
+        self._pages_key: tuple[int, int] | None = None
+        self._pages: list[list[PreviewItem]] = []
 
     def get_issued_invoice(self, invoice_number: str) -> IssuedInvoiceModel | None:
         with self._business_session() as session:
@@ -36,12 +44,14 @@ class InvoicePreviewLogic:
         """
         if not invoice: return 1
 
-        total_items = len(invoice.items)
+        return len(self._get_pages(invoice))
+
+    @staticmethod
+    def count_pages(total_items: int, conf: dict) -> int:
+        """The page-count rules, independent of any settings manager or widget."""
         if total_items == 0:
             return 1
 
-        conf = self.settings_manager.get_current_settings()['pagination']
-
         if total_items <= conf['one_page_max_rows']:
             return 1
 
@@ -137,36 +147,54 @@ class InvoicePreviewLogic:
         """
         if not invoice: return []
 
-        total_pages = self.get_total_pages(invoice)
+        pages = self._get_pages(invoice)
+        return pages[page_number - 1] if 1 <= page_number <= len(pages) else []
+
+    def _get_pages(self, invoice: Invoice) -> list[list[PreviewItem]]:
+        """Splits the invoice into pages once per invoice and settings revision."""
+        key = (len(invoice.items), self.settings_manager.revision)
+        if invoice is not self._paged_invoice or key != self._pages_key:
+            conf = self.settings_manager.get_current_settings()['pagination']
+            self._pages = self.paginate(invoice.items, conf)
+            self._paged_invoice, self._pages_key = invoice, key
+        return self._pages
+
+    @classmethod
+    def slice_page(cls, items: list[PreviewItem], page_number: int, conf: dict) -> list[PreviewItem]:
+        """The per-page slicing rules, independent of any settings manager or widget."""
+        total_pages = cls.count_pages(len(items), conf)
         if page_number < 1 or page_number > total_pages:
             return []
 
-        total_items = len(invoice.items)
-        conf = self.settings_manager.get_current_settings()['pagination']
-
         # --- Handle each page type ---
 
         # Case 1: The invoice is only one page long.
         if total_pages == 1:
-            return invoice.items[:conf['one_page_max_rows']]
+            return items[:conf['one_page_max_rows']]
 
         # Case 2: This is the first page of a multi-page invoice.
         if page_number == 1:
-            return invoice.items[:conf['first_page_max_rows']]
+            return items[:conf['first_page_max_rows']]
 
         # Case 3: This is the last page of a multi-page invoice.
         if page_number == total_pages:
             items_on_previous_pages = (conf['first_page_max_rows'] +
                                        (total_pages - 2) * conf['other_page_max_rows'])
             start_index = items_on_previous_pages
-            return invoice.items[start_index:]
+            return items[start_index:]
 
         # Case 4: This is a "middle" page (not first, not last).
         else:
             start_index = (conf['first_page_max_rows'] +
                            (page_number - 2) * conf['other_page_max_rows'])
             end_index = start_index + conf['other_page_max_rows']
-            return invoice.items[start_index:end_index]
+            return items[start_index:end_index]
+
+    @classmethod
+    def paginate(cls, items: list[PreviewItem], conf: dict) -> list[list[PreviewItem]]:
+        """Splits all items into pages at once, e.g. for headless rendering."""
+        total_pages = cls.count_pages(len(items), conf)
+        return [cls.slice_page(items, page, conf) for page in range(1, total_pages + 1)]
 
     def get_issued_invoice_with_items(self, invoice_number: str) -> IssuedInvoiceModel | None:
         """Manages the session to get an invoice and its items."""
@@ -175,102 +203,54 @@ class InvoicePreviewLogic:
 
     def get_next_invoice_version_number(self, base_invoice_number: str) -> str:
         """
-        Calculates the next version suffix for an invoice (e.g., -v2, -v3).
-        This is now session-safe.
+        Calculates the next version number for an invoice chain (e.g., -v2, -v3)
+        with a single indexed query.
         """
+        base_invoice_number, _ = split_invoice_version(base_invoice_number)
         with self._business_session() as session:
-            latest_invoice = self._repo.get_latest_invoice_version(session, base_invoice_number)
+            latest_version = self._repo.get_latest_version_number(session, base_invoice_number)
 
-            if not latest_invoice:
-                # If no previous version exists, the next one is -v2.
-                return f"{base_invoice_number}-v2"
-
-            # Access the attribute while the session is active.
-            latest_num = latest_invoice.invoice_number
-            import re
-            match = re.search(r'-v(\d+)$', latest_num)
-
-            if match:
-                version = int(match.group(1))
-                return f"{base_invoice_number}-v{version + 1}"
-            else:
-                # The existing invoice is the base version (e.g., 'INV-101'), so the next is -v2.
-                return f"{base_invoice_number}-v2"
+        # The original invoice is version 1, so the first re-issue is always -v2.
+        return format_invoice_version(base_invoice_number, max(latest_version, 1) + 1)
 
     def compare_invoice_data(self, new_invoice_dto: Invoice, new_items: list[InvoiceItem],
-                             old_invoice_orm: IssuedInvoiceModel) -> bool:
+                             old_invoice: InvoiceAggregate) -> bool:
         """
         Compares new invoice data with old data from the database.
         Returns True if identical, False otherwise.
         """
-        # 1. Compare main invoice fields
-        if (
-                new_invoice_dto.customer.name != old_invoice_orm.name or
-                new_invoice_dto.customer.national_id != old_invoice_orm.national_id or
-                int(new_invoice_dto.payable_amount) != old_invoice_orm.final_amount or
-                int(new_invoice_dto.discount_amount) != old_invoice_orm.discount_amount or
-                int(new_invoice_dto.emergency_cost) != old_invoice_orm.emergency_cost
-        ):
-            return False
-
-        # 2. Compare number of items
-        if len(new_items) != len(old_invoice_orm.items):
-            return False
-
-        # 3. Compare each item in detail
-        # Sort both lists to ensure a consistent comparison order
-        sorted_new_items = sorted(new_items, key=lambda item: item.service.id)
-        sorted_old_items = sorted(old_invoice_orm.items, key=lambda item: item.service_id)
-
-        for new_item, old_item in zip(sorted_new_items, sorted_old_items):
-            if (
-                    new_item.service.id != old_item.service_id or
-                    new_item.quantity != old_item.quantity or
-                    new_item.page_count != old_item.page_count or
-                    (1 if new_item.is_official else 0) != old_item.is_official or
-                    (1 if new_item.has_judiciary_seal else 0) != old_item.has_judiciary_seal or
-                    (1 if new_item.has_foreign_affairs_seal else 0) != old_item.has_foreign_affairs_seal or
-                    new_item.total_price != old_item.total_price
-            ):
-                return False  # Found a difference
-
-        # If all checks pass, the data is identical
-        return True
+        return self._compare_invoice_data(new_invoice_dto, new_items, old_invoice)
 
     def check_for_invoice_changes(self,
                                   base_invoice_number: str,
                                   new_invoice_dto: Invoice,
-                                  new_items: List[InvoiceItem]) -> Tuple[bool, IssuedInvoiceModel | None]:
+                                  new_items: List[InvoiceItem]) -> Tuple[bool, InvoiceAggregate | None]:
         """
-        Opens a session to fetch the latest version of an invoice and compares it
-        with the new data. This entire operation is within a single session to
-        avoid DetachedInstanceError.
+        Loads the stored invoice through the shared aggregate loader and compares
+        it with the new data.
 
         Returns:
             A tuple containing:
             - bool: True if the data is identical, False otherwise.
-            - IssuedInvoiceModel | None: The fetched ORM object for reference, or None.
+            - InvoiceAggregate | None: The stored invoice for reference, or None.
         """
-        with self._business_session() as session:
-            # Fetch the latest version using the active session
-            latest_orm = self._repo.get_issued_invoice_with_items(session, base_invoice_number)
+        latest = self._aggregate_loader.load(base_invoice_number)
 
-            if not latest_orm:
-                # No existing invoice found, so it's definitely not identical.
-                return False, None
+        if not latest:
+            # No existing invoice found, so it's definitely not identical.
+            return False, None
 
-            # Perform the comparison while the latest_orm object is still attached to the session
-            is_identical = self._compare_invoice_data(new_invoice_dto, new_items, latest_orm)
-            return is_identical, latest_orm
+        return self._compare_invoice_data(new_invoice_dto, new_items, latest), latest
 
     @staticmethod
-    def _generate_edit_logs(old_orm: IssuedInvoiceModel,
+    def _generate_edit_logs(latest: InvoiceAggregate,
                             new_dto: Invoice,
                             new_items: List[InvoiceItem]) -> List[EditedInvoiceModel]:
         """
-        Compares an old ORM invoice with new DTO data and generates a list of
+        Compares the stored invoice with new DTO data and generates a list of
         ORM objects detailing every change for the edit history table.
         """
+        old_invoice = latest.invoice
         logs = []
         user_info = SessionManager().get_session()
         edited_by = user_info.username if user_info else "نامشخص"
@@ -278,7 +258,7 @@ class InvoicePreviewLogic:
         # Helper to create a log entry
         def add_log(field, old, new, remarks=""):
             logs.append(EditedInvoiceModel(
-                invoice_number=old_orm.invoice_number,  # Log against the original number
+                invoice_number=old_invoice.invoice_number,  # Log against the original number
                 edited_field=field,
                 old_value=str(old),
                 new_value=str(new),
@@ -287,26 +267,26 @@ class InvoicePreviewLogic:
             ))
 
         # 1. Compare Customer and Financial Fields
-        if old_orm.name != new_dto.customer.name:
-            add_log("نام مشتری", old_orm.name, new_dto.customer.name)
-        if old_orm.national_id != new_dto.customer.national_id:
-            add_log("کد ملی", old_orm.national_id, new_dto.customer.national_id)
-        if old_orm.phone != new_dto.customer.phone:
-            add_log("تلفن", old_orm.phone, new_dto.customer.phone)
-        if old_orm.final_amount != int(new_dto.payable_amount):
-            add_log("مبلغ نهایی", old_orm.final_amount, int(new_dto.payable_amount))
-        if old_orm.discount_amount != int(new_dto.discount_amount):
-            add_log("تخفیف", old_orm.discount_amount, int(new_dto.discount_amount))
-        if old_orm.emergency_cost != int(new_dto.emergency_cost):
-            add_log("هزینه فوریت", old_orm.emergency_cost, int(new_dto.emergency_cost))
-        if old_orm.delivery_date != new_dto.delivery_date:
-            add_log("تاریخ تحویل", old_orm.delivery_date.strftime('%Y-%m-%d'),
+        if old_invoice.name != new_dto.customer.name:
+            add_log("نام مشتری", old_invoice.name, new_dto.customer.name)
+        if old_invoice.national_id != new_dto.customer.national_id:
+            add_log("کد ملی", old_invoice.national_id, new_dto.customer.national_id)
+        if old_invoice.phone != new_dto.customer.phone:
+            add_log("تلفن", old_invoice.phone, new_dto.customer.phone)
+        if old_invoice.final_amount != int(new_dto.payable_amount):
+            add_log("مبلغ نهایی", old_invoice.final_amount, int(new_dto.payable_amount))
+        if old_invoice.discount_amount != int(new_dto.discount_amount):
+            add_log("تخفیف", old_invoice.discount_amount, int(new_dto.discount_amount))
+        if old_invoice.emergency_cost != int(new_dto.emergency_cost):
+            add_log("هزینه فوریت", old_invoice.emergency_cost, int(new_dto.emergency_cost))
+        if old_invoice.delivery_date != new_dto.delivery_date:
+            add_log("تاریخ تحویل", old_invoice.delivery_date.strftime('%Y-%m-%d'),
                     new_dto.delivery_date.strftime('%Y-%m-%d'))
-        if old_orm.remarks != new_dto.remarks:
-            add_log("توضیحات", old_orm.remarks, new_dto.remarks)
+        if old_invoice.remarks != new_dto.remarks:
+            add_log("توضیحات", old_invoice.remarks, new_dto.remarks)
 
         # 2. Compare Items (more complex)
-        old_items_map = {item.service_id: item for item in old_orm.items}
+        old_items_map = {item.service_id: item for item in latest.items}
         new_items_map = {item.service.id: item for item in new_items}
 
         all_service_ids = set(old_items_map.keys()) | set(new_items_map.keys())
@@ -344,49 +324,47 @@ class InvoicePreviewLogic:
             - Optional[List[EditedInvoiceModel]]: A list of generated edit logs if
               changes were found, otherwise None.
         """
-        with self._business_session() as session:
-            # 1. Fetch the latest version using the active session
-            latest_orm = self._repo.get_issued_invoice_with_items(session, base_invoice_number)
-
-            if not latest_orm:
-                # No existing invoice found, so there are changes (it's a new issue)
-                return True, None
+        # 1. Fetch the stored invoice through the shared aggregate loader
+        latest = self._aggregate_loader.load(base_invoice_number)
 
-            # 2. Perform the comparison while the object is attached to the session
-            is_identical = self._compare_invoice_data(new_invoice_dto, new_items, latest_orm)
+        if not latest:
+            # No existing invoice found, so there are changes (it's a new issue)
+            return True, None
 
-            if is_identical:
-                return False, None  # Data has NOT changed
+        # 2. Compare the stored data with the new data
+        if self._compare_invoice_data(new_invoice_dto, new_items, latest):
+            return False, None  # Data has NOT changed
 
-            # 3. If not identical, generate logs while the object is still attached
-            edit_logs = self._generate_edit_logs(latest_orm, new_invoice_dto, new_items)
-            return True, edit_logs # Data HAS changed, and here are the logs
+        # 3. If not identical, generate the edit logs
+        edit_logs = self._generate_edit_logs(latest, new_invoice_dto, new_items)
+        return True, edit_logs  # Data HAS changed, and here are the logs
 
     @staticmethod
     def _compare_invoice_data(new_invoice_dto: Invoice, new_items: List[InvoiceItem],
-                              old_invoice_orm: IssuedInvoiceModel) -> bool:
+                              latest: InvoiceAggregate) -> bool:
         """
         Compares new invoice data with old data from the database.
         Returns True if identical, False otherwise.
         (Now a static helper method).
         """
+        old_invoice = latest.invoice
         # 1. Compare main invoice fields
         if (
-                new_invoice_dto.customer.name != old_invoice_orm.name or
-                new_invoice_dto.customer.national_id != old_invoice_orm.national_id or
-                int(new_invoice_dto.payable_amount) != old_invoice_orm.final_amount or
-                int(new_invoice_dto.discount_amount) != old_invoice_orm.discount_amount or
-                int(new_invoice_dto.emergency_cost) != old_invoice_orm.emergency_cost
+                new_invoice_dto.customer.name != old_invoice.name or
+                new_invoice_dto.customer.national_id != old_invoice.national_id or
+                int(new_invoice_dto.payable_amount) != old_invoice.final_amount or
+                int(new_invoice_dto.discount_amount) != old_invoice.discount_amount or
+                int(new_invoice_dto.emergency_cost) != old_invoice.emergency_cost
         ):
             return False
 
         # 2. Compare number of items
-        if len(new_items) != len(old_invoice_orm.items):
+        if len(new_items) != len(latest.items):
             return False
 
         # 3. Compare each item in detail
         sorted_new_items = sorted(new_items, key=lambda item: item.service.id)
-        sorted_old_items = sorted(old_invoice_orm.items, key=lambda item: item.service_id)
+        sorted_old_items = sorted(latest.items, key=lambda item: item.service_id)
 
         for new_item, old_item in zip(sorted_new_items, sorted_old_items):
             if (
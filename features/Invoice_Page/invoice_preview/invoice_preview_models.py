@@ -18,6 +18,7 @@ class PreviewOfficeInfo:
     whatsapp: str
     telegram: str
     logo: bytes | None = None
+    updated_at: datetime | None = None  # office row revision; keys the decoded-logo cache
 
 
 @dataclass
@@ -0,0 +1,96 @@
+# features/Invoice_Page/invoice_preview/invoice_preview_render_cache.py
+
+"""
+Render assets shared by the on-screen preview and the headless renderer.
+
+Everything here is derived from inputs that rarely change - the office logo,
+the table fonts - so it is computed once and reused for every page update:
+
+- the decoded, scaled logo, keyed by the office row's revision (updated_at)
+  instead of re-decoding the image bytes on each page;
+- the preview table's column widths, measured once from the font metrics so
+  the table never has to re-measure its contents while paging.
+"""
+
+from functools import lru_cache
+from typing import Hashable
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QFont, QFontMetricsF, QImage, QPixmap
+
+from features.Invoice_Page.invoice_preview.invoice_preview_models import PreviewOfficeInfo
+from shared.utils.number_utils import to_persian_number
+
+LOGO_CACHE_SIZE = 4
+LOGO_RESOLUTION = 320  # px; 4x the 80px logo box, enough for 300 dpi output
+
+TABLE_HEADERS = ["شرح خدمات", "نوع", "تعداد", "مهر دادگستری", "مهر خارجه", "مبلغ کل"]
+# Widest content each fixed column is expected to hold besides its header.
+TABLE_SAMPLE_CELLS = ["", "غیر رسمی", to_persian_number(999), "✔", "✔", to_persian_number("999,999,999")]
+TABLE_CELL_PADDING = 16
+
+_logo_images: dict[Hashable, QImage | None] = {}
+_logo_pixmaps: dict[Hashable, QPixmap | None] = {}
+
+
+def _logo_key(office: PreviewOfficeInfo) -> Hashable:
+    # Offices loaded from the database carry their revision; otherwise fall back to
+    # the bytes themselves (CPython caches a bytes object's hash after the first use).
+    if office.updated_at is not None:
+        return office.updated_at, len(office.logo)
+    return office.logo
+
+
+def _remember(cache: dict, key: Hashable, value):
+    if len(cache) >= LOGO_CACHE_SIZE:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+    return value
+
+
+def logo_image(office: PreviewOfficeInfo) -> QImage | None:
+    """The office logo decoded and scaled once per office revision, or None if it has none."""
+    if not office.logo:
+        return None
+    key = _logo_key(office)
+    if key in _logo_images:
+        return _logo_images[key]
+
+    image = QImage.fromData(office.logo)
+    if image.isNull():
+        return _remember(_logo_images, key, None)
+    return _remember(_logo_images, key, image.scaled(
+        LOGO_RESOLUTION, LOGO_RESOLUTION, Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation))
+
+
+def logo_pixmap(office: PreviewOfficeInfo) -> QPixmap | None:
+    """Screen counterpart of logo_image(); requires a running QApplication."""
+    if not office.logo:
+        return None
+    key = _logo_key(office)
+    if key in _logo_pixmaps:
+        return _logo_pixmaps[key]
+    image = logo_image(office)
+    return _remember(_logo_pixmaps, key, QPixmap.fromImage(image) if image is not None else None)
+
+
+@lru_cache(maxsize=None)
+def table_column_widths(font_family: str, point_size: int) -> tuple[int, ...]:
+    """
+    Widths of the fixed item columns (all but the description), fitting both
+    the header title and the widest expected cell - what ResizeToContents would
+    settle on, without measuring every row on every page change.
+    """
+    metrics = QFontMetricsF(QFont(font_family, point_size))
+    return tuple(
+        round(max(metrics.horizontalAdvance(title), metrics.horizontalAdvance(sample)) + TABLE_CELL_PADDING)
+        for title, sample in zip(TABLE_HEADERS[1:], TABLE_SAMPLE_CELLS[1:])
+    )
+
+
+def clear_render_cache() -> None:
+    """Drops every cached asset, e.g. after fonts were (re)loaded."""
+    _logo_images.clear()
+    _logo_pixmaps.clear()
+    table_column_widths.cache_clear()
@@ -0,0 +1,330 @@
+# features/Invoice_Page/invoice_preview/invoice_preview_renderer.py
+
+"""
+Headless invoice renderer.
+
+Lays the invoice out directly with a QPainter on any paged device (QPdfWriter,
+QPrinter) from the Invoice/PreviewItem DTOs, mirroring the on-screen preview
+without creating, showing or paging through any widget. Fonts, the decoded
+logo and the table geometry are cached at module level, so only the first
+render pays for them.
+"""
+
+import logging
+import os
+from functools import lru_cache
+
+from PySide6.QtCore import Qt, QRectF, QMarginsF, QPointF
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import (QGuiApplication, QFont, QFontMetricsF, QPainter, QPagedPaintDevice,
+                           QPdfWriter, QPageSize, QPen, QColor)
+
+from features.Invoice_Page.invoice_preview.invoice_preview_logic import InvoicePreviewLogic
+from features.Invoice_Page.invoice_preview.invoice_preview_models import Invoice, PreviewItem
+from features.Invoice_Page.invoice_preview.invoice_preview_render_cache import TABLE_HEADERS, logo_image
+from features.Invoice_Page.invoice_preview.invoice_preview_view import (FONT_FAMILY, A4_WIDTH_PX, A4_HEIGHT_PX,
+                                                                        INVOICE_BORDER_COLOR, HEADER_COLOR,
+                                                                        SECTION_SEPARATOR_COLOR)
+from shared.fonts.font_manager import FontManager
+from shared.utils.date_utils import to_jalali
+from shared.utils.number_utils import to_persian_number
+
+logger = logging.getLogger(__name__)
+
+PAGE_MARGIN = 40
+CONTENT_WIDTH = A4_WIDTH_PX - 2 * PAGE_MARGIN
+LOGO_SIZE = 80
+TABLE_HEADER_HEIGHT = 28
+TABLE_ROW_HEIGHT = 26
+ROW_NUMBER_WIDTH = 40
+CELL_PADDING = 16
+PDF_RESOLUTION = 300
+
+EDIT_MESSAGE = "* این فاکتور ویرایش شده است"
+ALIGN_LEFT = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+ALIGN_RIGHT = Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+ALIGN_CENTER = Qt.AlignmentFlag.AlignCenter
+
+
+def ensure_gui_application() -> QGuiApplication:
+    """
+    Returns the running Qt application, creating an offscreen one when none
+    exists (e.g. in a worker process) so fonts and painters work. A full
+    QApplication is created so widgets can still be built in the same process.
+    """
+    app = QGuiApplication.instance()
+    if app is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        app = QApplication([])
+    return app
+
+
+@lru_cache(maxsize=None)
+def _load_fonts() -> None:
+    ensure_gui_application()
+    try:
+        FontManager.load_fonts()
+    except FileNotFoundError as e:
+        logger.warning(f"Invoice fonts not found, falling back to system fonts: {e}")
+
+
+@lru_cache(maxsize=None)
+def _font(point_size: int, bold: bool = False) -> QFont:
+    """Fonts are sized in pixels at 96 DPI so they scale with the page, not the device resolution."""
+    _load_fonts()
+    font = QFont(FONT_FAMILY)
+    font.setPixelSize(round(point_size * 96 / 72))
+    font.setBold(bold)
+    return font
+
+
+@lru_cache(maxsize=None)
+def _metrics(point_size: int, bold: bool = False) -> QFontMetricsF:
+    return QFontMetricsF(_font(point_size, bold))
+
+
+@lru_cache(maxsize=None)
+def _column_widths() -> tuple[float, ...]:
+    """
+    Widths of the item columns in display order (right to left). The fixed
+    columns fit their header, the amount column fits a nine-digit sum, and the
+    description column takes the rest - like the preview's ResizeToContents.
+    """
+    header_metrics = _metrics(10)
+    cell_metrics = _metrics(10)
+    fixed = [header_metrics.horizontalAdvance(title) + CELL_PADDING for title in TABLE_HEADERS[1:]]
+    fixed[-1] = max(fixed[-1], cell_metrics.horizontalAdvance(to_persian_number("999,999,999")) + CELL_PADDING)
+    description = CONTENT_WIDTH - ROW_NUMBER_WIDTH - sum(fixed)
+    return (description, *fixed)
+
+
+class InvoicePdfRenderer:
+    """Renders complete invoices page by page without touching the GUI."""
+
+    def render_to_pdf(self, invoice: Invoice, settings: dict, file_path: str) -> bool:
+        """Writes the whole invoice to an A4 PDF file. Returns True on success."""
+        ensure_gui_application()
+        writer = QPdfWriter(file_path)
+        writer.setPageSize(QPageSize(QPageSize.PageSizeId.A4))
+        writer.setPageMargins(QMarginsF(0, 0, 0, 0))
+        writer.setResolution(PDF_RESOLUTION)
+        writer.setTitle(f"Invoice {invoice.invoice_number}")
+        return self.render(invoice, settings, writer)
+
+    def render(self, invoice: Invoice, settings: dict, device: QPagedPaintDevice) -> bool:
+        """Paints every page of the invoice onto a paged device (PDF writer or printer)."""
+        pages = InvoicePreviewLogic.paginate(invoice.items, settings['pagination'])
+
+        painter = QPainter()
+        if not painter.begin(device):
+            logger.error(f"Could not start painting invoice {invoice.invoice_number}.")
+            return False
+
+        try:
+            scale = min(device.width() / A4_WIDTH_PX, device.height() / A4_HEIGHT_PX)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+
+            for page_number, items_on_page in enumerate(pages, start=1):
+                if page_number > 1:
+                    device.newPage()
+                painter.save()
+                painter.scale(scale, scale)
+                self._paint_page(painter, invoice, items_on_page, page_number, len(pages), settings)
+                painter.restore()
+        except Exception as e:
+            logger.error(f"Error rendering invoice {invoice.invoice_number}: {e}")
+            return False
+        finally:
+            painter.end()
+        return True
+
+    # ------------------------------------------------------------------
+    # PAGE SECTIONS
+    # ------------------------------------------------------------------
+
+    def _paint_page(self, painter: QPainter, invoice: Invoice, items_on_page: list[PreviewItem],
+                    page_number: int, total_pages: int, settings: dict) -> None:
+        footer_vis = settings.get("footer_visibility", {})
+        y = PAGE_MARGIN
+
+        if page_number == 1:
+            y = self._paint_header(painter, invoice, settings.get("header_visibility", {}), y)
+            y = self._paint_customer(painter, invoice, settings.get("customer_visibility", {}), y)
+
+        if items_on_page:
+            first_row_number = 0
+            if page_number > 1:
+                conf = settings['pagination']
+                first_row_number = conf['first_page_max_rows'] + (page_number - 2) * conf['other_page_max_rows']
+            self._paint_table(painter, items_on_page, first_row_number, y)
+
+        bottom = A4_HEIGHT_PX - PAGE_MARGIN
+        if footer_vis.get("show_page_number", True):
+            self._text(painter, QRectF(PAGE_MARGIN, bottom - 20, CONTENT_WIDTH, 20),
+                       f"صفحه {to_persian_number(page_number)} از {to_persian_number(total_pages)}", 9,
+                       align=ALIGN_CENTER)
+        bottom -= 30
+
+        if page_number == total_pages:
+            self._paint_summary(painter, invoice, footer_vis, bottom)
+
+    def _paint_header(self, painter: QPainter, invoice: Invoice, header_vis: dict, y: float) -> float:
+        office = invoice.office
+        left, right = PAGE_MARGIN, PAGE_MARGIN + CONTENT_WIDTH
+        column_width = (CONTENT_WIDTH - LOGO_SIZE) / 2 - 10
+
+        # Left: invoice number, issuer and dates
+        left_lines = [(f"فاکتور شماره: {to_persian_number(invoice.invoice_number)}", 10)]
+        if header_vis.get("show_issuer", True):
+            left_lines.append((f"صادر کننده: {invoice.username or ''}", 8))
+        left_lines.append((f"تاریخ صدور: {to_jalali(invoice.issue_date)}", 9))
+        left_lines.append((f"تاریخ تحویل: {to_jalali(invoice.delivery_date)}", 9))
+        left_bottom = self._lines(painter, left, y, column_width, left_lines, ALIGN_LEFT)
+
+        # Right: office identity and contact details
+        right_lines = [(office.name or '', 16, True)]
+        if header_vis.get("show_representative", True):
+            right_lines.append((f"مترجم مسئول: {office.representative or ''}", 9))
+        contact_fields = [
+            ("show_address", "آدرس", office.address or ''),
+            ("show_phone", "تلفن", to_persian_number(office.phone or '')),
+            ("show_email", "ایمیل", office.email or ''),
+            ("show_website", "وبسایت", office.website or ''),
+            ("show_telegram", "تلگرام", office.telegram or ''),
+            ("show_whatsapp", "واتساپ", office.whatsapp or ''),
+        ]
+        right_lines += [(f"{label}: {value}", 9) for key, label, value in contact_fields if header_vis.get(key, True)]
+        right_bottom = self._lines(painter, right - column_width, y, column_width, right_lines, ALIGN_RIGHT)
+
+        # Center: logo
+        if header_vis.get("show_logo", True) and office.logo:
+            logo = logo_image(office)
+            if logo is not None:
+                painter.drawImage(QRectF(PAGE_MARGIN + (CONTENT_WIDTH - LOGO_SIZE) / 2, y, LOGO_SIZE, LOGO_SIZE), logo)
+
+        y = max(left_bottom, right_bottom, y + LOGO_SIZE) + 5
+        self._hline(painter, y, INVOICE_BORDER_COLOR)
+        y += 15
+        self._hline(painter, y, SECTION_SEPARATOR_COLOR)
+        return y + 15
+
+    def _paint_customer(self, painter: QPainter, invoice: Invoice, customer_vis: dict, y: float) -> float:
+        customer = invoice.customer
+        half = CONTENT_WIDTH / 2
+        left, right = PAGE_MARGIN, PAGE_MARGIN + half
+
+        self._text(painter, QRectF(left, y, half, 24),
+                   f"ترجمه از {invoice.source_language or ''} به {invoice.target_language or ''}", 10, True, ALIGN_LEFT)
+        self._text(painter, QRectF(right, y, half, 24), f"مشتری: {customer.name}", 11, True, ALIGN_RIGHT)
+        y += 29
+
+        if customer_vis.get("show_address", True):
+            self._text(painter, QRectF(left, y, half, 22), f"آدرس: {customer.address}", 9, align=ALIGN_LEFT)
+        details = []
+        if customer_vis.get("show_national_id", True):
+            details.append(f"کد ملی: {to_persian_number(customer.national_id)}")
+        if customer_vis.get("show_phone", True):
+            details.append(f"تلفن: {to_persian_number(customer.phone)}")
+        if details:
+            self._text(painter, QRectF(right, y, half, 22), " | ".join(details), 10, align=ALIGN_RIGHT)
+        return y + 22 + 20
+
+    def _paint_table(self, painter: QPainter, items: list[PreviewItem], first_row_number: int, y: float) -> None:
+        widths = _column_widths()
+        border = QPen(QColor(INVOICE_BORDER_COLOR))
+        grid = QPen(QColor("#E0E0E0"))
+
+        # Header row; columns run right to left, with the row number column on the right edge.
+        painter.fillRect(QRectF(PAGE_MARGIN, y, CONTENT_WIDTH, TABLE_HEADER_HEIGHT), QColor(HEADER_COLOR))
+        x = PAGE_MARGIN + CONTENT_WIDTH - ROW_NUMBER_WIDTH
+        for title, width in zip(TABLE_HEADERS, widths):
+            x -= width
+            self._text(painter, QRectF(x, y, width, TABLE_HEADER_HEIGHT), title, 10, align=ALIGN_CENTER)
+        painter.setPen(border)
+        painter.drawLine(QPointF(PAGE_MARGIN, y + TABLE_HEADER_HEIGHT),
+                         QPointF(PAGE_MARGIN + CONTENT_WIDTH, y + TABLE_HEADER_HEIGHT))
+        y += TABLE_HEADER_HEIGHT
+
+        for index, item in enumerate(items):
+            row_rect = QRectF(PAGE_MARGIN + CONTENT_WIDTH - ROW_NUMBER_WIDTH, y, ROW_NUMBER_WIDTH, TABLE_ROW_HEIGHT)
+            painter.fillRect(row_rect, QColor(HEADER_COLOR))
+            self._text(painter, row_rect, to_persian_number(first_row_number + index + 1), 10, align=ALIGN_CENTER)
+
+            cells = [item.name, item.type, to_persian_number(item.quantity), item.judiciary_seal,
+                     item.foreign_affairs_seal, to_persian_number(f"{item.total_price:,.0f}")]
+            x = row_rect.left()
+            for text, width in zip(cells, widths):
+                x -= width
+                self._text(painter, QRectF(x + 4, y, width - 8, TABLE_ROW_HEIGHT), text, 10, align=ALIGN_CENTER)
+
+            y += TABLE_ROW_HEIGHT
+            painter.setPen(grid)
+            painter.drawLine(QPointF(PAGE_MARGIN, y), QPointF(PAGE_MARGIN + CONTENT_WIDTH, y))
+
+        painter.setPen(border)
+        painter.drawLine(QPointF(PAGE_MARGIN + CONTENT_WIDTH - ROW_NUMBER_WIDTH, y - len(items) * TABLE_ROW_HEIGHT),
+                         QPointF(PAGE_MARGIN + CONTENT_WIDTH - ROW_NUMBER_WIDTH, y))
+
+    def _paint_summary(self, painter: QPainter, invoice: Invoice, footer_vis: dict, bottom: float) -> None:
+        def rial(amount) -> str:
+            return f"{to_persian_number(f'{amount:,.0f}')} ریال"
+
+        totals = [
+            ("show_subtotal", "جمع جزء:", rial(invoice.total_amount), 10, True),
+            ("show_emergency_cost", "هزینه فوریت:", rial(invoice.emergency_cost), 10, False),
+            ("show_discount", "تخفیف:", rial(invoice.discount_amount), 10, False),
+            ("show_advance_payment", "پیش پرداخت:", rial(invoice.advance_payment), 10, False),
+            (None, "مبلغ نهایی:", rial(invoice.payable_amount), 11, True),
+        ]
+        rows = [row for row in totals if row[0] is None or footer_vis.get(row[0], True)]
+
+        row_height = 24
+        top = bottom - 6 * row_height
+        totals_width = 260
+        for index, (_, label, value, size, bold) in enumerate(rows):
+            row_y = top + index * row_height
+            self._text(painter, QRectF(PAGE_MARGIN, row_y, 150, row_height), value, size, bold, ALIGN_RIGHT)
+            self._text(painter, QRectF(PAGE_MARGIN + 160, row_y, totals_width - 160, row_height),
+                       label, size, size == 11, ALIGN_RIGHT)
+
+        remarks_left = PAGE_MARGIN + totals_width + 25
+        remarks_rect = QRectF(remarks_left, top, PAGE_MARGIN + CONTENT_WIDTH - remarks_left, 4 * row_height)
+        remarks = invoice.remarks or ""
+        is_edited = EDIT_MESSAGE in remarks
+        if footer_vis.get("show_remarks", True):
+            display_remarks = remarks.replace(EDIT_MESSAGE, "").strip() if is_edited else remarks
+            painter.setFont(_font(9))
+            painter.setPen(QColor("black"))
+            painter.drawText(remarks_rect, int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignTop |
+                                               Qt.TextFlag.TextWordWrap), f"توضیحات: {display_remarks}")
+        if is_edited:
+            self._text(painter, QRectF(remarks_rect.left(), top + 4 * row_height, remarks_rect.width(), row_height),
+                       EDIT_MESSAGE, 9, True, ALIGN_RIGHT, color="#D32F2F")
+        if footer_vis.get("show_signature", True):
+            self._text(painter, QRectF(remarks_rect.left(), top + 5 * row_height, remarks_rect.width(), row_height),
+                       "امضاء و مهر دارالترجمه", 10, True, ALIGN_CENTER)
+
+    # ------------------------------------------------------------------
+    # DRAWING HELPERS
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _text(painter: QPainter, rect: QRectF, text: str, size: int, bold: bool = False,
+              align=ALIGN_RIGHT, color: str = "black") -> None:
+        painter.setFont(_font(size, bold))
+        painter.setPen(QColor(color))
+        painter.drawText(rect, int(align), text)
+
+    def _lines(self, painter: QPainter, x: float, y: float, width: float, lines: list[tuple], align) -> float:
+        """Draws stacked single-line labels ``(text, size[, bold])`` and returns the y below them."""
+        for text, size, *bold in lines:
+            height = _metrics(size, bool(bold and bold[0])).height() + 4
+            self._text(painter, QRectF(x, y, width, height), text, size, bool(bold and bold[0]), align)
+            y += height
+        return y
+
+    @staticmethod
+    def _hline(painter: QPainter, y: float, color: str) -> None:
+        painter.setPen(QPen(QColor(color)))
+        painter.drawLine(QPointF(PAGE_MARGIN, y), QPointF(PAGE_MARGIN + CONTENT_WIDTH, y))
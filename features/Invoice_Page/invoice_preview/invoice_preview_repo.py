@@ -4,7 +4,7 @@
 Repository for handling database operations related to invoice preview and issuance.
 """
 
-from sqlalchemy import update, desc
+from sqlalchemy import update, desc, select, func
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError
 from typing import List, Optional
@@ -66,7 +66,7 @@ class InvoicePreviewRepository:
             stmt = (
                 update(IssuedInvoiceModel)
                 .where(IssuedInvoiceModel.invoice_number == invoice_number)
-                .values(pdf_file_path=file_path)
+                .values(pdf_file_path=file_path, revision=IssuedInvoiceModel.revision + 1)
             )
             result = session.execute(stmt)
             session.commit()
@@ -93,13 +93,19 @@ class InvoicePreviewRepository:
 
     def get_latest_invoice_version(self, session: Session, base_invoice_number: str) -> IssuedInvoiceModel | None:
         """
-
-        Finds the most recent version of an invoice by a base number
-        (e.g., for base 'INV-101', it finds 'INV-101-v3' over 'INV-101-v2').
+        Finds the most recent version of an invoice chain
+        (e.g., for base 'INV-101', it finds 'INV-101-v10' over 'INV-101-v9').
         """
         return (
             session.query(IssuedInvoiceModel)
-            .filter(IssuedInvoiceModel.invoice_number.like(f"{base_invoice_number}%"))
-            .order_by(desc(IssuedInvoiceModel.invoice_number))
+            .filter(IssuedInvoiceModel.base_invoice_number == base_invoice_number)
+            .order_by(desc(IssuedInvoiceModel.version))
             .first()
         )
+
+    def get_latest_version_number(self, session: Session, base_invoice_number: str) -> int:
+        """Returns the highest version issued for a chain, or 0 if the chain does not exist."""
+        return session.execute(
+            select(func.coalesce(func.max(IssuedInvoiceModel.version), 0))
+            .where(IssuedInvoiceModel.base_invoice_number == base_invoice_number)
+        ).scalar_one()
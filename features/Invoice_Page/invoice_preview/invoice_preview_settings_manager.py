@@ -11,6 +11,12 @@ class PreviewSettingsManager:
     """Handles loading and saving of UI settings for the invoice preview."""
     def __init__(self):
         self._settings = self._load_settings()
+        self._revision = 0
+
+    @property
+    def revision(self) -> int:
+        """Bumped whenever new settings are saved, so derived data can be cached per revision."""
+        return self._revision
 
     def _get_default_settings(self) -> dict:
         """Provides the hardcoded default settings with granular controls."""
@@ -82,6 +88,7 @@ class PreviewSettingsManager:
             with open(SETTINGS_FILE_PATH, 'w', encoding='utf-8') as f:
                 json.dump(new_settings, f, indent=4, ensure_ascii=False)
             self._settings = new_settings
+            self._revision += 1
             return True
         except IOError as e:
             print(f"ERROR: Could not save settings file: {e}")
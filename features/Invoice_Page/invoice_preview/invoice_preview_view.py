@@ -1,15 +1,19 @@
 # features/Invoice_Page/invoice_preview/invoice_preview_view.py
 
+from dataclasses import astuple
+
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QTableWidget, QTableWidgetItem,
                                QHeaderView, QSizePolicy, QScrollArea, QSpacerItem, QAbstractItemView, QGridLayout,
                                QToolButton, QMenu)
-from PySide6.QtGui import QFont, QIcon, QPixmap, QAction
+from PySide6.QtGui import QFont, QIcon, QAction
 from PySide6.QtCore import Qt, QSize, Signal
 from features.Invoice_Page.invoice_preview.invoice_preview_models import Invoice, PreviewItem
 from typing import List
 from features.Invoice_Page.invoice_preview.invoice_preview_assets import (PRINT_ICON_PATH, PDF_ICON_PATH,
                                                                           PNG_ICON_PATH, SHARE_ICON_PATH,
                                                                           SETTINGS_ICON_PATH)
+from features.Invoice_Page.invoice_preview.invoice_preview_render_cache import (TABLE_HEADERS, logo_pixmap,
+                                                                                table_column_widths)
 from shared import to_persian_number
 from shared.utils.date_utils import to_jalali
 
@@ -48,6 +52,12 @@ class InvoicePreviewWidget(QFrame):
             #InvoicePreviewWidget * {{ background-color: transparent; border: none; }}
         """)
 
+        # What each section currently shows, so unchanged sections are skipped while paging.
+        self._header_state = None
+        self._footer_state = None
+        self._row_texts: list[tuple[str, ...]] = []
+        self._row_headers: list[str] = []
+
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setContentsMargins(40, 40, 40, 40)
         self.main_layout.setSpacing(0)
@@ -150,17 +160,15 @@ class InvoicePreviewWidget(QFrame):
         self.items_table = QTableWidget()
         self.items_table.setLayoutDirection(Qt.LayoutDirection.RightToLeft)
         self.items_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
-        self.items_table.setColumnCount(6)
-        headers = ["شرح خدمات", "نوع", "تعداد", "مهر دادگستری", "مهر خارجه", "مبلغ کل"]
-        self.items_table.setHorizontalHeaderLabels(headers)
+        self.items_table.setColumnCount(len(TABLE_HEADERS))
+        self.items_table.setHorizontalHeaderLabels(TABLE_HEADERS)
 
+        # Fixed, pre-measured widths: ResizeToContents would re-measure every cell on each page change.
         header = self.items_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(4, QHeaderView.ResizeMode.ResizeToContents)
-        header.setSectionResizeMode(5, QHeaderView.ResizeMode.ResizeToContents)
+        for column, width in enumerate(table_column_widths(FONT_FAMILY, 10), start=1):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.Fixed)
+            header.resizeSection(column, width)
 
         self.items_table.verticalHeader().setVisible(True)
         self.items_table.verticalHeader().setFixedWidth(40)
@@ -311,7 +319,11 @@ class InvoicePreviewWidget(QFrame):
         self.header_frame.setVisible(is_first_page)
         self.customer_frame.setVisible(is_first_page)
 
-        if is_first_page:
+        header_state = (invoice.invoice_number, invoice.username, invoice.issue_date, invoice.delivery_date,
+                        invoice.source_language, invoice.target_language, astuple(invoice.customer),
+                        astuple(invoice.office), tuple(header_vis.items()), tuple(customer_vis.items()))
+        if is_first_page and header_state != self._header_state:
+            self._header_state = header_state
             office = invoice.office
             customer = invoice.customer
 
@@ -323,9 +335,8 @@ class InvoicePreviewWidget(QFrame):
 
             # Logo
             self.logo_label.setVisible(header_vis.get("show_logo", True))
-            if header_vis.get("show_logo", True) and office.logo:
-                pixmap = QPixmap()
-                pixmap.loadFromData(office.logo)
+            pixmap = logo_pixmap(office) if header_vis.get("show_logo", True) else None
+            if pixmap is not None:
                 self.logo_label.setPixmap(pixmap)
             else:
                 self.logo_label.clear()
@@ -376,29 +387,24 @@ class InvoicePreviewWidget(QFrame):
         # --- TABLE VISIBILITY (as before) ---
         self.table_container.setVisible(bool(items_on_page))
 
-        self.items_table.setRowCount(len(items_on_page))
-
-        if items_on_page and pagination_config:
-            start_row_num = 0
-            if not is_first_page:
-                first_page_count = pagination_config.get('first_page_max_rows', 24)
-                other_page_count = pagination_config.get('other_page_max_rows', 28)
-                start_row_num = first_page_count + (page_num - 2) * other_page_count
-
-            vertical_headers = [to_persian_number(i + 1 + start_row_num) for i in range(len(items_on_page))]
-            self.items_table.setVerticalHeaderLabels(vertical_headers)
+        start_row_num = 0
+        if items_on_page and pagination_config and not is_first_page:
+            first_page_count = pagination_config.get('first_page_max_rows', 24)
+            other_page_count = pagination_config.get('other_page_max_rows', 28)
+            start_row_num = first_page_count + (page_num - 2) * other_page_count
 
-        for row, item in enumerate(items_on_page):
-            columns = [item.name, item.type, to_persian_number(item.quantity), item.judiciary_seal,
-                       item.foreign_affairs_seal, to_persian_number(f"{item.total_price:,.0f}")]
-            for col, col_text in enumerate(columns):
-                cell = QTableWidgetItem(col_text)
-                cell.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.items_table.setItem(row, col, cell)
+        row_headers = [to_persian_number(i + 1 + start_row_num) for i in range(len(items_on_page))]
+        row_texts = [(item.name, item.type, to_persian_number(item.quantity), item.judiciary_seal,
+                      item.foreign_affairs_seal, to_persian_number(f"{item.total_price:,.0f}"))
+                     for item in items_on_page]
+        self._update_table(row_headers, row_texts)
 
         # --- FOOTER VISIBILITY ---
         self.summary_frame.setVisible(is_last_page)
-        if is_last_page:
+        footer_state = (invoice.total_amount, invoice.discount_amount, invoice.emergency_cost,
+                        invoice.advance_payment, invoice.payable_amount, invoice.remarks, tuple(footer_vis.items()))
+        if is_last_page and footer_state != self._footer_state:
+            self._footer_state = footer_state
 
             self.subtotal_label.setText(f"{to_persian_number(f'{invoice.total_amount:,.0f}')} ریال")
             self.discount_label.setText(f"{to_persian_number(f'{invoice.discount_amount:,.0f}')} ریال")
@@ -430,6 +436,46 @@ class InvoicePreviewWidget(QFrame):
         self.page_label.setText(f"صفحه {to_persian_number(page_num)} از {to_persian_number(total_pages)}")
         self.page_label.setVisible(footer_vis.get("show_page_number", True))
 
+    def _update_table(self, row_headers: list[str], row_texts: list[tuple[str, ...]]):
+        """
+        Brings the items table to the given rows, touching only the cells whose
+        text changed. Existing QTableWidgetItems are reused across pages.
+        """
+        table = self.items_table
+        table.setUpdatesEnabled(False)
+        try:
+            if table.rowCount() != len(row_texts):
+                table.setRowCount(len(row_texts))
+                del self._row_texts[len(row_texts):]
+                del self._row_headers[len(row_headers):]
+
+            for row, (row_header, texts) in enumerate(zip(row_headers, row_texts)):
+                if row >= len(self._row_headers) or self._row_headers[row] != row_header:
+                    header_item = table.verticalHeaderItem(row)
+                    if header_item is None:
+                        table.setVerticalHeaderItem(row, QTableWidgetItem(row_header))
+                    else:
+                        header_item.setText(row_header)
+
+                previous = self._row_texts[row] if row < len(self._row_texts) else None
+                if previous == texts:
+                    continue
+                for col, col_text in enumerate(texts):
+                    if previous is not None and previous[col] == col_text:
+                        continue
+                    cell = table.item(row, col)
+                    if cell is None:
+                        cell = QTableWidgetItem(col_text)
+                        cell.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                        table.setItem(row, col, cell)
+                    else:
+                        cell.setText(col_text)
+        finally:
+            table.setUpdatesEnabled(True)
+
+        self._row_headers = list(row_headers)
+        self._row_texts = list(row_texts)
+
 
 class ActionPanel(QWidget):
     """A side panel with action buttons for the invoice, now loading from files."""
@@ -174,7 +174,8 @@ class InvoiceWizardController(QObject):
         doc_logic = self.sub_controllers['documents']._logic
         wizard_items = []
         for db_item in items_data:
-            service = doc_logic.get_service_by_name(db_item.service_name)
+            # Prefer the current catalog name so renamed services are still found.
+            service = doc_logic.get_service_by_name(db_item.catalog_service_name or db_item.service_name)
             if not service:
                 print(f"Warning: Could not find service '{db_item.service_name}' for deep edit. Skipping item.")
                 continue
@@ -11,10 +11,11 @@ from features.Invoice_Table.invoice_table_deleted_invoices_dialog import Deleted
 from features.Invoice_Table.invoice_table_summary_dialog import InvoiceSummaryDialog
 from features.Invoice_Table.invoice_table_edit_dialog import EditInvoiceDialog
 from features.Invoice_Table.invoice_table_logic import InvoiceLogic
-from features.Invoice_Table.invoice_table_models import InvoiceData
+from features.Invoice_Table.invoice_table_models import InvoiceData, InvoiceRow
 
 from shared import show_question_message_box, show_error_message_box, show_information_message_box
 from shared.session_provider import SessionManager
+from shared.widgets.export_progress import run_export_with_progress
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +36,8 @@ class InvoiceTableController(QObject):
         self._view = view
 
         # --- State Management ---
-        self._all_invoices: List[InvoiceData] = []
-        self._filtered_invoices: List[InvoiceData] = []
+        self._all_invoices: List[InvoiceRow] = []
+        self._filtered_invoices: List[InvoiceRow] = []
         self._selected_invoice_numbers: List[str] = []
         self._doc_counts: dict = {}
         self._translator_names: List[str] = []
@@ -78,7 +79,7 @@ class InvoiceTableController(QObject):
 
     def _refresh_data(self):
         try:
-            self._all_invoices = self._logic.invoice.get_all_invoices()
+            self._all_invoices = self._logic.invoice.get_invoice_rows()
             self._doc_counts = self._logic.invoice.get_document_counts()
             self._translator_names = self._logic.invoice.get_translator_names()
             self._filter_invoices(self._view.search_bar.text())
@@ -238,35 +239,39 @@ class InvoiceTableController(QObject):
                                       yes_func=replace_file)
 
     def _export_to_csv(self):
-        """Export selected invoices to CSV file."""
+        """Export selected invoices to a CSV or Excel file in a background thread."""
         count = len(self._selected_invoice_numbers)
-
-        is_valid, message = self._logic.validation.validate_bulk_delete(count)
-        if not is_valid:
+        if count == 0:
             show_error_message_box(self._view, "خطا", "هیچ فاکتوری انتخاب نشده است.")
             return
 
         def export_to_excel():
-            file_path, _ = QFileDialog.getSaveFileName(
+            file_path, selected_filter = QFileDialog.getSaveFileName(
                 self._view,
-                "ذخیره فایل CSV",
+                "ذخیره خروجی",
                 "",
-                "CSV Files (*.csv)"
+                "CSV Files (*.csv);;Excel Files (*.xlsx)"
             )
             if not file_path:
                 return
+            if not file_path.lower().endswith((".csv", ".xlsx")):
+                file_path += ".xlsx" if "xlsx" in selected_filter else ".csv"
+
+            invoice_numbers = list(self._selected_invoice_numbers)
 
-            try:
-                success = self._logic.export.export_to_csv(self._selected_invoice_numbers, file_path)
-                if success:
-                    show_information_message_box(self._view, "موفقیت",
-                                                 f"فاکتورها با موفقیت در فایل '{file_path}' ذخیره شدند.")
-                else:
-                    show_error_message_box(self._view, "خطا",
-                                           "عملیات صادر کردن فاکتورها ناموفق بود.")
-            except Exception as e:
-                logger.error(f"Error exporting to CSV: {e}")
-                show_error_message_box(self._view, "خطا", f"خطا در صادر کردن فایل CSV: {e}")
+            def on_finished(rows: int):
+                show_information_message_box(self._view, "موفقیت",
+                                             f"{rows} فاکتور با موفقیت در فایل '{file_path}' ذخیره شد.")
+
+            def on_failed(error: str):
+                logger.error(f"Error exporting invoices: {error}")
+                show_error_message_box(self._view, "خطا", f"خطا در صادر کردن فایل: {error}")
+
+            run_export_with_progress(
+                self._view,
+                lambda progress, is_cancelled: self._logic.export.export(
+                    invoice_numbers, file_path, progress=progress, is_cancelled=is_cancelled),
+                "در حال صادر کردن فاکتورها...", on_finished, on_failed)
 
         show_question_message_box(parent=self._view, title="خروجی اکسل",
                                   message=f"آیا از خروجی اکسل  {count} فاکتور انتخاب شده مطمئن هستید؟",
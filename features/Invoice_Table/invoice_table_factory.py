@@ -9,6 +9,8 @@ from features.Invoice_Table.invoice_table_logic import (InvoiceLogic, InvoiceSer
                                                         ValidationService, NumberFormatService)
 from features.Invoice_Table.invoice_table_controller import InvoiceTableController
 
+from shared.services.invoice_aggregate_loader import InvoiceAggregateLoader
+from shared.services.streaming_exporter import StreamingExporter
 from shared.session_provider import ManagedSessionProvider
 
 
@@ -40,8 +42,10 @@ class InvoiceTableFactory:
         search_service = SearchService()
         invoice_service = InvoiceService(repo_manager=repo_manager,
                                          business_engine=business_session,
-                                         payroll_engine=payroll_session)
-        export_service = InvoiceExportService(invoice_service=invoice_service)
+                                         payroll_engine=payroll_session,
+                                         aggregate_loader=InvoiceAggregateLoader(business_engine))
+        export_service = InvoiceExportService(repo_manager=repo_manager,
+                                              exporter=StreamingExporter(business_engine))
         format_service = NumberFormatService()
 
         logic = InvoiceLogic(
@@ -1,17 +1,21 @@
 # features/Invoice_Table/invoice_table_logic.py
 
 from __future__ import annotations
-import csv
 import json
 import logging
 from pathlib import Path
 from typing import Any, List, Dict, Optional, Tuple
 
-from features.Invoice_Table.invoice_table_models import InvoiceSummary, InvoiceFilter, ColumnSettings
-from features.Invoice_Table.invoice_table_repo import (RepositoryManager, InvoiceData, InvoiceItemData,
-                                                       EditedInvoiceData, DeletedInvoiceData)
+from features.Invoice_Table.invoice_table_models import InvoiceSummary, InvoiceFilter, ColumnSettings, InvoiceRow
+from features.Invoice_Table.invoice_table_repo import (RepositoryManager, BusinessRepository, InvoiceData,
+                                                       InvoiceItemData, EditedInvoiceData, DeletedInvoiceData)
+from shared.orm_models.business_models import IssuedInvoiceModel
+from shared.services.invoice_aggregate_loader import InvoiceAggregateLoader
+from shared.services.streaming_exporter import (StreamingExporter, ExportColumn, ExportSheet, ProgressCallback,
+                                                CancelCheck, jalali_date, select_columns)
 from shared.session_provider import ManagedSessionProvider
 from shared.utils.path_utils import get_user_data_path
+from shared.utils.text_utils import split_invoice_version
 
 logger = logging.getLogger(__name__)
 
@@ -89,10 +93,12 @@ class InvoiceService:
     def __init__(self,
                  repo_manager: RepositoryManager,
                  business_engine: ManagedSessionProvider,
-                 payroll_engine: ManagedSessionProvider):
+                 payroll_engine: ManagedSessionProvider,
+                 aggregate_loader: InvoiceAggregateLoader):
         self._repo_manager = repo_manager
         self._business_session = business_engine
         self._payroll_session = payroll_engine
+        self._aggregate_loader = aggregate_loader
         self._document_counts_cache: Dict[str, int] = {}
 
     # ==============================================================
@@ -106,6 +112,13 @@ class InvoiceService:
             self._update_document_counts_cache()
             return invoices
 
+    def get_invoice_rows(self) -> List[InvoiceRow]:
+        """Loads the compact list rows for every invoice and updates the document count cache."""
+        with self._business_session() as session:
+            rows = self._repo_manager.get_business_repository().get_invoice_rows(session)
+        self._update_document_counts_cache()
+        return rows
+
     def get_invoice_by_number(self, invoice_number: str) -> Optional[InvoiceData]:
         """Retrieves a single invoice by its number."""
         with self._business_session() as session:
@@ -117,45 +130,13 @@ class InvoiceService:
 
     def get_invoice_with_details(self, invoice_number: str) -> Optional[tuple[InvoiceData, list[InvoiceItemData]]]:
         """
-        Fetches an invoice and all its associated items,
-        then enriches them with dynamic price names.
+        Fetches an invoice and all its associated items, enriched with the
+        catalog service and dynamic price names, through the shared aggregate loader.
         """
-        repo = self._repo_manager.get_business_repository()
-
-        # Step 1: Fetch invoice and item dataclasses from the invoices DB.
-        # This is safe because the repository converts ORM objects to dataclasses inside the session.
-        with self._business_session() as invoice_session:
-            invoice_data, items_data = repo.get_invoice_and_items(invoice_session, invoice_number)
-
-            if not invoice_data:
-                return None
-
-            if not items_data:
-                return invoice_data, []
-
-        # Step 2: Collect ONLY the dynamic price IDs needed for enrichment.
-        # We no longer need to look up the main service name; it's already in items_data.
-        dynamic_price_ids: set[int] = set()
-        for item in items_data:
-            if item.dynamic_price_1: # Assuming the dataclass field is named `dynamic_price_1_id`
-                dynamic_price_ids.add(item.dynamic_price_1)
-            if item.dynamic_price_2: # Assuming the dataclass field is named `dynamic_price_2_id`
-                dynamic_price_ids.add(item.dynamic_price_2)
-
-        # Step 3: Fetch ONLY dynamic price names from the services DB.
-        with self._business_session() as services_session:
-            # We pass an empty set for service_ids as it's no longer needed.
-            _, dynamic_price_map = repo.get_services_and_dynamic_prices(
-                services_session, set(), dynamic_price_ids
-            )
-
-        # Step 4: Enrich the existing item dataclasses with the dynamic price names.
-        for item in items_data:
-            # The service_name is already correct from the repository. We just add the dynamic price names.
-            item.dynamic_price_1_name = dynamic_price_map.get(item.dynamic_price_1)
-            item.dynamic_price_2_name = dynamic_price_map.get(item.dynamic_price_2)
-
-        return invoice_data, items_data
+        aggregate = self._aggregate_loader.load(invoice_number)
+        if not aggregate:
+            return None
+        return aggregate.invoice, aggregate.items
 
     # ==============================================================
     # UPDATE / DELETE OPERATIONS
@@ -224,11 +205,6 @@ class InvoiceService:
         with self._business_session() as session:
             return self._repo_manager.get_business_repository().get_invoice_summary(session)
 
-    def get_invoices_for_export(self, invoice_numbers: List[str]) -> List[Dict[str, Any]]:
-        """Fetches simplified invoice data suitable for exporting."""
-        with self._business_session() as session:
-            return self._repo_manager.get_business_repository().export_invoices_data(session, invoice_numbers)
-
     # ==============================================================
     # EDIT HISTORY OPERATIONS
     # ==============================================================
@@ -246,6 +222,12 @@ class InvoiceService:
             return self._repo_manager.get_business_repository().get_edit_history_by_invoice_number(session,
                                                                                                    invoice_number)
 
+    def get_invoice_versions(self, invoice_number: str) -> List[InvoiceData]:
+        """Retrieves all issued versions of the chain the given invoice belongs to."""
+        base_invoice_number, _ = split_invoice_version(invoice_number)
+        with self._business_session() as session:
+            return self._repo_manager.get_business_repository().get_invoice_versions(session, base_invoice_number)
+
     def get_all_deleted_invoices(self) -> List[DeletedInvoiceData]:
         """Retrieves all invoices from the deleted_invoices table."""
         with self._business_session() as session:
@@ -329,7 +311,7 @@ class SearchService:
     def __init__(self):
         self.filter = InvoiceFilter()
 
-    def search(self, search_text: str, invoices: List[InvoiceData]) -> List[InvoiceData]:
+    def search(self, search_text: str, invoices: List[InvoiceRow]) -> List[InvoiceRow]:
         """Filters a list of invoices based on the search text."""
         self.filter.set_search_text(search_text)
         if not self.filter.search_text:
@@ -338,66 +320,49 @@ class SearchService:
 
 
 class InvoiceExportService:
-    """Handles the entire process of exporting invoice data to CSV."""
-
-    def __init__(self, invoice_service: InvoiceService):
-        self._invoice_service = invoice_service
+    """Streams selected invoices to a CSV or xlsx file in constant memory."""
+
+    COLUMNS = [
+        ExportColumn('invoice_number', 'شماره فاکتور', IssuedInvoiceModel.invoice_number),
+        ExportColumn('name', 'نام', IssuedInvoiceModel.name),
+        ExportColumn('national_id', 'کد ملی', IssuedInvoiceModel.national_id),
+        ExportColumn('phone', 'شماره تماس', IssuedInvoiceModel.phone),
+        ExportColumn('issue_date', 'تاریخ صدور', IssuedInvoiceModel.issue_date, jalali_date),
+        ExportColumn('delivery_date', 'تاریخ تحویل', IssuedInvoiceModel.delivery_date, jalali_date),
+        ExportColumn('translator', 'مترجم', IssuedInvoiceModel.translator),
+        ExportColumn('document_count', 'تعداد اسناد', BusinessRepository.document_count_expression()),
+        ExportColumn('total_amount', 'مبلغ کل', IssuedInvoiceModel.total_amount),
+        ExportColumn('final_amount', 'مبلغ نهایی', IssuedInvoiceModel.final_amount),
+    ]
+    DEFAULT_COLUMN_KEYS = ['invoice_number', 'name', 'national_id', 'phone',
+                           'issue_date', 'delivery_date', 'translator', 'total_amount']
+
+    def __init__(self, repo_manager: RepositoryManager, exporter: StreamingExporter):
+        self._repo_manager = repo_manager
+        self._exporter = exporter
 
-    @staticmethod
-    def prepare_export_data(invoices: list[InvoiceData], document_counts: dict[str, int]) -> list[dict[str, object]]:
-        """Prepare invoice data for export"""
-        export_data = []
-
-        for invoice in invoices:
-            doc_count = document_counts.get(invoice.invoice_number, 0)
-
-            export_data.append({
-                'شماره فاکتور': invoice.invoice_number,
-                'نام': invoice.name,
-                'کد ملی': invoice.national_id,
-                'شماره تماس': invoice.phone,
-                'تاریخ صدور': invoice.issue_date,
-                'تاریخ تحویل': invoice.delivery_date,
-                'مترجم': invoice.translator,
-                'تعداد اسناد': doc_count,
-                'مبلغ کل': NumberFormatService.format_currency(invoice.total_amount)
-            })
-
-        return export_data
+    def export(self, invoice_numbers: Optional[List[str]], file_path: str,
+               column_keys: Optional[List[str]] = None,
+               progress: Optional[ProgressCallback] = None,
+               is_cancelled: Optional[CancelCheck] = None) -> int:
+        """
+        Exports the given invoices (all invoices when ``invoice_numbers`` is None)
+        to ``file_path``; the format follows its suffix (.csv or .xlsx).
+        Returns the number of exported rows. Raises ExportCancelled when cancelled.
+        """
+        columns = select_columns(self.COLUMNS, column_keys or self.DEFAULT_COLUMN_KEYS)
+        statement = self._repo_manager.get_business_repository().invoice_export_statement(
+            [column.expression for column in columns], invoice_numbers)
+        return self._exporter.export(file_path, [ExportSheet('فاکتورها', columns, statement)],
+                                     progress=progress, is_cancelled=is_cancelled)
 
     def export_to_csv(self, invoice_numbers: List[str], file_path: str) -> bool:
         """Exports selected invoices to a CSV file."""
         if not invoice_numbers:
             return False
-
         try:
-            export_data = self._invoice_service.get_invoices_for_export(invoice_numbers)
-            if not export_data:
-                logger.warning("No data found for export.")
-                return False
-
-            headers = [
-                'شماره فاکتور', 'نام', 'کد ملی', 'شماره تماس',
-                'تاریخ صدور', 'تاریخ تحویل', 'مترجم', 'مبلغ کل'
-            ]
-
-            # Map model keys to Persian headers
-            key_map = {
-                'invoice_number': 'شماره فاکتور', 'name': 'نام', 'national_id': 'کد ملی',
-                'phone': 'شماره تماس', 'issue_date': 'تاریخ صدور', 'delivery_date': 'تاریخ تحویل',
-                'translator': 'مترجم', 'total_amount': 'مبلغ کل'
-            }
-
-            with open(file_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=headers)
-                writer.writeheader()
-                for row_data in export_data:
-                    # Create a new dict with Persian keys
-                    persian_row = {key_map[key]: value for key, value in row_data.items()}
-                    writer.writerow(persian_row)
-
-            return True
-        except (IOError, KeyError) as e:
+            return self.export(invoice_numbers, file_path) > 0
+        except (IOError, ValueError) as e:
             logger.error(f"Error exporting invoices to CSV: {e}")
             return False
 
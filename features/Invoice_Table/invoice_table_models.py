@@ -1,6 +1,7 @@
 # features/Invoice_Table/invoice_table_models.py
 
 from dataclasses import dataclass
+from datetime import date, datetime
 from typing import List, Optional
 from shared.orm_models.invoices_models import InvoiceData, InvoiceItemData
 
@@ -52,6 +53,32 @@ class ExportInvoiceData:
     total_amount: int
 
 
+@dataclass(slots=True)
+class InvoiceRow:
+    """
+    Compact read-model for the invoice list: only the displayed and searchable
+    columns, without a per-instance __dict__. Built straight from Core rows.
+    """
+    id: int
+    invoice_number: str
+    name: str
+    national_id: str
+    phone: str
+    issue_date: datetime
+    delivery_date: datetime
+    translator: str
+    total_amount: int
+
+
+@dataclass
+class PdfArchiveFilter:
+    """Selects the invoices a batch PDF archive run should render."""
+    start_date: Optional[date] = None  # first and last day of issue, both included
+    end_date: Optional[date] = None
+    translator: Optional[str] = None
+    missing_pdf_only: bool = True
+
+
 class InvoiceFilter:
     """Class for managing invoice filtering criteria"""
 
@@ -68,7 +95,7 @@ class InvoiceFilter:
         if 0 <= column_index < len(self.visible_columns):
             self.visible_columns[column_index] = visible
 
-    def matches_search(self, invoice: InvoiceData) -> bool:
+    def matches_search(self, invoice: InvoiceRow | InvoiceData) -> bool:
         """Check if invoice matches search criteria"""
         if not self.search_text:
             return True
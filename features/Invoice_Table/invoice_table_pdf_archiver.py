@@ -0,0 +1,253 @@
+# features/Invoice_Table/invoice_table_pdf_archiver.py
+
+"""
+Batch PDF regeneration and archival.
+
+Renders the invoices matching a PdfArchiveFilter with the headless invoice
+renderer in a process pool, stores each file in a Jalali year/month archive
+tree under a content-hashed name, and records all new paths with a single
+bulk UPDATE. Meant for overnight runs over thousands of invoices:
+
+    python -m features.Invoice_Table.invoice_table_pdf_archiver --missing-only --workers 4
+"""
+
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import jdatetime
+from sqlalchemy import Engine
+
+from features.Invoice_Page.invoice_preview.invoice_preview_models import (Invoice, Customer, PreviewItem,
+                                                                          PreviewOfficeInfo)
+from features.Invoice_Page.invoice_preview.invoice_preview_renderer import InvoicePdfRenderer, ensure_gui_application
+from features.Invoice_Page.invoice_preview.invoice_preview_settings_manager import PreviewSettingsManager
+from features.Invoice_Table.invoice_table_models import PdfArchiveFilter
+from features.Invoice_Table.invoice_table_repo import BusinessRepository
+from shared.orm_models.business_models import InvoiceData, InvoiceItemData, TranslationOfficeData
+from shared.session_provider import ManagedSessionProvider
+from shared.utils.path_utils import get_user_data_path
+
+logger = logging.getLogger(__name__)
+
+HASH_PREFIX_LENGTH = 12
+UPDATE_BATCH_SIZE = 500
+
+
+@dataclass
+class PdfArchiveReport:
+    """Outcome of one archive run."""
+    total: int = 0
+    archived: Dict[str, str] = field(default_factory=dict)
+    failures: Dict[str, str] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def invoices_per_second(self) -> float:
+        return len(self.archived) / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def summary(self) -> str:
+        return (f"Archived {len(self.archived)}/{self.total} invoices in {self.elapsed_seconds:.1f}s "
+                f"({self.invoices_per_second:.1f}/s), {len(self.failures)} failed.")
+
+
+# ---------------------------------------------------------------------
+# WORKER SIDE (runs in the pool processes)
+# ---------------------------------------------------------------------
+
+_worker_renderer: Optional[InvoicePdfRenderer] = None
+
+
+def _init_worker() -> None:
+    global _worker_renderer
+    ensure_gui_application()
+    _worker_renderer = InvoicePdfRenderer()
+
+
+def archive_directory(archive_root: Path, issue_date) -> Path:
+    """The Jalali year/month folder an invoice issued on ``issue_date`` belongs to."""
+    jalali = jdatetime.date.fromgregorian(date=issue_date.date() if hasattr(issue_date, "date") else issue_date)
+    return archive_root / f"{jalali.year:04d}" / f"{jalali.month:02d}"
+
+
+def render_to_archive(invoice: Invoice, settings: dict, archive_root: str) -> Tuple[str, str]:
+    """
+    Renders one invoice into the archive and returns (invoice_number, final path).
+    The file is written under a temporary name and renamed once its hash is known.
+    """
+    if _worker_renderer is None:
+        _init_worker()
+
+    directory = archive_directory(Path(archive_root), invoice.issue_date)
+    directory.mkdir(parents=True, exist_ok=True)
+    temp_path = directory / f".{invoice.invoice_number}.{os.getpid()}.tmp"
+
+    if not _worker_renderer.render_to_pdf(invoice, settings, str(temp_path)):
+        temp_path.unlink(missing_ok=True)
+        raise RuntimeError("rendering failed")
+
+    digest = hashlib.sha256(temp_path.read_bytes()).hexdigest()
+    final_path = directory / f"{invoice.invoice_number}-{digest[:HASH_PREFIX_LENGTH]}.pdf"
+    os.replace(temp_path, final_path)
+    return invoice.invoice_number, str(final_path)
+
+
+# ---------------------------------------------------------------------
+# COORDINATOR
+# ---------------------------------------------------------------------
+
+class InvoicePdfArchiver:
+    """Selects invoices, fans rendering out to a process pool and records the results."""
+
+    def __init__(self, business_engine: Engine, archive_root: Optional[Path] = None,
+                 max_workers: Optional[int] = None, repository: Optional[BusinessRepository] = None):
+        """
+        Args:
+            business_engine: Engine of the business database.
+            archive_root: Root of the archive tree; defaults to the user data folder.
+            max_workers: Pool size (None = one per CPU). 0 renders in this process.
+            repository: Data access layer, injectable for tests.
+        """
+        self._session = ManagedSessionProvider(engine=business_engine)
+        self._archive_root = archive_root or get_user_data_path("invoice_archive", create_dirs=False)
+        self._max_workers = max_workers
+        self._repo = repository or BusinessRepository()
+
+    def run(self, pdf_filter: PdfArchiveFilter, settings: Optional[dict] = None) -> PdfArchiveReport:
+        started = time.perf_counter()
+        settings = settings or PreviewSettingsManager().get_current_settings()
+
+        with self._session() as session:
+            rows = self._repo.get_invoices_for_pdf_archive(session, pdf_filter)
+            office = self._repo.get_office_info(session)
+
+        office_info = self._to_office_info(office)
+        invoices = [self._to_invoice(invoice, items, address, office_info) for invoice, items, address in rows]
+        report = PdfArchiveReport(total=len(invoices))
+        logger.info(f"Archiving {report.total} invoices into {self._archive_root}.")
+
+        if invoices:
+            Path(self._archive_root).mkdir(parents=True, exist_ok=True)
+            if self._max_workers == 0:
+                self._render_inline(invoices, settings, report)
+            else:
+                self._render_in_pool(invoices, settings, report)
+            self._record_paths(report.archived)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(report.summary())
+        for number, error in report.failures.items():
+            logger.warning(f"Invoice {number} was not archived: {error}")
+        return report
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    def _render_inline(self, invoices: List[Invoice], settings: dict, report: PdfArchiveReport) -> None:
+        for invoice in invoices:
+            try:
+                number, path = render_to_archive(invoice, settings, str(self._archive_root))
+                report.archived[number] = path
+            except Exception as e:
+                report.failures[invoice.invoice_number] = str(e)
+
+    def _render_in_pool(self, invoices: List[Invoice], settings: dict, report: PdfArchiveReport) -> None:
+        # 'spawn' gives every worker a clean Qt state instead of a forked copy of the GUI process.
+        with ProcessPoolExecutor(max_workers=self._max_workers, mp_context=get_context("spawn"),
+                                 initializer=_init_worker) as pool:
+            futures = {
+                pool.submit(render_to_archive, invoice, settings, str(self._archive_root)): invoice.invoice_number
+                for invoice in invoices
+            }
+            for future in as_completed(futures):
+                try:
+                    number, path = future.result()
+                    report.archived[number] = path
+                except Exception as e:
+                    report.failures[futures[future]] = str(e)
+
+    def _record_paths(self, archived: Dict[str, str]) -> None:
+        numbers = list(archived)
+        for start in range(0, len(numbers), UPDATE_BATCH_SIZE):
+            batch = {number: archived[number] for number in numbers[start:start + UPDATE_BATCH_SIZE]}
+            with self._session() as session:
+                self._repo.update_pdf_paths(session, batch)
+
+    @staticmethod
+    def _to_office_info(office: Optional[TranslationOfficeData]) -> PreviewOfficeInfo:
+        if not office:
+            return PreviewOfficeInfo(name="", reg_no="", representative="", address="", phone="",
+                                     email="", website="", whatsapp="", telegram="")
+        return PreviewOfficeInfo(
+            name=office.name or "", reg_no=office.reg_no or "", representative=office.representative or "",
+            address=office.address or "", phone=office.phone or "", email=office.email or "",
+            website=office.website or "", whatsapp=office.whatsapp or "", telegram=office.telegram or "",
+            logo=office.logo, updated_at=office.updated_at,
+        )
+
+    @staticmethod
+    def _to_invoice(invoice: InvoiceData, items: List[InvoiceItemData], address: Optional[str],
+                    office: PreviewOfficeInfo) -> Invoice:
+        """Rebuilds the preview DTO of an issued invoice from its stored rows."""
+        preview_items = [
+            PreviewItem(
+                name=item.service_name,
+                type="رسمی" if item.is_official else "غیر رسمی",
+                quantity=item.quantity,
+                judiciary_seal="✔" if item.has_judiciary_seal else "-",
+                foreign_affairs_seal="✔" if item.has_foreign_affairs_seal else "-",
+                total_price=item.total_price,
+            )
+            for item in items
+        ]
+        return Invoice(
+            invoice_number=invoice.invoice_number,
+            issue_date=invoice.issue_date, delivery_date=invoice.delivery_date,
+            username=invoice.username or "",
+            customer=Customer(name=invoice.name, national_id=invoice.national_id, phone=invoice.phone,
+                              address=address or ""),
+            office=office,
+            source_language=invoice.source_language, target_language=invoice.target_language,
+            items=preview_items,
+            total_translation_price=invoice.total_translation_price,
+            total_confirmation_price=invoice.total_confirmation_price,
+            total_office_price=invoice.total_registration_price,
+            total_certified_copy_price=invoice.total_certified_copy_price,
+            total_additional_price=invoice.total_additional_issues_price,
+            total_amount=invoice.total_amount,
+            discount_amount=invoice.discount_amount,
+            advance_payment=invoice.advance_payment,
+            emergency_cost=invoice.emergency_cost,
+            remarks=invoice.remarks or "",
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import date
+    from sqlalchemy import create_engine
+
+    from config.config import DATABASE_PATHS
+
+    parser = argparse.ArgumentParser(description="Render and archive invoice PDFs in bulk.")
+    parser.add_argument("--from", dest="start_date", type=date.fromisoformat, help="first issue day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end_date", type=date.fromisoformat, help="last issue day, included")
+    parser.add_argument("--translator")
+    parser.add_argument("--missing-only", action="store_true")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--archive-root", type=Path)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    engine = create_engine(f"sqlite:///{DATABASE_PATHS['business']}")
+    archiver = InvoicePdfArchiver(engine, archive_root=args.archive_root, max_workers=args.workers)
+    result = archiver.run(PdfArchiveFilter(start_date=args.start_date, end_date=args.end_date,
+                                           translator=args.translator, missing_pdf_only=args.missing_only))
+    print(result.summary())
@@ -4,18 +4,19 @@
 Repository for invoice-related database operations.
 """
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, func, select, update, bindparam, or_
+from sqlalchemy.orm import Session, selectinload
 # We remove the broad try/except blocks so errors propagate to the UI controller
-from datetime import datetime, timezone
-from typing import Optional, List, Tuple, Dict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, List, Dict, Tuple
 
 # Import the Data Classes and Models correctly
-from features.Invoice_Table.invoice_table_models import InvoiceSummary
+from features.Invoice_Table.invoice_table_models import InvoiceSummary, InvoiceRow, PdfArchiveFilter
 from shared.orm_models.business_models import (
     IssuedInvoiceModel, InvoiceItemModel, DeletedInvoiceModel,
     InvoiceItemData, InvoiceData, EditedInvoiceModel, EditedInvoiceData,
-    DeletedInvoiceData, UsersModel, ServicesModel, ServiceDynamicPrice
+    DeletedInvoiceData, UsersModel, CustomerModel, TranslationOfficeDataModel, TranslationOfficeData,
+    TranslatorModel
 )
 from shared.orm_models.payroll_models import EmployeeModel, EmployeeRoleModel
 
@@ -39,62 +40,66 @@ class BusinessRepository:
         # Convert ORM objects to Dataclasses
         return [invoice.to_dataclass() for invoice in invoices]
 
-    def get_invoice_by_number(self, session: Session, invoice_number: str) -> Optional[InvoiceData]:
-        invoice = (
-            session.query(IssuedInvoiceModel)
-            .filter(IssuedInvoiceModel.invoice_number == invoice_number)
-            .one_or_none()
+    def get_invoice_rows(self, session: Session) -> List[InvoiceRow]:
+        """
+        Fetches only the columns shown in the invoice list through a Core select,
+        bypassing ORM hydration and the identity map.
+        """
+        stmt = select(
+            IssuedInvoiceModel.id, IssuedInvoiceModel.invoice_number, IssuedInvoiceModel.name,
+            IssuedInvoiceModel.national_id, IssuedInvoiceModel.phone, IssuedInvoiceModel.issue_date,
+            IssuedInvoiceModel.delivery_date, IssuedInvoiceModel.translator, IssuedInvoiceModel.total_amount,
         )
-        return invoice.to_dataclass() if invoice else None
-
-    def get_invoice_and_items(
-            self, session: Session, invoice_number: str
-    ) -> Tuple[Optional[InvoiceData], List[InvoiceItemData]]:
+        return [InvoiceRow(*row) for row in session.execute(stmt)]
 
-        invoice_orm = (
-            session.query(IssuedInvoiceModel)
-            .filter_by(invoice_number=invoice_number)
-            .one_or_none()
+    def get_invoices_for_pdf_archive(
+            self, session: Session, pdf_filter: PdfArchiveFilter
+    ) -> List[Tuple[InvoiceData, List[InvoiceItemData], Optional[str]]]:
+        """
+        Fetches the invoices matching the archive filter with their items
+        (one extra SELECT for all items) and the customer's address.
+        """
+        stmt = (
+            select(IssuedInvoiceModel, CustomerModel.address)
+            .outerjoin(CustomerModel, CustomerModel.national_id == IssuedInvoiceModel.national_id)
+            .options(selectinload(IssuedInvoiceModel.items))
+            .order_by(IssuedInvoiceModel.issue_date)
         )
+        if pdf_filter.start_date:
+            stmt = stmt.where(IssuedInvoiceModel.issue_date >= pdf_filter.start_date)
+        if pdf_filter.end_date:
+            # issue_date carries a time: the whole last day is included
+            stmt = stmt.where(IssuedInvoiceModel.issue_date < pdf_filter.end_date + timedelta(days=1))
+        if pdf_filter.translator:
+            stmt = stmt.where(IssuedInvoiceModel.translator == pdf_filter.translator)
+        if pdf_filter.missing_pdf_only:
+            stmt = stmt.where(or_(IssuedInvoiceModel.pdf_file_path.is_(None), IssuedInvoiceModel.pdf_file_path == ""))
 
-        if not invoice_orm:
-            return None, []
+        return [
+            (invoice.to_dataclass(), [item.to_dataclass() for item in invoice.items], address)
+            for invoice, address in session.execute(stmt)
+        ]
 
-        items_orm = (
-            session.query(InvoiceItemModel)
-            .filter_by(invoice_number=invoice_number)
-            .all()
+    def update_pdf_paths(self, session: Session, paths: Dict[str, str]) -> int:
+        """Sets pdf_file_path for many invoices in a single executemany UPDATE."""
+        if not paths:
+            return 0
+        table = IssuedInvoiceModel.__table__
+        stmt = (
+            update(table)
+            .where(table.c.invoice_number == bindparam("number"))
+            .values(pdf_file_path=bindparam("path"), revision=table.c.revision + 1)
         )
+        result = session.execute(stmt, [{"number": number, "path": path} for number, path in paths.items()])
+        return result.rowcount
 
-        return (
-            invoice_orm.to_dataclass(),
-            [item.to_dataclass() for item in items_orm],
+    def get_invoice_by_number(self, session: Session, invoice_number: str) -> Optional[InvoiceData]:
+        invoice = (
+            session.query(IssuedInvoiceModel)
+            .filter(IssuedInvoiceModel.invoice_number == invoice_number)
+            .one_or_none()
         )
-
-    def get_services_and_dynamic_prices(
-            self, session: Session, service_ids: set[int], dynamic_price_ids: set[int]
-    ) -> Tuple[Dict[int, str], Dict[int, str]]:
-
-        service_map = {}
-        dynamic_price_map = {}
-
-        if service_ids:
-            services = (
-                session.query(ServicesModel)
-                .filter(ServicesModel.id.in_(service_ids))
-                .all()
-            )
-            service_map = {s.id: s.name for s in services}
-
-        if dynamic_price_ids:
-            dynamic_prices = (
-                session.query(ServiceDynamicPrice)
-                .filter(ServiceDynamicPrice.id.in_(dynamic_price_ids))
-                .all()
-            )
-            dynamic_price_map = {dp.id: dp.name for dp in dynamic_prices}
-
-        return service_map, dynamic_price_map
+        return invoice.to_dataclass() if invoice else None
 
     def update_invoice(self, session: Session, invoice_number: str, updates: Dict[str, object]) -> bool:
         invoice = (
@@ -193,16 +198,17 @@ class BusinessRepository:
         total_count = session.query(func.count(IssuedInvoiceModel.id)).scalar() or 0
         total_amount = session.query(func.sum(IssuedInvoiceModel.total_amount)).scalar() or 0
 
+        invoice_counts = (
+            session.query(IssuedInvoiceModel.translator_employee_id.label("translator_id"),
+                          func.count(IssuedInvoiceModel.id).label("invoice_count"))
+            .filter(IssuedInvoiceModel.translator_employee_id.isnot(None))
+            .group_by(IssuedInvoiceModel.translator_employee_id)
+            .subquery()
+        )
         translator_stats = [
             (translator, count)
-            for translator, count in session.query(
-                IssuedInvoiceModel.translator, func.count(IssuedInvoiceModel.id)
-            )
-            .filter(
-                IssuedInvoiceModel.translator.isnot(None),
-                IssuedInvoiceModel.translator != "نامشخص",
-            )
-            .group_by(IssuedInvoiceModel.translator)
+            for translator, count in session.query(TranslatorModel.full_name, invoice_counts.c.invoice_count)
+            .join(invoice_counts, invoice_counts.c.translator_id == TranslatorModel.id)
             .all()
         ]
 
@@ -212,25 +218,30 @@ class BusinessRepository:
             translator_stats=translator_stats,
         )
 
-    def export_invoices_data(self, session: Session, invoice_numbers: List[str]) -> List[dict]:
-        invoices = (
-            session.query(IssuedInvoiceModel)
-            .filter(IssuedInvoiceModel.invoice_number.in_(invoice_numbers))
-            .all()
+    @staticmethod
+    def invoice_export_statement(columns: List[Any], invoice_numbers: Optional[List[str]] = None) -> Select:
+        """
+        Builds (without running) the export query selecting ``columns`` from the
+        invoices, optionally restricted to ``invoice_numbers``; it is streamed by the exporter.
+        """
+        statement = (
+            select(*columns)
+            .select_from(IssuedInvoiceModel)
+            .order_by(IssuedInvoiceModel.issue_date, IssuedInvoiceModel.id)
+        )
+        if invoice_numbers is not None:
+            statement = statement.where(IssuedInvoiceModel.invoice_number.in_(invoice_numbers))
+        return statement
+
+    @staticmethod
+    def document_count_expression():
+        """Correlated per-invoice document count, usable as an export column."""
+        return (
+            select(func.coalesce(func.sum(InvoiceItemModel.quantity), 0))
+            .where(InvoiceItemModel.invoice_number == IssuedInvoiceModel.invoice_number)
+            .correlate(IssuedInvoiceModel)
+            .scalar_subquery()
         )
-        return [
-            {
-                "invoice_number": inv.invoice_number,
-                "name": inv.name,
-                "national_id": inv.national_id,
-                "phone": inv.phone,
-                "issue_date": inv.issue_date,
-                "delivery_date": inv.delivery_date,
-                "translator": inv.translator,
-                "total_amount": inv.total_amount,
-            }
-            for inv in invoices
-        ]
 
     def add_invoice_edits(self, session: Session, edits: List[EditedInvoiceData]) -> bool:
         try:
@@ -262,6 +273,16 @@ class BusinessRepository:
         )
         return [item.to_dataclass() for item in history_orm]
 
+    def get_invoice_versions(self, session: Session, base_invoice_number: str) -> List[InvoiceData]:
+        """Returns every issued version of an invoice chain, oldest first."""
+        versions = (
+            session.query(IssuedInvoiceModel)
+            .filter(IssuedInvoiceModel.base_invoice_number == base_invoice_number)
+            .order_by(IssuedInvoiceModel.version)
+            .all()
+        )
+        return [invoice.to_dataclass() for invoice in versions]
+
     def get_all_deleted_invoices(self, session: Session) -> List[DeletedInvoiceData]:
         invoices = (
             session.query(DeletedInvoiceModel)
@@ -270,6 +291,10 @@ class BusinessRepository:
         )
         return [invoice.to_dataclass() for invoice in invoices]
 
+    def get_office_info(self, session: Session) -> Optional[TranslationOfficeData]:
+        office = session.query(TranslationOfficeDataModel).first()
+        return office.to_dataclass() if office else None
+
     # ────────────────────────────────────────────────────────────── #
     #                             USERS                              #
     # ────────────────────────────────────────────────────────────── #
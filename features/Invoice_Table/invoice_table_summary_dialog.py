@@ -135,11 +135,11 @@ class InvoiceSummaryDialog(QDialog):
             details = []
             if item.dynamic_price_1 and item.dynamic_price_amount_1 > 0:
                 price_str = to_persian_numbers(f"{item.dynamic_price_amount_1:,}")
-                details.append(f"{item.dynamic_price_1} ({price_str})")
+                details.append(f"{item.dynamic_price_1_name or item.dynamic_price_1} ({price_str})")
 
             if item.dynamic_price_2 and item.dynamic_price_amount_2 > 0:
                 price_str = to_persian_numbers(f"{item.dynamic_price_amount_2:,}")
-                details.append(f"{item.dynamic_price_2} ({price_str})")
+                details.append(f"{item.dynamic_price_2_name or item.dynamic_price_2} ({price_str})")
 
             if item.remarks:
                 details.append(f"توضیحات: {item.remarks}")
@@ -6,7 +6,7 @@ from PySide6.QtCore import Qt, Signal, QPoint, QUrl
 from PySide6.QtGui import QDesktopServices, QAction
 from functools import partial
 from typing import List
-from features.Invoice_Table.invoice_table_models import InvoiceData
+from features.Invoice_Table.invoice_table_models import InvoiceRow
 from shared.utils.persian_tools import to_persian_numbers, to_english_numbers
 from shared.utils.date_utils import to_jalali
 
@@ -99,7 +99,7 @@ class InvoiceTableView(QWidget):
 
     # --- Public Methods (Slots) for the Controller to Call ---
 
-    def update_table(self, invoices: List[InvoiceData], doc_counts: dict, translator_names: List[str]):
+    def update_table(self, invoices: List[InvoiceRow], doc_counts: dict, translator_names: List[str]):
         """Populate the table with fresh invoice data, sorted by issue_date descending."""
         # Sort invoices so the newest ones (by issue_date) appear on top
         invoices = sorted(
@@ -169,7 +169,7 @@ class InvoiceTableView(QWidget):
             is_visible = checkbox.isChecked()
             self.table.setColumnHidden(i + 1, not is_visible)
 
-    def _populate_row(self, row_idx: int, invoice: InvoiceData, doc_count: int, translator_names: list):
+    def _populate_row(self, row_idx: int, invoice: InvoiceRow, doc_count: int, translator_names: list):
         # Checkbox for selection
         checkbox = QCheckBox()
         checkbox.stateChanged.connect(self._emit_selection_changed)
@@ -343,7 +343,7 @@ class InvoiceTableView(QWidget):
         item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
         return item
 
-    def _setup_translator_column(self, row_idx: int, invoice: InvoiceData, translator_names: List[str]):
+    def _setup_translator_column(self, row_idx: int, invoice: InvoiceRow, translator_names: List[str]):
         if not invoice.translator or invoice.translator == "نامشخص":
             translator_combo = QComboBox()
             translator_combo.addItems(translator_names)
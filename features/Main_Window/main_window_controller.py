@@ -43,9 +43,11 @@ class MainWindowController(QObject):
         try:
             self.config = ConfigManager(get_resource_path('config', 'config.ini'))
             self.broker_host = self.config.get_broker_host()
+            self.broker_framing = self.config.get_broker_framing()
         except FileNotFoundError:
             show_error_message_box(self._view, "Configuration Error", "Could not find config.ini.")
             self.broker_host = '127.0.0.1'
+            self.broker_framing = 'json'
 
         self._connect_signals()
         self.initialize_with_user(username)
@@ -107,7 +109,8 @@ class MainWindowController(QObject):
                 self._engines.get('workspace'),
                 self._logic.get_user_profile_for_view(self._username).id,
                 self.broker_host,
-                self._view),
+                self._view,
+                broker_framing=self.broker_framing),
             lifetime=PageLifetime.KEEP_ALIVE
         )
 
@@ -1,91 +1,206 @@
-# file_exporter.py
+# features/Reports/file_exporter.py
+
+"""
+Excel and PDF export of the reports.
+
+PDFs are built headlessly with reportlab: the Persian fonts are registered once
+per process from resources/fonts, charts are drawn as vector graphics from the
+report data itself (no screenshot of the on-screen chart, no temp image), and
+tables are LongTables with fixed column widths and row heights so reports
+spanning hundreds of pages lay out in a single pass.
+"""
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from numbers import Number
+from typing import Optional, Sequence
+
 import pandas as pd
+from reportlab.graphics.charts.barcharts import HorizontalBarChart, VerticalBarChart
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
+from reportlab.lib.units import cm
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-from pathlib import Path
-import io
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer
+
+from shared.utils.path_utils import get_resource_path
+from shared.utils.persian_tools import to_visual_rtl
+
+logger = logging.getLogger(__name__)
+
+FONT_NAME = "IRANSans"
+BOLD_FONT_NAME = "IRANSans-Bold"
+FALLBACK_FONTS = ("Helvetica", "Helvetica-Bold")
+
+TABLE_FONT_SIZE = 9
+TABLE_ROW_HEIGHT = 16
+COLUMN_SAMPLE_ROWS = 200  # rows measured to size the columns; the rest are cut to fit
+CHART_MAX_BARS = 15
+CHART_HEIGHT = 7 * cm
+
+
+@lru_cache(maxsize=None)
+def register_fonts() -> tuple[str, str]:
+    """Registers the report fonts once per process and returns (regular, bold) font names."""
+    regular = get_resource_path("resources", "fonts", "IRANSans(FaNum).ttf")
+    bold = get_resource_path("resources", "fonts", "IRANSans(FaNum)_Bold.ttf")
+    try:
+        pdfmetrics.registerFont(TTFont(FONT_NAME, str(regular)))
+        pdfmetrics.registerFont(TTFont(BOLD_FONT_NAME, str(bold) if bold.exists() else str(regular)))
+    except Exception as e:
+        logger.warning(f"Report fonts could not be loaded from {regular.parent}, Persian text will not render: {e}")
+        return FALLBACK_FONTS
+    pdfmetrics.registerFontFamily(FONT_NAME, normal=FONT_NAME, bold=BOLD_FONT_NAME)
+    return FONT_NAME, BOLD_FONT_NAME
+
+
+@dataclass
+class ReportChart:
+    """A bar chart of one value per label, drawn into the PDF as vector graphics."""
+    title: str
+    labels: Sequence[str]
+    values: Sequence[float]
+    horizontal: bool = True
+
+
+def format_cell(value) -> str:
+    """Table text of one value: thousands separators for numbers, empty for missing values."""
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if isinstance(value, bool) or not isinstance(value, Number):
+        return to_visual_rtl(str(value).replace("\n", " "))
+    if float(value).is_integer():
+        return f"{int(value):,}"
+    return f"{value:,.2f}"
 
 
 class FileExporter:
     def __init__(self):
-        # Register a Persian-supporting font.
-        # Make sure 'Vazir.ttf' is in the same directory or provide the full path.
-        font_path = Path("Vazir.ttf")
-        if font_path.exists():
-            pdfmetrics.registerFont(TTFont('Vazir', font_path))
-            self.persian_font = 'Vazir'
-        else:
-            # Fallback font
-            print("Warning: Vazir.ttf not found. Using IranSANS font.")
-            self.persian_font = 'IranSANS'
+        self.persian_font, self.persian_bold_font = register_fonts()
 
     def to_excel(self, df: pd.DataFrame, save_path: str):
         if not save_path.endswith('.xlsx'):
             save_path += '.xlsx'
         df.to_excel(save_path, index=False, engine='openpyxl')
 
-    def to_pdf(self, title: str, df: pd.DataFrame, report_info: str, chart_image_path: Path, save_path: str):
+    def to_pdf(self, title: str, df: pd.DataFrame, report_info: str, save_path: str,
+               chart: Optional[ReportChart] = None):
         if not save_path.endswith('.pdf'):
             save_path += '.pdf'
 
-        doc = SimpleDocTemplate(save_path, pagesize=landscape(letter))
+        doc = SimpleDocTemplate(save_path, pagesize=landscape(letter), title=title,
+                                leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm)
         styles = getSampleStyleSheet()
-
-        # Custom RTL style
         rtl_style = ParagraphStyle(
             'rtl_style',
             parent=styles['Normal'],
             fontName=self.persian_font,
-            alignment=2,  # 2 is for right alignment
+            alignment=2,  # right
             fontSize=12,
-            leading=14
+            leading=16
         )
         title_style = ParagraphStyle(
-            'rtl_title', parent=rtl_style, fontSize=18, alignment=1
+            'rtl_title', parent=rtl_style, fontName=self.persian_bold_font, fontSize=18, leading=24, alignment=1
         )
 
-        story = []
+        story = [
+            Paragraph(to_visual_rtl(title), title_style),
+            Spacer(1, 12),
+            Paragraph(to_visual_rtl(report_info), rtl_style),
+            Spacer(1, 18),
+        ]
+        if chart and len(chart.values):
+            story.append(self._chart_drawing(chart, doc.width))
+            story.append(Spacer(1, 18))
+        story.append(self._table(df, doc.width))
+        doc.build(story)
 
-        # Helper to reverse strings for RTL display in ReportLab
-        def rtl(text):
-            return str(text)[::-1]
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
 
-        # Title
-        story.append(Paragraph(rtl(title), title_style))
-        story.append(Spacer(1, 12))
+    def _table(self, df: pd.DataFrame, available_width: float) -> LongTable:
+        # Columns run right-to-left, so the first column of the frame is drawn rightmost.
+        headers = [to_visual_rtl(column) for column in reversed(df.columns)]
+        rows = [[format_cell(value) for value in reversed(row)] for row in df.itertuples(index=False, name=None)]
+        data = [headers] + rows
 
-        # Report Info
-        story.append(Paragraph(rtl(report_info), rtl_style))
-        story.append(Spacer(1, 24))
+        table = LongTable(data, colWidths=self._column_widths(data, available_width),
+                          rowHeights=[TABLE_ROW_HEIGHT + 4] + [TABLE_ROW_HEIGHT] * len(rows),
+                          repeatRows=1, hAlign='CENTER')
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), self.persian_font),
+            ('FONTNAME', (0, 0), (-1, 0), self.persian_bold_font),
+            ('FONTSIZE', (0, 0), (-1, -1), TABLE_FONT_SIZE),
+            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.beige]),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ]))
+        return table
 
-        # Chart
-        if chart_image_path and chart_image_path.exists():
-            img = Image(chart_image_path, width=400, height=200)
-            img.hAlign = 'CENTER'
-            story.append(img)
-            story.append(Spacer(1, 24))
+    def _column_widths(self, data: list[list[str]], available_width: float) -> list[float]:
+        """
+        Widths from the header and a sample of rows, scaled down to the page when too wide.
+        Giving reportlab the widths (and row heights) spares it measuring every cell of every row.
+        """
+        padding = 12
+        widths = [
+            max(pdfmetrics.stringWidth(row[index], self.persian_font, TABLE_FONT_SIZE)
+                for row in data[:COLUMN_SAMPLE_ROWS + 1]) + padding
+            for index in range(len(data[0]))
+        ]
+        total = sum(widths)
+        if total > available_width:
+            widths = [width * available_width / total for width in widths]
+        return widths
 
-        # Table
-        # Reverse column headers and data for RTL
-        df_display = df.rename(columns={col: rtl(str(col)) for col in df.columns})
-        data = [df_display.columns.values.tolist()] + df_display.applymap(lambda x: rtl(str(x))).values.tolist()
+    def _chart_drawing(self, chart: ReportChart, available_width: float) -> Drawing:
+        labels = [to_visual_rtl(label) for label in chart.labels[:CHART_MAX_BARS]]
+        values = [float(value or 0) for value in chart.values[:CHART_MAX_BARS]]
+        width = min(available_width, 18 * cm)
+        drawing = Drawing(width, CHART_HEIGHT)
 
-        table = Table(data, hAlign='CENTER')
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, -1), self.persian_font),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ])
-        table.setStyle(style)
-
-        story.append(table)
-        doc.build(story)
+        title_height = 20
+        label_width = max(pdfmetrics.stringWidth(label, self.persian_font, 8) for label in labels) + 8
+        if chart.horizontal:
+            # The first label is drawn at the top, as in a ranking.
+            bar_chart = HorizontalBarChart()
+            bar_chart.x = min(label_width, width / 3)
+            bar_chart.y = 15
+            bar_chart.width = width - bar_chart.x - 10
+            bar_chart.categoryAxis.reverseDirection = True
+            bar_chart.categoryAxis.labels.boxAnchor = 'e'
+            bar_chart.categoryAxis.labels.dx = -4
+        else:
+            bar_chart = VerticalBarChart()
+            bar_chart.x = 60
+            bar_chart.y = 20
+            bar_chart.width = width - bar_chart.x - 10
+            bar_chart.categoryAxis.labels.boxAnchor = 'n'
+            bar_chart.valueAxis.labels.boxAnchor = 'e'
+        bar_chart.height = CHART_HEIGHT - bar_chart.y - title_height - 5
+
+        bar_chart.data = [values]
+        bar_chart.categoryAxis.categoryNames = labels
+        bar_chart.categoryAxis.labels.fontName = self.persian_font
+        bar_chart.categoryAxis.labels.fontSize = 8
+        bar_chart.valueAxis.labels.fontName = self.persian_font
+        bar_chart.valueAxis.labels.fontSize = 7
+        bar_chart.valueAxis.valueMin = 0
+        bar_chart.valueAxis.labelTextFormat = lambda value: f"{value:,.0f}"
+        bar_chart.bars[0].fillColor = colors.HexColor("#4a7ebb")
+        bar_chart.bars[0].strokeColor = None
+        bar_chart.barSpacing = 2
+
+        drawing.add(bar_chart)
+        drawing.add(String(width / 2, CHART_HEIGHT - title_height + 4, to_visual_rtl(chart.title),
+                           fontName=self.persian_bold_font, fontSize=11, textAnchor='middle'))
+        drawing.hAlign = 'CENTER'
+        return drawing
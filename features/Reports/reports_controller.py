@@ -1,13 +1,32 @@
 # controller.py
 import dataclasses
+from typing import Optional, Tuple
+
 import pandas as pd
-from pathlib import Path
 from PySide6.QtCore import Slot
-from PySide6.QtGui import QPixmap
 
 from features.Reports.reports_view import ReportsView
 from features.Reports.reports_logic import ReportsLogic
-from file_exporter import FileExporter
+from features.Reports.file_exporter import FileExporter, ReportChart
+
+PDF_TITLES = {
+    "financial": "گزارش خلاصه مالی",
+    "translator": "گزارش عملکرد مترجمین",
+    "customer": "گزارش مشتریان برتر",
+    "user": "گزارش فعالیت کاربران"
+}
+PDF_COLUMN_TITLES = {
+    "translator": {"translator_name": "نام مترجم", "total_revenue": "درآمد کل",
+                   "invoice_count": "تعداد فاکتور", "average_revenue_per_invoice": "میانگین درآمد/فاکتور"},
+    "customer": {"customer_name": "نام مشتری", "national_id": "کد ملی",
+                 "total_spent": "مجموع پرداختی", "invoice_count": "تعداد فاکتور"},
+    "user": {"username": "نام کاربری", "full_name": "نام کامل",
+             "invoice_count": "فاکتورهای صادر شده", "total_time_on_app_hours": "زمان فعالیت (ساعت)"},
+}
+FINANCIAL_TITLES = {
+    "total_revenue": "درآمد کل", "total_discount": "تخفیف", "total_advance": "پیش پرداخت",
+    "net_income": "درآمد خالص", "fully_paid_invoices": "فاکتورهای پرداخت شده", "unpaid_invoices": "پرداخت نشده",
+}
 
 
 class ReportsController:
@@ -60,7 +79,8 @@ class ReportsController:
         report_name = button.property("report_name")
         file_type = "pdf" if "pdf" in button.text().lower() else "excel"
 
-        df = self.view.current_dataframes.get(report_name)
+        # The financial tab keeps its single summary row under its own key.
+        df = self.view.current_dataframes.get("financial_summary" if report_name == "financial" else report_name)
         if df is None or df.empty:
             print(f"No data available to export for {report_name}")
             return
@@ -72,33 +92,34 @@ class ReportsController:
         if file_type == "excel":
             self.exporter.to_excel(df, save_path)
         else:  # PDF
-            chart_widget = getattr(self.view, f"{report_name}_chart", None)
-
-            # Save chart to a temporary image file
-            temp_chart_path = Path("./temp_chart.png")
-            if chart_widget:
-                pixmap = chart_widget.grab()
-                pixmap.save(str(temp_chart_path))
-
             start_date, end_date = self._get_dates()
             report_info = f"گزارش از تاریخ {start_date} تا {end_date}"
-
-            title_map = {
-                "financial": "گزارش خلاصه مالی",
-                "translator": "گزارش عملکرد مترجمین",
-                "customer": "گزارش مشتریان برتر",
-                "user": "گزارش فعالیت کاربران"
-            }
-            title = title_map.get(report_name, "گزارش")
-
-            # For financial report, use a simplified dataframe
-            if report_name == 'financial':
-                summary_df = self.view.current_dataframes.get("financial_summary")
-                summary_df.columns = ["درآمد کل", "تخفیف", "پیش پرداخت", "درآمد خالص", "فاکتورهای پرداخت شده",
-                                      "پرداخت نشده"]
-                self.exporter.to_pdf(title, summary_df.T, report_info, temp_chart_path, save_path)
-            else:
-                self.exporter.to_pdf(title, df, report_info, temp_chart_path, save_path)
-
-            if temp_chart_path.exists():
-                temp_chart_path.unlink()  # Clean up the temp image
+            table_df, chart = self._pdf_content(report_name, df)
+            self.exporter.to_pdf(PDF_TITLES.get(report_name, "گزارش"), table_df, report_info, save_path, chart)
+
+    def _pdf_content(self, report_name: str, df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[ReportChart]]:
+        """The table and the chart of a report's PDF, both built from the report data itself."""
+        if report_name == 'financial':
+            summary = df.iloc[0]
+            table_df = pd.DataFrame({"شرح": list(FINANCIAL_TITLES.values()),
+                                     "مقدار": [summary.get(key) or 0 for key in FINANCIAL_TITLES]})
+            chart = ReportChart("مقایسه درآمد کل و خالص", ["درآمد کل", "درآمد خالص"],
+                                [summary.get("total_revenue") or 0, summary.get("net_income") or 0],
+                                horizontal=False)
+            return table_df, chart
+
+        if report_name == 'translator':
+            ranked = df.sort_values('total_revenue', ascending=False)
+            chart = ReportChart("درآمد بر اساس مترجم", ranked['translator_name'].tolist(),
+                                ranked['total_revenue'].tolist())
+        elif report_name == 'customer':
+            ranked = df.sort_values('total_spent', ascending=False)
+            chart = ReportChart("مجموع پرداختی مشتریان", ranked['customer_name'].tolist(),
+                                ranked['total_spent'].tolist())
+        elif report_name == 'user':
+            ranked = df[df['invoice_count'] > 0].sort_values('invoice_count', ascending=False)
+            chart = ReportChart("تعداد فاکتورهای صادر شده توسط کاربر", ranked['username'].tolist(),
+                                ranked['invoice_count'].tolist())
+        else:
+            chart = None
+        return df.rename(columns=PDF_COLUMN_TITLES.get(report_name, {})), chart
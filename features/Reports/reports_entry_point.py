@@ -27,7 +27,7 @@ from features.Reports.reports_view import ReportsView
 from features.Reports.reports_controller import ReportsController
 from features.Reports.reports_logic import ReportsLogic
 from features.Reports.reports_repo import ReportsRepo
-from file_exporter import FileExporter
+from features.Reports.file_exporter import FileExporter
 
 
 def main():
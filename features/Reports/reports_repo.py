@@ -5,6 +5,8 @@ from sqlalchemy.orm import Session
 from datetime import date
 from shared.orm_models.invoices_models import IssuedInvoiceModel
 from shared.orm_models.customer_models import CustomerModel
+from shared.orm_models.business_models import TranslatorModel
+from shared.services.translator_registry import UNASSIGNED_TRANSLATOR
 
 from shared.orm_models.users_models import UsersModel, LoginLogsModel
 from typing import List
@@ -34,35 +36,55 @@ class ReportsRepo:
 
     def get_revenue_by_translator(self, start_date: date, end_date: date) -> List[dict]:
         """ Fetches aggregated revenue data grouped by translator for a given date range. """
-        query = self.session.query(
-            IssuedInvoiceModel.translator.label('translator_name'),
+        revenue = self.session.query(
+            IssuedInvoiceModel.translator_employee_id.label('translator_id'),
             func.sum(IssuedInvoiceModel.final_amount).label('total_revenue'),
             func.count(IssuedInvoiceModel.id).label('invoice_count')
         ).filter(
             IssuedInvoiceModel.issue_date.between(start_date, end_date)
         ).group_by(
-            IssuedInvoiceModel.translator
+            IssuedInvoiceModel.translator_employee_id
+        ).subquery()
+
+        # Grouped on the integer key; names are joined afterwards, once per translator.
+        query = self.session.query(
+            func.coalesce(TranslatorModel.full_name, UNASSIGNED_TRANSLATOR).label('translator_name'),
+            revenue.c.total_revenue,
+            revenue.c.invoice_count
+        ).select_from(revenue).outerjoin(
+            TranslatorModel, TranslatorModel.id == revenue.c.translator_id
         ).order_by(
-            func.sum(IssuedInvoiceModel.final_amount).desc()
+            revenue.c.total_revenue.desc()
         )
         return [row._asdict() for row in query.all()]
 
     def get_top_customers(self, start_date: date, end_date: date, limit: int = 10) -> List[dict]:
         """ Fetches top customers by total amount spent in a given date range. """
-        query = self.session.query(
-            CustomerModel.name.label('customer_name'),
-            CustomerModel.national_id,
+        spending = self.session.query(
+            IssuedInvoiceModel.customer_id,
             func.sum(IssuedInvoiceModel.final_amount).label('total_spent'),
             func.count(IssuedInvoiceModel.id).label('invoice_count')
-        ).join(
-            IssuedInvoiceModel, CustomerModel.national_id == IssuedInvoiceModel.national_id
         ).filter(
-            IssuedInvoiceModel.issue_date.between(start_date, end_date)
+            IssuedInvoiceModel.issue_date.between(start_date, end_date),
+            # Invoices of unregistered customers would otherwise take a top-N slot as one bucket.
+            IssuedInvoiceModel.customer_id.isnot(None)
         ).group_by(
-            CustomerModel.name, CustomerModel.national_id
+            IssuedInvoiceModel.customer_id
         ).order_by(
             func.sum(IssuedInvoiceModel.final_amount).desc()
-        ).limit(limit)
+        ).limit(limit).subquery()
+
+        # Ranked on the integer key; only the top rows are joined to the customers.
+        query = self.session.query(
+            CustomerModel.name.label('customer_name'),
+            CustomerModel.national_id,
+            spending.c.total_spent,
+            spending.c.invoice_count
+        ).join(
+            spending, CustomerModel.id == spending.c.customer_id
+        ).order_by(
+            spending.c.total_spent.desc()
+        )
         return [row._asdict() for row in query.all()]
 
     def get_user_activity(self, start_date: date, end_date: date) -> List[dict]:
@@ -1,10 +1,10 @@
 # features/Workspace/workspace_controller.py
 
-from features.Workspace.workspace_logic import ChatLogic
+from features.Workspace.workspace_logic import ChatLogic, HISTORY_PAGE_SIZE
 from features.Workspace.workspace_view import ChatView
 from features.Workspace.workspace_models import MessageDTO
 
-from PySide6.QtCore import QThread, QObject
+from PySide6.QtCore import QObject, Slot
 from server.client import ChatClient
 
 
@@ -25,6 +25,8 @@ class ChatController(QObject):
 
         # State variable to keep track of the currently active chat
         self._active_chat_id: int | None = None
+        # Id of the oldest message loaded for the active chat; older pages are fetched before it
+        self._oldest_message_id: int | None = None
 
         # Connect the _view's signals to the controller's handler methods
         self._connect_signals()
@@ -33,6 +35,9 @@ class ChatController(QObject):
         """Connects signals from the _view to the controller's handlers (slots)."""
         self._view.chatSelected.connect(self.handle_chat_selection)
         self._view.sendMessageClicked.connect(self.handle_send_message)
+        self._view.olderMessagesRequested.connect(self.handle_older_messages_requested)
+        # The page manager deletes the view when the workspace page goes away
+        self._view.destroyed.connect(self.cleanup)
 
     def get_view(self) -> ChatView:
         """Returns the _view instance managed by this controller."""
@@ -43,7 +48,10 @@ class ChatController(QObject):
         Performs the initial data fetch when the feature is first opened.
         This would be called by the factory right after creating the controller.
         """
+        # 1. Get the list of chats for the current user from the _logic layer
         chat_dtos = self._logic.get_chats_for_user(self._current_user_id)
+
+        # 2. Tell the _view to display this list
         self._view.display_chat_list(chat_dtos)
 
         # --- Register with Broker ---
@@ -53,17 +61,8 @@ class ChatController(QObject):
             "user_id": self._current_user_id,
             "chat_ids": chat_ids
         })
-
-    def perform_initial_load(self):
-        """
-        Performs the initial data fetch when the feature is first opened.
-        This would be called by your factory right after creating the controller.
-        """
-        # 1. Get the list of chats for the current user from the _logic layer
-        chat_dtos = self._logic.get_chats_for_user(self._current_user_id)
-
-        # 2. Tell the _view to display this list
-        self._view.display_chat_list(chat_dtos)
+        # The registration is queued; the client sends it (again) on every (re)connect
+        self._start_client_thread()
 
     # --- HANDLERS (SLOTS) ---
 
@@ -74,9 +73,25 @@ class ChatController(QObject):
 
         # 1. Request the message history for this chat from the _logic layer
         message_history_dtos = self._logic.get_chat_history(chat_id)
+        self._oldest_message_id = message_history_dtos[0].id if message_history_dtos else None
 
         # 2. Tell the _view to display these messages
-        self._view.display_chat_history(message_history_dtos)
+        self._view.display_chat_history(message_history_dtos,
+                                        has_older=len(message_history_dtos) == HISTORY_PAGE_SIZE)
+
+        # 3. Everything now on screen has been read
+        if message_history_dtos:
+            for chat in self._logic.mark_chats_read(self._current_user_id, {chat_id: message_history_dtos[-1].id}):
+                self._view.update_chat_summary(chat)
+
+    def handle_older_messages_requested(self):
+        """Handles the user scrolling to the top of the history: loads the page before it."""
+        if self._active_chat_id is None or self._oldest_message_id is None:
+            return
+        older_dtos = self._logic.get_chat_history(self._active_chat_id, before_id=self._oldest_message_id)
+        if older_dtos:
+            self._oldest_message_id = older_dtos[0].id
+        self._view.prepend_messages(older_dtos, has_older=len(older_dtos) == HISTORY_PAGE_SIZE)
 
     def handle_send_message(self, content: str):
         """Handles the user clicking the 'send' button."""
@@ -98,6 +113,7 @@ class ChatController(QObject):
         if new_message_dto:
             # 2a. Tell the _view to add the new message to the display
             self._view.add_message(new_message_dto)
+            self._refresh_chat_summary(self._active_chat_id)
 
             # 2b. Tell the _view to clear the input field
             self._view.clear_message_input()
@@ -107,11 +123,28 @@ class ChatController(QObject):
 
     # --- METHODS FOR REAL-TIME UPDATES ---
 
+    @Slot(dict)
     def on_new_message_received(self, message_data: dict):
         """
         This is a public method that will be called by the real-time client
         when a new message arrives from the network.
         """
+        if message_data.get("type") == "resume_incomplete":
+            # Messages were missed beyond what the broker can replay: reload the summaries.
+            for chat in self._logic.get_chats_for_user(self._current_user_id, refresh=True):
+                self._view.update_chat_summary(chat)
+            return
+
+        # Keep the chat list's last message and unread count current
+        updated_chat = self._logic.apply_chat_event(self._current_user_id, message_data)
+        if updated_chat is not None:
+            if message_data.get("type") == "new_message" and updated_chat.id == self._active_chat_id:
+                # The message arrives in the open chat: it is read right away
+                read_chats = self._logic.mark_chats_read(self._current_user_id,
+                                                         {updated_chat.id: updated_chat.last_message.id})
+                updated_chat = read_chats[0] if read_chats else updated_chat
+            self._view.update_chat_summary(updated_chat)
+
         if message_data.get("type") == "new_message":
             chat_id = message_data.get("chat_id")
             # We need to reconstruct the DTO from the payload dictionary
@@ -124,23 +157,19 @@ class ChatController(QObject):
                 # self.view.add_message(message_dto)
                 print(f"Controller: Real-time message received: {payload}")
 
-    def _start_client_thread(self):
-        """Creates a QThread, moves the client to it, and starts listening."""
-        self.client_thread = QThread()
-        self._client.moveToThread(self.client_thread)
-
-        # Connect the thread's started signal to our client's main loop
-        self.client_thread.started.connect(self._client.connect_and_listen)
+    def _refresh_chat_summary(self, chat_id: int):
+        """Redraws one chat of the list from the cache."""
+        chat = next((c for c in self._logic.get_chats_for_user(self._current_user_id) if c.id == chat_id), None)
+        if chat is not None:
+            self._view.update_chat_summary(chat)
 
-        # Connect the client's received signal to our controller's handler
+    def _start_client_thread(self):
+        """Starts the client's own networking thread; it reconnects by itself until cleanup()."""
+        # Connect the client's received signal to our controller's handler (queued to the GUI thread)
         self._client.messageReceived.connect(self.on_new_message_received)
+        self._client.start()
 
-        # Handle cleanup
-        self.client_thread.finished.connect(self.client_thread.deleteLater)
-
-        self.client_thread.start()
-
+    @Slot()
     def cleanup(self):
-        self._client.disconnect()
-        self.client_thread.quit()
-        self.client_thread.wait()
\ No newline at end of file
+        """Stops the chat client; called when the view is destroyed."""
+        self._client.disconnect()
\ No newline at end of file
@@ -6,10 +6,17 @@ from features.Workspace.workspace_repo import ChatRepository, UserRepository
 from features.Workspace.workspace_logic import ChatLogic
 from features.Workspace.workspace_view import ChatView
 from features.Workspace.workspace_controller import ChatController
+from server.attachment_client import AttachmentClient
+from server.attachment_store import AttachmentStore
 from server.client import ChatClient
+from server.framing import FRAMING_JSON
 
 from shared.session_provider import ManagedSessionProvider
 
+BROKER_PORT = 8888
+# Local copies of downloaded and sent attachments, keyed by content
+ATTACHMENT_CACHE_DIR = "attachment_cache"
+
 
 class WorkspaceFactory:
     """
@@ -17,7 +24,8 @@ class WorkspaceFactory:
     """
     @staticmethod
     def create(users_engine: Engine, workspace_engine: Engine,
-               current_user_id: int, broker_host: str, parent=None) -> ChatController:
+               current_user_id: int, broker_host: str, parent=None,
+               broker_framing: str = FRAMING_JSON, broker_port: int = BROKER_PORT) -> ChatController:
         """
         Factory function to create and assemble the entire chat module.
 
@@ -27,6 +35,8 @@ class WorkspaceFactory:
             current_user_id: The ID of the user currently logged into the application.
             broker_host: The host address of the chat message broker.
             parent: Optional parent widget for the view.
+            broker_framing: The wire format to request from the broker ('json' or 'binary').
+            broker_port: The port of the chat message broker.
         Returns:
             A fully initialized and ready-to-use ChatController.
         """
@@ -35,12 +45,14 @@ class WorkspaceFactory:
 
         chat_repository = ChatRepository()
         user_repository = UserRepository()
-        chat_client = ChatClient(host=broker_host)
+        chat_client = ChatClient(host=broker_host, port=broker_port, framing=broker_framing)
+        attachment_client = AttachmentClient(AttachmentStore(ATTACHMENT_CACHE_DIR), host=broker_host)
 
         # 2. Instantiate the _logic layer, injecting the _repository and session provider
         chat_logic = ChatLogic(user_repository=user_repository,
                                chat_repository=chat_repository,
                                client=chat_client,
+                               attachment_client=attachment_client,
                                users_engine=users_session,
                                workspace_engine=workspace_session)
 
@@ -55,7 +67,7 @@ class WorkspaceFactory:
             client=chat_client
         )
 
-        # 5. Perform the initial data load to populate the UI
+        # 5. Perform the initial data load to populate the UI and connect to the broker
         # This is a critical step to make the feature usable as soon as it's displayed
         chat_controller.perform_initial_load()
 
@@ -1,27 +1,38 @@
 # features/Workspace/workspace_logic.py
 
+from dataclasses import asdict, replace
+from datetime import datetime
+from pathlib import Path
 from typing import List, Optional
 
 from features.Workspace.workspace_repo import ChatRepository, UserRepository
 from features.Workspace.workspace_models import ChatDTO, MessageDTO, UserDTO, AttachmentDTO, MessageReadReceiptDTO
 from shared.orm_models.workspace_models import (MessageModel, ChatModel, ChatParticipantModel, ChatType,
-                                                ParticipantRole)
+                                                ParticipantRole, AttachmentModel)
+from server.attachment_client import AttachmentClient
 from server.client import ChatClient
 
 from shared.session_provider import ManagedSessionProvider
 
+# Messages loaded per history page, both on opening a chat and on scrolling up
+HISTORY_PAGE_SIZE = 50
+
 
 class ChatLogic:
     def __init__(self, user_repository: UserRepository,
                  chat_repository: ChatRepository,
                  users_engine: ManagedSessionProvider,
                  workspace_engine: ManagedSessionProvider,
-                 client: ChatClient):
+                 client: ChatClient,
+                 attachment_client: Optional[AttachmentClient] = None):
         self._user_repo = user_repository
         self._chat_repo = chat_repository
         self._users_session = users_engine
         self._workspace_session = workspace_engine
         self._client = client
+        self._attachment_client = attachment_client
+        # user_id -> {chat_id: ChatDTO}, most recently active chat first
+        self._chat_list_cache: dict[int, dict[int, ChatDTO]] = {}
 
     # --- Data Transformation (Mapping) Methods ---
 
@@ -38,20 +49,10 @@ class ChatLogic:
 
     def _map_message_to_dto(self, message: MessageModel) -> MessageDTO:
         """Converts a Message SQLAlchemy model to a MessageDTO."""
-        sender_dto = UserDTO(id=message.sender.id, name=message.sender.username)
-
-        attachment_dtos = [
-            AttachmentDTO(id=att.id, file_path=att.file_path, file_type=att.file_type)
-            for att in message.attachments
-        ]
+        sender_dto = self._get_user_details_map([message.sender_id]).get(
+            message.sender_id, UserDTO(id=message.sender_id, name="Unknown User"))
 
-        read_receipt_dtos = [
-            MessageReadReceiptDTO(
-                user=UserDTO(id=receipt.reader.id, name=receipt.reader.username),
-                read_at=receipt.read_at
-            )
-            for receipt in message.read_receipts
-        ]
+        attachment_dtos = [self._map_attachment_to_dto(att) for att in message.attachments]
 
         return MessageDTO(
             id=message.id,
@@ -60,47 +61,105 @@ class ChatLogic:
             created_at=message.created_at,
             is_pinned=message.is_pinned,
             attachments=attachment_dtos,
-            read_receipts=read_receipt_dtos
         )
 
-    # --- Public Business Logic Methods ---
-
-    def get_chats_for_user(self, user_id: int) -> List[ChatDTO]:
-        with self._workspace_session() as chat_session:
-            chats = self._chat_repo.get_chats_for_user(chat_session, user_id)
-
-            # 1. Collect all participant user IDs from all chats
-            all_participant_ids = set()
-            for chat in chats:
-                for p in chat.participants:
-                    all_participant_ids.add(p.user_id)
-
-            # 2. Fetch all user details in a single query
-            user_details_map = self._get_user_details_map(list(all_participant_ids))
+    @staticmethod
+    def _map_attachment_to_dto(attachment: AttachmentModel) -> AttachmentDTO:
+        return AttachmentDTO(id=attachment.id, file_path=attachment.file_path, file_type=attachment.file_type,
+                             sha256=attachment.sha256, size=attachment.size)
 
-            # 3. Build the DTOs
-            chat_dtos = []
-            for chat in chats:
-                display_name = chat.name
-                if chat.type == ChatType.ONE_ON_ONE:
-                    other_participant = next((p for p in chat.participants if p.user_id != user_id), None)
-                    if other_participant and other_participant.user_id in user_details_map:
-                        display_name = user_details_map[other_participant.user_id].name
+    # --- Public Business Logic Methods ---
 
-                chat_dtos.append(ChatDTO(id=chat.id, name=display_name, type=chat.type))
-            return chat_dtos
+    def get_chats_for_user(self, user_id: int, refresh: bool = False) -> List[ChatDTO]:
+        """
+        The user's chat list with last message, unread count and participants, most
+        recently active first. Served from a cache that broker events keep current
+        (see apply_chat_event); refresh=True reloads it.
+        """
+        cached = self._chat_list_cache.get(user_id)
+        if cached is not None and not refresh:
+            return list(cached.values())
 
-    def get_chat_history(self, chat_id: int) -> List[MessageDTO]:
-        with self._workspace_session as chat_session:
-            messages = self._chat_repo.get_messages_for_chat(chat_session, chat_id)
+        # 1. One query for the chats, their last messages, unread counts and participant ids
+        with self._workspace_session() as chat_session:
+            rows = self._chat_repo.get_chat_summaries(chat_session, user_id)
+
+        participant_ids = {row.id: [int(uid) for uid in (row.participant_ids or "").split(",") if uid]
+                           for row in rows}
+        all_user_ids = {uid for ids in participant_ids.values() for uid in ids}
+        all_user_ids.update(row.last_message_sender_id for row in rows if row.last_message_id is not None)
+
+        # 2. Fetch all user details in a single query (users live in their own database)
+        user_details_map = self._get_user_details_map(list(all_user_ids))
+
+        # 3. Build the DTOs
+        chat_dtos = []
+        for row in rows:
+            participants = [user_details_map.get(uid, UserDTO(id=uid, name="Unknown User"))
+                            for uid in participant_ids[row.id]]
+            display_name = row.name
+            if row.type == ChatType.ONE_ON_ONE:
+                other_participant = next((p for p in participants if p.id != user_id), None)
+                if other_participant and other_participant.id in user_details_map:
+                    display_name = other_participant.name
+
+            last_message = None
+            if row.last_message_id is not None:
+                sender_id = row.last_message_sender_id
+                last_message = MessageDTO(
+                    id=row.last_message_id, content=row.last_message_content,
+                    sender=user_details_map.get(sender_id, UserDTO(id=sender_id, name="Unknown User")),
+                    created_at=row.last_message_created_at, is_pinned=row.last_message_is_pinned)
+
+            chat_dtos.append(ChatDTO(id=row.id, name=display_name, type=row.type, unread_count=row.unread_count,
+                                     last_message=last_message, participants=participants))
+
+        self._chat_list_cache[user_id] = {chat.id: chat for chat in chat_dtos}
+        return chat_dtos
+
+    def apply_chat_event(self, user_id: int, event: dict) -> Optional[ChatDTO]:
+        """
+        Updates the cached chat list of a user with a message received from the broker.
+        Returns the updated chat, or None if the event does not change the list.
+        """
+        chats = self._chat_list_cache.get(user_id)
+        chat = chats.get(event.get("chat_id")) if chats is not None else None
+        if chat is None:
+            return None
+
+        if event.get("type") == "new_message":
+            message = _message_from_payload(event.get("payload") or {})
+            if message is None or (chat.last_message is not None and message.id <= chat.last_message.id):
+                return None
+            unread_count = chat.unread_count + (message.sender.id != user_id)
+            updated = replace(chat, last_message=message, unread_count=unread_count)
+            # The chat moves to the top of the list
+            self._chat_list_cache[user_id] = {chat.id: updated, **{k: v for k, v in chats.items() if k != chat.id}}
+            return updated
+
+        if event.get("type") == "events" and event.get("user_id") == user_id:
+            # Read on another of the user's workstations
+            read_up_to = max((e.get("message_id", 0) for e in event.get("events", []) if e.get("type") == "read"),
+                             default=0)
+            if chat.unread_count and chat.last_message is not None and read_up_to >= chat.last_message.id:
+                updated = replace(chat, unread_count=0)
+                chats[chat.id] = updated
+                return updated
+        return None
+
+    def get_chat_history(self, chat_id: int, before_id: Optional[int] = None,
+                         limit: int = HISTORY_PAGE_SIZE) -> List[MessageDTO]:
+        """
+        One page of a chat's history, oldest first. before_id is the id of the
+        oldest message already loaded; None loads the newest page.
+        """
+        with self._workspace_session() as chat_session:
+            messages = self._chat_repo.get_messages_for_chat(chat_session, chat_id, limit=limit, before_id=before_id)
+            watermarks = self._chat_repo.get_read_watermarks(chat_session, chat_id) if messages else []
 
             # 1. Collect all sender IDs and reader IDs
             sender_ids = {msg.sender_id for msg in messages}
-            reader_ids = {
-                receipt.user_id
-                for msg in messages
-                for receipt in msg.read_receipts
-            }
+            reader_ids = {watermark.user_id for watermark in watermarks}
             all_user_ids = list(sender_ids.union(reader_ids))
 
             # 2. Fetch all required user details in one go
@@ -111,28 +170,33 @@ class ChatLogic:
             for msg in messages:
                 sender_dto = user_details_map.get(msg.sender_id, UserDTO(id=msg.sender_id, name="Unknown User"))
 
+                # Everyone whose watermark has reached the message has read it; read_at is
+                # when that reader's watermark last moved.
                 read_receipt_dtos = [
                     MessageReadReceiptDTO(
-                        user=user_details_map.get(r.user_id, UserDTO(id=r.user_id, name="Unknown User")),
-                        read_at=r.read_at
+                        user=user_details_map.get(w.user_id, UserDTO(id=w.user_id, name="Unknown User")),
+                        read_at=w.updated_at
                     )
-                    for r in msg.read_receipts
+                    for w in watermarks
+                    if w.last_read_message_id >= msg.id and w.user_id != msg.sender_id
                 ]
 
                 message_dtos.append(MessageDTO(
                     id=msg.id, content=msg.content, sender=sender_dto,
                     created_at=msg.created_at, is_pinned=msg.is_pinned,
-                    # attachments mapping would be here, it doesn't change
-                    attachments=[],
+                    attachments=[self._map_attachment_to_dto(att) for att in msg.attachments],
                     read_receipts=read_receipt_dtos
                 ))
             return message_dtos
 
-    def send_message(self, sender_id: int, chat_id: int, content: str) -> Optional[MessageDTO]:
+    def send_message(self, sender_id: int, chat_id: int, content: str,
+                     attachment_paths: Optional[List[str]] = None) -> Optional[MessageDTO]:
         """
         Validates and saves a new message, then returns its DTO.
-        This is where the real-time broadcast would be triggered.
+        Attached files are uploaded to the broker's attachment store first; a file
+        it already has (from any chat) is not sent again.
         """
+        attachments = [self._upload_attachment(path) for path in attachment_paths or []]
         with self._workspace_session() as session:
             # Authorization: Check if the user is actually a participant in the chat
             participant = self._chat_repo.get_participant_info(session, user_id=sender_id, chat_id=chat_id)
@@ -144,11 +208,13 @@ class ChatLogic:
             if participant.chat.type == ChatType.CHANNEL and participant.role != ParticipantRole.ADMIN:
                 return None
 
-            new_message = self._chat_repo.create_message(session, chat_id, sender_id, content)
+            new_message = self._chat_repo.create_message(session, chat_id, sender_id, content, attachments)
 
             # This is a critical step to ensure relationships are loaded before mapping
             session.flush()  # Flushes the above change to the DB transaction
             session.refresh(new_message)  # Refreshes the object with data from the DB
+            # The sender has read everything up to their own message
+            self._chat_repo.advance_read_watermarks(session, sender_id, {chat_id: new_message.id})
 
             # 1. Map the new message to a DTO
             message_dto = self._map_message_to_dto(new_message)
@@ -157,8 +223,9 @@ class ChatLogic:
                 self._client.send_message({
                     "type": "message",
                     "chat_id": chat_id,
-                    "payload": message_dto.__dict__  # Convert DTO to dict for JSON
+                    "payload": _message_payload(message_dto)
                 })
+                self._update_cached_chat(sender_id, chat_id, last_message=message_dto, unread_count=0)
 
             return message_dto
 
@@ -178,8 +245,96 @@ class ChatLogic:
             # Here you would also trigger a real-time event to notify other clients of the pin
             return True
 
-    def mark_message_as_read(self, user_id: int, message_id: int):
-        """Marks a message as read for a user."""
+    def mark_chat_read(self, user_id: int, chat_id: int, message_id: int):
+        """Marks a chat as read by a user up to (and including) message_id."""
+        self.mark_chats_read(user_id, {chat_id: message_id})
+
+    def mark_chats_read(self, user_id: int, read_up_to: dict[int, int]) -> List[ChatDTO]:
+        """
+        Advances the user's read watermark of several chats at once ({chat_id: message_id}).
+        Returns the cached chats whose unread count changed.
+        """
+        if not read_up_to:
+            return []
         with self._workspace_session() as session:
-            self._chat_repo.mark_message_as_read(session, message_id, user_id)
-            # Here you would trigger a real-time event to update the "seen by" list on other clients' screens
+            self._chat_repo.advance_read_watermarks(session, user_id, read_up_to)
+            unread_counts = self._chat_repo.get_unread_counts(session, user_id) \
+                if user_id in self._chat_list_cache else {}
+        # Let the other participants' clients update their "seen by" lists
+        for chat_id, message_id in read_up_to.items():
+            self._client.send_read_receipt(chat_id, message_id)
+
+        updated = []
+        for chat_id in read_up_to:
+            chat = self._update_cached_chat(user_id, chat_id, unread_count=unread_counts.get(chat_id, 0))
+            if chat is not None:
+                updated.append(chat)
+        return updated
+
+    def get_unread_counts(self, user_id: int) -> dict[int, int]:
+        """Unread messages per chat of the user, as {chat_id: count}."""
+        with self._workspace_session() as session:
+            return self._chat_repo.get_unread_counts(session, user_id)
+
+    def fetch_attachment(self, attachment: AttachmentDTO) -> Path:
+        """
+        The local path of an attachment's file, downloaded from the broker on first use.
+        Blocks while downloading; call it off the GUI thread.
+        """
+        if attachment.sha256 is None:
+            return Path(attachment.file_path)  # stored before the attachment store existed
+        return self._require_attachment_client().fetch(attachment.sha256)
+
+    def get_attachment_thumbnail(self, attachment: AttachmentDTO) -> Optional[Path]:
+        """A cached thumbnail of an image attachment; None if it is not an image or not downloaded yet."""
+        if attachment.sha256 is None:
+            return None
+        return self._require_attachment_client().store.thumbnail(attachment.sha256)
+
+    def _upload_attachment(self, path: str) -> AttachmentModel:
+        digest = self._require_attachment_client().upload_file(path)
+        return AttachmentModel(file_path=Path(path).name, file_type=Path(path).suffix.lstrip(".").lower() or None,
+                               sha256=digest, size=self._attachment_client.store.size(digest))
+
+    def _require_attachment_client(self) -> AttachmentClient:
+        if self._attachment_client is None:
+            raise RuntimeError("Attachments are not available: no attachment client was configured.")
+        return self._attachment_client
+
+    # --- Chat List Cache ---
+
+    def _update_cached_chat(self, user_id: int, chat_id: int, **changes) -> Optional[ChatDTO]:
+        chats = self._chat_list_cache.get(user_id)
+        if chats is None or chat_id not in chats:
+            return None
+        chats[chat_id] = replace(chats[chat_id], **changes)
+        return chats[chat_id]
+
+
+def _message_payload(message: MessageDTO) -> dict:
+    """The JSON-safe form of a message sent through the broker."""
+    return {
+        "id": message.id,
+        "content": message.content,
+        "sender_id": message.sender.id,
+        "sender_name": message.sender.name,
+        "created_at": message.created_at.isoformat() if message.created_at else None,
+        "is_pinned": message.is_pinned,
+        "attachments": [asdict(attachment) for attachment in message.attachments],
+    }
+
+
+def _message_from_payload(payload: dict) -> Optional[MessageDTO]:
+    """Rebuilds a message received through the broker; None if the payload is not one."""
+    try:
+        created_at = payload.get("created_at")
+        return MessageDTO(
+            id=int(payload["id"]),
+            content=payload.get("content"),
+            sender=UserDTO(id=payload["sender_id"], name=payload.get("sender_name") or "Unknown User"),
+            created_at=datetime.fromisoformat(created_at) if created_at else None,
+            is_pinned=bool(payload.get("is_pinned", False)),
+            attachments=[AttachmentDTO(**attachment) for attachment in payload.get("attachments", [])],
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -17,8 +17,10 @@ class UserDTO:
 class AttachmentDTO:
     """Represents a file attached to a message."""
     id: int
-    file_path: str
+    file_path: str  # The file's original name
     file_type: str
+    sha256: Optional[str] = None  # Key in the attachment store; None for attachments from before it
+    size: Optional[int] = None
 
 
 @dataclass(frozen=True)
@@ -48,3 +50,4 @@ class ChatDTO:
     type: ChatType
     unread_count: int = 0
     last_message: Optional[MessageDTO] = None
+    participants: List[UserDTO] = field(default_factory=list)
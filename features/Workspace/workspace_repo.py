@@ -1,11 +1,12 @@
 # features/Workspace/workspace_repo.py
 
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload, aliased
+from sqlalchemy import select, func, and_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 # You might need to adjust the import paths based on your project structure
-from shared.orm_models.workspace_models import (ChatModel, ChatParticipantModel, MessageModel, MessageReadStatusModel,
+from shared.orm_models.workspace_models import (ChatModel, ChatParticipantModel, MessageModel, ChatReadWatermarkModel,
                                                 AttachmentModel)
 from shared.orm_models.users_models import UsersModel
 from shared.enums import ChatType, ParticipantRole
@@ -43,15 +44,63 @@ class ChatRepository:
         )
         return list(session.scalars(stmt).all())
 
-    def get_messages_for_chat(self, session: Session, chat_id: int, limit: int = 50, offset: int = 0) -> List[MessageModel]:
-        """Fetches a paginated list of messages for a given chat, ordered by creation time."""
+    def get_chat_summaries(self, session: Session, user_id: int) -> list:
+        """
+        Fetches the chat list of a user in one query: every chat they are part of with
+        its newest message, the user's unread count and the ids of all participants
+        (comma separated), most recently active chat first.
+        """
+        last_message = aliased(MessageModel)
+        newest_message_id = (
+            select(func.max(MessageModel.id))
+            .where(MessageModel.chat_id == ChatModel.id)
+            .scalar_subquery()
+        )
+        unread_count = (
+            select(func.count())
+            .where(MessageModel.chat_id == ChatModel.id,
+                   MessageModel.id > func.coalesce(ChatReadWatermarkModel.last_read_message_id, 0))
+            .scalar_subquery()
+        )
+        others = aliased(ChatParticipantModel)
+        participant_ids = (
+            select(func.group_concat(others.user_id))
+            .where(others.chat_id == ChatModel.id)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(ChatModel.id, ChatModel.name, ChatModel.type,
+                   last_message.id.label("last_message_id"), last_message.content.label("last_message_content"),
+                   last_message.sender_id.label("last_message_sender_id"),
+                   last_message.created_at.label("last_message_created_at"),
+                   last_message.is_pinned.label("last_message_is_pinned"),
+                   unread_count.label("unread_count"), participant_ids.label("participant_ids"))
+            .select_from(ChatParticipantModel)
+            .join(ChatModel, ChatModel.id == ChatParticipantModel.chat_id)
+            .outerjoin(ChatReadWatermarkModel, and_(ChatReadWatermarkModel.chat_id == ChatParticipantModel.chat_id,
+                                                    ChatReadWatermarkModel.user_id == ChatParticipantModel.user_id))
+            .outerjoin(last_message, last_message.id == newest_message_id)
+            .where(ChatParticipantModel.user_id == user_id)
+            .order_by(func.coalesce(last_message.id, 0).desc(), ChatModel.id)
+        )
+        return list(session.execute(stmt).all())
+
+    def get_messages_for_chat(self, session: Session, chat_id: int, limit: int = 50,
+                              before_id: Optional[int] = None) -> List[MessageModel]:
+        """
+        Fetches a page of a chat's messages, oldest first, with their attachments.
+        The newest page is returned when before_id is None; pass the id of the
+        oldest message already shown to get the page before it.
+        """
         stmt = (
             select(MessageModel)
             .where(MessageModel.chat_id == chat_id)
-            .order_by(MessageModel.created_at.desc())
+            .options(selectinload(MessageModel.attachments))
+            .order_by(MessageModel.id.desc())
             .limit(limit)
-            .offset(offset)
         )
+        if before_id is not None:
+            stmt = stmt.where(MessageModel.id < before_id)
         # We fetch in descending order to get the latest, but reverse it for display
         results = session.scalars(stmt).all()
         return list(reversed(results))
@@ -95,24 +144,43 @@ class ChatRepository:
         session.add(new_message)
         return new_message
 
-    def mark_message_as_read(self, session: Session, message_id: int, user_id: int) -> Optional[MessageReadStatusModel]:
-        """Marks a message as read by a user. Does nothing if already marked as read."""
-        # First, check if a read receipt already exists
-        stmt_exists = select(MessageReadStatusModel).where(
-            MessageReadStatusModel.message_id == message_id,
-            MessageReadStatusModel.user_id == user_id
+    def advance_read_watermarks(self, session: Session, user_id: int, read_up_to: dict[int, int]) -> None:
+        """
+        Records that a user has read each chat in read_up_to ({chat_id: message_id}) up to
+        that message, in one statement. A watermark never moves backwards.
+        """
+        if not read_up_to:
+            return
+        stmt = sqlite_insert(ChatReadWatermarkModel)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ChatReadWatermarkModel.chat_id, ChatReadWatermarkModel.user_id],
+            set_={"last_read_message_id": stmt.excluded.last_read_message_id, "updated_at": func.now()},
+            where=stmt.excluded.last_read_message_id > ChatReadWatermarkModel.last_read_message_id,
         )
-        existing_receipt = session.scalars(stmt_exists).first()
+        session.execute(stmt, [{"chat_id": chat_id, "user_id": user_id, "last_read_message_id": message_id}
+                               for chat_id, message_id in read_up_to.items()])
 
-        if existing_receipt:
-            return None  # Already read
+    def get_read_watermarks(self, session: Session, chat_id: int) -> List[ChatReadWatermarkModel]:
+        """Fetches how far each participant has read a chat."""
+        stmt = select(ChatReadWatermarkModel).where(ChatReadWatermarkModel.chat_id == chat_id)
+        return list(session.scalars(stmt).all())
 
-        read_status = MessageReadStatusModel(
-            message_id=message_id,
-            user_id=user_id
+    def get_unread_counts(self, session: Session, user_id: int) -> dict[int, int]:
+        """
+        Counts the messages past the user's watermark in every chat they are part of,
+        as {chat_id: count}. Each count is a range scan of the (chat_id, id) index.
+        """
+        stmt = (
+            select(ChatParticipantModel.chat_id, func.count(MessageModel.id))
+            .outerjoin(ChatReadWatermarkModel, and_(ChatReadWatermarkModel.chat_id == ChatParticipantModel.chat_id,
+                                                    ChatReadWatermarkModel.user_id == user_id))
+            .outerjoin(MessageModel, and_(
+                MessageModel.chat_id == ChatParticipantModel.chat_id,
+                MessageModel.id > func.coalesce(ChatReadWatermarkModel.last_read_message_id, 0)))
+            .where(ChatParticipantModel.user_id == user_id)
+            .group_by(ChatParticipantModel.chat_id)
         )
-        session.add(read_status)
-        return read_status
+        return {chat_id: count for chat_id, count in session.execute(stmt).all()}
 
     def set_message_pin_status(self, session: Session, message_id: int, is_pinned: bool) -> Optional[MessageModel]:
         """Updates the is_pinned status of a message."""
@@ -62,10 +62,14 @@ class ChatView(QWidget):
     # --- SIGNALS (Outputs to Controller) ---
     chatSelected = Signal(int)  # Emits the chat_id
     sendMessageClicked = Signal(str)  # Emits the message content
+    olderMessagesRequested = Signal()  # Emitted when the history is scrolled to the top
 
     def __init__(self, current_user_id: int, parent=None):
         super().__init__(parent)
         self.current_user_id = current_user_id
+        self._has_older_messages = False
+        self._loading_older_messages = False
+        self._anchor_from_bottom = None  # scroll position to restore once prepended messages are laid out
         self._setup_ui()
         self._connect_signals()
 
@@ -115,6 +119,8 @@ class ChatView(QWidget):
         """Connects internal widget signals to this _view's public signals."""
         self.send_button.clicked.connect(self._on_send_clicked)
         self.chat_list_widget.currentItemChanged.connect(self._on_chat_selected)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        self.scroll_area.verticalScrollBar().rangeChanged.connect(self._on_scroll_range_changed)
 
     # --- Private Handlers that Emit Public Signals ---
     def _on_send_clicked(self):
@@ -127,18 +133,53 @@ class ChatView(QWidget):
             chat_id = current_item.data(Qt.ItemDataRole.UserRole)
             self.chatSelected.emit(chat_id)
 
+    def _on_scrolled(self, value: int):
+        if value == 0 and self._has_older_messages and not self._loading_older_messages:
+            self._loading_older_messages = True
+            self.olderMessagesRequested.emit()
+
+    def _on_scroll_range_changed(self, minimum: int, maximum: int):
+        if self._anchor_from_bottom is not None:
+            # Keep the messages that were on screen in place after older ones were prepended.
+            self.scroll_area.verticalScrollBar().setValue(maximum - self._anchor_from_bottom)
+            self._anchor_from_bottom = None
+
     # --- PUBLIC METHODS (Inputs from Controller) ---
 
     def display_chat_list(self, chats: list[ChatDTO]):
         """Clears and repopulates the list of chats."""
         self.chat_list_widget.clear()
         for chat in chats:
-            item = QListWidgetItem(chat.name)
+            item = QListWidgetItem(self._chat_item_text(chat))
             item.setData(Qt.ItemDataRole.UserRole, chat.id)  # Store chat ID in the item
             self.chat_list_widget.addItem(item)
 
-    def display_chat_history(self, messages: list[MessageDTO]):
-        """Clears the message _view and displays a list of past messages."""
+    def update_chat_summary(self, chat: ChatDTO):
+        """Redraws one chat of the list (its last message and unread count) in place."""
+        for row in range(self.chat_list_widget.count()):
+            item = self.chat_list_widget.item(row)
+            if item.data(Qt.ItemDataRole.UserRole) == chat.id:
+                item.setText(self._chat_item_text(chat))
+                return
+
+    @staticmethod
+    def _chat_item_text(chat: ChatDTO) -> str:
+        title = f"{chat.name} ({chat.unread_count})" if chat.unread_count else chat.name
+        if chat.last_message is None or not chat.last_message.content:
+            return title
+        preview = chat.last_message.content.splitlines()[0]
+        if len(preview) > 40:
+            preview = preview[:40] + "…"
+        return f"{title}\n{chat.last_message.sender.name}: {preview}"
+
+    def display_chat_history(self, messages: list[MessageDTO], has_older: bool = False):
+        """
+        Clears the message _view and displays a list of past messages.
+        has_older tells whether scrolling to the top should ask for more.
+        """
+        self._has_older_messages = has_older
+        self._loading_older_messages = False
+        self._anchor_from_bottom = None
         # Clear existing messages by creating a new container
         self.message_container = QWidget()
         self.message_layout = QVBoxLayout(self.message_container)
@@ -160,6 +201,16 @@ class ChatView(QWidget):
         if scroll_to_bottom:
             self._scroll_to_bottom()
 
+    def prepend_messages(self, messages: list[MessageDTO], has_older: bool):
+        """Inserts older messages above the loaded ones without moving the visible ones."""
+        scroll_bar = self.scroll_area.verticalScrollBar()
+        if messages:
+            self._anchor_from_bottom = scroll_bar.maximum() - scroll_bar.value()
+        for index, message in enumerate(messages):
+            self.message_layout.insertWidget(index, MessageWidget(message, self.current_user_id))
+        self._has_older_messages = has_older
+        self._loading_older_messages = False
+
     def clear_message_input(self):
         """Clears the text input box."""
         self.message_input.clear()
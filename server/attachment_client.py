@@ -0,0 +1,125 @@
+# server/attachment_client.py
+
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+from server.attachment_store import AttachmentError, AttachmentStore
+
+ATTACHMENT_PORT = 8889
+CONNECT_TIMEOUT = 5.0
+# An interrupted transfer is resumed up to MAX_RETRIES times, waiting RETRY_DELAY, then twice as long, ...
+MAX_RETRIES = 3
+RETRY_DELAY = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+class AttachmentClient:
+    """
+    Moves attachment bytes between a workstation's local AttachmentStore and the
+    broker's, over the broker's attachment port.
+
+    Files are identified by their SHA-256: an upload the broker already has sends
+    no bytes, and a download the local store already has opens no connection.
+    Interrupted transfers continue from the bytes already received. The blocking
+    upload_file and fetch run their own event loop; call them off the GUI thread.
+    """
+
+    def __init__(self, store: AttachmentStore, host='127.0.0.1', port=ATTACHMENT_PORT):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.retries = MAX_RETRIES
+        self.retry_delay = RETRY_DELAY
+
+    def upload_file(self, path) -> str:
+        """Uploads a local file unless the broker has it already; returns its digest."""
+        return asyncio.run(self.upload(path))
+
+    def fetch(self, digest: str) -> Path:
+        """Returns the local path of an attachment, downloading it first if needed."""
+        return asyncio.run(self.download(digest))
+
+    async def upload(self, path) -> str:
+        # Kept in the local store too, so the sender never downloads its own file.
+        digest = self.store.add_file(path)
+        await self._with_retries(lambda: self._upload_once(digest, self.store.size(digest)))
+        return digest
+
+    async def download(self, digest: str) -> Path:
+        if not self.store.has(digest):
+            await self._with_retries(lambda: self._download_once(digest))
+        return self.store.path(digest)
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    async def _upload_once(self, digest: str, size: int):
+        reader, writer = await self._connect()
+        try:
+            answer = await self._request(reader, writer, {"op": "upload", "sha256": digest, "size": size})
+            status = answer.get("status")
+            if status == "exists":
+                return
+            if status == "busy":
+                raise ConnectionError(f"Another upload of {digest} is in progress.")
+            if status != "ready":
+                raise AttachmentError(answer.get("error", f"Upload refused: {status}"))
+            with self.store.open(digest) as file:
+                file.seek(answer["offset"])
+                while chunk := file.read(self.store.chunk_size):
+                    writer.write(chunk)
+                    await writer.drain()
+            answer = await self._read_answer(reader)
+            if answer.get("status") != "stored":
+                raise AttachmentError(answer.get("error", f"Upload of {digest} was not stored."))
+        finally:
+            writer.close()
+
+    async def _download_once(self, digest: str):
+        offset = self.store.received(digest)
+        reader, writer = await self._connect()
+        try:
+            answer = await self._request(reader, writer, {"op": "download", "sha256": digest, "offset": offset})
+            if answer.get("status") == "missing":
+                raise AttachmentError(f"The broker does not have attachment {digest}.")
+            if answer.get("status") != "ok":
+                raise AttachmentError(answer.get("error", f"Download of {digest} refused."))
+            size = answer["size"]
+            while offset < size:
+                chunk = await reader.read(min(self.store.chunk_size, size - offset))
+                if not chunk:
+                    raise ConnectionError(f"Download of {digest} stopped at {offset} of {size} bytes.")
+                offset = self.store.write(digest, offset, chunk)
+            self.store.complete(digest, size)
+        finally:
+            writer.close()
+
+    async def _with_retries(self, transfer):
+        for attempt in range(self.retries + 1):
+            try:
+                return await transfer()
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.retry_delay * 2 ** attempt
+                logger.info(f"Attachment transfer interrupted ({e}); resuming in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+
+    async def _connect(self):
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port), CONNECT_TIMEOUT)
+
+    async def _request(self, reader, writer, request: dict) -> dict:
+        writer.write((json.dumps(request) + "\n").encode())
+        await writer.drain()
+        return await self._read_answer(reader)
+
+    @staticmethod
+    async def _read_answer(reader) -> dict:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("The broker closed the attachment connection.")
+        return json.loads(line)
@@ -0,0 +1,163 @@
+# server/attachment_store.py
+
+"""
+Content-addressed store for chat attachments.
+
+A file is kept once under the SHA-256 of its bytes, however many messages or
+chats it is attached to::
+
+    blobs/ab/abcdef....          complete files, named by their digest
+    partial/abcdef....part       uploads or downloads still in progress
+    thumbnails/abcdef..._256.png thumbnails generated on first request
+
+Bytes arrive in chunks appended to the partial file, so an interrupted
+transfer resumes from ``received(digest)`` instead of starting over. A
+partial file only becomes a blob once its size and digest check out. The
+broker serves its store to the workstations; each workstation keeps one as a
+local cache, so an attachment already fetched for one chat is not fetched
+again for another.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_CHUNK_SIZE = 256 * 2 ** 10
+THUMBNAIL_SIZE = 256
+
+_DIGEST_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class AttachmentError(Exception):
+    """A transfer that cannot be accepted: bad digest, out-of-order chunk or corrupted content."""
+
+
+def digest_file(path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple[str, int]:
+    """Returns (sha256 hex digest, size in bytes) of a file, read in chunks."""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            sha256.update(chunk)
+            size += len(chunk)
+    return sha256.hexdigest(), size
+
+
+class AttachmentStore:
+    """Attachment files keyed by their SHA-256. Not thread-safe; one writer per digest at a time."""
+
+    def __init__(self, directory, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.directory = Path(directory)
+        self.chunk_size = chunk_size
+        for name in ("blobs", "partial", "thumbnails"):
+            (self.directory / name).mkdir(parents=True, exist_ok=True)
+
+    def path(self, digest: str) -> Path:
+        """Where the blob of a digest is (or would be) stored."""
+        digest = self._check_digest(digest)
+        return self.directory / "blobs" / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        return self.path(digest).is_file()
+
+    def size(self, digest: str) -> Optional[int]:
+        """Size of a stored blob, or None if the store does not have it."""
+        try:
+            return self.path(digest).stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def received(self, digest: str) -> int:
+        """Bytes of an unfinished transfer kept so far; the offset to resume from."""
+        try:
+            return self._partial_path(digest).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def write(self, digest: str, offset: int, data: bytes) -> int:
+        """Appends a chunk of a transfer at ``offset`` and returns the bytes received so far."""
+        received = self.received(digest)
+        if offset != received:
+            raise AttachmentError(f"Chunk for {digest} starts at {offset}, expected {received}.")
+        with open(self._partial_path(digest), "ab") as file:
+            file.write(data)
+        return received + len(data)
+
+    def complete(self, digest: str, size: int) -> Path:
+        """
+        Verifies a finished transfer and moves it into place. A corrupted one is
+        discarded so that the next attempt starts from scratch.
+        """
+        partial = self._partial_path(digest)
+        if self.has(digest):
+            partial.unlink(missing_ok=True)
+            return self.path(digest)
+        actual_digest, actual_size = digest_file(partial, self.chunk_size)
+        if (actual_digest, actual_size) != (digest, size):
+            partial.unlink(missing_ok=True)
+            raise AttachmentError(f"Transfer of {digest} is corrupted ({actual_size} of {size} bytes, "
+                                  f"digest {actual_digest}).")
+        target = self.path(digest)
+        target.parent.mkdir(exist_ok=True)
+        os.replace(partial, target)
+        return target
+
+    def add_file(self, source) -> str:
+        """Copies a local file into the store (unless it is already there) and returns its digest."""
+        digest, _ = digest_file(source, self.chunk_size)
+        if not self.has(digest):
+            target = self.path(digest)
+            target.parent.mkdir(exist_ok=True)
+            temporary = self._partial_path(digest).with_suffix(".copy")
+            shutil.copyfile(source, temporary)
+            os.replace(temporary, target)
+        return digest
+
+    def open(self, digest: str):
+        """Opens a stored blob for binary reading."""
+        return open(self.path(digest), "rb")
+
+    def thumbnail(self, digest: str, max_side: int = THUMBNAIL_SIZE) -> Optional[Path]:
+        """
+        A PNG thumbnail of a stored image, generated on first request and kept on disk.
+        None for blobs that are not images Qt can read (e.g. PDFs) or not stored.
+        """
+        if not self.has(digest):
+            return None
+        target = self.directory / "thumbnails" / f"{self._check_digest(digest)}_{max_side}.png"
+        if target.is_file():
+            return target
+
+        from PySide6.QtCore import Qt
+        from PySide6.QtGui import QImage
+
+        image = QImage(str(self.path(digest)))
+        if image.isNull():
+            return None
+        if image.width() > max_side or image.height() > max_side:
+            image = image.scaled(max_side, max_side, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        temporary = target.with_suffix(".tmp")
+        if not image.save(str(temporary), "PNG"):
+            logging.warning(f"Could not write the thumbnail of {digest}.")
+            return None
+        os.replace(temporary, target)
+        return target
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    def _partial_path(self, digest: str) -> Path:
+        return self.directory / "partial" / f"{self._check_digest(digest)}.part"
+
+    @staticmethod
+    def _check_digest(digest) -> str:
+        # Digests come from the network and become file names.
+        if not isinstance(digest, str) or not _DIGEST_PATTERN.fullmatch(digest):
+            raise AttachmentError(f"Not a SHA-256 digest: {digest!r}")
+        return digest
@@ -4,29 +4,260 @@ import asyncio
 import json
 import logging
 
+from server.framing import (FRAMING_BINARY, FRAMING_JSON, KIND_CONTROL, KIND_MESSAGE, KIND_NEW_MESSAGE,
+                            SUPPORTED_FRAMINGS, FrameError, encode_frame, read_frame)
+from server.attachment_store import AttachmentError, AttachmentStore
+from server.membership import MembershipRegistry
+from server.message_log import DEFAULT_RETENTION_BYTES, DEFAULT_RETENTION_SECONDS, MessageLog
+
 # Basic logging setup
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# --- Outbound queue settings ---
+# Every connection gets a bounded queue of encoded frames and its own writer task,
+# so a slow client only ever delays itself.
+OUTBOUND_QUEUE_SIZE = 256
+# What to do when a client's queue is full:
+#   "drop_oldest" - discard the oldest queued frame to make room for the new one
+#   "disconnect"  - close the slow client; it re-registers and reloads history
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DISCONNECT = "disconnect"
+OVERFLOW_POLICY = OVERFLOW_DROP_OLDEST
+
+# How often the membership metrics are logged
+METRICS_INTERVAL_SECONDS = 300
+
+# --- Message log ---
+# Messages are appended to a per-room log so reconnecting clients can resume from
+# the last offset they saw instead of reloading the chat history.
+MESSAGE_LOG_DIR = "chat_log"
+# Most messages replayed per room on resume; a longer gap is reported as incomplete
+REPLAY_LIMIT = 1000
+RETENTION_CHECK_SECONDS = 3600
+
+# Client events relayed to the other members of a chat (sent batched by the client)
+CLIENT_EVENT_TYPES = ("read", "typing")
+
+# --- Attachments ---
+# Attachment bytes travel on a port of their own, so a 20 MB scan never holds up chat
+# messages. Each transfer is one JSON request line, a JSON answer line, then raw bytes.
+ATTACHMENT_PORT = 8889
+ATTACHMENT_DIR = "chat_attachments"
+# Larger uploads are refused before any byte is written, so no client can fill the broker's disk.
+MAX_ATTACHMENT_BYTES = 100 * 2 ** 20
+
 # --- Global State ---
-# These two dictionaries are the entire "state" of our broker.
-# 1. Maps a user_id to their writer object for sending data.
-clients = {}
-# 2. Maps a chat_id to a set of user_ids who are in that chat.
-chat_rooms = {}
+# The connected sessions and the chat rooms each of them is in.
+registry = MembershipRegistry()
+# The MessageLog, or None when messages are not logged.
+message_log = None
+# The AttachmentStore, or None when attachments are not served.
+attachment_store = None
+# Digests being uploaded right now; a second upload of the same file is told to retry
+uploads_in_progress = set()
+
+
+class ClientConnection:
+    """The sending side of one connected client: a bounded frame queue drained by a writer task."""
+
+    def __init__(self, writer, queue_size: int = None, overflow_policy: str = None):
+        queue_size = queue_size or OUTBOUND_QUEUE_SIZE
+        overflow_policy = overflow_policy or OVERFLOW_POLICY
+        if overflow_policy not in (OVERFLOW_DROP_OLDEST, OVERFLOW_DISCONNECT):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.writer = writer
+        self.addr = writer.get_extra_info('peername')
+        self.overflow_policy = overflow_policy
+        self.framing = FRAMING_JSON  # switched by a "hello" from the client
+        self.dropped = 0  # frames discarded because the queue was full
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._closed = False
+        self._task = asyncio.create_task(self._write_loop())
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def send(self, frame: bytes) -> bool:
+        """
+        Queues an encoded frame without waiting. Returns False if the frame was not
+        queued, either because the connection is closed or the overflow policy
+        disconnected it.
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        self.dropped += 1
+        if self.overflow_policy == OVERFLOW_DISCONNECT:
+            logging.warning(f"Outbound queue of {self.addr} is full, disconnecting it.")
+            self.close()
+            return False
+        self._queue.get_nowait()
+        self._queue.put_nowait(frame)
+        if self.dropped == 1 or self.dropped % 100 == 0:
+            logging.warning(f"Outbound queue of {self.addr} is full, {self.dropped} frames dropped so far.")
+        return True
+
+    async def send_wait(self, frame: bytes) -> bool:
+        """Queues a frame, waiting for room instead of applying the overflow policy (used for replays)."""
+        if self._closed:
+            return False
+        await self._queue.put(frame)
+        return not self._closed
+
+    def close(self):
+        """Stops the writer task and closes the socket; the client's read loop then ends."""
+        if self._closed:
+            return
+        self._closed = True
+        self._task.cancel()
+        self.writer.close()
+
+    async def wait_closed(self):
+        self.close()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+    async def _write_loop(self):
+        try:
+            while True:
+                frame = await self._queue.get()
+                self.writer.write(frame)
+                # Write whatever else is already queued before waiting on the socket once.
+                while not self._queue.empty():
+                    self.writer.write(self._queue.get_nowait())
+                await self.writer.drain()
+        except (ConnectionError, OSError) as e:
+            logging.warning(f"Failed writing to {self.addr}: {e}")
+            self.close()
+
+
+def new_message_frame(framing: str, chat_id, payload: bytes, offset: int = 0) -> bytes:
+    """A "new_message" frame around an already JSON-encoded payload, built without parsing it."""
+    if framing == FRAMING_BINARY:
+        return encode_frame(KIND_NEW_MESSAGE, chat_id, payload, offset)
+    head = b'{"type": "new_message", "chat_id": ' + json.dumps(chat_id).encode()
+    if offset:
+        head += b', "offset": %d' % offset
+    return head + b', "payload": ' + payload + b'}\n'
+
+
+def control_frame(framing: str, data: dict) -> bytes:
+    body = json.dumps(data)
+    if framing == FRAMING_BINARY:
+        return encode_frame(KIND_CONTROL, 0, body.encode())
+    return (body + '\n').encode()
+
+
+def broadcast_control(chat_id, sender, data: dict) -> int:
+    """Queues a control message for every connection in a chat except the sending one."""
+    frames = {}
+    delivered = 0
+    for connection in registry.room_members(chat_id):
+        if connection is sender:
+            continue
+        frame = frames.get(connection.framing)
+        if frame is None:
+            frame = frames[connection.framing] = control_frame(connection.framing, data)
+        if connection.send(frame):
+            delivered += 1
+    return delivered
+
+
+def broadcast(chat_id, sender, payload: bytes, offset: int = 0) -> int:
+    """
+    Queues a JSON-encoded message payload for every connection in a chat except
+    the sending one (the sender's other sessions do get it). The frame is built
+    once per framing in use. Returns the recipient count.
+    """
+    frames = {}
+    delivered = 0
+    for connection in registry.room_members(chat_id):
+        if connection is sender:
+            continue
+        frame = frames.get(connection.framing)
+        if frame is None:
+            frame = frames[connection.framing] = new_message_frame(connection.framing, chat_id, payload, offset)
+        if connection.send(frame):
+            delivered += 1
+    return delivered
+
+
+def route_message(connection, user_id, chat_id, payload: bytes) -> int:
+    """Logs a chat message (rooms with integer ids only) and broadcasts it. Returns the recipient count."""
+    offset = 0
+    if message_log is not None and isinstance(chat_id, int) and not isinstance(chat_id, bool):
+        offset = message_log.append(chat_id, user_id, payload)
+    return broadcast(chat_id, connection, payload, offset)
+
+
+async def replay(connection, chat_id, after_offset: int) -> int:
+    """
+    Sends a connection the logged messages of a room after the given offset. The
+    user's own messages are included: they may have been sent from another of the
+    user's workstations while this one was offline (clients skip what they have).
+    When the log no longer holds the whole gap, or the gap exceeds REPLAY_LIMIT, a
+    "resume_incomplete" message tells the client to reload the room's history
+    instead. Returns the number of messages sent.
+    """
+    if message_log is None or not isinstance(chat_id, int):
+        return 0
+    first_offset = message_log.first_offset(chat_id)
+    missed = message_log.last_offset(chat_id) - after_offset
+    if missed <= 0:
+        return 0
+    if first_offset is None or first_offset > after_offset + 1 or missed > REPLAY_LIMIT:
+        connection.send(control_frame(connection.framing, {
+            "type": "resume_incomplete", "chat_id": chat_id, "last_offset": message_log.last_offset(chat_id)}))
+        return 0
+    sent = 0
+    for record in message_log.read(chat_id, after_offset, REPLAY_LIMIT):
+        if not await connection.send_wait(new_message_frame(connection.framing, chat_id, record.payload,
+                                                            record.offset)):
+            break
+        sent += 1
+    return sent
 
 
 async def handle_client(reader, writer):
     """This function is called for each new client that connects."""
     user_id = None
-    addr = writer.get_extra_info('peername')
+    connection = ClientConnection(writer)
+    addr = connection.addr
     logging.info(f"New connection from {addr}")
 
     try:
         while True:
-            # Wait for data from the client (e.g., {"type": "register", ...})
-            data = await reader.readline()
-            if not data:
-                break  # Client disconnected
+            if connection.framing == FRAMING_BINARY:
+                try:
+                    kind, chat_id, body = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break  # Client disconnected
+                # Chat messages are routed on the frame header; the payload is never parsed.
+                if kind == KIND_MESSAGE:
+                    if user_id is not None and registry.has_room(chat_id):
+                        route_message(connection, user_id, chat_id, body)
+                    continue
+                if kind != KIND_CONTROL:
+                    logging.warning(f"Unexpected frame kind {kind} from {addr}")
+                    continue
+                data = body
+            else:
+                # Wait for data from the client (e.g., {"type": "register", ...})
+                data = await reader.readline()
+                if not data:
+                    break  # Client disconnected
 
             message = data.decode().strip()
             try:
@@ -34,6 +265,14 @@ async def handle_client(reader, writer):
 
                 # --- Message Routing Logic ---
 
+                # Framing negotiation: answered in the current framing, then switched
+                if msg_data.get("type") == "hello":
+                    framing = msg_data.get("framing", FRAMING_JSON)
+                    if framing not in SUPPORTED_FRAMINGS:
+                        framing = FRAMING_JSON
+                    connection.send(control_frame(FRAMING_JSON, {"type": "hello", "framing": framing}))
+                    connection.framing = framing
+
                 # A. Handle Registration: The first thing a client must do
                 if msg_data.get("type") == "register":
                     user_id = msg_data.get("user_id")
@@ -42,62 +281,209 @@ async def handle_client(reader, writer):
                     if user_id is None:
                         continue
 
-                    clients[user_id] = writer  # Store the writer for this user
-                    for chat_id in chat_ids:
-                        if chat_id not in chat_rooms:
-                            chat_rooms[chat_id] = set()
-                        chat_rooms[chat_id].add(user_id)
+                    registry.register(connection, user_id, chat_ids)
                     logging.info(f"User {user_id} registered for chats: {chat_ids}")
 
+                    # Resume: {"<chat_id>": last offset seen} - send only what was missed
+                    resume = msg_data.get("resume")
+                    for chat_id in (chat_ids if isinstance(resume, dict) else ()):
+                        after_offset = resume.get(str(chat_id))
+                        if isinstance(after_offset, int):
+                            await replay(connection, chat_id, after_offset)
+
+                elif user_id and msg_data.get("type") == "resume":
+                    chat_id = msg_data.get("chat_id")
+                    if chat_id in registry.rooms_of(connection):
+                        await replay(connection, chat_id, int(msg_data.get("after_offset", 0)))
+
                 # B. Handle Incoming Chat Messages
                 elif user_id and msg_data.get("type") == "message":
                     chat_id = msg_data.get("chat_id")
                     message_payload = msg_data.get("payload")  # This will be our MessageDTO
 
-                    if chat_id in chat_rooms:
-                        # Prepare the message to be broadcast
-                        broadcast_data = {
-                            "type": "new_message",
-                            "chat_id": chat_id,
-                            "payload": message_payload
-                        }
-                        broadcast_json = json.dumps(broadcast_data) + '\n'
-
-                        # Find all users in the room
-                        recipients = chat_rooms.get(chat_id, set())
-                        for recipient_id in recipients:
-                            # Don't send the message back to the original sender
-                            if recipient_id != user_id:
-                                recipient_writer = clients.get(recipient_id)
-                                if recipient_writer:
-                                    recipient_writer.write(broadcast_json.encode())
-                                    await recipient_writer.drain()
+                    if registry.has_room(chat_id):
+                        # Serialized once, then queued for every recipient without waiting on any of them
+                        route_message(connection, user_id, chat_id, json.dumps(message_payload).encode())
+
+                # C. Batched read receipts and typing events, forwarded to each chat's other members
+                elif user_id and msg_data.get("type") == "events":
+                    rooms, by_chat = registry.rooms_of(connection), {}
+                    for event in msg_data.get("events", []):
+                        if event.get("type") in CLIENT_EVENT_TYPES and event.get("chat_id") in rooms:
+                            by_chat.setdefault(event["chat_id"], []).append(event)
+                    for chat_id, events in by_chat.items():
+                        broadcast_control(chat_id, connection,
+                                          {"type": "events", "chat_id": chat_id, "user_id": user_id, "events": events})
+
+                # D. Heartbeat
+                elif msg_data.get("type") == "ping":
+                    connection.send(control_frame(connection.framing, {"type": "pong"}))
 
             except (json.JSONDecodeError, KeyError) as e:
                 logging.warning(f"Invalid message from {addr}: {message} - Error: {e}")
 
     except ConnectionResetError:
         logging.warning(f"Connection reset by {addr}")
+    except FrameError as e:
+        logging.warning(f"Corrupt frame from {addr}, closing the connection: {e}")
     finally:
         # --- Cleanup on Disconnect ---
-        if user_id is not None:
+        if registry.unregister(connection) is not None:
             logging.info(f"User {user_id} ({addr}) disconnected.")
-            clients.pop(user_id, None)
-            for chat_id in list(chat_rooms.keys()):
-                chat_rooms[chat_id].discard(user_id)
+        await connection.wait_closed()
+
+
+async def handle_attachment_transfer(reader, writer):
+    """Called for each connection to the attachment port: one upload, download or lookup."""
+    addr = writer.get_extra_info('peername')
+    try:
+        line = await reader.readline()
+        if not line:
+            return
+        request = json.loads(line)
+        op = request.get("op")
+        if op == "upload":
+            await receive_attachment(reader, writer, request["sha256"], int(request["size"]))
+        elif op == "download":
+            await send_attachment(writer, request["sha256"], int(request.get("offset", 0)))
+        elif op == "stat":
+            size = attachment_store.size(request["sha256"])
+            await _reply(writer, {"status": "missing"} if size is None else {"status": "exists", "size": size})
+        else:
+            await _reply(writer, {"status": "error", "error": f"Unknown operation: {op}"})
+    except (AttachmentError, json.JSONDecodeError, KeyError, ValueError, TypeError) as e:
+        logging.warning(f"Rejected attachment request from {addr}: {e}")
+        try:
+            await _reply(writer, {"status": "error", "error": str(e)})
+        except ConnectionError:
+            pass
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        logging.info(f"Attachment transfer with {addr} interrupted: {e}")
+    finally:
         writer.close()
-        await writer.wait_closed()
 
 
-async def main():
-    """Starts the TCP server."""
-    server = await asyncio.start_server(handle_client, '0.0.0.0', 8888)
+async def receive_attachment(reader, writer, digest: str, size: int):
+    """Stores an upload, continuing a partial one; a file the store already has is not sent again."""
+    if not 0 <= size <= MAX_ATTACHMENT_BYTES:
+        raise AttachmentError(f"Attachment size {size} is outside 0..{MAX_ATTACHMENT_BYTES} bytes.")
+    if attachment_store.has(digest):
+        await _reply(writer, {"status": "exists"})
+        return
+    if digest in uploads_in_progress:
+        await _reply(writer, {"status": "busy"})
+        return
+    uploads_in_progress.add(digest)
+    try:
+        offset = attachment_store.received(digest)
+        if offset > size:
+            raise AttachmentError(f"{offset} bytes of {digest} already received, but it has only {size}.")
+        await _reply(writer, {"status": "ready", "offset": offset})
+        while offset < size:
+            chunk = await reader.read(min(attachment_store.chunk_size, size - offset))
+            if not chunk:
+                logging.info(f"Upload of {digest} stopped at {offset} of {size} bytes; it can be resumed.")
+                return
+            # Disk writes and the final hash run off the event loop, which keeps routing chat meanwhile.
+            offset = await asyncio.to_thread(attachment_store.write, digest, offset, chunk)
+        await asyncio.to_thread(attachment_store.complete, digest, size)
+        await _reply(writer, {"status": "stored"})
+        logging.info(f"Stored attachment {digest} ({size} bytes).")
+    finally:
+        uploads_in_progress.discard(digest)
+
+
+async def send_attachment(writer, digest: str, offset: int):
+    """Streams a stored attachment from ``offset`` on, in chunks, waiting on the reader as it goes."""
+    size = attachment_store.size(digest)
+    if size is None:
+        await _reply(writer, {"status": "missing"})
+        return
+    if not 0 <= offset <= size:
+        raise AttachmentError(f"Offset {offset} is outside {digest} ({size} bytes).")
+    await _reply(writer, {"status": "ok", "size": size})
+    with attachment_store.open(digest) as file:
+        file.seek(offset)
+        while chunk := file.read(attachment_store.chunk_size):
+            writer.write(chunk)
+            await writer.drain()
+
+
+async def _reply(writer, data: dict):
+    writer.write((json.dumps(data) + "\n").encode())
+    await writer.drain()
+
+
+async def log_metrics(interval: float = None):
+    """Logs the membership metrics periodically."""
+    while True:
+        await asyncio.sleep(interval or METRICS_INTERVAL_SECONDS)
+        metrics = registry.metrics()
+        logging.info(f"{metrics.users} users on {metrics.connections} connections in {metrics.rooms} rooms "
+                     f"(largest {metrics.largest_room}); {metrics.registrations} registrations, "
+                     f"{metrics.disconnects} disconnects since start.")
+
+
+async def enforce_log_retention(interval: float = None):
+    """Deletes expired message log segments periodically."""
+    while True:
+        await asyncio.sleep(interval or RETENTION_CHECK_SECONDS)
+        message_log.enforce_retention()
+
+
+async def main(host: str = '0.0.0.0', port: int = 8888, log_dir: str = MESSAGE_LOG_DIR,
+               retention_seconds: float = DEFAULT_RETENTION_SECONDS, retention_bytes: int = DEFAULT_RETENTION_BYTES,
+               attachment_dir: str = ATTACHMENT_DIR, attachment_port: int = ATTACHMENT_PORT):
+    """
+    Starts the TCP server. An empty log_dir disables the message log, an empty
+    attachment_dir the attachment port.
+    """
+    global message_log, attachment_store
+    if log_dir:
+        message_log = MessageLog(log_dir, retention_seconds=retention_seconds, retention_bytes=retention_bytes)
+        logging.info(f"Logging messages to {log_dir}")
+
+    server = await asyncio.start_server(handle_client, host, port)
     addr = server.sockets[0].getsockname()
     logging.info(f'Serving on {addr}')
 
-    async with server:
-        await server.serve_forever()
+    attachment_server = None
+    if attachment_dir:
+        attachment_store = AttachmentStore(attachment_dir)
+        attachment_server = await asyncio.start_server(handle_attachment_transfer, host, attachment_port)
+        logging.info(f"Serving attachments from {attachment_dir} on port {attachment_port}")
+
+    tasks = [asyncio.create_task(log_metrics())]
+    if message_log is not None:
+        tasks.append(asyncio.create_task(enforce_log_retention()))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        if attachment_server is not None:
+            attachment_server.close()
+        if message_log is not None:
+            message_log.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MotarjemYar chat broker")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--queue-size", type=int, default=OUTBOUND_QUEUE_SIZE,
+                        help="frames buffered per client before the overflow policy applies")
+    parser.add_argument("--overflow", choices=(OVERFLOW_DROP_OLDEST, OVERFLOW_DISCONNECT), default=OVERFLOW_POLICY)
+    parser.add_argument("--log-dir", default=MESSAGE_LOG_DIR, help="message log directory; empty to disable")
+    parser.add_argument("--retention-days", type=float, default=DEFAULT_RETENTION_SECONDS / 86400)
+    parser.add_argument("--retention-mb", type=float, default=DEFAULT_RETENTION_BYTES / 2 ** 20,
+                        help="message log size kept per room")
+    parser.add_argument("--attachment-dir", default=ATTACHMENT_DIR, help="attachment store directory; empty to disable")
+    parser.add_argument("--attachment-port", type=int, default=ATTACHMENT_PORT)
+    args = parser.parse_args()
+    OUTBOUND_QUEUE_SIZE, OVERFLOW_POLICY = args.queue_size, args.overflow
+    asyncio.run(main(args.host, args.port, args.log_dir, args.retention_days * 86400,
+                     int(args.retention_mb * 2 ** 20), args.attachment_dir, args.attachment_port))
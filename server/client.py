@@ -1,65 +1,309 @@
 # server/client
 
-import socket
+import asyncio
 import json
-from PySide6.QtCore import QObject, Signal, QRunnable, QThreadPool
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from PySide6.QtCore import QObject, Signal
+
+from server.framing import FRAMING_BINARY, FRAMING_JSON, BinaryFrameCodec, FrameError, JsonLineCodec
+
+# Seconds to wait for the broker to answer a framing "hello" before staying on JSON
+HANDSHAKE_TIMEOUT = 2.0
+CONNECT_TIMEOUT = 5.0
+# Reconnect delays grow from INITIAL_BACKOFF to MAX_BACKOFF, each randomized into [delay / 2, delay]
+INITIAL_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+# A ping is sent every HEARTBEAT_INTERVAL; silence for HEARTBEAT_TIMEOUT means the connection is dead
+HEARTBEAT_INTERVAL = 15.0
+HEARTBEAT_TIMEOUT = 45.0
+# Read receipts and typing events are coalesced and sent at most this often
+BATCH_INTERVAL = 0.25
+# Messages kept while disconnected; the oldest are discarded beyond this
+MAX_PENDING_MESSAGES = 1000
+
+logger = logging.getLogger(__name__)
 
 
 class ChatClient(QObject):
     """
-    Handles TCP communication with the broker in a background thread.
+    Handles TCP communication with the broker on an asyncio loop in its own thread.
+
+    The connection is re-established with exponential backoff whenever it drops,
+    and the last "register" message is sent again (with the offsets seen so far,
+    so the broker replays only what was missed). send_message and the event
+    methods may be called from any thread; they only queue.
     """
     # Signal to emit when a message is received from the server.
     # The payload will be a dictionary (the decoded JSON).
     messageReceived = Signal(dict)
+    # Emitted with True once connected (and registered), False when the connection drops.
+    connectionChanged = Signal(bool)
 
-    def __init__(self, host='127.0.0.1', port=8888):
+    def __init__(self, host='127.0.0.1', port=8888, framing=FRAMING_JSON):
         super().__init__()
         self.host = host
         self.port = port
-        self.socket = None
-        self._is_running = False
+        self.framing = framing  # requested; the broker may keep the connection on JSON
+        self.initial_backoff = INITIAL_BACKOFF
+        self.max_backoff = MAX_BACKOFF
+        self.heartbeat_interval = HEARTBEAT_INTERVAL
+        self.heartbeat_timeout = HEARTBEAT_TIMEOUT
+        self.batch_interval = BATCH_INTERVAL
+
+        self._lock = threading.Lock()  # guards the queues below, which other threads fill
+        self._outbox = deque(maxlen=MAX_PENDING_MESSAGES)
+        self._read_receipts = {}  # chat_id -> highest message id read
+        self._typing = set()  # chat ids
+        self._registration = None  # the last "register" message, re-sent on every reconnect
+        # Last message log offset seen per chat, sent with "register" so the broker
+        # replays only what was missed while disconnected
+        self._offsets = {}
+
+        self._thread = None
+        self._loop = None
+        self._wakeup = None
+        self._main_task = None
+        self._last_received = 0.0
+        self._stopping = False
+        self._is_connected = False
+        # Set once a broker failed to answer a framing hello in time; later connections stay on JSON
+        self._hello_unanswered = False
+
+    @property
+    def is_connected(self) -> bool:
+        return self._is_connected
+
+    def start(self):
+        """Runs the client on a daemon thread of its own."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self.connect_and_listen, name="chat-client", daemon=True)
+            self._thread.start()
 
     def connect_and_listen(self):
-        """Main method to be run in the background thread."""
+        """Runs the client's event loop in the calling thread until disconnect() is called."""
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.connect((self.host, self.port))
-            self._is_running = True
-
-            # Start listening for incoming messages
-            buffer = ""
-            while self._is_running:
-                data = self.socket.recv(4096).decode()
-                if not data:
-                    break
-                buffer += data
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    try:
-                        msg_data = json.loads(line)
-                        # Emit the signal to notify the controller on the main thread
-                        self.messageReceived.emit(msg_data)
-                    except json.JSONDecodeError:
-                        print(f"Client: Received invalid JSON: {line}")
-        except Exception as e:
-            print(f"Client error: {e}")
-        finally:
-            self.disconnect()
+            asyncio.run(self._run())
+        except Exception:
+            logger.exception("Chat client stopped unexpectedly.")
 
     def send_message(self, data: dict):
-        """Sends a JSON message to the server. Can be called from any thread."""
-        if self.socket and self._is_running:
-            try:
-                message = json.dumps(data) + '\n'
-                self.socket.sendall(message.encode())
-            except Exception as e:
-                print(f"Client failed to send message: {e}")
+        """Queues a message for the broker. Can be called from any thread, connected or not."""
+        with self._lock:
+            if data.get("type") == "register":
+                # Only the latest registration matters; it is sent first on every (re)connect.
+                self._registration = dict(data)
+                self._drop_queued_registration()
+            if len(self._outbox) == self._outbox.maxlen:
+                logger.warning("Chat client send queue is full, dropping the oldest message.")
+            self._outbox.append(data)
+        self._wake()
+
+    def send_read_receipt(self, chat_id: int, message_id: int):
+        """Reports that the user has read a chat up to message_id; coalesced with other receipts."""
+        with self._lock:
+            self._read_receipts[chat_id] = max(message_id, self._read_receipts.get(chat_id, 0))
+
+    def send_typing(self, chat_id: int):
+        """Reports that the user is typing in a chat; coalesced with other typing events."""
+        with self._lock:
+            self._typing.add(chat_id)
 
     def disconnect(self):
-        """Shuts down the connection."""
-        self._is_running = False
-        if self.socket:
-            self.socket.close()
-            self.socket = None
-            print("Client disconnected.")
+        """Closes the connection for good and stops the loop."""
+        self._stopping = True
+        loop, task = self._loop, self._main_task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # the loop finished in the meantime
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    # ------------------------------------------------------------------
+    # EVENT LOOP
+    # ------------------------------------------------------------------
+
+    async def _run(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._main_task = asyncio.current_task()
+        attempt = 0
+        try:
+            while not self._stopping:
+                try:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), CONNECT_TIMEOUT)
+                except (OSError, asyncio.TimeoutError) as e:
+                    delay = self._backoff(attempt)
+                    attempt += 1
+                    logger.info(f"Chat broker unreachable ({e}); retrying in {delay:.1f}s.")
+                    await asyncio.sleep(delay)
+                    continue
+
+                attempt = 0
+                try:
+                    await self._session(reader, writer)
+                except (ConnectionError, OSError, FrameError, asyncio.TimeoutError,
+                        asyncio.IncompleteReadError) as e:
+                    logger.warning(f"Chat connection lost: {e}")
+                finally:
+                    writer.close()
+                    self._set_connected(False)
+                if not self._stopping:
+                    await asyncio.sleep(self._backoff(0))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop = self._main_task = None
+            logger.info("Chat client stopped.")
+
+    async def _session(self, reader, writer):
+        codec = JsonLineCodec()
+        if self.framing == FRAMING_BINARY and not self._hello_unanswered:
+            codec = await self._negotiate(reader, writer)
+
+        with self._lock:
+            if self._registration is not None:
+                # Re-register ahead of anything queued while disconnected.
+                self._drop_queued_registration()
+                self._outbox.appendleft(self._registration)
+        self._set_connected(True)
+        self._last_received = time.monotonic()
+        self._wakeup.set()
+
+        tasks = [asyncio.create_task(coroutine) for coroutine in (
+            self._read_loop(reader, codec), self._write_loop(writer, codec),
+            self._heartbeat_loop(), self._batch_loop())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()  # re-raises the error that ended the session
+            raise ConnectionError("Broker closed the connection.")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _negotiate(self, reader, writer):
+        """
+        Asks the broker for binary framing. An older broker ignores the hello; since a
+        late answer would still switch the broker to binary, the connection is then
+        dropped and the next one is made without a hello, on JSON.
+        """
+        writer.write(JsonLineCodec().encode({"type": "hello", "framing": FRAMING_BINARY}))
+        await writer.drain()
+        try:
+            # Nothing but the answer is sent before we register, and it always comes as a JSON line.
+            answer = await asyncio.wait_for(reader.readline(), HANDSHAKE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._hello_unanswered = True
+            raise ConnectionError("No answer to the framing hello; reconnecting with JSON framing.")
+        if not answer:
+            raise ConnectionError("Broker closed the connection during the handshake.")
+        framing = json.loads(answer).get("framing")
+        return BinaryFrameCodec() if framing == FRAMING_BINARY else JsonLineCodec()
+
+    async def _read_loop(self, reader, codec):
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            self._last_received = time.monotonic()
+            for msg_data in codec.feed(data):
+                self._dispatch(msg_data)
+
+    async def _write_loop(self, writer, codec):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                messages = list(self._outbox)
+                self._outbox.clear()
+            if not messages:
+                continue
+            try:
+                for data in messages:
+                    writer.write(codec.encode(self._with_resume(data)))
+                await writer.drain()
+            except (ConnectionError, OSError):
+                with self._lock:
+                    # Unsent messages go back for the next connection.
+                    self._outbox.extendleft(reversed(messages))
+                raise
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if time.monotonic() - self._last_received > self.heartbeat_timeout:
+                raise asyncio.TimeoutError(f"No data from the broker for {self.heartbeat_timeout:.0f}s.")
+            with self._lock:
+                self._outbox.append({"type": "ping"})
+            self._wakeup.set()
+
+    async def _batch_loop(self):
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            with self._lock:
+                events = [{"type": "read", "chat_id": chat_id, "message_id": message_id}
+                          for chat_id, message_id in self._read_receipts.items()]
+                events += [{"type": "typing", "chat_id": chat_id} for chat_id in self._typing]
+                self._read_receipts.clear()
+                self._typing.clear()
+                if events:
+                    self._outbox.append({"type": "events", "events": events})
+            if events:
+                self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    def _dispatch(self, msg_data: dict):
+        message_type = msg_data.get("type")
+        if message_type == "pong":
+            return
+        offset = msg_data.get("offset")
+        if message_type == "new_message" and offset:
+            chat_id = msg_data.get("chat_id")
+            self._offsets[chat_id] = max(offset, self._offsets.get(chat_id, 0))
+        elif message_type == "resume_incomplete" and isinstance(msg_data.get("last_offset"), int):
+            # The gap cannot be replayed; the app reloads the chat from the database instead,
+            # so later reconnects resume from the broker's current end of the log.
+            self._offsets[msg_data.get("chat_id")] = msg_data["last_offset"]
+        # Emit the signal to notify the controller on the main thread
+        self.messageReceived.emit(msg_data)
+
+    def _with_resume(self, data: dict) -> dict:
+        if data.get("type") != "register" or "resume" in data:
+            return data
+        return {**data, "resume": {str(chat_id): self._offsets[chat_id]
+                                   for chat_id in data.get("chat_ids", []) if chat_id in self._offsets}}
+
+    def _drop_queued_registration(self):
+        # Called with the lock held.
+        self._outbox = deque((queued for queued in self._outbox if queued.get("type") != "register"),
+                             maxlen=MAX_PENDING_MESSAGES)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.initial_backoff * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def _wake(self):
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # the loop is shutting down
+
+    def _set_connected(self, connected: bool):
+        if connected != self._is_connected:
+            self._is_connected = connected
+            self.connectionChanged.emit(connected)
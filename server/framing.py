@@ -0,0 +1,136 @@
+# server/framing.py
+
+"""
+Wire formats of the chat protocol.
+
+JSON (the default): one JSON object per line.
+
+Binary, negotiated per connection: the client sends the JSON line
+``{"type": "hello", "framing": "binary"}`` right after connecting and switches
+when the broker answers with the same line. A broker that does not know the
+hello never answers, and the client stays on JSON. Every binary frame is a
+21-byte header followed by the body::
+
+    body length (uint32) | kind (uint8) | chat_id (int64) | offset (uint64), big-endian
+
+``KIND_MESSAGE`` and ``KIND_NEW_MESSAGE`` bodies are the JSON-encoded message
+payload; the broker routes them on the header alone and forwards the body
+bytes unparsed. ``KIND_CONTROL`` bodies are a whole JSON message (register,
+hello, ...) and carry chat_id 0. ``offset`` is the position of a
+``KIND_NEW_MESSAGE`` in the broker's message log (see message_log), 0 when the
+message was not logged; JSON "new_message" lines carry it as an "offset" key.
+"""
+
+import json
+import logging
+import struct
+
+FRAMING_JSON = "json"
+FRAMING_BINARY = "binary"
+SUPPORTED_FRAMINGS = (FRAMING_JSON, FRAMING_BINARY)
+
+KIND_CONTROL = 1
+KIND_MESSAGE = 2  # client -> broker
+KIND_NEW_MESSAGE = 3  # broker -> client
+
+HEADER = struct.Struct(">IBqQ")
+MAX_BODY_SIZE = 16 * 2 ** 20
+
+
+class FrameError(ValueError):
+    """A frame that cannot be decoded; the stream cannot be resynchronized after it."""
+
+
+def encode_frame(kind: int, chat_id: int, body: bytes, offset: int = 0) -> bytes:
+    if len(body) > MAX_BODY_SIZE:
+        raise FrameError(f"Frame body of {len(body)} bytes exceeds {MAX_BODY_SIZE}.")
+    return HEADER.pack(len(body), kind, chat_id, offset) + body
+
+
+def _check_header(length: int, kind: int) -> None:
+    if length > MAX_BODY_SIZE:
+        raise FrameError(f"Frame body of {length} bytes exceeds {MAX_BODY_SIZE}.")
+    if kind not in (KIND_CONTROL, KIND_MESSAGE, KIND_NEW_MESSAGE):
+        raise FrameError(f"Unknown frame kind {kind}.")
+
+
+async def read_frame(reader) -> tuple[int, int, bytes]:
+    """Reads one frame's (kind, chat_id, body) from an asyncio StreamReader. Raises IncompleteReadError at EOF."""
+    length, kind, chat_id, _ = HEADER.unpack(await reader.readexactly(HEADER.size))
+    _check_header(length, kind)
+    return kind, chat_id, await reader.readexactly(length)
+
+
+class JsonLineCodec:
+    """Newline-delimited JSON, reassembled in a bytearray."""
+
+    framing = FRAMING_JSON
+
+    def __init__(self, buffer: bytearray = None):
+        self._buffer = buffer if buffer is not None else bytearray()
+        self._scanned = 0  # bytes of the buffer already known to hold no newline
+
+    def encode(self, data: dict) -> bytes:
+        return (json.dumps(data) + '\n').encode()
+
+    def feed(self, data: bytes) -> list[dict]:
+        """Adds received bytes and returns the complete messages; undecodable lines are logged and skipped."""
+        buffer = self._buffer
+        buffer += data
+        messages, start = [], 0
+        while (end := buffer.find(b'\n', max(start, self._scanned))) != -1:
+            line = buffer[start:end].strip()
+            start = end + 1
+            if line:
+                try:
+                    messages.append(json.loads(line))
+                except ValueError:
+                    logging.warning(f"Received invalid JSON: {line[:200]!r}")
+        del buffer[:start]
+        self._scanned = len(buffer)
+        return messages
+
+
+class BinaryFrameCodec:
+    """Length-prefixed frames, reassembled in a bytearray and sliced through a memoryview."""
+
+    framing = FRAMING_BINARY
+
+    def __init__(self, buffer: bytearray = None):
+        self._buffer = buffer if buffer is not None else bytearray()
+
+    def encode(self, data: dict) -> bytes:
+        if data.get("type") == "message":
+            return encode_frame(KIND_MESSAGE, data["chat_id"], json.dumps(data.get("payload")).encode())
+        return encode_frame(KIND_CONTROL, 0, json.dumps(data).encode())
+
+    def feed(self, data: bytes) -> list[dict]:
+        """Adds received bytes and returns the complete messages. Raises FrameError on a corrupt stream."""
+        buffer = self._buffer
+        buffer += data
+        messages, offset = [], 0
+        with memoryview(buffer) as view:
+            while len(buffer) - offset >= HEADER.size:
+                length, kind, chat_id, log_offset = HEADER.unpack_from(view, offset)
+                _check_header(length, kind)
+                end = offset + HEADER.size + length
+                if end > len(buffer):
+                    break
+                try:
+                    body = json.loads(bytes(view[offset + HEADER.size:end]))
+                except ValueError:
+                    logging.warning(f"Received a frame with an invalid JSON body (kind {kind}).")
+                    offset = end
+                    continue
+                if kind == KIND_CONTROL:
+                    messages.append(body)
+                elif kind == KIND_MESSAGE:
+                    messages.append({"type": "message", "chat_id": chat_id, "payload": body})
+                else:
+                    message = {"type": "new_message", "chat_id": chat_id, "payload": body}
+                    if log_offset:
+                        message["offset"] = log_offset
+                    messages.append(message)
+                offset = end
+        del buffer[:offset]
+        return messages
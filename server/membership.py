@@ -0,0 +1,123 @@
+# server/membership.py
+
+"""
+Who is connected to the broker and which chat rooms each connection is in.
+
+A user may have several sessions (one per workstation); each session is a
+connection object and joins rooms on its own. Rooms map to their member
+connections and every connection keeps the reverse set of its rooms, so
+leaving or disconnecting touches only that connection's rooms. A room is
+dropped as soon as its last member leaves.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class MembershipMetrics:
+    users: int
+    connections: int
+    rooms: int
+    memberships: int  # (room, connection) pairs
+    largest_room: int
+    registrations: int  # since start
+    disconnects: int  # since start
+
+
+class MembershipRegistry:
+    """Room membership of the broker's connections. Not thread-safe; used from the event loop only."""
+
+    def __init__(self):
+        self._rooms = {}  # chat_id -> set of connections
+        self._connection_rooms = {}  # connection -> set of chat_ids
+        self._connection_users = {}  # connection -> user_id
+        self._user_connections = {}  # user_id -> set of connections
+        self._registrations = 0
+        self._disconnects = 0
+
+    def register(self, connection, user_id, chat_ids) -> None:
+        """
+        Registers a session of a user for the given rooms. Registering the same
+        connection again replaces its rooms (and its user, if that changed).
+        """
+        previous_user = self._connection_users.get(connection)
+        if previous_user is not None and previous_user != user_id:
+            self.unregister(connection)
+        self._connection_users[connection] = user_id
+        self._user_connections.setdefault(user_id, set()).add(connection)
+
+        wanted = set(chat_ids)
+        current = self._connection_rooms.setdefault(connection, set())
+        for chat_id in current - wanted:
+            self._leave(connection, chat_id)
+        for chat_id in wanted - current:
+            self._rooms.setdefault(chat_id, set()).add(connection)
+        current.clear()
+        current.update(wanted)
+        self._registrations += 1
+
+    def join(self, connection, chat_id) -> None:
+        """Adds a registered connection to one more room."""
+        if connection not in self._connection_users:
+            raise KeyError("Connection is not registered.")
+        self._rooms.setdefault(chat_id, set()).add(connection)
+        self._connection_rooms[connection].add(chat_id)
+
+    def leave(self, connection, chat_id) -> None:
+        rooms = self._connection_rooms.get(connection)
+        if rooms is not None and chat_id in rooms:
+            rooms.discard(chat_id)
+            self._leave(connection, chat_id)
+
+    def unregister(self, connection):
+        """Removes a connection from all its rooms. Returns its user id, or None if it never registered."""
+        user_id = self._connection_users.pop(connection, None)
+        if user_id is None:
+            return None
+        for chat_id in self._connection_rooms.pop(connection, ()):
+            self._leave(connection, chat_id)
+        sessions = self._user_connections.get(user_id)
+        sessions.discard(connection)
+        if not sessions:
+            del self._user_connections[user_id]
+        self._disconnects += 1
+        return user_id
+
+    def room_members(self, chat_id) -> frozenset:
+        """The connections in a room (a snapshot, safe to iterate while the registry changes)."""
+        return frozenset(self._rooms.get(chat_id, ()))
+
+    def has_room(self, chat_id) -> bool:
+        return chat_id in self._rooms
+
+    def rooms_of(self, connection) -> frozenset:
+        return frozenset(self._connection_rooms.get(connection, ()))
+
+    def user_of(self, connection):
+        return self._connection_users.get(connection)
+
+    def sessions_of(self, user_id) -> frozenset:
+        return frozenset(self._user_connections.get(user_id, ()))
+
+    def metrics(self) -> MembershipMetrics:
+        return MembershipMetrics(
+            users=len(self._user_connections),
+            connections=len(self._connection_users),
+            rooms=len(self._rooms),
+            memberships=sum(len(members) for members in self._rooms.values()),
+            largest_room=max((len(members) for members in self._rooms.values()), default=0),
+            registrations=self._registrations,
+            disconnects=self._disconnects,
+        )
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    def _leave(self, connection, chat_id) -> None:
+        members = self._rooms.get(chat_id)
+        if members is None:
+            return
+        members.discard(connection)
+        if not members:
+            del self._rooms[chat_id]
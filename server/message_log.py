@@ -0,0 +1,218 @@
+# server/message_log.py
+
+"""
+Append-only, segmented log of the chat messages routed by the broker.
+
+Every room has its own directory of segment files named after the offset of
+their first record (``00000000000000000001.log``). Offsets start at 1 and
+increase by one per message, so a client that remembers the last offset it saw
+in a room can ask for exactly the messages it missed. A record is a fixed
+header followed by the JSON payload bytes as the broker received them::
+
+    offset (uint64) | timestamp ms (int64) | sender user id (int64) | length (uint32) | crc32 (uint32)
+
+The active segment rolls over once it reaches ``segment_bytes``. Retention
+deletes whole closed segments once they are older than ``retention_seconds``
+or the room's log is larger than ``retention_bytes``. A record torn by a
+crash is detected by its length or checksum and cut off at the next start.
+"""
+
+import bisect
+import logging
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+RECORD_HEADER = struct.Struct(">QqqII")
+SEGMENT_SUFFIX = ".log"
+
+DEFAULT_SEGMENT_BYTES = 4 * 2 ** 20
+DEFAULT_RETENTION_SECONDS = 30 * 24 * 3600
+DEFAULT_RETENTION_BYTES = 256 * 2 ** 20
+
+
+@dataclass(frozen=True)
+class LogRecord:
+    offset: int
+    timestamp_ms: int
+    sender_id: int  # 0 when the sender's id is not an integer
+    payload: bytes
+
+
+@dataclass
+class _Segment:
+    base_offset: int
+    path: Path
+    size: int
+    last_timestamp_ms: int
+
+
+class _RoomLog:
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.segments: list[_Segment] = []
+        self.next_offset = 1
+        self.active_file = None
+
+    @property
+    def base_offsets(self) -> list[int]:
+        return [segment.base_offset for segment in self.segments]
+
+    @property
+    def size(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+
+class MessageLog:
+    """The broker's message log. Not thread-safe; used from the event loop only."""
+
+    def __init__(self, directory, segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 retention_seconds: Optional[float] = DEFAULT_RETENTION_SECONDS,
+                 retention_bytes: Optional[int] = DEFAULT_RETENTION_BYTES):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.retention_seconds = retention_seconds
+        self.retention_bytes = retention_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._rooms: dict[int, _RoomLog] = {}
+        for room_directory in self.directory.iterdir():
+            if room_directory.is_dir() and room_directory.name.lstrip("-").isdigit():
+                self._rooms[int(room_directory.name)] = self._recover(room_directory)
+
+    def append(self, chat_id: int, sender_id, payload: bytes) -> int:
+        """Appends a message payload to a room's log and returns its offset."""
+        room = self._room(chat_id)
+        segment = room.segments[-1] if room.segments else None
+        if segment is None or segment.size >= self.segment_bytes:
+            segment = self._roll(room)
+        offset = room.next_offset
+        timestamp_ms = int(time.time() * 1000)
+        record = RECORD_HEADER.pack(offset, timestamp_ms, sender_id if isinstance(sender_id, int) else 0,
+                                    len(payload), zlib.crc32(payload)) + payload
+        room.active_file.write(record)
+        room.active_file.flush()
+        segment.size += len(record)
+        segment.last_timestamp_ms = timestamp_ms
+        room.next_offset += 1
+        return offset
+
+    def read(self, chat_id: int, after_offset: int, limit: int) -> list[LogRecord]:
+        """Up to ``limit`` records of a room with an offset greater than ``after_offset``, oldest first."""
+        room = self._rooms.get(chat_id)
+        if room is None or not room.segments or limit <= 0:
+            return []
+        index = max(bisect.bisect_right(room.base_offsets, after_offset + 1) - 1, 0)
+        records = []
+        for segment in room.segments[index:]:
+            for record in self._scan(segment.path):
+                if record.offset > after_offset:
+                    records.append(record)
+                    if len(records) == limit:
+                        return records
+        return records
+
+    def first_offset(self, chat_id: int) -> Optional[int]:
+        """The oldest offset still retained for a room, or None if nothing is."""
+        room = self._rooms.get(chat_id)
+        if room is None or not room.segments or room.segments[0].base_offset >= room.next_offset:
+            return None
+        return room.segments[0].base_offset
+
+    def last_offset(self, chat_id: int) -> int:
+        """The offset of a room's newest message; 0 if it has none."""
+        room = self._rooms.get(chat_id)
+        return room.next_offset - 1 if room else 0
+
+    def enforce_retention(self) -> int:
+        """Deletes closed segments past the age or size limit. Returns the number deleted."""
+        now_ms = int(time.time() * 1000)
+        deleted = 0
+        for room in self._rooms.values():
+            size = room.size
+            while len(room.segments) > 1:
+                oldest = room.segments[0]
+                expired = self.retention_seconds is not None and \
+                    now_ms - oldest.last_timestamp_ms > self.retention_seconds * 1000
+                oversized = self.retention_bytes is not None and size > self.retention_bytes
+                if not (expired or oversized):
+                    break
+                oldest.path.unlink(missing_ok=True)
+                room.segments.pop(0)
+                size -= oldest.size
+                deleted += 1
+        if deleted:
+            logging.info(f"Message log retention deleted {deleted} segments.")
+        return deleted
+
+    def close(self) -> None:
+        for room in self._rooms.values():
+            if room.active_file is not None:
+                room.active_file.close()
+                room.active_file = None
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    def _room(self, chat_id: int) -> _RoomLog:
+        room = self._rooms.get(chat_id)
+        if room is None:
+            directory = self.directory / str(chat_id)
+            directory.mkdir(exist_ok=True)
+            room = self._rooms[chat_id] = _RoomLog(directory)
+        if room.active_file is None and room.segments:
+            room.active_file = open(room.segments[-1].path, "ab")
+        return room
+
+    def _roll(self, room: _RoomLog) -> _Segment:
+        if room.active_file is not None:
+            room.active_file.close()
+        segment = _Segment(room.next_offset, room.directory / f"{room.next_offset:020d}{SEGMENT_SUFFIX}", 0, 0)
+        room.active_file = open(segment.path, "ab")
+        room.segments.append(segment)
+        self.enforce_retention()
+        return segment
+
+    def _recover(self, directory: Path) -> _RoomLog:
+        room = _RoomLog(directory)
+        paths = sorted(directory.glob(f"*{SEGMENT_SUFFIX}"))
+        for path in paths:
+            room.segments.append(_Segment(int(path.stem), path, path.stat().st_size, int(path.stat().st_mtime * 1000)))
+        if room.segments:
+            last = room.segments[-1]
+            valid_size, records = 0, 0
+            for record in self._scan(last.path):
+                valid_size += RECORD_HEADER.size + len(record.payload)
+                room.next_offset = record.offset + 1
+                last.last_timestamp_ms = record.timestamp_ms
+                records += 1
+            if not records:
+                room.next_offset = last.base_offset
+            if valid_size < last.size:
+                logging.warning(f"Truncating a torn record at the end of {last.path}.")
+                with open(last.path, "r+b") as file:
+                    file.truncate(valid_size)
+                last.size = valid_size
+        return room
+
+    @staticmethod
+    def _scan(path: Path):
+        """Yields the intact records of a segment, stopping at the first torn one."""
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return
+        position = 0
+        with memoryview(data) as view:
+            while position + RECORD_HEADER.size <= len(data):
+                offset, timestamp_ms, sender_id, length, checksum = RECORD_HEADER.unpack_from(view, position)
+                start = position + RECORD_HEADER.size
+                payload = bytes(view[start:start + length])
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    return
+                yield LogRecord(offset, timestamp_ms, sender_id, payload)
+                position = start + length
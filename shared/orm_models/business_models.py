@@ -13,10 +13,12 @@ from dataclasses import dataclass
 
 from sqlalchemy import (
     Integer, Text, String, Date, DateTime, LargeBinary,
-    ForeignKey, CheckConstraint, Index, event, func
+    ForeignKey, CheckConstraint, Index, event, func, DDL, FetchedValue
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column, declarative_base
 
+from shared.utils.text_utils import split_invoice_version
+
 
 # One Base to rule them all
 BaseBusiness = declarative_base()
@@ -108,6 +110,10 @@ class InvoiceItemData:
     foreign_affairs_seal_price: int
     additional_issues_price: int
     total_price: int
+    # Resolved from the catalog by the invoice aggregate loader.
+    catalog_service_name: Optional[str] = None
+    dynamic_price_1_name: Optional[str] = None
+    dynamic_price_2_name: Optional[str] = None
 
 
 @dataclass
@@ -373,6 +379,8 @@ class CustomerModel(BaseBusiness):
 
     # Changed Integer to Text to match IssuedInvoiceModel and standard National ID format
     national_id: Mapped[str] = mapped_column(Text, primary_key=True, unique=True, nullable=False)
+    # Integer surrogate key for joins and aggregations; assigned by the database (see CUSTOMER_ID_TRIGGERS).
+    id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, server_default=FetchedValue())
     name: Mapped[str] = mapped_column(Text, nullable=False)
     phone: Mapped[str] = mapped_column(Text, nullable=False)
     telegram_id: Mapped[str | None] = mapped_column(Text)
@@ -386,10 +394,11 @@ class CustomerModel(BaseBusiness):
 
     # New relationship to Invoices
     invoices: Mapped[list["IssuedInvoiceModel"]] = relationship(
-        "IssuedInvoiceModel", back_populates="customer"
+        "IssuedInvoiceModel", back_populates="customer", foreign_keys="IssuedInvoiceModel.national_id"
     )
 
     __table_args__ = (
+        Index('idx_customers_id', 'id', unique=True),
         Index('idx_customers_national_id', 'national_id'),
         Index('idx_customers_phone', 'phone'),
         Index('idx_customers_name', 'name'),
@@ -576,6 +585,12 @@ class IssuedInvoiceModel(BaseBusiness):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     invoice_number: Mapped[str] = mapped_column(Text, nullable=False, unique=True)
 
+    # Edit chain: every re-issued version shares the number of the original invoice.
+    base_invoice_number: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default='1')
+    # Bumped on every update so cached copies of the invoice can be validated cheaply.
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default='1')
+
     name: Mapped[str] = mapped_column(Text, nullable=False)
 
     # ✅ LINKED: Foreign Key to Customers
@@ -586,6 +601,14 @@ class IssuedInvoiceModel(BaseBusiness):
         index=True
     )
 
+    # Surrogate key of the customer, filled from national_id by the database (see CUSTOMER_ID_TRIGGERS).
+    customer_id: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        ForeignKey("customers.id"),
+        nullable=True,
+        server_default=FetchedValue()
+    )
+
     phone: Mapped[str] = mapped_column(Text, nullable=False)
 
     issue_date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -594,6 +617,12 @@ class IssuedInvoiceModel(BaseBusiness):
     payment_date: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     translator: Mapped[str] = mapped_column(Text, nullable=False)
+    # ✅ LINKED: Foreign Key to Translators (the name above is kept as issued)
+    translator_employee_id: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        ForeignKey("translators.id", ondelete="SET NULL"),
+        nullable=True
+    )
     total_items: Mapped[int] = mapped_column(Integer, nullable=False)
     total_amount: Mapped[int] = mapped_column(Integer, nullable=False)
 
@@ -630,11 +659,14 @@ class IssuedInvoiceModel(BaseBusiness):
         "InvoiceItemModel", cascade="all, delete-orphan", back_populates="invoice"
     )
     customer: Mapped["CustomerModel"] = relationship(
-        "CustomerModel", back_populates="invoices"
+        "CustomerModel", back_populates="invoices", foreign_keys=[national_id]
     )
     user: Mapped["UsersModel"] = relationship(
         "UsersModel", back_populates="invoices"
     )
+    translator_ref: Mapped[Optional["TranslatorModel"]] = relationship(
+        "TranslatorModel", back_populates="invoices"
+    )
 
     __table_args__ = (
         CheckConstraint('payment_status IN (0, 1)', name='check_payment_status'),
@@ -644,8 +676,11 @@ class IssuedInvoiceModel(BaseBusiness):
         Index('idx_issued_invoices_invoice_status', 'payment_status'),
         Index('idx_issued_invoices_issue_date', 'issue_date'),
         Index('idx_issued_invoices_national_id', 'national_id'),
+        Index('idx_issued_invoices_customer_issue_date', 'customer_id', 'issue_date'),
         Index('idx_issued_invoices_translator', 'translator'),
+        Index('idx_issued_invoices_translator_employee', 'translator_employee_id', 'issue_date'),
         Index('idx_issued_invoices_user', 'username'),
+        Index('idx_issued_invoices_base_version', 'base_invoice_number', 'version', unique=True),
     )
 
     def to_dataclass(self) -> InvoiceData:
@@ -669,12 +704,64 @@ class IssuedInvoiceModel(BaseBusiness):
 
 @event.listens_for(IssuedInvoiceModel, 'before_update', propagate=True)
 def before_update_listener(mapper, connection, target):
+    target.revision = (target.revision or 1) + 1
+    assign_translator_id(connection, target)
     if target.delivery_status == 4 and target.collection_date is None:
         target.collection_date = datetime.now(timezone.utc)
     if target.payment_status == 1 and target.payment_date is None:
         target.payment_date = datetime.now(timezone.utc)
 
 
+@event.listens_for(IssuedInvoiceModel, 'before_insert', propagate=True)
+def before_insert_listener(mapper, connection, target):
+    if target.base_invoice_number is None:
+        target.base_invoice_number, target.version = split_invoice_version(str(target.invoice_number))
+    assign_translator_id(connection, target)
+
+
+def assign_translator_id(connection, target):
+    """Keeps translator_employee_id in step with the translator name on every insert and update."""
+    from shared.services.translator_registry import TranslatorRegistry
+    TranslatorRegistry().assign(connection, target)
+
+
+# Customers get the next integer id and invoices the id of their customer inside the INSERT itself,
+# so every writer - ORM, Core or another workstation - is covered under the same write lock.
+CUSTOMER_ID_TRIGGERS = {
+    "customers": [
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_customers_assign_id AFTER INSERT ON customers
+        WHEN NEW.id IS NULL
+        BEGIN
+            UPDATE customers SET id = (SELECT COALESCE(MAX(id), 0) + 1 FROM customers) WHERE rowid = NEW.rowid;
+        END
+        """,
+    ],
+    "issued_invoices": [
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_issued_invoices_assign_customer AFTER INSERT ON issued_invoices
+        WHEN NEW.customer_id IS NULL
+        BEGIN
+            UPDATE issued_invoices SET customer_id = (SELECT id FROM customers WHERE national_id = NEW.national_id)
+            WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_issued_invoices_update_customer
+        AFTER UPDATE OF national_id ON issued_invoices
+        BEGIN
+            UPDATE issued_invoices SET customer_id = (SELECT id FROM customers WHERE national_id = NEW.national_id)
+            WHERE id = NEW.id;
+        END
+        """,
+    ],
+}
+
+for _table in (CustomerModel.__table__, IssuedInvoiceModel.__table__):
+    for _statement in CUSTOMER_ID_TRIGGERS[_table.name]:
+        event.listen(_table, "after_create", DDL(_statement))
+
+
 class DeletedInvoiceModel(BaseBusiness):
     """Archive table for deleted invoices."""
     __tablename__ = 'deleted_invoices'
@@ -758,6 +845,67 @@ class EditedInvoiceModel(BaseBusiness):
         )
 
 
+class InvoiceNumberCounterModel(BaseBusiness):
+    """Single-row counter holding the last allocated invoice number."""
+    __tablename__ = 'invoice_number_counter'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    last_value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        CheckConstraint('id = 1', name='check_invoice_number_counter_single_row'),
+    )
+
+
+class TranslatorModel(BaseBusiness):
+    """
+    Identity of a translator, referenced by issued_invoices.translator_employee_id.
+    Linked to the payroll employee by employee_id (the employees live in the payroll
+    database, so the link is by value); renames only touch this row.
+    """
+    __tablename__ = 'translators'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    employee_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True, unique=True)
+    full_name: Mapped[str] = mapped_column(Text, nullable=False)
+    name_key: Mapped[str] = mapped_column(Text, nullable=False, unique=True)  # see translator_name_key
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    invoices: Mapped[List["IssuedInvoiceModel"]] = relationship(
+        "IssuedInvoiceModel", back_populates="translator_ref"
+    )
+
+
+class TranslatorMonthlyStatsModel(BaseBusiness):
+    """Per-translator totals of the invoices issued in one Jalali month (see translator_monthly_rollup)."""
+    __tablename__ = 'translator_monthly_stats'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    jalali_year: Mapped[int] = mapped_column(Integer, nullable=False)
+    jalali_month: Mapped[int] = mapped_column(Integer, nullable=False)
+    # NULL groups the invoices without an assigned translator.
+    translator_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("translators.id", ondelete="CASCADE"), nullable=True
+    )
+    invoice_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    document_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    translation_total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)  # Toman
+
+    __table_args__ = (
+        Index('idx_translator_monthly_stats_month', 'jalali_year', 'jalali_month', 'translator_id', unique=True),
+    )
+
+
+class TranslatorRollupMonthModel(BaseBusiness):
+    """One row per rolled-up Jalali month, with the fingerprint of the invoices it was computed from."""
+    __tablename__ = 'translator_rollup_months'
+
+    jalali_year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    jalali_month: Mapped[int] = mapped_column(Integer, primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(Text, nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
 class InvoiceItemModel(BaseBusiness):
     __tablename__ = 'invoice_items'
 
@@ -1,7 +1,7 @@
 # shared/orm_models/business_models.py
 
 from __future__ import annotations
-from sqlalchemy import Integer, Text, Index, ForeignKey
+from sqlalchemy import Integer, Text, Index, ForeignKey, FetchedValue
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -12,6 +12,8 @@ class CustomerModel(BaseCustomers):
     __tablename__ = 'customers'
 
     national_id: Mapped[str] = mapped_column(Integer, primary_key=True, unique=True, nullable=False)
+    # Surrogate key, assigned by the database (see business_models.CUSTOMER_ID_TRIGGERS)
+    id: Mapped[int | None] = mapped_column(Integer, nullable=True, server_default=FetchedValue())
     name: Mapped[str] = mapped_column(Text, nullable=False)
     phone: Mapped[str] = mapped_column(Text, nullable=False)
     telegram_id: Mapped[str | None] = mapped_column(Text)
@@ -26,6 +28,7 @@ class CustomerModel(BaseCustomers):
     )
 
     __table_args__ = (
+        Index('idx_customers_id', 'id', unique=True),
         Index('idx_customers_national_id', 'national_id'),
         Index('idx_customers_phone', 'phone'),
         Index('idx_customers_name', 'name'),
@@ -1,11 +1,13 @@
 # shared/orm_models/invoices_models.py
 
-from sqlalchemy import Integer, Text, DateTime, ForeignKey, CheckConstraint, Index, event
+from sqlalchemy import Integer, Text, DateTime, ForeignKey, CheckConstraint, Index, event, FetchedValue
 from sqlalchemy.orm import Mapped, mapped_column, declarative_base, relationship
 from typing import Optional, List
 from datetime import datetime, timezone
 from dataclasses import dataclass
 
+from shared.utils.text_utils import split_invoice_version
+
 BaseInvoices = declarative_base()
 
 
@@ -91,6 +93,10 @@ class InvoiceItemData:
     foreign_affairs_seal_price: int
     additional_issues_price: int
     total_price: int
+    # Resolved from the catalog by the invoice aggregate loader.
+    catalog_service_name: Optional[str] = None
+    dynamic_price_1_name: Optional[str] = None
+    dynamic_price_2_name: Optional[str] = None
 
 
 @dataclass
@@ -145,8 +151,16 @@ class IssuedInvoiceModel(BaseInvoices):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     invoice_number: Mapped[str] = mapped_column(Text, nullable=False, unique=True)
 
+    # Edit chain: every re-issued version shares the number of the original invoice.
+    base_invoice_number: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default='1')
+    # Bumped on every update so cached copies of the invoice can be validated cheaply.
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default='1')
+
     name: Mapped[str] = mapped_column(Text, nullable=False)
     national_id: Mapped[str] = mapped_column(Text, nullable=False)
+    # customers.id, filled by the database (see business_models.CUSTOMER_ID_TRIGGERS)
+    customer_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, server_default=FetchedValue())
     phone: Mapped[str] = mapped_column(Text, nullable=False)
 
     issue_date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -155,6 +169,8 @@ class IssuedInvoiceModel(BaseInvoices):
     payment_date: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     translator: Mapped[str] = mapped_column(Text, nullable=False)
+    # translators.id in the business database (see business_models.TranslatorModel)
+    translator_employee_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     total_items: Mapped[int] = mapped_column(Integer, nullable=False)
     total_amount: Mapped[int] = mapped_column(Integer, nullable=False)
 
@@ -194,8 +210,11 @@ class IssuedInvoiceModel(BaseInvoices):
         Index('idx_issued_invoices_invoice_status', 'payment_status'),
         Index('idx_issued_invoices_issue_date', 'issue_date'),
         Index('idx_issued_invoices_national_id', 'national_id'),
+        Index('idx_issued_invoices_customer_issue_date', 'customer_id', 'issue_date'),
         Index('idx_issued_invoices_translator', 'translator'),
+        Index('idx_issued_invoices_translator_employee', 'translator_employee_id', 'issue_date'),
         Index('idx_issued_invoices_user', 'username'),
+        Index('idx_issued_invoices_base_version', 'base_invoice_number', 'version', unique=True),
     )
 
     def to_dataclass(self) -> InvoiceData:
@@ -233,12 +252,27 @@ class IssuedInvoiceModel(BaseInvoices):
 
 @event.listens_for(IssuedInvoiceModel, 'before_update', propagate=True)
 def before_update_listener(mapper, connection, target):
+    target.revision = (target.revision or 1) + 1
+    assign_translator_id(connection, target)
     if target.delivery_status == 4 and target.collection_date is None:
         target.collection_date = datetime.now(timezone.utc)
     if target.payment_status == 1 and target.payment_date is None:
         target.payment_date = datetime.now(timezone.utc)
 
 
+@event.listens_for(IssuedInvoiceModel, 'before_insert', propagate=True)
+def before_insert_listener(mapper, connection, target):
+    if target.base_invoice_number is None:
+        target.base_invoice_number, target.version = split_invoice_version(str(target.invoice_number))
+    assign_translator_id(connection, target)
+
+
+def assign_translator_id(connection, target):
+    """Keeps translator_employee_id in step with the translator name on every insert and update."""
+    from shared.services.translator_registry import TranslatorRegistry
+    TranslatorRegistry().assign(connection, target)
+
+
 class DeletedInvoiceModel(BaseInvoices):
     """A table to store invoices that have been deleted."""
     __tablename__ = 'deleted_invoices'
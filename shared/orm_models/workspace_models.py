@@ -3,7 +3,7 @@
 from datetime import datetime
 from typing import List
 
-from sqlalchemy import (String, DateTime, Enum, ForeignKey, Boolean, Text, Integer)
+from sqlalchemy import (String, DateTime, Enum, ForeignKey, Boolean, Text, Integer, Index)
 from sqlalchemy.orm import relationship, Mapped, mapped_column, declarative_base
 from sqlalchemy.sql import func
 from shared.enums import ChatType, ParticipantRole
@@ -35,6 +35,11 @@ class ChatParticipantModel(BaseWorkspace):
     role: Mapped[ParticipantRole] = mapped_column(Enum(ParticipantRole), default=ParticipantRole.MEMBER)
     chat: Mapped["ChatModel"] = relationship(back_populates="participants")
 
+    __table_args__ = (
+        Index('idx_chat_participants_chat_user', 'chat_id', 'user_id'),
+        Index('idx_chat_participants_user_chat', 'user_id', 'chat_id'),
+    )
+
 
 class MessageModel(BaseWorkspace):
     __tablename__ = 'messages'
@@ -48,7 +53,12 @@ class MessageModel(BaseWorkspace):
 
     chat: Mapped["ChatModel"] = relationship(back_populates="messages")
     attachments: Mapped[List["AttachmentModel"]] = relationship(back_populates="message", cascade="all, delete-orphan")
-    read_receipts: Mapped[List["MessageReadStatusModel"]] = relationship(back_populates="message", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # History pages are keyset-paginated on (chat_id, id); ids grow with created_at.
+        Index('idx_messages_chat_id', 'chat_id', 'id'),
+        Index('idx_messages_chat_created_at', 'chat_id', 'created_at'),
+    )
 
 
 # This table stores information about attached files
@@ -58,6 +68,9 @@ class AttachmentModel(BaseWorkspace):
     id: Mapped[int] = mapped_column(primary_key=True)
     file_path: Mapped[str] = mapped_column(String(512), nullable=False)
     file_type: Mapped[str] = mapped_column(String(50), nullable=True)
+    # Key of the file's bytes in the attachment store; the same file attached twice shares it
+    sha256: Mapped[str] = mapped_column(String(64), nullable=True)
+    size: Mapped[int] = mapped_column(Integer, nullable=True)
 
     # --- Foreign Key ---
     message_id: Mapped[int] = mapped_column(ForeignKey('messages.id'), nullable=False)
@@ -65,14 +78,22 @@ class AttachmentModel(BaseWorkspace):
     # --- Relationship ---
     message: Mapped["MessageModel"] = relationship(back_populates="attachments")
 
+    __table_args__ = (
+        Index('idx_attachments_message', 'message_id'),
+        Index('idx_attachments_sha256', 'sha256'),
+    )
 
-# This table tracks exactly who has read which message.
-class MessageReadStatusModel(BaseWorkspace):
-    __tablename__ = 'message_read_status'
 
-    id: Mapped[int] = mapped_column(primary_key=True)
-    read_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
-    message_id: Mapped[int] = mapped_column(ForeignKey('messages.id'), nullable=False)
-    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+# This table tracks how far each participant has read a chat: every message with an id
+# up to last_read_message_id counts as read by them. Per-message receipts are derived from it.
+class ChatReadWatermarkModel(BaseWorkspace):
+    __tablename__ = 'chat_read_watermarks'
+
+    chat_id: Mapped[int] = mapped_column(ForeignKey('chats.id'), primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    last_read_message_id: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
 
-    message: Mapped["MessageModel"] = relationship(back_populates="read_receipts")
+    __table_args__ = (
+        Index('idx_chat_read_watermarks_user', 'user_id', 'chat_id'),
+    )
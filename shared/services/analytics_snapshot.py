@@ -0,0 +1,280 @@
+# shared/services/analytics_snapshot.py
+
+"""
+Columnar analytical snapshots of the business and payroll data.
+
+Writes invoices, invoice items, customers, expenses and payroll records into
+a Hive-style tree partitioned by Jalali year and month:
+
+    <root>/issued_invoices/year=1403/month=01/part.parquet
+    <root>/customers/part.parquet            (tables without a date)
+
+Files are Parquet (or Feather) when pyarrow is installed and gzip'ed CSV
+otherwise, so analysts can point pandas/pyarrow/DuckDB at the tree without
+ever touching the live SQLite files.
+
+Runs are incremental: a per-partition fingerprint (row count plus a few
+cheap column sums, computed per day in one grouped query per table) is kept
+in ``_manifest.json``, and only partitions whose fingerprint changed - new
+months, the current month, edited or deleted rows - are rewritten.
+"""
+
+import importlib.util
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import jdatetime
+import pandas as pd
+from sqlalchemy import Engine, Select, func, select
+
+from shared.orm_models.business_models import (IssuedInvoiceModel, InvoiceItemModel, CustomerModel, ExpenseModel)
+from shared.orm_models.payroll_models import PayrollRecordModel
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "_manifest.json"
+UNPARTITIONED = "all"
+FORMATS = ("parquet", "feather", "csv.gz")
+
+
+def default_format() -> str:
+    """Parquet when pyarrow is importable, otherwise the dependency-free CSV.gz fallback."""
+    return "parquet" if importlib.util.find_spec("pyarrow") else "csv.gz"
+
+
+@dataclass(frozen=True)
+class SnapshotTable:
+    """How one table is snapshotted."""
+    name: str
+    database: str  # key into the engines mapping: 'business' or 'payroll'
+    columns: Sequence[Any]
+    date_column: Any = None  # partition column; None writes a single unpartitioned file
+    checksums: Sequence[Any] = ()  # numeric expressions summed into the partition fingerprint
+    joins: Sequence[tuple] = ()  # (target, onclause) needed to reach the date column
+
+    def base_statement(self, *columns) -> Select:
+        statement = select(*columns)
+        for target, onclause in self.joins:
+            statement = statement.join(target, onclause)
+        return statement
+
+
+SNAPSHOT_TABLES = [
+    SnapshotTable(
+        "issued_invoices", "business", IssuedInvoiceModel.__table__.columns,
+        date_column=IssuedInvoiceModel.issue_date,
+        checksums=(IssuedInvoiceModel.id, IssuedInvoiceModel.revision),
+    ),
+    SnapshotTable(
+        "invoice_items", "business",
+        (*InvoiceItemModel.__table__.columns, IssuedInvoiceModel.issue_date),
+        date_column=IssuedInvoiceModel.issue_date,
+        checksums=(InvoiceItemModel.id, InvoiceItemModel.total_price),
+        joins=((IssuedInvoiceModel, InvoiceItemModel.invoice_number == IssuedInvoiceModel.invoice_number),),
+    ),
+    SnapshotTable(
+        # No date or revision column: the fingerprint tracks the row count and text lengths.
+        "customers", "business",
+        [column for column in CustomerModel.__table__.columns if column.name != "passport_image"],
+        checksums=(func.length(CustomerModel.name) + func.length(CustomerModel.phone)
+                   + func.coalesce(func.length(CustomerModel.address), 0),),
+    ),
+    SnapshotTable(
+        "expenses", "business", ExpenseModel.__table__.columns,
+        date_column=ExpenseModel.expense_date,
+        checksums=(ExpenseModel.id, ExpenseModel.amount),
+    ),
+    SnapshotTable(
+        "payroll_records", "payroll", PayrollRecordModel.__table__.columns,
+        date_column=PayrollRecordModel.pay_period_start_date,
+        checksums=(PayrollRecordModel.net_income_rials, func.length(PayrollRecordModel.status)),
+    ),
+]
+
+
+@dataclass
+class SnapshotReport:
+    written: Dict[str, List[str]] = field(default_factory=dict)
+    removed: Dict[str, List[str]] = field(default_factory=dict)
+    unchanged: int = 0
+    rows: int = 0
+    elapsed_seconds: float = 0.0
+
+    def summary(self) -> str:
+        written = sum(len(partitions) for partitions in self.written.values())
+        return (f"Wrote {written} partitions ({self.rows} rows), kept {self.unchanged} unchanged, "
+                f"removed {sum(len(p) for p in self.removed.values())} in {self.elapsed_seconds:.1f}s.")
+
+
+@lru_cache(maxsize=8192)
+def _jalali_month(day: date) -> str:
+    jalali = jdatetime.date.fromgregorian(date=day)
+    return f"{jalali.year:04d}/{jalali.month:02d}"
+
+
+def _month_range(partition: str) -> tuple[datetime, datetime]:
+    """Gregorian [start, end) bounds of a 'YYYY/MM' Jalali month."""
+    year, month = map(int, partition.split("/"))
+    start = jdatetime.date(year, month, 1)
+    following = jdatetime.date(year + (month == 12), month % 12 + 1, 1)
+    return (datetime.combine(start.togregorian(), datetime.min.time()),
+            datetime.combine(following.togregorian(), datetime.min.time()))
+
+
+class AnalyticsSnapshotExporter:
+    """Writes and incrementally refreshes the partitioned snapshot tree."""
+
+    def __init__(self, engines: Dict[str, Engine], root: Path, fmt: Optional[str] = None):
+        """
+        Args:
+            engines: Engines by database key ('business', 'payroll'); tables of missing databases are skipped.
+            root: Root folder of the snapshot tree.
+            fmt: 'parquet', 'feather' or 'csv.gz'; defaults to default_format().
+        """
+        fmt = fmt or default_format()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported snapshot format: {fmt}")
+        if fmt != "csv.gz" and not importlib.util.find_spec("pyarrow"):
+            raise ValueError(f"The {fmt} format needs pyarrow; use 'csv.gz' instead.")
+        self._engines = engines
+        self._root = Path(root)
+        self._format = fmt
+
+    def run(self, tables: Optional[Sequence[str]] = None, force: bool = False) -> SnapshotReport:
+        """Brings the snapshot up to date; ``force`` rewrites every partition."""
+        started = time.perf_counter()
+        manifest = self._load_manifest()
+        if manifest.get("format") != self._format:
+            manifest = {"format": self._format, "tables": {}}
+            force = True
+
+        report = SnapshotReport()
+        for table in SNAPSHOT_TABLES:
+            if (tables and table.name not in tables) or table.database not in self._engines:
+                continue
+            known = manifest["tables"].setdefault(table.name, {})
+            self._refresh_table(table, known, force, report)
+            self._save_manifest(manifest)
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(report.summary())
+        return report
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    def _refresh_table(self, table: SnapshotTable, known: Dict[str, dict], force: bool,
+                       report: SnapshotReport) -> None:
+        engine = self._engines[table.database]
+        with engine.connect() as connection:
+            fingerprints = self._fingerprints(connection, table)
+
+            for partition, fingerprint in sorted(fingerprints.items()):
+                if not force and known.get(partition, {}).get("fingerprint") == fingerprint:
+                    report.unchanged += 1
+                    continue
+                rows = self._write_partition(connection, table, partition)
+                known[partition] = {"fingerprint": fingerprint, "rows": rows}
+                report.written.setdefault(table.name, []).append(partition)
+                report.rows += rows
+
+        for partition in sorted(set(known) - set(fingerprints)):
+            self._partition_path(table, partition).unlink(missing_ok=True)
+            del known[partition]
+            report.removed.setdefault(table.name, []).append(partition)
+
+    def _fingerprints(self, connection, table: SnapshotTable) -> Dict[str, list]:
+        """Fingerprint of every non-empty partition, from one grouped query over the table."""
+        aggregates = [func.count()] + [func.coalesce(func.sum(expression), 0) for expression in table.checksums]
+        if table.date_column is None:
+            row = connection.execute(table.base_statement(*aggregates)).one()
+            return {UNPARTITIONED: [str(value) for value in row]} if row[0] else {}
+
+        day = func.date(table.date_column)
+        statement = table.base_statement(day, *aggregates).group_by(day)
+        totals: Dict[str, list] = defaultdict(lambda: [0] * len(aggregates))
+        for day_value, *values in connection.execute(statement):
+            if day_value is None:
+                continue
+            month_totals = totals[_jalali_month(date.fromisoformat(day_value))]
+            for index, value in enumerate(values):
+                month_totals[index] += value
+        # Strings keep Decimal sums exact and JSON-serializable.
+        return {partition: [str(value) for value in values] for partition, values in totals.items()}
+
+    def _write_partition(self, connection, table: SnapshotTable, partition: str) -> int:
+        statement = table.base_statement(*table.columns)
+        if partition != UNPARTITIONED:
+            start, end = _month_range(partition)
+            statement = statement.where(table.date_column >= start, table.date_column < end)
+
+        frame = pd.read_sql_query(statement, connection)
+        path = self._partition_path(table, partition)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f".{path.name}.part")
+        try:
+            if self._format == "parquet":
+                frame.to_parquet(temp_path, index=False)
+            elif self._format == "feather":
+                frame.to_feather(temp_path)
+            else:
+                frame.to_csv(temp_path, index=False, compression="gzip", encoding="utf-8")
+            os.replace(temp_path, path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        return len(frame)
+
+    def _partition_path(self, table: SnapshotTable, partition: str) -> Path:
+        directory = self._root / table.name
+        if partition != UNPARTITIONED:
+            year, month = partition.split("/")
+            directory = directory / f"year={year}" / f"month={month}"
+        return directory / f"part.{self._format}"
+
+    def _load_manifest(self) -> dict:
+        path = self._root / MANIFEST_NAME
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Snapshot manifest unreadable, rebuilding the snapshot: {e}")
+            return {}
+
+    def _save_manifest(self, manifest: dict) -> None:
+        self._root.mkdir(parents=True, exist_ok=True)
+        path = self._root / MANIFEST_NAME
+        temp_path = path.with_name(f".{path.name}.part")
+        temp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(temp_path, path)
+
+
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import create_engine
+
+    from config.config import DATABASE_PATHS
+    from shared.utils.path_utils import get_user_data_path
+
+    parser = argparse.ArgumentParser(description="Write or refresh the analytical snapshot.")
+    parser.add_argument("--root", type=Path, default=None)
+    parser.add_argument("--format", choices=FORMATS, default=None)
+    parser.add_argument("--tables", nargs="*")
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    snapshot_engines = {key: create_engine(f"sqlite:///{DATABASE_PATHS[key]}") for key in ("business", "payroll")}
+    exporter = AnalyticsSnapshotExporter(snapshot_engines, args.root or get_user_data_path("analytics_snapshot"),
+                                         fmt=args.format)
+    print(exporter.run(tables=args.tables, force=args.force).summary())
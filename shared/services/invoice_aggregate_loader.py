@@ -0,0 +1,109 @@
+# shared/services/invoice_aggregate_loader.py
+
+import copy
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session, aliased
+
+from shared.orm_models.business_models import (
+    IssuedInvoiceModel, InvoiceItemModel, ServicesModel, ServiceDynamicPrice,
+    InvoiceData, InvoiceItemData
+)
+from shared.session_provider import ManagedSessionProvider
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class InvoiceAggregate:
+    """An issued invoice together with its items, as loaded at one revision."""
+    invoice: InvoiceData
+    items: list[InvoiceItemData]
+    revision: tuple[int, int]
+
+
+# Aggregates are shared by every loader bound to the same engine, so the invoice
+# table, the deep-edit flow and the preview comparison reuse each other's loads.
+_aggregate_caches: WeakKeyDictionary[Engine, OrderedDict[str, InvoiceAggregate]] = WeakKeyDictionary()
+
+
+class InvoiceAggregateLoader:
+    """
+    Loads an invoice, its items and their resolved service and dynamic-price
+    names in one session.
+
+    The invoice row is always read (a single indexed lookup) and its
+    ``(id, revision)`` is compared with the memoized aggregate; the items and
+    catalog names are only queried again when the invoice has changed since.
+    """
+
+    def __init__(self, business_engine: Engine, max_cached: int = 64):
+        self._session = ManagedSessionProvider(engine=business_engine)
+        self._cache = _aggregate_caches.setdefault(business_engine, OrderedDict())
+        self._max_cached = max_cached
+
+    def load(self, invoice_number: str) -> InvoiceAggregate | None:
+        """Returns a private copy of the invoice aggregate, or None if it does not exist."""
+        with self._session() as session:
+            invoice_orm = session.execute(
+                select(IssuedInvoiceModel).where(IssuedInvoiceModel.invoice_number == invoice_number)
+            ).scalar_one_or_none()
+
+            if invoice_orm is None:
+                self._cache.pop(invoice_number, None)
+                return None
+
+            revision = (invoice_orm.id, invoice_orm.revision)
+            aggregate = self._cache.get(invoice_number)
+            if aggregate is None or aggregate.revision != revision:
+                aggregate = InvoiceAggregate(
+                    invoice=invoice_orm.to_dataclass(),
+                    items=self._load_items(session, invoice_number),
+                    revision=revision,
+                )
+                self._remember(invoice_number, aggregate)
+            else:
+                self._cache.move_to_end(invoice_number)
+
+        # Callers are free to mutate what they receive without corrupting the cache.
+        return copy.deepcopy(aggregate)
+
+    def invalidate(self, invoice_number: str | None = None) -> None:
+        """Drops one memoized aggregate, or all of them."""
+        if invoice_number is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(invoice_number, None)
+
+    @staticmethod
+    def _load_items(session: Session, invoice_number: str) -> list[InvoiceItemData]:
+        """Items with their catalog service and dynamic-price names, in one joined query."""
+        price_1 = aliased(ServiceDynamicPrice)
+        price_2 = aliased(ServiceDynamicPrice)
+        rows = session.execute(
+            select(InvoiceItemModel, ServicesModel.name, price_1.name, price_2.name)
+            .outerjoin(ServicesModel, ServicesModel.id == InvoiceItemModel.service_id)
+            .outerjoin(price_1, price_1.id == InvoiceItemModel.dynamic_price_1)
+            .outerjoin(price_2, price_2.id == InvoiceItemModel.dynamic_price_2)
+            .where(InvoiceItemModel.invoice_number == invoice_number)
+            .order_by(InvoiceItemModel.id)
+        ).all()
+
+        items = []
+        for item_orm, service_name, price_1_name, price_2_name in rows:
+            item = item_orm.to_dataclass()
+            item.catalog_service_name = service_name
+            item.dynamic_price_1_name = price_1_name
+            item.dynamic_price_2_name = price_2_name
+            items.append(item)
+        return items
+
+    def _remember(self, invoice_number: str, aggregate: InvoiceAggregate) -> None:
+        self._cache[invoice_number] = aggregate
+        self._cache.move_to_end(invoice_number)
+        while len(self._cache) > self._max_cached:
+            self._cache.popitem(last=False)
@@ -1,112 +1,102 @@
 # shared/services/invoice_number_generator.py
 
 import logging
-from sqlalchemy import text
+from sqlalchemy import Connection, text, update, insert, select, inspect
 from sqlalchemy.exc import SQLAlchemyError
 
+from shared.orm_models.business_models import InvoiceNumberCounterModel
 from shared.session_provider import ManagedSessionProvider
 
 logger = logging.getLogger(__name__)
 
+LEGACY_SEQUENCE_TABLE = 'invoice_number_seq'
+COUNTER_ROW_ID = 1
+
+
+def ensure_invoice_number_counter(connection: Connection) -> None:
+    """
+    Creates the single counter row if it is missing. The starting value is taken
+    from the legacy one-row-per-number table when present (which is then dropped),
+    otherwise from the highest number ever issued or deleted.
+    """
+    counter = InvoiceNumberCounterModel.__table__
+    exists = connection.execute(
+        select(counter.c.id).where(counter.c.id == COUNTER_ROW_ID)
+    ).scalar() is not None
+
+    table_names = inspect(connection).get_table_names()
+    has_legacy_table = LEGACY_SEQUENCE_TABLE in table_names
+
+    if not exists:
+        if has_legacy_table:
+            last_value = connection.execute(
+                text(f"SELECT MAX(id) FROM {LEGACY_SEQUENCE_TABLE}")
+            ).scalar() or 0
+        else:
+            last_value = connection.execute(text("""
+                SELECT MAX(CAST(SUBSTR(invoice_number, 5) AS INTEGER))
+                FROM (
+                    SELECT invoice_number FROM issued_invoices
+                    UNION ALL
+                    SELECT invoice_number FROM deleted_invoices
+                ) AS all_invoices
+            """)).scalar() or 0
+
+        connection.execute(insert(counter).values(id=COUNTER_ROW_ID, last_value=last_value))
+        logger.info(f"Initialized invoice number counter at {last_value}.")
+
+    if has_legacy_table:
+        connection.execute(text(f"DROP TABLE {LEGACY_SEQUENCE_TABLE}"))
+        logger.info(f"Dropped legacy '{LEGACY_SEQUENCE_TABLE}' table.")
+
 
 class InvoiceNumberService:
     """
-    Generates unique sequential invoice numbers using a database-side counter.
-    Works with both SQLite and PostgreSQL.
+    Allocates sequential invoice numbers from a single-row counter table.
+
+    Each allocation is one ``UPDATE ... RETURNING`` statement, so it is O(1) in
+    time and storage and takes the database write lock before reading the new
+    value - concurrent workstations can never receive the same number.
+
+    With ``block_size > 1`` numbers are reserved in blocks and handed out from
+    memory; numbers left in a block when the application exits are skipped, so
+    keep the default of 1 where strictly gapless numbering is required.
     """
-    SEQUENCE_NAME = 'invoice_number_seq'
 
-    def __init__(self, invoices_engine):
+    def __init__(self, invoices_engine: ManagedSessionProvider, block_size: int = 1):
+        if block_size < 1:
+            raise ValueError("block_size must be at least 1.")
         self._engine = invoices_engine
-        self._is_sequence_initialized = False
-
-    def _initialize_sequence(self):
-        """Ensure a persistent counter exists across issued and deleted invoices."""
-        if self._is_sequence_initialized:
-            return
+        self._block_size = block_size
+        self._reserved: list[int] = []
+
+    def reserve_block(self, size: int) -> range:
+        """Atomically reserves ``size`` consecutive numbers and returns them."""
+        counter = InvoiceNumberCounterModel.__table__
+        stmt = (
+            update(counter)
+            .where(counter.c.id == COUNTER_ROW_ID)
+            .values(last_value=counter.c.last_value + size)
+            .returning(counter.c.last_value)
+        )
 
         with self._engine() as session:
             try:
-                dialect = session.bind.dialect.name
-                logger.debug(f"Initializing invoice number sequence for dialect: {dialect}")
-
-                # --- Dialect-specific check ---
-                if dialect == "postgresql":
-                    check_seq_sql = text(f"SELECT to_regclass('{self.SEQUENCE_NAME}')")
-                    result = session.execute(check_seq_sql).scalar()
-                    seq_exists = result is not None
-
-                elif dialect == "sqlite":
-                    check_seq_sql = text(
-                        f"SELECT name FROM sqlite_master WHERE type='table' AND name='{self.SEQUENCE_NAME}'"
-                    )
-                    result = session.execute(check_seq_sql).scalar()
-                    seq_exists = result is not None
-
-                else:
-                    raise NotImplementedError(f"Unsupported dialect: {dialect}")
-
-                if seq_exists:
-                    self._is_sequence_initialized = True
-                    return
-
-                # --- Compute starting value ---
-                get_max_id_sql = text("""
-                    SELECT MAX(CAST(SUBSTR(invoice_number, 5) AS INTEGER))
-                    FROM (
-                        SELECT invoice_number FROM issued_invoices
-                        UNION ALL
-                        SELECT invoice_number FROM deleted_invoices
-                    ) AS all_invoices;
-                """)
-                max_id = session.execute(get_max_id_sql).scalar() or 0
-                start_value = max_id + 1
-
-                # --- Create sequence/counter table ---
-                if dialect == "postgresql":
-                    session.execute(text(f"CREATE SEQUENCE {self.SEQUENCE_NAME} START {start_value}"))
-                elif dialect == "sqlite":
-                    session.execute(text(f"""
-                        CREATE TABLE {self.SEQUENCE_NAME} (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            dummy INTEGER
-                        )
-                    """))
-                    # Pre-insert rows to set the counter
-                    if start_value > 1:
-                        for _ in range(start_value - 1):
-                            session.execute(text(f"INSERT INTO {self.SEQUENCE_NAME} (dummy) VALUES (0)"))
-
-                session.commit()
-                self._is_sequence_initialized = True
-                logger.info(f"Initialized invoice number counter starting at {start_value}.")
-
+                last_value = session.execute(stmt).scalar()
+                if last_value is None:
+                    # First allocation on this database: create the counter row.
+                    ensure_invoice_number_counter(session.connection())
+                    last_value = session.execute(stmt).scalar()
             except SQLAlchemyError as e:
-                session.rollback()
-                logger.error(f"Failed to initialize invoice number sequence: {e}")
+                logger.error(f"Failed to reserve invoice numbers: {e}")
                 raise
 
+        return range(last_value - size + 1, last_value + 1)
+
     def get_next_invoice_number(self) -> str:
         """Return next formatted invoice number (INV-XXXX)."""
-        self._initialize_sequence()
-
-        with self._engine() as session:
-            dialect = session.bind.dialect.name
-
-            if dialect == "postgresql":
-                next_val_sql = text(f"SELECT nextval('{self.SEQUENCE_NAME}')")
-                next_id = session.execute(next_val_sql).scalar()
-
-            elif dialect == "sqlite":
-                # Insert a dummy row to get autoincremented id
-                session.execute(text(f"INSERT INTO {self.SEQUENCE_NAME} (dummy) VALUES (0)"))
-                next_id = session.execute(
-                    text(f"SELECT MAX(id) FROM {self.SEQUENCE_NAME}")
-                ).scalar()
-
-            else:
-                raise NotImplementedError(f"Unsupported dialect: {dialect}")
-
-            session.commit()
-            return f"INV-{next_id:04d}"
+        if not self._reserved:
+            self._reserved = list(reversed(self.reserve_block(self._block_size)))
 
+        next_id = self._reserved.pop()
+        return f"INV-{next_id:04d}"
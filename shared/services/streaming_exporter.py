@@ -0,0 +1,199 @@
+# shared/services/streaming_exporter.py
+
+"""
+Constant-memory CSV/xlsx export.
+
+Rows are streamed from a server-side cursor (``stream_results`` + ``yield_per``)
+straight into the output file, batch by batch, so the size of the selection
+only affects run time, never memory. xlsx files are written with openpyxl's
+write-only workbook, which flushes each row to disk as it is appended.
+
+Each sheet is described by ExportColumns - header, SQL expression and an
+optional cell formatter - so callers choose the columns they want and the
+query only selects those.
+"""
+
+import csv
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+import jdatetime
+from sqlalchemy import Engine, Select, func, select
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+CancelCheck = Callable[[], bool]
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is cancelled; the partial file has been removed."""
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    key: str
+    header: str
+    expression: Any = None  # SQL column expression; None for sheets fed from in-memory rows
+    formatter: Optional[Callable[[Any], Any]] = None
+
+
+@dataclass
+class ExportSheet:
+    """One output sheet: either a statement selecting the columns' expressions, or ready rows."""
+    title: str
+    columns: Sequence[ExportColumn]
+    statement: Optional[Select] = None
+    rows: Optional[Iterable[Sequence[Any]]] = None
+
+
+def select_columns(columns: Sequence[ExportColumn], keys: Optional[Iterable[str]] = None) -> list[ExportColumn]:
+    """The columns named by ``keys`` in the given order, or all columns when no keys are given."""
+    if keys is None:
+        return list(columns)
+    by_key = {column.key: column for column in columns}
+    unknown = [key for key in keys if key not in by_key]
+    if unknown:
+        raise ValueError(f"Unknown export columns: {', '.join(unknown)}")
+    return [by_key[key] for key in keys]
+
+
+@lru_cache(maxsize=4096)
+def _jalali_day(day: date) -> str:
+    return jdatetime.date.fromgregorian(date=day).strftime('%Y/%m/%d')
+
+
+def jalali_date(value) -> str:
+    """Formats a date/datetime as a Jalali YYYY/MM/DD cell (memoized per day)."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        value = value.date()
+    return _jalali_day(value)
+
+
+class StreamingExporter:
+    """Writes one or more sheets to a .csv or .xlsx file without materializing the rows."""
+
+    def __init__(self, engine: Engine, batch_size: int = DEFAULT_BATCH_SIZE):
+        self._engine = engine
+        self._batch_size = batch_size
+
+    def export(self, file_path: str, sheets: Sequence[ExportSheet],
+               progress: Optional[ProgressCallback] = None,
+               is_cancelled: Optional[CancelCheck] = None) -> int:
+        """
+        Exports the sheets and returns the number of data rows written.
+
+        The file is written under a temporary name and moved into place at the
+        end, so a failed or cancelled export never leaves a truncated file.
+        ``progress(rows_written, total_rows)`` is called once per batch.
+        """
+        path = Path(file_path)
+        if path.suffix.lower() == ".csv" and len(sheets) != 1:
+            raise ValueError("A CSV export holds exactly one sheet.")
+        if path.suffix.lower() not in (".csv", ".xlsx"):
+            raise ValueError(f"Unsupported export format: {path.suffix}")
+
+        temp_path = path.with_name(f".{path.name}.part")
+        stream = _RowStream(self._engine, self._batch_size, sheets, progress, is_cancelled)
+        try:
+            if path.suffix.lower() == ".csv":
+                self._write_csv(temp_path, sheets[0], stream)
+            else:
+                self._write_xlsx(temp_path, sheets, stream)
+            os.replace(temp_path, path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        logger.info(f"Exported {stream.written} rows to {path}.")
+        return stream.written
+
+    @staticmethod
+    def _write_csv(path: Path, sheet: ExportSheet, stream: "_RowStream") -> None:
+        with open(path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow([column.header for column in sheet.columns])
+            for batch in stream.batches(sheet):
+                writer.writerows(batch)
+
+    @staticmethod
+    def _write_xlsx(path: Path, sheets: Sequence[ExportSheet], stream: "_RowStream") -> None:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        for sheet in sheets:
+            worksheet = workbook.create_sheet(title=sheet.title[:31])
+            worksheet.sheet_view.rightToLeft = True
+            worksheet.append([column.header for column in sheet.columns])
+            for batch in stream.batches(sheet):
+                for row in batch:
+                    worksheet.append(row)
+        workbook.save(path)
+
+
+class _RowStream:
+    """Yields formatted row batches for each sheet and reports progress across all of them."""
+
+    def __init__(self, engine: Engine, batch_size: int, sheets: Sequence[ExportSheet],
+                 progress: Optional[ProgressCallback], is_cancelled: Optional[CancelCheck]):
+        self._engine = engine
+        self._batch_size = batch_size
+        self._progress = progress
+        self._is_cancelled = is_cancelled
+        self.written = 0
+        self.total = self._count_rows(sheets) if progress else None
+
+    def batches(self, sheet: ExportSheet) -> Iterable[list[list[Any]]]:
+        formatters = [column.formatter for column in sheet.columns]
+        for raw_batch in self._raw_batches(sheet):
+            if self._is_cancelled and self._is_cancelled():
+                raise ExportCancelled()
+            batch = [
+                [fmt(value) if fmt else value for fmt, value in zip(formatters, row)]
+                for row in raw_batch
+            ]
+            yield batch
+            self.written += len(batch)
+            if self._progress:
+                self._progress(self.written, self.total)
+
+    def _raw_batches(self, sheet: ExportSheet) -> Iterable[Sequence[Sequence[Any]]]:
+        if sheet.statement is None:
+            batch = []
+            for row in sheet.rows or ():
+                batch.append(row)
+                if len(batch) == self._batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+            return
+
+        with self._engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=self._batch_size
+            ).execute(sheet.statement)
+            yield from result.partitions()
+
+    def _count_rows(self, sheets: Sequence[ExportSheet]) -> Optional[int]:
+        total = 0
+        with self._engine.connect() as connection:
+            for sheet in sheets:
+                if sheet.statement is not None:
+                    total += connection.execute(
+                        select(func.count()).select_from(sheet.statement.order_by(None).subquery())
+                    ).scalar_one()
+                elif isinstance(sheet.rows, Sequence):
+                    total += len(sheet.rows)
+                else:
+                    return None
+        return total
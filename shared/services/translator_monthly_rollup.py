@@ -0,0 +1,149 @@
+# shared/services/translator_monthly_rollup.py
+
+"""
+Per-translator monthly rollup of the issued invoices.
+
+``translator_monthly_stats`` holds, for every Jalali month and translator id
+(see translator_registry), the number of invoices, the number of documents and
+the translation total. Payroll
+reads the commission base of all its translators from it and the admin
+dashboard ranks its top translators from it, so neither aggregates the
+invoice table itself.
+
+Every rolled-up month keeps a fingerprint of the invoices it was computed from
+(row count plus a few cheap column sums, as in the analytics snapshot). Reading
+a month compares it with one single-row aggregate over that month's invoices
+and recomputes the month with one grouped query only when it changed, so new,
+edited and deleted invoices are always reflected.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Iterable, Optional
+
+import jdatetime
+from sqlalchemy import delete, func, insert, select
+
+from shared.orm_models.business_models import (IssuedInvoiceModel, TranslatorModel, TranslatorMonthlyStatsModel,
+                                               TranslatorRollupMonthModel)
+from shared.services.translator_registry import UNASSIGNED_TRANSLATOR
+
+logger = logging.getLogger(__name__)
+
+SORT_COLUMNS = ("invoice_count", "document_count", "translation_total")
+
+
+@dataclass(frozen=True)
+class TranslatorMonthStats:
+    translator_id: Optional[int]  # None for the invoices without a translator
+    translator: str
+    invoice_count: int
+    document_count: int
+    translation_total: int  # Toman
+
+
+def jalali_month_bounds(year: int, month: int) -> tuple[datetime, datetime]:
+    """Gregorian [start, end) bounds of a Jalali month."""
+    start = jdatetime.date(year, month, 1)
+    following = jdatetime.date(year + (month == 12), month % 12 + 1, 1)
+    return (datetime.combine(start.togregorian(), datetime.min.time()),
+            datetime.combine(following.togregorian(), datetime.min.time()))
+
+
+class TranslatorMonthlyRollup:
+    """
+    Reads and maintains the rollup. Stateless; every method takes a Session or
+    Connection and runs inside the caller's transaction.
+    """
+
+    def month_stats(self, connection, year: int, month: int,
+                    translator_ids: Optional[Iterable[int]] = None) -> dict[Optional[int], TranslatorMonthStats]:
+        """The month's totals by translator id (optionally only the given ones), refreshed first if stale."""
+        self.refresh_month(connection, year, month)
+        statement = self._stats_statement(year, month)
+        if translator_ids is not None:
+            statement = statement.where(TranslatorMonthlyStatsModel.translator_id.in_(list(translator_ids)))
+        return {row.translator_id: TranslatorMonthStats(*row) for row in connection.execute(statement)}
+
+    def top_translators(self, connection, year: int, month: int, limit: int = 3,
+                        order_by: str = "document_count") -> list[TranslatorMonthStats]:
+        """The month's leading translators by one of SORT_COLUMNS."""
+        if order_by not in SORT_COLUMNS:
+            raise ValueError(f"Unknown rollup column: {order_by}")
+        self.refresh_month(connection, year, month)
+        column = getattr(TranslatorMonthlyStatsModel, order_by)
+        rows = connection.execute(
+            self._stats_statement(year, month)
+            .where(TranslatorMonthlyStatsModel.translator_id.isnot(None))
+            .order_by(column.desc(), TranslatorModel.full_name)
+            .limit(limit)
+        )
+        return [TranslatorMonthStats(*row) for row in rows]
+
+    def refresh_month(self, connection, year: int, month: int, force: bool = False) -> bool:
+        """Recomputes the month if its invoices changed since the last refresh. Returns True if it did."""
+        start, end = jalali_month_bounds(year, month)
+        invoices = IssuedInvoiceModel.__table__.c
+        in_month = (invoices.issue_date >= start, invoices.issue_date < end)
+
+        fingerprint = ",".join(str(value) for value in connection.execute(
+            select(func.count(), *(func.coalesce(func.sum(column), 0) for column in (
+                invoices.id, invoices.revision, invoices.total_items, invoices.total_translation_price,
+                invoices.translator_employee_id)))
+            .where(*in_month)
+        ).one())
+        months = TranslatorRollupMonthModel.__table__
+        month_filter = (months.c.jalali_year == year, months.c.jalali_month == month)
+        if not force and connection.execute(
+                select(months.c.fingerprint).where(*month_filter)).scalar() == fingerprint:
+            return False
+
+        totals = connection.execute(
+            select(invoices.translator_employee_id, func.count(), func.coalesce(func.sum(invoices.total_items), 0),
+                   func.coalesce(func.sum(invoices.total_translation_price), 0))
+            .where(*in_month)
+            .group_by(invoices.translator_employee_id)
+        ).all()
+
+        stats = TranslatorMonthlyStatsModel.__table__
+        connection.execute(delete(stats).where(stats.c.jalali_year == year, stats.c.jalali_month == month))
+        if totals:
+            connection.execute(insert(stats), [
+                {"jalali_year": year, "jalali_month": month, "translator_id": translator_id,
+                 "invoice_count": invoice_count, "document_count": document_count,
+                 "translation_total": translation_total}
+                for translator_id, invoice_count, document_count, translation_total in totals
+            ])
+        connection.execute(delete(months).where(*month_filter))
+        connection.execute(insert(months).values(jalali_year=year, jalali_month=month, fingerprint=fingerprint,
+                                                 refreshed_at=datetime.now()))
+        logger.debug(f"Rolled up {len(totals)} translators for {year}/{month:02d}.")
+        return True
+
+    def rebuild(self, connection) -> int:
+        """Recomputes every month that has invoices. Returns the number of months rolled up."""
+        day = func.date(IssuedInvoiceModel.__table__.c.issue_date)
+        months = set()
+        for (day_value,) in connection.execute(select(day).group_by(day)):
+            if day_value is not None:
+                jalali = jdatetime.date.fromgregorian(date=date.fromisoformat(day_value))
+                months.add((jalali.year, jalali.month))
+        for year, month in sorted(months):
+            self.refresh_month(connection, year, month, force=True)
+        return len(months)
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _stats_statement(year: int, month: int):
+        # Names are joined at read time, so a renamed translator shows under the new name.
+        stats = TranslatorMonthlyStatsModel
+        return (
+            select(stats.translator_id, func.coalesce(TranslatorModel.full_name, UNASSIGNED_TRANSLATOR),
+                   stats.invoice_count, stats.document_count, stats.translation_total)
+            .outerjoin(TranslatorModel, TranslatorModel.id == stats.translator_id)
+            .where(stats.jalali_year == year, stats.jalali_month == month)
+        )
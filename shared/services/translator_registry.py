@@ -0,0 +1,225 @@
+# shared/services/translator_registry.py
+
+"""
+Translator identities for the issued invoices.
+
+Invoices record the translator's name as free text. Every name is mapped to a
+row of the ``translators`` table (matched on a normalized key, so Arabic and
+Persian letter variants, ZWNJs and extra spaces do not split one translator in
+two) and the invoice carries that row's integer id in
+``translator_employee_id``. Aggregations group on the id, so renaming a
+translator is a single-row update.
+
+Translators are linked to the payroll employees by ``employee_id``. Payroll
+links the employees it pays; ``reconcile`` links every employee and reports
+the invoice names that match no employee:
+
+    python -m shared.services.translator_registry
+"""
+
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Engine, delete, func, insert, inspect, select, update
+
+from shared.orm_models.business_models import IssuedInvoiceModel, TranslatorModel
+
+logger = logging.getLogger(__name__)
+
+UNASSIGNED_TRANSLATOR = "نامشخص"
+
+_LETTER_VARIANTS = str.maketrans({"ي": "ی", "ى": "ی", "ك": "ک", "‌": " ", "ـ": None})
+
+# Whether the translators table exists, per engine; databases created from the legacy
+# invoice models alone do not have it.
+_has_registry: WeakKeyDictionary[Engine, bool] = WeakKeyDictionary()
+
+
+def translator_name_key(name: Optional[str]) -> Optional[str]:
+    """The matching key of a translator name, or None for a blank or unassigned translator."""
+    if not name:
+        return None
+    key = " ".join(str(name).translate(_LETTER_VARIANTS).split())
+    if not key or key == UNASSIGNED_TRANSLATOR:
+        return None
+    return key
+
+
+@dataclass
+class TranslatorReconciliation:
+    """Outcome of linking translator names to payroll employees and backfilling the invoices."""
+    linked: dict[str, str] = field(default_factory=dict)  # translator name -> employee_id
+    renamed: dict[str, str] = field(default_factory=dict)  # old name -> new name
+    unmatched: list[str] = field(default_factory=list)  # invoice names matching no employee
+    ambiguous: list[str] = field(default_factory=list)  # names shared by several employees, left unlinked
+    backfilled_invoices: int = 0
+    unassigned_invoices: int = 0  # blank or "نامشخص" translator
+
+    def summary(self) -> str:
+        lines = [f"Backfilled {self.backfilled_invoices} invoices, {self.unassigned_invoices} have no translator.",
+                 f"Linked {len(self.linked)} translators to employees, renamed {len(self.renamed)}."]
+        lines += [f"  renamed: {old} -> {new}" for old, new in self.renamed.items()]
+        lines += [f"  no matching employee: {name}" for name in self.unmatched]
+        lines += [f"  several employees named: {name}" for name in self.ambiguous]
+        return "\n".join(lines)
+
+
+class TranslatorRegistry:
+    """Stateless; every method takes a Session or Connection and runs inside the caller's transaction."""
+
+    def resolve(self, connection, name: Optional[str]) -> Optional[int]:
+        """The translator id for a name, registering the name if it is new. None when unassigned."""
+        key = translator_name_key(name)
+        if key is None:
+            return None
+        translators = TranslatorModel.__table__
+        translator_id = connection.execute(
+            select(translators.c.id).where(translators.c.name_key == key)
+        ).scalar()
+        if translator_id is None:
+            translator_id = connection.execute(insert(translators).values(
+                full_name=" ".join(str(name).split()), name_key=key, created_at=datetime.now(timezone.utc)
+            )).inserted_primary_key[0]
+        return translator_id
+
+    def assign(self, connection, invoice) -> None:
+        """
+        Sets ``invoice.translator_employee_id`` from its translator name when the invoice
+        is new or its translator changed. Called from the invoice models' flush listeners.
+        """
+        state = inspect(invoice)
+        if state.persistent and not state.attrs.translator.history.has_changes():
+            return
+        if not self._registry_exists(connection):
+            return
+        invoice.translator_employee_id = self.resolve(connection, invoice.translator)
+
+    def link_employees(self, connection, employees: Iterable[tuple[str, str]],
+                       report: Optional[TranslatorReconciliation] = None) -> dict[str, int]:
+        """
+        Links payroll employees, given as (employee_id, full name), to their translator rows
+        and returns {employee_id: translator id}. A linked employee whose name changed has
+        the row renamed (merging any unlinked row already registered under the new name);
+        names shared by several employees are left unlinked.
+        """
+        report = report or TranslatorReconciliation()
+        employees = [(employee_id, name, translator_name_key(name)) for employee_id, name in employees]
+        translators = TranslatorModel.__table__
+        rows = connection.execute(select(translators.c.id, translators.c.employee_id,
+                                         translators.c.full_name, translators.c.name_key)).all()
+        by_employee = {row.employee_id: row for row in rows if row.employee_id}
+        by_key = {row.name_key: row for row in rows}
+        key_counts = Counter(key for employee_id, name, key in employees if employee_id not in by_employee)
+
+        ids = {}
+        for employee_id, name, key in employees:
+            if key is None:
+                continue
+            row = by_employee.get(employee_id)
+            if row is not None:
+                if row.name_key != key:
+                    self._rename(connection, row, name, key, by_key.get(key), report)
+                ids[employee_id] = row.id
+                continue
+
+            if key_counts[key] > 1:
+                if name not in report.ambiguous:
+                    report.ambiguous.append(name)
+                continue
+            existing = by_key.get(key)
+            if existing is None:
+                ids[employee_id] = connection.execute(insert(translators).values(
+                    employee_id=employee_id, full_name=name, name_key=key, created_at=datetime.now(timezone.utc)
+                )).inserted_primary_key[0]
+            elif existing.employee_id is None:
+                connection.execute(update(translators).where(translators.c.id == existing.id)
+                                   .values(employee_id=employee_id))
+                ids[employee_id] = existing.id
+                report.linked[existing.full_name] = employee_id
+            elif name not in report.ambiguous:
+                # The name already belongs to another employee.
+                report.ambiguous.append(name)
+        return ids
+
+    def backfill(self, connection, report: Optional[TranslatorReconciliation] = None) -> TranslatorReconciliation:
+        """Fills translator_employee_id of the invoices that lack it, one update per distinct name."""
+        report = report or TranslatorReconciliation()
+        invoices = IssuedInvoiceModel.__table__
+        names = connection.execute(
+            select(invoices.c.translator, func.count())
+            .where(invoices.c.translator_employee_id.is_(None))
+            .group_by(invoices.c.translator)
+        ).all()
+        for name, count in names:
+            translator_id = self.resolve(connection, name)
+            if translator_id is None:
+                report.unassigned_invoices += count
+                continue
+            connection.execute(
+                update(invoices)
+                .where(invoices.c.translator == name, invoices.c.translator_employee_id.is_(None))
+                .values(translator_employee_id=translator_id, revision=invoices.c.revision + 1)
+            )
+            report.backfilled_invoices += count
+        return report
+
+    def reconcile(self, connection, employees: Iterable[tuple[str, str]]) -> TranslatorReconciliation:
+        """Backfills the invoices, links every employee and lists the translators left without one."""
+        report = self.backfill(connection)
+        self.link_employees(connection, employees, report)
+        translators = TranslatorModel.__table__
+        report.unmatched = list(connection.execute(
+            select(translators.c.full_name).where(translators.c.employee_id.is_(None))
+            .order_by(translators.c.full_name)
+        ).scalars())
+        return report
+
+    # ------------------------------------------------------------------
+    # PRIVATE HELPERS
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _rename(connection, row, name: str, key: str, duplicate, report: TranslatorReconciliation) -> None:
+        translators = TranslatorModel.__table__
+        if duplicate is not None:
+            if duplicate.employee_id is not None:
+                # Another employee already carries the new name; keep the old one.
+                if name not in report.ambiguous:
+                    report.ambiguous.append(name)
+                return
+            invoices = IssuedInvoiceModel.__table__
+            connection.execute(
+                update(invoices).where(invoices.c.translator_employee_id == duplicate.id)
+                .values(translator_employee_id=row.id, revision=invoices.c.revision + 1)
+            )
+            connection.execute(delete(translators).where(translators.c.id == duplicate.id))
+        connection.execute(update(translators).where(translators.c.id == row.id)
+                           .values(full_name=name, name_key=key))
+        report.renamed[row.full_name] = name
+
+    @staticmethod
+    def _registry_exists(connection) -> bool:
+        engine = connection.engine
+        if engine not in _has_registry:
+            _has_registry[engine] = inspect(connection).has_table(TranslatorModel.__tablename__)
+        return _has_registry[engine]
+
+
+if __name__ == "__main__":
+    from sqlalchemy import create_engine
+
+    from config.config import DATABASE_PATHS
+    from shared.orm_models.payroll_models import EmployeeModel
+
+    logging.basicConfig(level=logging.INFO)
+    payroll_engine = create_engine(f"sqlite:///{DATABASE_PATHS['payroll']}")
+    with payroll_engine.connect() as payroll_connection:
+        all_employees = payroll_connection.execute(
+            select(EmployeeModel.employee_id, EmployeeModel.first_name + " " + EmployeeModel.last_name)
+        ).all()
+    with create_engine(f"sqlite:///{DATABASE_PATHS['business']}").begin() as business_connection:
+        print(TranslatorRegistry().reconcile(business_connection, all_employees).summary())
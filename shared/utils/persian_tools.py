@@ -2,6 +2,7 @@
 
 import jdatetime
 from datetime import date
+from functools import lru_cache
 from shared.enums import DeliveryStatus
 
 # Mapping of Persian to English numbers
@@ -110,3 +111,132 @@ def number_to_words_fa(n):
             word_parts.append(part)
 
     return ' و '.join(word_parts)
+
+
+# --- Visual-order Persian text for renderers without shaping (e.g. reportlab) ---
+
+# Presentation forms per letter: (isolated, final, initial, medial); right-joining
+# letters only have the first two.
+_JOINING_FORMS = {
+    'ء': ('ﺀ',),
+    'آ': ('ﺁ', 'ﺂ'), 'أ': ('ﺃ', 'ﺄ'), 'ؤ': ('ﺅ', 'ﺆ'),
+    'إ': ('ﺇ', 'ﺈ'), 'ئ': ('ﺉ', 'ﺊ', 'ﺋ', 'ﺌ'), 'ا': ('ﺍ', 'ﺎ'),
+    'ب': ('ﺏ', 'ﺐ', 'ﺑ', 'ﺒ'), 'ة': ('ﺓ', 'ﺔ'),
+    'ت': ('ﺕ', 'ﺖ', 'ﺗ', 'ﺘ'), 'ث': ('ﺙ', 'ﺚ', 'ﺛ', 'ﺜ'),
+    'ج': ('ﺝ', 'ﺞ', 'ﺟ', 'ﺠ'), 'ح': ('ﺡ', 'ﺢ', 'ﺣ', 'ﺤ'),
+    'خ': ('ﺥ', 'ﺦ', 'ﺧ', 'ﺨ'), 'د': ('ﺩ', 'ﺪ'), 'ذ': ('ﺫ', 'ﺬ'),
+    'ر': ('ﺭ', 'ﺮ'), 'ز': ('ﺯ', 'ﺰ'), 'س': ('ﺱ', 'ﺲ', 'ﺳ', 'ﺴ'),
+    'ش': ('ﺵ', 'ﺶ', 'ﺷ', 'ﺸ'), 'ص': ('ﺹ', 'ﺺ', 'ﺻ', 'ﺼ'),
+    'ض': ('ﺽ', 'ﺾ', 'ﺿ', 'ﻀ'), 'ط': ('ﻁ', 'ﻂ', 'ﻃ', 'ﻄ'),
+    'ظ': ('ﻅ', 'ﻆ', 'ﻇ', 'ﻈ'), 'ع': ('ﻉ', 'ﻊ', 'ﻋ', 'ﻌ'),
+    'غ': ('ﻍ', 'ﻎ', 'ﻏ', 'ﻐ'), 'ف': ('ﻑ', 'ﻒ', 'ﻓ', 'ﻔ'),
+    'ق': ('ﻕ', 'ﻖ', 'ﻗ', 'ﻘ'), 'ك': ('ﻙ', 'ﻚ', 'ﻛ', 'ﻜ'),
+    'ل': ('ﻝ', 'ﻞ', 'ﻟ', 'ﻠ'), 'م': ('ﻡ', 'ﻢ', 'ﻣ', 'ﻤ'),
+    'ن': ('ﻥ', 'ﻦ', 'ﻧ', 'ﻨ'), 'ه': ('ﻩ', 'ﻪ', 'ﻫ', 'ﻬ'),
+    'و': ('ﻭ', 'ﻮ'), 'ي': ('ﻱ', 'ﻲ', 'ﻳ', 'ﻴ'),
+    'پ': ('ﭖ', 'ﭗ', 'ﭘ', 'ﭙ'), 'چ': ('ﭺ', 'ﭻ', 'ﭼ', 'ﭽ'),
+    'ژ': ('ﮊ', 'ﮋ'), 'ک': ('ﮎ', 'ﮏ', 'ﮐ', 'ﮑ'),
+    'گ': ('ﮒ', 'ﮓ', 'ﮔ', 'ﮕ'), 'ی': ('ﯼ', 'ﯽ', 'ﯾ', 'ﯿ'),
+}
+# Lam followed by one of these alefs becomes a single (isolated, final) ligature.
+_LAM_ALEF = {'آ': ('ﻵ', 'ﻶ'), 'أ': ('ﻷ', 'ﻸ'), 'إ': ('ﻹ', 'ﻺ'),
+             'ا': ('ﻻ', 'ﻼ')}
+_TATWEEL = '\u0640'
+_ZWNJ = '\u200c'
+_MIRRORED = str.maketrans('()[]{}<>«»', ')(][}{><»«')
+
+
+def _is_transparent(char: str) -> bool:
+    return '\u064b' <= char <= '\u065f' or char == '\u0670'
+
+
+def _joins_forward(char: str) -> bool:
+    return char == _TATWEEL or len(_JOINING_FORMS.get(char, ())) == 4
+
+
+def _joins_backward(char: str) -> bool:
+    return char == _TATWEEL or len(_JOINING_FORMS.get(char, ())) >= 2
+
+
+def _shape(text: str) -> str:
+    """Replaces Persian/Arabic letters with their contextual presentation forms (logical order)."""
+    chars = list(text)
+    shaped = []
+    previous = None  # last non-transparent character
+    i = 0
+    while i < len(chars):
+        char = chars[i]
+        if char not in _JOINING_FORMS:
+            if char != _ZWNJ:
+                shaped.append(char)
+            if not _is_transparent(char):
+                previous = char
+            i += 1
+            continue
+
+        following = next((c for c in chars[i + 1:] if not _is_transparent(c)), None)
+        joined_before = previous is not None and _joins_forward(previous)
+        if char == 'ل' and following in _LAM_ALEF:
+            shaped.append(_LAM_ALEF[following][1 if joined_before else 0])
+            i = chars.index(following, i + 1) + 1
+            previous = following
+            continue
+
+        forms = _JOINING_FORMS[char]
+        joined_after = len(forms) == 4 and following is not None and _joins_backward(following)
+        if len(forms) == 1:
+            shaped.append(forms[0])
+        elif joined_before and joined_after:
+            shaped.append(forms[3])
+        elif joined_before:
+            shaped.append(forms[1])
+        elif joined_after:
+            shaped.append(forms[2])
+        else:
+            shaped.append(forms[0])
+        previous = char
+        i += 1
+    return ''.join(shaped)
+
+
+def _direction(char: str) -> str:
+    """'R' for Persian/Arabic letters, 'L' for Latin letters and all digits, 'N' for neutrals."""
+    if char.isdigit():
+        return 'L'
+    if '\u0600' <= char <= '\u06ff' or '\ufb50' <= char <= '\ufeff':
+        return 'R'
+    return 'L' if char.isalpha() else 'N'
+
+
+@lru_cache(maxsize=8192)
+def to_visual_rtl(text) -> str:
+    """
+    Shapes and reorders a single line of Persian text for renderers that draw
+    glyphs left-to-right without any shaping of their own (reportlab).
+
+    Letters get their joined presentation forms and the line is laid out
+    right-to-left, while numbers and Latin runs keep their own order - unlike a
+    plain ``[::-1]``, which also reverses digits and leaves letters unjoined.
+    """
+    text = _shape(str(text))
+    directions = [_direction(char) for char in text]
+
+    # Neutrals between two left-to-right runs stay with them; all others follow the RTL base.
+    for i, direction in enumerate(directions):
+        if direction != 'N':
+            continue
+        before = next((d for d in reversed(directions[:i]) if d != 'N'), 'R')
+        after = next((d for d in directions[i + 1:] if d != 'N'), 'R')
+        directions[i] = 'L' if before == after == 'L' else 'R'
+
+    runs = []
+    for char, direction in zip(text, directions):
+        if runs and runs[-1][0] == direction:
+            runs[-1][1].append(char)
+        else:
+            runs.append((direction, [char]))
+
+    return ''.join(
+        ''.join(chars) if direction == 'L' else ''.join(reversed(chars)).translate(_MIRRORED)
+        for direction, chars in reversed(runs)
+    )
@@ -1,7 +1,10 @@
 # shared/utils/text_utils.py
 
+import re
 from num2fawords import words
 
+_INVOICE_VERSION_SUFFIX = re.compile(r'^(?P<base>.+?)-v(?P<version>\d+)$')
+
 
 def amount_to_persian_words(amount: int) -> str:
     """
@@ -11,3 +14,19 @@ def amount_to_persian_words(amount: int) -> str:
     if amount == 0:
         return ""
     return words(amount)
+
+
+def split_invoice_version(invoice_number: str) -> tuple[str, int]:
+    """
+    Splits an invoice number into its base number and version.
+    'INV-101' -> ('INV-101', 1), 'INV-101-v3' -> ('INV-101', 3).
+    """
+    match = _INVOICE_VERSION_SUFFIX.match(invoice_number)
+    if not match:
+        return invoice_number, 1
+    return match.group('base'), int(match.group('version'))
+
+
+def format_invoice_version(base_invoice_number: str, version: int) -> str:
+    """Inverse of split_invoice_version: version 1 is the bare base number."""
+    return base_invoice_number if version <= 1 else f"{base_invoice_number}-v{version}"
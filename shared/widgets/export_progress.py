@@ -0,0 +1,133 @@
+# shared/widgets/export_progress.py
+
+"""
+Runs a long export in a worker thread behind a cancellable progress dialog.
+
+The job is any callable ``job(progress, is_cancelled) -> result`` - in
+practice a StreamingExporter.export call returning the rows written - so the
+GUI thread stays responsive and the user can cancel between batches.
+"""
+
+import threading
+from typing import Any, Callable, Optional
+
+from PySide6.QtCore import QObject, QThread, Qt, Signal, Slot
+from PySide6.QtWidgets import QProgressDialog, QWidget
+
+from shared.services.streaming_exporter import CancelCheck, ExportCancelled, ProgressCallback
+
+# Returns the number of rows written, or any result the on_finished callback expects.
+ExportJob = Callable[[ProgressCallback, CancelCheck], Any]
+
+# Keeps running workers (and their threads and GUI-side receivers) alive until they finish.
+_running: dict["ExportWorker", "_GuiCallbacks"] = {}
+
+
+class ExportWorker(QObject):
+    progress = Signal(int, int)  # rows written, total rows (-1 when unknown)
+    finished = Signal(object)  # the job's result
+    failed = Signal(str)
+    cancelled = Signal()
+
+    def __init__(self, job: ExportJob):
+        super().__init__()
+        self._job = job
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Thread-safe; the job stops at its next batch boundary."""
+        self._cancel_event.set()
+
+    @Slot()
+    def run(self):
+        try:
+            result = self._job(lambda done, total: self.progress.emit(done, -1 if total is None else total),
+                               self._cancel_event.is_set)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(result)
+
+
+class _GuiCallbacks(QObject):
+    """
+    Lives in the GUI thread, so the worker's signals reach it queued and the dialog
+    and the caller's callbacks are only ever touched from the GUI thread.
+    """
+
+    def __init__(self, worker: ExportWorker, thread: QThread, dialog: QProgressDialog, label: str,
+                 on_finished: Callable[[Any], None], on_failed: Optional[Callable[[str], None]]):
+        super().__init__()
+        self._worker = worker
+        self._thread = thread
+        self._dialog = dialog
+        self._label = label
+        self._on_finished = on_finished
+        self._on_failed = on_failed
+
+    @Slot(int, int)
+    def on_progress(self, done: int, total: int):
+        if total > 0:
+            self._dialog.setMaximum(total)
+            self._dialog.setValue(min(done, total))
+        self._dialog.setLabelText(f"{self._label}\n{done:,}")
+
+    @Slot(object)
+    def on_finished(self, result):
+        self._stop()
+        self._on_finished(result)
+
+    @Slot(str)
+    def on_failed(self, error: str):
+        self._stop()
+        if self._on_failed:
+            self._on_failed(error)
+
+    @Slot()
+    def on_cancelled(self):
+        self._stop()
+
+    @Slot()
+    def on_canceled_by_user(self):
+        # Not a queued call into the worker: its thread is busy running the job.
+        self._worker.cancel()
+
+    @Slot()
+    def on_thread_finished(self):
+        _running.pop(self._worker, None)
+
+    def _stop(self):
+        self._dialog.close()
+        self._thread.quit()
+
+
+def run_export_with_progress(parent: QWidget, job: ExportJob, label: str,
+                             on_finished: Callable[[Any], None],
+                             on_failed: Optional[Callable[[str], None]] = None) -> ExportWorker:
+    """
+    Starts ``job`` on a QThread and shows its progress. Call it from the GUI thread;
+    on_finished (with the job's result) and on_failed run on the GUI thread.
+    """
+    dialog = QProgressDialog(label, "انصراف", 0, 0, parent)
+    dialog.setWindowModality(Qt.WindowModality.WindowModal)
+    dialog.setMinimumDuration(300)
+
+    thread = QThread(parent)
+    worker = ExportWorker(job)
+    worker.moveToThread(thread)
+    callbacks = _GuiCallbacks(worker, thread, dialog, label, on_finished, on_failed)
+    _running[worker] = callbacks
+
+    thread.started.connect(worker.run)
+    worker.progress.connect(callbacks.on_progress)
+    worker.finished.connect(callbacks.on_finished)
+    worker.failed.connect(callbacks.on_failed)
+    worker.cancelled.connect(callbacks.on_cancelled)
+    dialog.canceled.connect(callbacks.on_canceled_by_user)
+    thread.finished.connect(callbacks.on_thread_finished)
+    thread.finished.connect(thread.deleteLater)
+
+    thread.start()
+    return worker
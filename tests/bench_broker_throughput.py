@@ -0,0 +1,249 @@
+# tests/bench_broker_throughput.py
+
+"""
+Load test for the chat broker: N simulated clients speaking the ChatClient
+protocol, spread over M chat rooms, sending at a fixed aggregate rate.
+
+Reports delivery latency (p50/p99), delivered messages per second, messages
+lost (expected deliveries that never arrived), and the broker process's CPU
+and peak memory. The broker is started as a subprocess on a free localhost
+port; CPU and memory are read from /proc and reported as n/a elsewhere.
+
+Not collected by pytest. Run from the repository root:
+
+    python -m tests.bench_broker_throughput --clients 200 --rooms 20 --rate 2000 --duration 10
+    python -m tests.bench_broker_throughput --json before.json
+    python -m tests.bench_broker_throughput --baseline before.json
+
+"Slow" clients register but stop reading until the send phase is over, which
+exercises the broker's per-client queues and overflow policy.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SETTLE_SECONDS = 0.5
+
+
+class SimulatedClient:
+    """One workstation: registers for its rooms and timestamps every message it receives."""
+
+    def __init__(self, user_id: int, chat_ids: list[int], slow: bool):
+        self.user_id = user_id
+        self.chat_ids = chat_ids
+        self.slow = slow
+        self.latencies = []
+        self.reader = self.writer = None
+        self._reading = asyncio.Event()
+        if not slow:
+            self._reading.set()
+
+    async def connect(self, port: int):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port, limit=2 ** 20)
+        self._send({"type": "register", "user_id": self.user_id, "chat_ids": self.chat_ids})
+        await self.writer.drain()
+
+    def send_message(self, chat_id: int, seq: int, padding: str):
+        self._send({"type": "message", "chat_id": chat_id,
+                    "payload": {"seq": seq, "sent": time.perf_counter(), "content": padding}})
+
+    def start_reading(self):
+        self._reading.set()
+
+    async def listen(self):
+        await self._reading.wait()
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            message = json.loads(line)
+            self.latencies.append(time.perf_counter() - message["payload"]["sent"])
+
+    def _send(self, data: dict):
+        self.writer.write((json.dumps(data) + "\n").encode())
+
+
+class BrokerProcess:
+    """The broker under test, started with ``python -m server.broker``."""
+
+    def __init__(self, queue_size: int, overflow: str, log_dir: str):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "server.broker", "--host", "127.0.0.1", "--port", str(self.port),
+             "--queue-size", str(queue_size), "--overflow", overflow, "--log-dir", log_dir,
+             "--attachment-dir", ""],
+            cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    async def wait_ready(self, timeout: float = 10.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", self.port)
+                writer.close()
+                return
+            except OSError:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    raise RuntimeError("The broker did not start.")
+                await asyncio.sleep(0.05)
+
+    def cpu_seconds(self):
+        try:
+            fields = Path(f"/proc/{self.process.pid}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        # utime and stime are the 14th and 15th fields of /proc/<pid>/stat.
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    def peak_rss_mib(self):
+        try:
+            status = Path(f"/proc/{self.process.pid}/status").read_text()
+        except OSError:
+            return None
+        for line in status.splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+        return None
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+def _percentile(values: list[float], percent: int):
+    if len(values) < 2:
+        return values[0] if values else None
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+async def _run(args) -> dict:
+    rng = random.Random(args.seed)
+    log_dir = tempfile.TemporaryDirectory() if args.message_log else None
+    broker = BrokerProcess(args.queue_size, args.overflow, log_dir.name if log_dir else "")
+    try:
+        await broker.wait_ready()
+        rooms_per_client = min(args.rooms_per_client, args.rooms)
+        clients = [
+            SimulatedClient(user_id, [(user_id + k) % args.rooms for k in range(rooms_per_client)],
+                            slow=user_id < args.slow_clients)
+            for user_id in range(1, args.clients + 1)
+        ]
+        members = {}
+        for client in clients:
+            await client.connect(broker.port)
+            for chat_id in client.chat_ids:
+                members[chat_id] = members.get(chat_id, 0) + 1
+        listeners = [asyncio.create_task(client.listen()) for client in clients]
+        await asyncio.sleep(SETTLE_SECONDS)  # registrations are not acknowledged
+
+        padding = "x" * args.payload_bytes
+        total = int(args.rate * args.duration)
+        senders = [client for client in clients if not client.slow] or clients
+        expected = 0
+        cpu_before, started = broker.cpu_seconds(), time.perf_counter()
+        for seq in range(total):
+            # Paced against the start time, so a slow iteration does not lower the rate.
+            delay = started + seq / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            sender = rng.choice(senders)
+            chat_id = rng.choice(sender.chat_ids)
+            sender.send_message(chat_id, seq, padding)
+            expected += members[chat_id] - 1
+        await asyncio.gather(*(client.writer.drain() for client in senders))
+        send_seconds = time.perf_counter() - started
+
+        for client in clients:
+            client.start_reading()
+        deadline = time.perf_counter() + args.drain_timeout
+        while sum(len(client.latencies) for client in clients) < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        cpu_after = broker.cpu_seconds()
+
+        for listener in listeners:
+            listener.cancel()
+        for client in clients:
+            client.writer.close()
+
+        # Latency only of the clients that were reading throughout.
+        latencies = sorted(latency for client in clients if not client.slow for latency in client.latencies)
+        received = sum(len(client.latencies) for client in clients)
+        p50, p99 = _percentile(latencies, 50), _percentile(latencies, 99)
+        return {
+            "clients": args.clients, "rooms": args.rooms, "rate": args.rate, "duration": args.duration,
+            "sent": total, "send_rate": total / send_seconds,
+            "expected": expected, "received": received, "dropped": expected - received,
+            "delivered_per_second": received / elapsed,
+            "p50_ms": None if p50 is None else p50 * 1000,
+            "p99_ms": None if p99 is None else p99 * 1000,
+            "broker_cpu_percent": None if cpu_before is None or cpu_after is None
+            else 100 * (cpu_after - cpu_before) / elapsed,
+            "broker_peak_rss_mib": broker.peak_rss_mib(),
+        }
+    finally:
+        broker.stop()
+        if log_dir:
+            log_dir.cleanup()
+
+
+def _format(value) -> str:
+    if value is None:
+        return "n/a"
+    return f"{value:,.2f}" if isinstance(value, float) else f"{value:,}"
+
+
+def report(result: dict, baseline: dict = None) -> None:
+    metrics = ("sent", "send_rate", "expected", "received", "dropped", "delivered_per_second",
+               "p50_ms", "p99_ms", "broker_cpu_percent", "broker_peak_rss_mib")
+    header = f"{'metric':<22} {'value':>14}"
+    print(header + (f" {'baseline':>14} {'change':>8}" if baseline else ""))
+    for metric in metrics:
+        line = f"{metric:<22} {_format(result[metric]):>14}"
+        if baseline:
+            before, after = baseline.get(metric), result[metric]
+            change = f"{100 * (after - before) / before:+.1f}%" if before and after is not None else ""
+            line += f" {_format(before):>14} {change:>8}"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--rooms", type=int, default=10)
+    parser.add_argument("--rooms-per-client", type=int, default=2)
+    parser.add_argument("--rate", type=float, default=1000, help="messages sent per second, all clients together")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of sending")
+    parser.add_argument("--payload-bytes", type=int, default=200)
+    parser.add_argument("--slow-clients", type=int, default=0, help="clients that do not read while sending")
+    parser.add_argument("--queue-size", type=int, default=256, help="broker's per-client queue size")
+    parser.add_argument("--overflow", default="drop_oldest", help="broker's overflow policy")
+    parser.add_argument("--message-log", action=argparse.BooleanOptionalAction, default=True,
+                        help="let the broker log messages (to a temporary directory)")
+    parser.add_argument("--drain-timeout", type=float, default=5, help="seconds to wait for deliveries after sending")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    parser.add_argument("--baseline", type=Path, help="compare with the results of an earlier --json run")
+    args = parser.parse_args()
+
+    result = asyncio.run(_run(args))
+    report(result, json.loads(args.baseline.read_text()) if args.baseline else None)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# tests/bench_invoice_rows_memory.py
+
+"""
+Memory benchmark for the invoice list: full ORM hydration into InvoiceData
+versus the compact InvoiceRow read-model fetched through a Core select.
+
+Not collected by pytest. Run from the repository root:
+
+    python -m tests.bench_invoice_rows_memory --sizes 100000 1000000
+"""
+
+import argparse
+import gc
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+
+from features.Invoice_Table.invoice_table_repo import BusinessRepository
+from shared.orm_models.business_models import BaseBusiness, IssuedInvoiceModel
+from shared.session_provider import ManagedSessionProvider
+
+BATCH_SIZE = 50_000
+
+
+def _populate(engine, count: int) -> None:
+    start = datetime(2024, 1, 1)
+    with engine.begin() as connection:
+        for offset in range(0, count, BATCH_SIZE):
+            connection.execute(insert(IssuedInvoiceModel), [
+                {
+                    "invoice_number": f"INV-{n:07d}", "base_invoice_number": f"INV-{n:07d}", "version": 1,
+                    "name": f"مشتری {n}", "national_id": f"{n:010d}", "phone": f"0912{n:07d}",
+                    "issue_date": start + timedelta(minutes=n), "delivery_date": start + timedelta(days=3),
+                    "translator": "مترجم", "total_items": 2, "total_amount": 150_000, "final_amount": 150_000,
+                    "source_language": "فارسی", "target_language": "انگلیسی",
+                }
+                for n in range(offset, min(offset + BATCH_SIZE, count))
+            ])
+
+
+def _measure(session_provider: ManagedSessionProvider, load) -> tuple[float, float, float]:
+    """Returns (retained MiB, peak MiB, seconds) for keeping the loaded list alive."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with session_provider() as session:
+        rows = load(session)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return retained / 2 ** 20, peak / 2 ** 20, elapsed
+
+
+def run(sizes: list[int]) -> None:
+    repo = BusinessRepository()
+    paths = {
+        "ORM -> InvoiceData": repo.get_all_invoices,
+        "Core -> InvoiceRow": repo.get_invoice_rows,
+    }
+
+    print(f"{'invoices':>10}  {'path':<20} {'retained MiB':>13} {'peak MiB':>10} {'seconds':>8}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{Path(tmp) / 'business.db'}")
+            BaseBusiness.metadata.create_all(engine)
+            _populate(engine, size)
+            session_provider = ManagedSessionProvider(engine)
+
+            for label, load in paths.items():
+                retained, peak, elapsed = _measure(session_provider, load)
+                print(f"{size:>10,}  {label:<20} {retained:>13.1f} {peak:>10.1f} {elapsed:>8.2f}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    run(parser.parse_args().sizes)
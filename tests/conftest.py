@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from shared.orm_models.business_models import IssuedInvoiceModel
+
+
+@pytest.fixture
+def business_engine(tmp_path):
+    """An empty business database file; tests create the tables or migrate it themselves."""
+    return create_engine(f"sqlite:///{tmp_path / 'business.db'}")
+
+
+@pytest.fixture
+def make_invoice():
+    """Builds an IssuedInvoiceModel whose translation price, total and final amount are all ``amount``."""
+    def make(number, translator="Ali", issue_date=datetime(2024, 4, 1), national_id="1", items=1, amount=10):
+        return IssuedInvoiceModel(
+            invoice_number=number, name="مشتری", national_id=national_id, phone="2", issue_date=issue_date,
+            delivery_date=issue_date, translator=translator, total_items=items, total_translation_price=amount,
+            total_amount=amount, final_amount=amount, source_language="fa", target_language="en",
+        )
+    return make
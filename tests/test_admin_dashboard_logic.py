@@ -56,16 +56,16 @@ class TestAdminDashboardLogic(unittest.TestCase):
         This proves why Logic shouldn't be inside the Repo.
         """
         # Arrange: Create fake order objects
-        mock_order_1 = MagicMock(national_id="123", invoice_number="INV-001", name="Alice")
-        mock_order_2 = MagicMock(national_id="456", invoice_number="INV-002", name="Bob")
+        mock_order_1 = MagicMock(national_id="123", customer_id=1, invoice_number="INV-001", name="Alice")
+        mock_order_2 = MagicMock(national_id="456", customer_id=2, invoice_number="INV-002", name="Bob")
 
         # Setup Repo returns
         self.mock_repo.get_orders_needing_attention.return_value = [mock_order_1, mock_order_2]
         self.mock_repo.get_unpaid_collected_invoices.return_value = []  # Ignore this for this test
 
         # The critical part: Mocking the companion count dictionary lookup
-        # Logic expects: { "123": 2, "456": 0 }
-        self.mock_repo.get_companion_counts_for_customers.return_value = {"123": 2}
+        # Logic expects: { 1: 2, 2: 0 }, keyed by customer id
+        self.mock_repo.get_companion_counts_for_customers.return_value = {1: 2}
 
         # Act
         result = self.logic.get_attention_queue()
@@ -74,7 +74,7 @@ class TestAdminDashboardLogic(unittest.TestCase):
         # Assert
         # 1. Check if Logic correctly extracted IDs to call the companion repo method
         self.mock_repo.get_companion_counts_for_customers.assert_called_with(
-            self.mock_session, ["123", "456"]
+            self.mock_session, [1, 2]
         )
 
         # 2. Check if data was stitched correctly
@@ -0,0 +1,46 @@
+from datetime import datetime, date
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from shared.orm_models.business_models import BaseBusiness, IssuedInvoiceModel, InvoiceItemModel, ExpenseModel
+from shared.services.analytics_snapshot import AnalyticsSnapshotExporter
+from shared.session_provider import ManagedSessionProvider
+
+
+def _add_invoice(engine, number, issued):
+    with ManagedSessionProvider(engine)() as session:
+        invoice = IssuedInvoiceModel(
+            invoice_number=number, name="c", national_id=number, phone="1", issue_date=issued,
+            delivery_date=issued, translator="t", total_items=1, total_amount=10, final_amount=10,
+            source_language="fa", target_language="en",
+        )
+        invoice.items.append(InvoiceItemModel(service_id=1, service_name="s", quantity=1, total_price=10))
+        session.add(invoice)
+
+
+def test_snapshot_is_partitioned_by_jalali_month_and_refreshed_incrementally(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'business.db'}")
+    BaseBusiness.metadata.create_all(engine)
+    _add_invoice(engine, "INV-1", datetime(2024, 3, 19, 10))  # 1402/12/29
+    _add_invoice(engine, "INV-2", datetime(2024, 3, 20, 10))  # 1403/01/01
+    with ManagedSessionProvider(engine)() as session:
+        session.add(ExpenseModel(name="rent", amount=5, expense_date=date(2024, 3, 20), category="Rent"))
+    exporter = AnalyticsSnapshotExporter({"business": engine}, tmp_path / "snapshot", fmt="csv.gz")
+
+    first = exporter.run()
+
+    assert first.written == {"issued_invoices": ["1402/12", "1403/01"], "invoice_items": ["1402/12", "1403/01"],
+                             "expenses": ["1403/01"]}
+    invoices = pd.read_csv(tmp_path / "snapshot" / "issued_invoices" / "year=1403" / "month=01" / "part.csv.gz")
+    assert invoices["invoice_number"].tolist() == ["INV-2"]
+    assert exporter.run().written == {}
+
+    _add_invoice(engine, "INV-3", datetime(2024, 4, 25))  # 1403/02/06
+    with ManagedSessionProvider(engine)() as session:
+        session.query(IssuedInvoiceModel).filter_by(invoice_number="INV-1").one().remarks = "edited"
+
+    third = exporter.run()
+
+    assert third.written == {"issued_invoices": ["1402/12", "1403/02"], "invoice_items": ["1403/02"]}
+    assert third.unchanged == 4
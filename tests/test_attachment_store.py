@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+
+import pytest
+
+from server import broker
+from server.attachment_client import AttachmentClient
+from server.attachment_store import AttachmentError, AttachmentStore, digest_file
+
+
+@pytest.fixture
+def scan(tmp_path):
+    path = tmp_path / "scan.bin"
+    path.write_bytes(bytes(range(256)) * 400)  # 100 KiB
+    return path
+
+
+def test_chunks_become_a_blob_only_once_verified(tmp_path, scan):
+    store = AttachmentStore(tmp_path / "store", chunk_size=4096)
+    data = scan.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    assert store.write(digest, 0, data[:5000]) == 5000
+    with pytest.raises(AttachmentError):
+        store.write(digest, 4000, data[4000:])  # out of order
+    assert store.received(digest) == 5000 and not store.has(digest)
+    store.write(digest, 5000, data[5000:])
+    assert store.complete(digest, len(data)).read_bytes() == data
+    assert store.received(digest) == 0 and store.size(digest) == len(data)
+
+    other = "0" * 64
+    store.write(other, 0, b"not what was promised")
+    with pytest.raises(AttachmentError):
+        store.complete(other, 21)
+    assert store.received(other) == 0  # the next attempt starts over
+
+    with pytest.raises(AttachmentError):
+        store.path("../../etc/passwd")
+
+
+def test_thumbnails_are_generated_once(tmp_path):
+    from PySide6.QtGui import QColor, QImage
+
+    image = QImage(1200, 600, QImage.Format.Format_RGB32)
+    image.fill(QColor("red"))
+    image.save(str(tmp_path / "page.png"))
+    store = AttachmentStore(tmp_path / "store")
+    digest = store.add_file(tmp_path / "page.png")
+
+    thumbnail = store.thumbnail(digest, max_side=100)
+    assert QImage(str(thumbnail)).size().toTuple() == (100, 50)
+    assert store.thumbnail(digest, max_side=100) == thumbnail
+    (tmp_path / "notes.txt").write_text("not an image")
+    assert store.thumbnail(store.add_file(tmp_path / "notes.txt")) is None
+
+
+@pytest.fixture
+def attachment_port(tmp_path, monkeypatch):
+    monkeypatch.setattr(broker, "attachment_store", AttachmentStore(tmp_path / "broker", chunk_size=8192))
+    monkeypatch.setattr(broker, "uploads_in_progress", set())
+
+
+def _served(scenario):
+    async def run():
+        server = await asyncio.start_server(broker.handle_attachment_transfer, "127.0.0.1", 0)
+        async with server:
+            await scenario(server.sockets[0].getsockname()[1])
+    asyncio.run(run())
+
+
+def test_a_file_shared_twice_is_uploaded_once(attachment_port, tmp_path, scan):
+    async def scenario(port):
+        sender = AttachmentClient(AttachmentStore(tmp_path / "sender"), port=port)
+        digest = await sender.upload(scan)
+        assert broker.attachment_store.path(digest).read_bytes() == scan.read_bytes()
+
+        # Sent again (to another chat): the broker answers "exists" before any byte moves.
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write((json.dumps({"op": "upload", "sha256": digest, "size": scan.stat().st_size}) + "\n").encode())
+        assert json.loads(await reader.readline()) == {"status": "exists"}
+        writer.close()
+
+        for n in range(3):
+            receiver = AttachmentClient(AttachmentStore(tmp_path / f"receiver{n}"), port=port)
+            assert (await receiver.download(digest)).read_bytes() == scan.read_bytes()
+        receiver.port = 1  # a second fetch comes from the local store without connecting
+        assert await receiver.download(digest) == receiver.store.path(digest)
+
+    _served(scenario)
+
+
+def test_interrupted_transfers_resume_where_they_stopped(attachment_port, tmp_path, scan):
+    data = scan.read_bytes()
+    digest, size = digest_file(scan)
+
+    async def scenario(port):
+        # The upload connection drops after 30000 bytes.
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write((json.dumps({"op": "upload", "sha256": digest, "size": size}) + "\n").encode())
+        assert json.loads(await reader.readline()) == {"status": "ready", "offset": 0}
+        writer.write(data[:30000])
+        writer.close()
+        while broker.uploads_in_progress or broker.attachment_store.received(digest) < 30000:
+            await asyncio.sleep(0.01)
+
+        sender = AttachmentClient(AttachmentStore(tmp_path / "sender"), port=port)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write((json.dumps({"op": "upload", "sha256": digest, "size": size}) + "\n").encode())
+        assert json.loads(await reader.readline()) == {"status": "ready", "offset": 30000}
+        writer.close()
+        while broker.uploads_in_progress:
+            await asyncio.sleep(0.01)
+        await sender.upload(scan)
+        assert broker.attachment_store.has(digest)
+
+        # A download that already has the first 50000 bytes asks only for the rest.
+        receiver = AttachmentStore(tmp_path / "receiver")
+        receiver.write(digest, 0, data[:50000])
+        assert (await AttachmentClient(receiver, port=port).download(digest)).read_bytes() == data
+
+    _served(scenario)
+
+
+def test_uploads_above_the_size_limit_are_refused_before_any_byte(attachment_port, monkeypatch, tmp_path, scan):
+    monkeypatch.setattr(broker, "MAX_ATTACHMENT_BYTES", 50000)
+
+    async def scenario(port):
+        sender = AttachmentClient(AttachmentStore(tmp_path / "sender"), port=port)
+        with pytest.raises(AttachmentError, match="outside"):
+            await sender.upload(scan)
+        digest, _ = digest_file(scan)
+        assert broker.attachment_store.received(digest) == 0 and not broker.attachment_store.has(digest)
+
+    _served(scenario)
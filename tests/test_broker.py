@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import pytest
+
+from server import broker
+from server.framing import HEADER, BinaryFrameCodec
+from server.membership import MembershipRegistry
+
+
+class StalledWriter:
+    """A transport whose socket never drains, like a frozen workstation."""
+
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+        self.unblock = asyncio.Event()
+
+    def get_extra_info(self, name):
+        return ("10.0.0.9", 5000)
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+    async def drain(self):
+        await self.unblock.wait()
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def empty_broker(monkeypatch):
+    monkeypatch.setattr(broker, "registry", MembershipRegistry())
+
+
+def _payload(frame):
+    return json.loads(frame)["payload"]
+
+
+async def _connect(port, user_id, chat_ids):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write((json.dumps({"type": "register", "user_id": user_id, "chat_ids": chat_ids}) + "\n").encode())
+    await writer.drain()
+    return reader, writer
+
+
+def test_messages_reach_the_other_members_only():
+    async def scenario():
+        server = await asyncio.start_server(broker.handle_client, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            alice = await _connect(port, 1, [7])
+            bob = await _connect(port, 2, [7])
+            while broker.registry.metrics().users != 2:
+                await asyncio.sleep(0.01)
+
+            alice[1].write((json.dumps({"type": "message", "chat_id": 7, "payload": {"content": "hi"}}) + "\n")
+                           .encode())
+            received = json.loads(await asyncio.wait_for(bob[0].readline(), 2))
+            assert received == {"type": "new_message", "chat_id": 7, "payload": {"content": "hi"}}
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(alice[0].readline(), 0.2)
+
+            for _, writer in (alice, bob):
+                writer.close()
+            while broker.registry.metrics().connections:
+                await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+
+def test_a_stalled_client_does_not_delay_the_others():
+    async def scenario():
+        stalled = broker.ClientConnection(StalledWriter(), queue_size=2)
+        healthy_writer = StalledWriter()
+        healthy_writer.unblock.set()
+        healthy = broker.ClientConnection(healthy_writer)
+        broker.registry.register(stalled, 2, [7])
+        broker.registry.register(healthy, 3, [7])
+
+        for number in range(5):
+            assert broker.broadcast(7, None, b"%d" % number) == 2
+            if number == 0:
+                await asyncio.sleep(0)  # the stalled writer takes "0" and blocks in drain()
+        await asyncio.sleep(0.01)
+
+        assert [_payload(frame) for frame in healthy_writer.frames] == [0, 1, 2, 3, 4]
+        # The first frame is stuck in drain(); of the rest only the newest two are kept.
+        assert stalled.dropped == 2
+        stalled.writer.unblock.set()
+        await asyncio.sleep(0.01)
+        assert [_payload(frame) for frame in stalled.writer.frames] == [0, 3, 4]
+        for connection in (stalled, healthy):
+            await connection.wait_closed()
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_closes_the_slow_client():
+    async def scenario():
+        connection = broker.ClientConnection(StalledWriter(), queue_size=1,
+                                             overflow_policy=broker.OVERFLOW_DISCONNECT)
+        assert connection.send(b"a\n")
+        await asyncio.sleep(0)  # "a" is now stuck in drain()
+        assert connection.send(b"b\n")
+        assert not connection.send(b"c\n")
+        assert connection.closed and connection.writer.closed
+        await connection.wait_closed()
+
+    asyncio.run(scenario())
+
+
+def test_binary_and_json_clients_share_a_room():
+    async def scenario():
+        server = await asyncio.start_server(broker.handle_client, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b'{"type": "hello", "framing": "binary"}\n')
+            assert json.loads(await reader.readline()) == {"type": "hello", "framing": "binary"}
+            codec = BinaryFrameCodec()
+            writer.write(codec.encode({"type": "register", "user_id": 1, "chat_ids": [7]}))
+            legacy = await _connect(port, 2, [7])
+            while broker.registry.metrics().users != 2:
+                await asyncio.sleep(0.01)
+
+            writer.write(codec.encode({"type": "message", "chat_id": 7, "payload": {"content": "سلام"}}))
+            assert json.loads(await asyncio.wait_for(legacy[0].readline(), 2)) == \
+                {"type": "new_message", "chat_id": 7, "payload": {"content": "سلام"}}
+
+            legacy[1].write(b'{"type": "message", "chat_id": 7, "payload": {"content": "hi"}}\n')
+            header = await asyncio.wait_for(reader.readexactly(HEADER.size), 2)
+            body = await reader.readexactly(HEADER.unpack(header)[0])
+            assert codec.feed(header + body) == [{"type": "new_message", "chat_id": 7, "payload": {"content": "hi"}}]
+
+            for stream_writer in (writer, legacy[1]):
+                stream_writer.close()
+            while broker.registry.metrics().connections:
+                await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
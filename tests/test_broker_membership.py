@@ -0,0 +1,37 @@
+from server.membership import MembershipRegistry
+
+
+def test_sessions_join_and_leave_rooms_independently():
+    registry = MembershipRegistry()
+    desk, laptop, other = object(), object(), object()
+    registry.register(desk, 1, [10, 11])
+    registry.register(laptop, 1, [10])
+    registry.register(other, 2, [11, 12])
+
+    assert registry.room_members(10) == {desk, laptop}
+    assert registry.sessions_of(1) == {desk, laptop}
+    assert registry.metrics().users == 2 and registry.metrics().largest_room == 2
+
+    # Re-registering replaces the session's rooms; room 12 empties and is dropped.
+    registry.register(other, 2, [11])
+    assert not registry.has_room(12)
+
+    assert registry.unregister(desk) == 1
+    assert registry.room_members(10) == {laptop} and registry.room_members(11) == {other}
+    assert registry.unregister(desk) is None
+
+    registry.unregister(laptop)
+    registry.unregister(other)
+    metrics = registry.metrics()
+    assert (metrics.users, metrics.connections, metrics.rooms, metrics.memberships) == (0, 0, 0, 0)
+    assert (metrics.registrations, metrics.disconnects) == (4, 3)
+
+
+def test_join_and_leave_single_rooms():
+    registry = MembershipRegistry()
+    session = object()
+    registry.register(session, 1, [])
+    registry.join(session, 5)
+    assert registry.rooms_of(session) == {5}
+    registry.leave(session, 5)
+    assert not registry.has_room(5) and registry.rooms_of(session) == frozenset()
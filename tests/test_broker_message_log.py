@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+
+from server import broker
+from server.membership import MembershipRegistry
+from server.message_log import MessageLog
+
+
+def test_offsets_survive_segment_rolls_and_restarts(tmp_path):
+    log = MessageLog(tmp_path, segment_bytes=100)
+    offsets = [log.append(7, 1, b'{"n": %d}' % n) for n in range(10)]
+    assert offsets == list(range(1, 11))
+    assert len(list((tmp_path / "7").glob("*.log"))) > 1
+    assert [record.offset for record in log.read(7, 6, limit=10)] == [7, 8, 9, 10]
+    assert [record.payload for record in log.read(7, 0, limit=2)] == [b'{"n": 0}', b'{"n": 1}']
+    log.close()
+
+    # A record torn by a crash is cut off and its offset reused.
+    segment = sorted((tmp_path / "7").glob("*.log"))[-1]
+    segment.write_bytes(segment.read_bytes()[:-3])
+    log = MessageLog(tmp_path, segment_bytes=100)
+    assert log.last_offset(7) == 9
+    assert log.append(7, 1, b'{"n": 10}') == 10
+    assert log.read(7, 9, limit=5)[0].payload == b'{"n": 10}'
+
+
+def test_retention_deletes_whole_closed_segments(tmp_path):
+    log = MessageLog(tmp_path, segment_bytes=100, retention_seconds=None, retention_bytes=200)
+    for n in range(20):
+        log.append(3, 1, b"x" * 40)
+    assert log.first_offset(3) > 1
+    assert log.read(3, 0, limit=100)[0].offset == log.first_offset(3)
+    assert log.last_offset(3) == 20 and log.last_offset(99) == 0
+
+
+@pytest.fixture
+def logged_broker(tmp_path, monkeypatch):
+    monkeypatch.setattr(broker, "registry", MembershipRegistry())
+    monkeypatch.setattr(broker, "message_log", MessageLog(tmp_path))
+    yield
+    broker.message_log.close()
+
+
+async def _register(port, user_id, chat_ids, resume=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    message = {"type": "register", "user_id": user_id, "chat_ids": chat_ids}
+    if resume is not None:
+        message["resume"] = resume
+    writer.write((json.dumps(message) + "\n").encode())
+    return reader, writer
+
+
+def test_reconnecting_client_receives_only_the_gap(logged_broker):
+    async def scenario():
+        server = await asyncio.start_server(broker.handle_client, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            bob = await _register(port, 2, [7])
+            alice = await _register(port, 1, [7])
+            while broker.registry.metrics().users != 2:
+                await asyncio.sleep(0.01)
+            for n in range(3):
+                alice[1].write((json.dumps({"type": "message", "chat_id": 7, "payload": {"n": n}}) + "\n").encode())
+            received = [json.loads(await asyncio.wait_for(bob[0].readline(), 2)) for _ in range(3)]
+            assert [message["offset"] for message in received] == [1, 2, 3]
+
+            # Bob reconnects having seen only offset 1.
+            bob[1].close()
+            bob = await _register(port, 2, [7], resume={"7": 1})
+            replayed = [json.loads(await asyncio.wait_for(bob[0].readline(), 2)) for _ in range(2)]
+            assert [(message["offset"], message["payload"]) for message in replayed] == [(2, {"n": 1}), (3, {"n": 2})]
+
+            # Alice's own messages are replayed to another of her workstations that was offline.
+            alice_elsewhere = await _register(port, 1, [7], resume={"7": 1})
+            replayed = [json.loads(await asyncio.wait_for(alice_elsewhere[0].readline(), 2)) for _ in range(2)]
+            assert [message["payload"] for message in replayed] == [{"n": 1}, {"n": 2}]
+            alice_elsewhere[1].close()
+
+            for _, writer in (alice, bob):
+                writer.close()
+            while broker.registry.metrics().connections:
+                await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+
+
+def test_gap_beyond_the_log_is_reported(logged_broker, monkeypatch):
+    monkeypatch.setattr(broker, "REPLAY_LIMIT", 2)
+    for n in range(5):
+        broker.message_log.append(7, 1, b'{"n": %d}' % n)
+
+    async def scenario():
+        server = await asyncio.start_server(broker.handle_client, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await _register(port, 2, [7], resume={"7": 1})
+            assert json.loads(await asyncio.wait_for(reader.readline(), 2)) == \
+                {"type": "resume_incomplete", "chat_id": 7, "last_offset": 5}
+            writer.close()
+            while broker.registry.metrics().connections:
+                await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
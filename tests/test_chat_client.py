@@ -0,0 +1,197 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from PySide6.QtCore import QEvent, Qt
+
+from server import broker
+from server import client as client_module
+from server.client import ChatClient
+from server.membership import MembershipRegistry
+
+
+class BrokerThread:
+    """The broker's handle_client (or another handler) served from an event loop on a background thread."""
+
+    def __init__(self, handler=broker.handle_client):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = self.call(asyncio.start_server(handler, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(5)
+
+    def run(self, function):
+        async def wrapper():
+            return function()
+        return self.call(wrapper())
+
+    def stop(self):
+        self.run(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for the condition.")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def broker_thread(monkeypatch):
+    monkeypatch.setattr(broker, "registry", MembershipRegistry())
+    running = BrokerThread()
+    yield running
+    running.stop()
+
+
+@pytest.fixture
+def client(broker_thread):
+    chat_client = ChatClient(port=broker_thread.port)
+    chat_client.initial_backoff = chat_client.max_backoff = 0.05
+    chat_client.batch_interval = 0.05
+    received = []
+    chat_client.messageReceived.connect(received.append, Qt.DirectConnection)
+    chat_client.received = received
+    yield chat_client
+    chat_client.disconnect()
+
+
+def _peer(broker_thread, user_id, chat_ids):
+    async def connect():
+        reader, writer = await asyncio.open_connection("127.0.0.1", broker_thread.port)
+        writer.write((json.dumps({"type": "register", "user_id": user_id, "chat_ids": chat_ids}) + "\n").encode())
+        return reader, writer
+    return broker_thread.call(connect())
+
+
+def test_client_reregisters_after_the_broker_drops_it(broker_thread, client):
+    client.send_message({"type": "register", "user_id": 1, "chat_ids": [7]})  # queued before connecting
+    client.start()
+    _wait_for(lambda: broker_thread.run(lambda: broker.registry.metrics().users) == 1)
+
+    # The broker restarts: every connection is dropped and its registry is empty again.
+    def restart():
+        sessions = broker.registry.sessions_of(1)
+        broker.registry = MembershipRegistry()
+        for connection in sessions:
+            connection.close()
+    broker_thread.run(restart)
+    _wait_for(lambda: broker_thread.run(lambda: broker.registry.metrics().users) == 1)
+
+    reader, writer = _peer(broker_thread, 2, [7])
+    _wait_for(lambda: broker_thread.run(lambda: broker.registry.metrics().users) == 2)
+    broker_thread.run(lambda: writer.write(b'{"type": "message", "chat_id": 7, "payload": {"content": "hi"}}\n'))
+    _wait_for(lambda: client.received)
+    assert client.received == [{"type": "new_message", "chat_id": 7, "payload": {"content": "hi"}}]
+    broker_thread.loop.call_soon_threadsafe(writer.close)
+
+
+def test_read_receipts_and_typing_are_sent_in_one_batch(broker_thread, client):
+    client.send_message({"type": "register", "user_id": 1, "chat_ids": [7]})
+    client.start()
+    reader, writer = _peer(broker_thread, 2, [7])
+    _wait_for(lambda: broker_thread.run(lambda: broker.registry.metrics().users) == 2)
+
+    for message_id in (3, 5, 4):
+        client.send_read_receipt(7, message_id)
+    client.send_typing(7)
+    client.send_typing(7)
+
+    batch = json.loads(broker_thread.call(asyncio.wait_for(reader.readline(), 2)))
+    assert batch == {"type": "events", "chat_id": 7, "user_id": 1, "events": [
+        {"type": "read", "chat_id": 7, "message_id": 5}, {"type": "typing", "chat_id": 7}]}
+    broker_thread.loop.call_soon_threadsafe(writer.close)
+
+
+def test_backoff_grows_with_jitter_up_to_the_cap():
+    chat_client = ChatClient()
+    delays = [chat_client._backoff(attempt) for attempt in range(12)]
+    assert 0.25 <= delays[0] <= 0.5 and 2 <= delays[3] <= 4
+    assert all(chat_client.max_backoff / 2 <= delay <= chat_client.max_backoff for delay in delays[7:])
+
+
+def test_unanswered_hello_reconnects_on_json(monkeypatch):
+    monkeypatch.setattr(client_module, "HANDSHAKE_TIMEOUT", 0.1)
+    first_lines, closed = [], []
+
+    async def slow_broker(reader, writer):
+        line = await reader.readline()
+        first_lines.append(json.loads(line))
+        if json.loads(line)["type"] == "hello":
+            # Answers too late: this broker has switched the connection to binary by now.
+            await asyncio.sleep(0.3)
+            writer.write(b'{"type": "hello", "framing": "binary"}\n')
+        else:
+            writer.write(b'{"type": "new_message", "chat_id": 7, "payload": {"content": "hi"}}\n')
+        await writer.drain()
+        await reader.read()  # until the client hangs up
+        writer.close()
+        closed.append(True)
+
+    running = BrokerThread(slow_broker)
+    chat_client = ChatClient(port=running.port, framing="binary")
+    chat_client.initial_backoff = chat_client.max_backoff = 0.05
+    received = []
+    chat_client.messageReceived.connect(received.append, Qt.DirectConnection)
+    chat_client.send_message({"type": "register", "user_id": 1, "chat_ids": [7]})
+    chat_client.start()
+    try:
+        _wait_for(lambda: received)
+        assert [line["type"] for line in first_lines] == ["hello", "register"]
+        assert received == [{"type": "new_message", "chat_id": 7, "payload": {"content": "hi"}}]
+    finally:
+        chat_client.disconnect()
+        _wait_for(lambda: len(closed) == len(first_lines))
+        running.stop()
+
+
+def test_factory_built_workspace_connects_and_registers(broker_thread, tmp_path, monkeypatch):
+    from PySide6.QtWidgets import QApplication
+    from sqlalchemy import create_engine
+
+    from features.Workspace import workspace_factory
+    from shared.enums import ChatType
+    from shared.orm_models.users_models import BaseUsers
+    from shared.orm_models.workspace_models import BaseWorkspace, ChatModel, ChatParticipantModel
+    from shared.session_provider import ManagedSessionProvider
+
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setattr(workspace_factory, "ATTACHMENT_CACHE_DIR", str(tmp_path / "attachments"))
+    users_engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    workspace_engine = create_engine(f"sqlite:///{tmp_path / 'workspace.db'}")
+    BaseUsers.metadata.create_all(users_engine)
+    BaseWorkspace.metadata.create_all(workspace_engine)
+    with ManagedSessionProvider(workspace_engine)() as session:
+        session.add(ChatModel(id=7, name="team", type=ChatType.GROUP))
+        session.flush()
+        session.add(ChatParticipantModel(chat_id=7, user_id=1))
+
+    controller = workspace_factory.WorkspaceFactory.create(users_engine, workspace_engine, 1, "127.0.0.1",
+                                                           broker_port=broker_thread.port)
+    try:
+        _wait_for(lambda: broker_thread.run(lambda: broker.registry.metrics().users) == 1)
+        assert broker_thread.run(lambda: broker.registry.has_room(7))
+    finally:
+        # Destroying the view stops the client, which drops the connection.
+        controller.get_view().deleteLater()
+        app.sendPostedEvents(None, QEvent.Type.DeferredDelete)
+    _wait_for(lambda: broker_thread.run(lambda: broker.registry.metrics().connections) == 0)
+
+
+def test_incomplete_resume_moves_the_offset_to_the_end_of_the_log():
+    chat_client = ChatClient()
+    received = []
+    chat_client.messageReceived.connect(received.append, Qt.DirectConnection)
+    chat_client._dispatch({"type": "new_message", "chat_id": 7, "offset": 3, "payload": {}})
+    chat_client._dispatch({"type": "resume_incomplete", "chat_id": 7, "last_offset": 2500})
+
+    assert chat_client._with_resume({"type": "register", "user_id": 1, "chat_ids": [7]})["resume"] == {"7": 2500}
+    assert received[-1]["type"] == "resume_incomplete"  # passed on so the app reloads the chat
@@ -0,0 +1,26 @@
+from server.framing import BinaryFrameCodec, JsonLineCodec
+
+
+def test_json_lines_are_reassembled_across_reads():
+    codec = JsonLineCodec()
+    wire = codec.encode({"type": "new_message", "chat_id": 1, "payload": {"content": "سلام"}}) + b"not json\n"
+    wire += codec.encode({"type": "register", "user_id": 2})
+    received = [message for offset in range(0, len(wire), 7) for message in codec.feed(wire[offset:offset + 7])]
+    assert received == [{"type": "new_message", "chat_id": 1, "payload": {"content": "سلام"}},
+                        {"type": "register", "user_id": 2}]
+
+
+def test_binary_frames_are_reassembled_across_reads():
+    codec = BinaryFrameCodec()
+    messages = [{"type": "register", "user_id": 2, "chat_ids": [5]},
+                {"type": "message", "chat_id": 5, "payload": {"content": "x" * 5000}}]
+    wire = b"".join(codec.encode(message) for message in messages)
+    received = [message for offset in range(0, len(wire), 1000) for message in codec.feed(wire[offset:offset + 1000])]
+    assert received == messages
+
+
+def test_binary_codec_starts_from_bytes_left_by_the_handshake():
+    frame = BinaryFrameCodec().encode({"type": "register", "user_id": 1})
+    codec = BinaryFrameCodec(bytearray(frame[:4]))
+    assert codec.feed(b"") == []
+    assert codec.feed(frame[4:]) == [{"type": "register", "user_id": 1}]
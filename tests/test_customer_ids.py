@@ -0,0 +1,85 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.database_migrations import SchemaMigrator, SCHEMA_COMPONENT
+from features.Admin_Panel.admin_reports.admin_reports_repo import AdminReportsRepository
+from features.Reports.reports_repo import ReportsRepo
+from shared.orm_models.business_models import BaseBusiness, CustomerModel, IssuedInvoiceModel
+from shared.session_provider import ManagedSessionProvider
+
+
+@pytest.fixture
+def populated(business_engine, make_invoice):
+    BaseBusiness.metadata.create_all(business_engine)
+    with ManagedSessionProvider(business_engine)() as session:
+        session.add_all([CustomerModel(national_id="111", name="Alice", phone="1"),
+                         CustomerModel(national_id="222", name="Bob", phone="2")])
+        session.flush()
+        session.add_all([make_invoice("1", national_id="111", amount=100),
+                         make_invoice("2", national_id="222", amount=500),
+                         make_invoice("3", national_id="222", amount=50),
+                         make_invoice("4", national_id="111", amount=900, issue_date=datetime(2023, 1, 1))])
+    return business_engine
+
+
+def test_new_customers_and_invoices_get_integer_ids(populated):
+    with ManagedSessionProvider(populated)() as session:
+        ids = dict(session.query(CustomerModel.national_id, CustomerModel.id))
+        assert sorted(ids.values()) == [1, 2]
+        customer_ids = dict(session.query(IssuedInvoiceModel.invoice_number, IssuedInvoiceModel.customer_id))
+        assert customer_ids == {"1": ids["111"], "2": ids["222"], "3": ids["222"], "4": ids["111"]}
+
+        session.query(IssuedInvoiceModel).filter_by(invoice_number="3").one().national_id = "111"
+    with ManagedSessionProvider(populated)() as session:
+        invoice = session.query(IssuedInvoiceModel).filter_by(invoice_number="3").one()
+        assert invoice.customer_id == session.query(CustomerModel.id).filter_by(national_id="111").scalar()
+
+
+def test_customer_reports_join_on_the_customer_id(populated):
+    with Session(populated) as session:
+        top = ReportsRepo(session).get_top_customers(date(2024, 1, 1), date(2024, 12, 31))
+        assert [(row["customer_name"], row["total_spent"], row["invoice_count"]) for row in top] == \
+            [("Bob", 550, 2), ("Alice", 100, 1)]
+
+        frequent = AdminReportsRepository().find_frequent_customers(session, min_visits=2)
+        assert sorted((row.name, row.national_id, row.visit_count) for row in frequent) == \
+            [("Alice", "111", 2), ("Bob", "222", 2)]
+        assert [row.name for row in AdminReportsRepository().find_frequent_customers(
+            session, 2, date(2024, 1, 1), date(2024, 12, 31))] == ["Bob"]
+
+
+def test_invoices_without_a_customer_do_not_take_a_top_slot(populated, make_invoice):
+    with ManagedSessionProvider(populated)() as session:
+        session.add(make_invoice("5", national_id="999", amount=5000))  # no customers row for this national id
+    with Session(populated) as session:
+        top = ReportsRepo(session).get_top_customers(date(2024, 1, 1), date(2024, 12, 31), limit=2)
+        assert [row["customer_name"] for row in top] == ["Bob", "Alice"]
+
+
+def test_migration_backfills_customer_ids(business_engine):
+    with business_engine.begin() as conn:
+        # The v6 tables, before customers and invoices carried an integer customer id.
+        conn.execute(text("CREATE TABLE customers (national_id TEXT PRIMARY KEY, name TEXT, phone TEXT)"))
+        conn.execute(text(
+            "CREATE TABLE issued_invoices (id INTEGER PRIMARY KEY, invoice_number TEXT, national_id TEXT, "
+            "issue_date DATETIME, revision INTEGER NOT NULL DEFAULT 1)"
+        ))
+        conn.execute(text("INSERT INTO customers VALUES ('111', 'Alice', '1'), ('222', 'Bob', '2')"))
+        conn.execute(text(
+            "INSERT INTO issued_invoices (invoice_number, national_id, issue_date) "
+            "VALUES ('1', '222', '2024-04-01'), ('2', '999', '2024-04-01')"
+        ))
+    migrator = SchemaMigrator()
+    migrator.stamp(business_engine, SCHEMA_COMPONENT, 6)
+
+    migrator.upgrade(business_engine, "business", BaseBusiness.metadata)
+
+    with business_engine.begin() as conn:
+        assert conn.execute(text("SELECT invoice_number, customer_id, revision FROM issued_invoices "
+                                 "ORDER BY invoice_number")).all() == [("1", 2, 2), ("2", None, 1)]
+        conn.execute(text("INSERT INTO customers (national_id, name, phone) VALUES ('999', 'Sara', '3')"))
+        conn.execute(text("INSERT INTO issued_invoices (invoice_number, national_id) VALUES ('3', '999')"))
+        assert conn.execute(text("SELECT customer_id FROM issued_invoices WHERE invoice_number = '3'")).scalar() == 3
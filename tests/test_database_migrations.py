@@ -0,0 +1,147 @@
+import pytest
+from sqlalchemy import create_engine, event, inspect, text, MetaData
+
+from core.database_migrations import (
+    SchemaMigrator, Migration, SCHEMA_COMPONENT, SEED_COMPONENT
+)
+from shared.orm_models.business_models import BaseBusiness
+from shared.orm_models.workspace_models import BaseWorkspace
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'business.db'}")
+
+
+def _count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_new_database_is_created_at_head(engine):
+    migrator = SchemaMigrator()
+
+    version = migrator.upgrade(engine, "business", BaseBusiness.metadata)
+
+    assert version == migrator.head("business")
+    assert "issued_invoices" in inspect(engine).get_table_names()
+
+
+def test_up_to_date_database_costs_a_single_read(engine):
+    SchemaMigrator().upgrade(engine, "business", BaseBusiness.metadata)
+    engine.dispose()
+
+    fresh_engine = create_engine(engine.url)
+    statements = _count_statements(fresh_engine)
+    SchemaMigrator().upgrade(fresh_engine, "business", BaseBusiness.metadata)
+
+    assert len(statements) == 1
+    assert "schema_version" in statements[0]
+
+
+def test_legacy_database_gets_missing_indexes(engine):
+    BaseBusiness.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_issued_invoices_issue_date"))
+
+    SchemaMigrator().upgrade(engine, "business", BaseBusiness.metadata)
+
+    index_names = {ix["name"] for ix in inspect(engine).get_indexes("issued_invoices")}
+    assert "idx_issued_invoices_issue_date" in index_names
+
+
+def test_pending_migrations_run_in_order(engine):
+    applied = []
+    migrations = {
+        "demo": [
+            Migration(2, "second", lambda conn, md: applied.append(2)),
+            Migration(1, "first", lambda conn, md: applied.append(1)),
+        ]
+    }
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE legacy (id INTEGER PRIMARY KEY)"))
+
+    version = SchemaMigrator(migrations).upgrade(engine, "demo", MetaData())
+
+    assert applied == [1, 2]
+    assert version == 2
+
+
+def test_migration_numbering_gaps_are_rejected():
+    with pytest.raises(ValueError):
+        SchemaMigrator({"demo": [Migration(2, "orphan", lambda conn, md: None)]})
+
+
+def test_stamp_records_component_version(engine):
+    migrator = SchemaMigrator()
+    migrator.upgrade(engine, "business", BaseBusiness.metadata)
+
+    migrator.stamp(engine, SEED_COMPONENT, 3)
+
+    assert migrator.get_version(engine, SEED_COMPONENT) == 3
+    assert migrator.get_version(engine, SCHEMA_COMPONENT) == migrator.head("business")
+
+
+def test_legacy_invoice_sequence_is_migrated_to_counter(engine):
+    BaseBusiness.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE invoice_number_counter"))
+        conn.execute(text("CREATE TABLE invoice_number_seq (id INTEGER PRIMARY KEY AUTOINCREMENT, dummy INTEGER)"))
+        for _ in range(41):
+            conn.execute(text("INSERT INTO invoice_number_seq (dummy) VALUES (0)"))
+
+    SchemaMigrator().upgrade(engine, "business", BaseBusiness.metadata)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT last_value FROM invoice_number_counter")).scalar() == 41
+    assert "invoice_number_seq" not in inspect(engine).get_table_names()
+
+
+def test_invoice_versions_are_backfilled(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE issued_invoices (id INTEGER PRIMARY KEY, invoice_number TEXT)"))
+        conn.execute(text(
+            "INSERT INTO issued_invoices (invoice_number) VALUES "
+            "('INV-101'), ('INV-101-v9'), ('INV-101-v10'), ('INV-1010')"
+        ))
+
+    SchemaMigrator().upgrade(engine, "business", BaseBusiness.metadata)
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT invoice_number, base_invoice_number, version FROM issued_invoices ORDER BY id"
+        )).all()
+    assert [tuple(row) for row in rows] == [
+        ("INV-101", "INV-101", 1),
+        ("INV-101-v9", "INV-101", 9),
+        ("INV-101-v10", "INV-101", 10),
+        ("INV-1010", "INV-1010", 1),
+    ]
+
+
+def test_read_receipts_are_folded_into_watermarks(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'workspace.db'}")
+    with engine.begin() as conn:
+        for statement in (
+            "CREATE TABLE chats (id INTEGER PRIMARY KEY, name VARCHAR(100), type VARCHAR(9) NOT NULL, created_at DATETIME)",
+            "CREATE TABLE messages (id INTEGER PRIMARY KEY, content TEXT, created_at DATETIME, "
+            "is_pinned BOOLEAN NOT NULL, chat_id INTEGER NOT NULL, sender_id INTEGER NOT NULL)",
+            "CREATE TABLE message_read_status (id INTEGER PRIMARY KEY, read_at DATETIME, "
+            "message_id INTEGER NOT NULL, user_id INTEGER NOT NULL)",
+            "INSERT INTO chats VALUES (1, 'team', 'GROUP', NULL), (2, 'other', 'GROUP', NULL)",
+            "INSERT INTO messages VALUES (1, 'a', NULL, 0, 1, 9), (2, 'b', NULL, 0, 1, 9), (3, 'c', NULL, 0, 2, 9)",
+            "INSERT INTO message_read_status (read_at, message_id, user_id) VALUES "
+            "('2024-01-01', 1, 5), ('2024-01-02', 2, 5), ('2024-01-03', 1, 6), ('2024-01-04', 3, 5)",
+        ):
+            conn.execute(text(statement))
+    SchemaMigrator().stamp(engine, SCHEMA_COMPONENT, 1)
+
+    SchemaMigrator().upgrade(engine, "workspace", BaseWorkspace.metadata)
+
+    assert "message_read_status" not in inspect(engine).get_table_names()
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT chat_id, user_id, last_read_message_id FROM chat_read_watermarks ORDER BY chat_id, user_id"
+        )).all()
+    assert rows == [(1, 5, 2), (1, 6, 1), (2, 5, 3)]
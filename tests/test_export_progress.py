@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+from PySide6.QtWidgets import QApplication
+
+from shared.services.streaming_exporter import ExportCancelled
+from shared.widgets import export_progress
+from shared.widgets.export_progress import run_export_with_progress
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def _wait_until(app, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for the export.")
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def test_callbacks_run_on_the_gui_thread(app):
+    calls = []
+
+    def job(progress, is_cancelled):
+        progress(5, 10)
+        return {"rows": 10, "thread": threading.current_thread()}
+
+    run_export_with_progress(None, job, "export", on_finished=lambda result: calls.append(
+        (result, threading.current_thread())))
+    _wait_until(app, lambda: calls and not export_progress._running)
+
+    [(result, callback_thread)] = calls
+    assert result["rows"] == 10
+    assert result["thread"] is not threading.main_thread()
+    assert callback_thread is threading.main_thread()
+
+
+def test_failures_and_cancellation_reach_the_gui_thread(app):
+    failures, started = [], threading.Event()
+
+    def failing_job(progress, is_cancelled):
+        raise ValueError("disk full")
+
+    run_export_with_progress(None, failing_job, "export", on_finished=failures.append,
+                             on_failed=lambda error: failures.append((error, threading.current_thread())))
+    _wait_until(app, lambda: failures)
+    assert failures == [("disk full", threading.main_thread())]
+
+    def endless_job(progress, is_cancelled):
+        started.set()
+        while not is_cancelled():
+            time.sleep(0.01)
+        raise ExportCancelled()
+
+    worker = run_export_with_progress(None, endless_job, "export", on_finished=failures.append)
+    started.wait(5)
+    export_progress._running[worker].on_canceled_by_user()
+    _wait_until(app, lambda: not export_progress._running)
+    assert failures == [("disk full", threading.main_thread())]
@@ -0,0 +1,74 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, event
+
+from shared.orm_models.business_models import (
+    BaseBusiness, IssuedInvoiceModel, InvoiceItemModel, ServicesModel, ServiceDynamicPrice
+)
+from shared.services.invoice_aggregate_loader import InvoiceAggregateLoader
+from shared.session_provider import ManagedSessionProvider
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'business.db'}")
+    BaseBusiness.metadata.create_all(engine)
+    with ManagedSessionProvider(engine)() as session:
+        service = ServicesModel(id=1, name="شناسنامه")
+        service.dynamic_prices = [ServiceDynamicPrice(id=7, name="صفحه اضافه", unit_price=1000)]
+        session.add(service)
+        session.add(IssuedInvoiceModel(
+            invoice_number="INV-0001", name="x", national_id="1", phone="1",
+            issue_date=datetime(2024, 1, 1), delivery_date=datetime(2024, 1, 2),
+            translator="t", total_items=2, total_amount=10, final_amount=10,
+            source_language="fa", target_language="en",
+        ))
+        session.add_all([
+            InvoiceItemModel(invoice_number="INV-0001", service_id=1, service_name="old name",
+                             dynamic_price_1=7, dynamic_price_amount_1=1000, total_price=5),
+            InvoiceItemModel(invoice_number="INV-0001", service_id=1, service_name="old name",
+                             total_price=5),
+        ])
+    return engine
+
+
+def _record_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_aggregate_resolves_catalog_names(engine):
+    aggregate = InvoiceAggregateLoader(engine).load("INV-0001")
+
+    assert aggregate.invoice.invoice_number == "INV-0001"
+    assert [item.catalog_service_name for item in aggregate.items] == ["شناسنامه", "شناسنامه"]
+    assert aggregate.items[0].dynamic_price_1_name == "صفحه اضافه"
+    assert aggregate.items[1].dynamic_price_1_name is None
+
+
+def test_unchanged_invoice_is_served_from_memo(engine):
+    InvoiceAggregateLoader(engine).load("INV-0001")
+    statements = _record_statements(engine)
+
+    aggregate = InvoiceAggregateLoader(engine).load("INV-0001")
+
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    assert len(selects) == 1
+    assert len(aggregate.items) == 2
+
+
+def test_updated_invoice_is_reloaded(engine):
+    loader = InvoiceAggregateLoader(engine)
+    loader.load("INV-0001").invoice.translator = "mutated copy"
+
+    with ManagedSessionProvider(engine)() as session:
+        session.query(IssuedInvoiceModel).filter_by(invoice_number="INV-0001").one().translator = "new"
+
+    aggregate = loader.load("INV-0001")
+    assert aggregate.invoice.translator == "new"
+    assert aggregate.revision[1] == 2
+
+
+def test_missing_invoice_returns_none(engine):
+    assert InvoiceAggregateLoader(engine).load("INV-9999") is None
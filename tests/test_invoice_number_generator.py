@@ -0,0 +1,46 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, text
+
+from shared.orm_models.business_models import BaseBusiness, DeletedInvoiceModel
+from shared.services.invoice_number_generator import InvoiceNumberService
+from shared.session_provider import ManagedSessionProvider
+
+
+@pytest.fixture
+def session_provider(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'business.db'}")
+    BaseBusiness.metadata.create_all(engine)
+    return ManagedSessionProvider(engine)
+
+
+def test_numbers_are_sequential_and_use_one_row(session_provider):
+    service = InvoiceNumberService(session_provider)
+
+    numbers = [service.get_next_invoice_number() for _ in range(3)]
+
+    assert numbers == ["INV-0001", "INV-0002", "INV-0003"]
+    with session_provider() as session:
+        assert session.execute(text("SELECT COUNT(*) FROM invoice_number_counter")).scalar() == 1
+
+
+def test_counter_starts_after_highest_existing_invoice(session_provider):
+    with session_provider() as session:
+        session.add(DeletedInvoiceModel(
+            invoice_number="INV-0150", name="x", national_id="1", phone="1",
+            issue_date=datetime(2024, 1, 1), delivery_date=datetime(2024, 1, 1),
+            translator="t", total_items=1, total_amount=1, final_amount=1,
+            source_language="fa", target_language="en", deleted_at=datetime(2024, 1, 1),
+        ))
+
+    assert InvoiceNumberService(session_provider).get_next_invoice_number() == "INV-0151"
+
+
+def test_block_reservation_hands_out_disjoint_ranges(session_provider):
+    first = InvoiceNumberService(session_provider, block_size=10)
+    second = InvoiceNumberService(session_provider, block_size=10)
+
+    assert first.get_next_invoice_number() == "INV-0001"
+    assert second.get_next_invoice_number() == "INV-0011"
+    assert first.get_next_invoice_number() == "INV-0002"
+    assert second.reserve_block(5) == range(21, 26)
@@ -0,0 +1,62 @@
+from datetime import date, datetime
+
+from sqlalchemy import create_engine
+
+from features.Invoice_Page.invoice_preview.invoice_preview_settings_manager import PreviewSettingsManager
+from features.Invoice_Table.invoice_table_models import PdfArchiveFilter
+from features.Invoice_Table.invoice_table_pdf_archiver import InvoicePdfArchiver
+from shared.orm_models.business_models import BaseBusiness, IssuedInvoiceModel, InvoiceItemModel
+from shared.session_provider import ManagedSessionProvider
+
+
+def _seed(engine):
+    with ManagedSessionProvider(engine)() as session:
+        for number, translator, issued in (("INV-1", "a", datetime(2024, 4, 1)),
+                                           ("INV-2", "b", datetime(2024, 4, 2))):
+            invoice = IssuedInvoiceModel(
+                invoice_number=number, name="مشتری", national_id="1", phone="2",
+                issue_date=issued, delivery_date=issued, translator=translator,
+                total_items=1, total_amount=10, final_amount=10,
+                source_language="فارسی", target_language="انگلیسی",
+            )
+            invoice.items.append(InvoiceItemModel(service_id=1, service_name="شناسنامه",
+                                                  quantity=1, total_price=10))
+            session.add(invoice)
+
+
+def test_archive_run_stores_dated_files_and_records_paths(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'business.db'}")
+    BaseBusiness.metadata.create_all(engine)
+    _seed(engine)
+    archiver = InvoicePdfArchiver(engine, archive_root=tmp_path / "archive", max_workers=0)
+    settings = PreviewSettingsManager()._get_default_settings()
+
+    report = archiver.run(PdfArchiveFilter(translator="a"), settings)
+
+    assert report.failures == {}
+    assert list(report.archived) == ["INV-1"]
+    archived = tmp_path / "archive" / "1403" / "01"
+    [pdf] = list(archived.glob("INV-1-*.pdf"))
+    assert pdf.read_bytes().startswith(b"%PDF")
+    with ManagedSessionProvider(engine)() as session:
+        invoice = session.query(IssuedInvoiceModel).filter_by(invoice_number="INV-1").one()
+        assert invoice.pdf_file_path == str(pdf)
+
+    rerun = archiver.run(PdfArchiveFilter(), settings)
+    assert list(rerun.archived) == ["INV-2"]
+    assert archiver.run(PdfArchiveFilter(), settings).total == 0
+
+
+def test_end_date_includes_invoices_issued_during_the_last_day(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'business.db'}")
+    BaseBusiness.metadata.create_all(engine)
+    _seed(engine)
+    with ManagedSessionProvider(engine)() as session:
+        session.query(IssuedInvoiceModel).filter_by(invoice_number="INV-2").one().issue_date = \
+            datetime(2024, 4, 2, 15, 30)
+    archiver = InvoicePdfArchiver(engine, archive_root=tmp_path / "archive", max_workers=0)
+    settings = PreviewSettingsManager()._get_default_settings()
+
+    report = archiver.run(PdfArchiveFilter(start_date=date(2024, 4, 2), end_date=date(2024, 4, 2)), settings)
+
+    assert list(report.archived) == ["INV-2"]
@@ -0,0 +1,43 @@
+import re
+from datetime import datetime
+
+from features.Invoice_Page.invoice_preview.invoice_preview_logic import InvoicePreviewLogic
+from features.Invoice_Page.invoice_preview.invoice_preview_models import (Invoice, Customer, PreviewItem,
+                                                                          PreviewOfficeInfo)
+from features.Invoice_Page.invoice_preview.invoice_preview_renderer import InvoicePdfRenderer
+from features.Invoice_Page.invoice_preview.invoice_preview_settings_manager import PreviewSettingsManager
+
+PAGINATION = {'one_page_max_rows': 12, 'first_page_max_rows': 24,
+              'other_page_max_rows': 28, 'last_page_max_rows': 22}
+
+
+def _invoice(item_count: int) -> Invoice:
+    office = PreviewOfficeInfo(name="دارالترجمه", reg_no="1", representative="مترجم", address="تهران",
+                               phone="021", email="a@b.c", website="", whatsapp="", telegram="")
+    items = [PreviewItem(name=f"سند {i}", type="رسمی", quantity=1, judiciary_seal="✔",
+                         foreign_affairs_seal="-", total_price=100_000) for i in range(item_count)]
+    return Invoice(invoice_number="INV-0001", issue_date=datetime(2024, 1, 1), delivery_date=datetime(2024, 1, 5),
+                   username="admin", customer=Customer("مشتری", "0012345678", "0912"), office=office,
+                   source_language="فارسی", target_language="انگلیسی", items=items,
+                   total_amount=100_000 * item_count)
+
+
+def test_paginate_matches_per_page_rules():
+    items = list(range(70))
+
+    pages = InvoicePreviewLogic.paginate(items, PAGINATION)
+
+    assert [len(page) for page in pages] == [24, 28, 18]
+    assert pages == [InvoicePreviewLogic.slice_page(items, n, PAGINATION) for n in (1, 2, 3)]
+
+
+def test_multi_page_invoice_is_rendered_headless(tmp_path):
+    settings = PreviewSettingsManager()._get_default_settings()
+    invoice = _invoice(70)
+    pdf_path = tmp_path / "invoice.pdf"
+
+    assert InvoicePdfRenderer().render_to_pdf(invoice, settings, str(pdf_path))
+
+    content = pdf_path.read_bytes()
+    assert content.startswith(b"%PDF")
+    assert len(re.findall(rb"/Type\s*/Page\b", content)) == 3
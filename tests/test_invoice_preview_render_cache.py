@@ -0,0 +1,74 @@
+from dataclasses import replace
+from datetime import datetime
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+from PySide6.QtGui import QColor, QImage
+
+from features.Invoice_Page.invoice_preview.invoice_preview_logic import InvoicePreviewLogic
+from features.Invoice_Page.invoice_preview.invoice_preview_render_cache import logo_image
+from features.Invoice_Page.invoice_preview.invoice_preview_renderer import ensure_gui_application
+from features.Invoice_Page.invoice_preview.invoice_preview_settings_manager import PreviewSettingsManager
+from features.Invoice_Page.invoice_preview.invoice_preview_view import InvoicePreviewWidget
+from tests.test_invoice_pdf_renderer import _invoice
+
+
+def _png() -> bytes:
+    image = QImage(10, 10, QImage.Format.Format_RGB32)
+    image.fill(QColor("red"))
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(data)
+
+
+def test_logo_is_decoded_once_per_office_revision():
+    ensure_gui_application()
+    office = replace(_invoice(0).office, logo=_png(), updated_at=datetime(2024, 1, 1))
+
+    first = logo_image(office)
+
+    assert first is not None and not first.isNull()
+    assert logo_image(replace(office, logo=bytes(office.logo))) is first
+    assert logo_image(replace(office, updated_at=datetime(2024, 2, 1))) is not first
+
+
+def test_pages_are_computed_once_per_invoice_and_settings_revision(monkeypatch):
+    settings_manager = PreviewSettingsManager()
+    logic = InvoicePreviewLogic(repo=None, business_engine=None, settings_manager=settings_manager,
+                                aggregate_loader=None)
+    invoice = _invoice(70)
+    calls = []
+    original = InvoicePreviewLogic.paginate
+    monkeypatch.setattr(InvoicePreviewLogic, "paginate",
+                        classmethod(lambda cls, items, conf: calls.append(1) or original(items, conf)))
+
+    assert logic.get_total_pages(invoice) == 3
+    assert [len(logic.get_items_for_page(invoice, page)) for page in (1, 2, 3, 4)] == [24, 28, 18, 0]
+    assert len(calls) == 1
+
+    settings_manager._revision += 1
+    logic.get_total_pages(invoice)
+    assert len(calls) == 2
+
+
+def test_paging_reuses_table_cells():
+    ensure_gui_application()
+    settings = PreviewSettingsManager()._get_default_settings()
+    pages = InvoicePreviewLogic.paginate(_invoice(70).items, settings['pagination'])
+    invoice = _invoice(70)
+    widget = InvoicePreviewWidget()
+
+    widget.update_content(invoice, pages[0], 1, 3, settings)
+    first_cell = widget.items_table.item(0, 1)
+    widget.update_content(invoice, pages[1], 2, 3, settings)
+
+    table = widget.items_table
+    assert table.rowCount() == 28
+    assert table.item(0, 1) is first_cell
+    assert table.item(0, 0).text() == "سند 24"
+    assert table.verticalHeaderItem(0).text() == "۲۵"
+
+    widget.update_content(invoice, pages[2], 3, 3, settings)
+    assert table.rowCount() == 18
+    assert table.item(17, 0).text() == "سند 69"
@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import create_engine
+
+from features.Invoice_Table.invoice_table_models import InvoiceRow
+from features.Invoice_Table.invoice_table_repo import BusinessRepository
+from shared.orm_models.business_models import BaseBusiness, IssuedInvoiceModel
+from shared.session_provider import ManagedSessionProvider
+
+
+def test_invoice_rows_hold_only_list_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'business.db'}")
+    BaseBusiness.metadata.create_all(engine)
+    session_provider = ManagedSessionProvider(engine)
+    with session_provider() as session:
+        session.add(IssuedInvoiceModel(
+            invoice_number="INV-0001", name="x", national_id="1", phone="2",
+            issue_date=datetime(2024, 1, 1), delivery_date=datetime(2024, 1, 2),
+            translator="t", total_items=1, total_amount=10, final_amount=10,
+            source_language="fa", target_language="en",
+        ))
+
+    with session_provider() as session:
+        rows = BusinessRepository().get_invoice_rows(session)
+
+    assert rows == [InvoiceRow(1, "INV-0001", "x", "1", "2", datetime(2024, 1, 1),
+                               datetime(2024, 1, 2), "t", 10)]
+    assert not hasattr(rows[0], "__dict__")
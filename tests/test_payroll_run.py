@@ -0,0 +1,147 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+
+from features.Admin_Panel.wage_calculator.wage_calculator_logic import WageCalculatorLogic
+from features.Admin_Panel.wage_calculator.wage_calculator_payroll_run import PayrollRunner
+from features.Admin_Panel.wage_calculator.wage_calculator_repo import (WageCalculatorRepository, UsersRepository,
+                                                                       InvoicesRepository, PayrollRepository)
+from shared.orm_models.business_models import BaseBusiness, TranslationOfficeDataModel
+from shared.orm_models.payroll_models import (BasePayroll, EmployeeModel, EmployeePayrollProfileModel,
+                                              EmploymentType, PayrollAuditLogModel, PayrollRecordModel,
+                                              SalaryComponentModel, SystemConstantModel, TaxBracketModel)
+from shared.services.streaming_exporter import ExportCancelled
+from shared.session_provider import ManagedSessionProvider
+
+COMPONENTS = [
+    ("Basic Salary", "Earning", True), ("Overtime Pay", "Earning", True), ("Housing Allowance", "Earning", True),
+    ("Groceries Allowance", "Earning", True), ("Children Allowance", "Earning", False),
+    ("BaseBusiness Hourly Salary", "Earning", True), ("Commission", "Earning", False),
+    ("Employee Insurance", "Deduction", False), ("Income Tax", "Deduction", False),
+    ("Employer Insurance (20%)", "Deduction", False), ("Unemployment Insurance (3%)", "Deduction", False),
+]
+
+
+def _employee(code, first_name, employment_type, **profile):
+    employee = EmployeeModel(employee_code=code, first_name=first_name, last_name="Test", national_id=code * 2,
+                             hire_date=date(2020, 1, 1))
+    employee.payroll_profile = EmployeePayrollProfileModel(employment_type=employment_type, **profile)
+    return employee
+
+
+@pytest.fixture
+def engines(tmp_path, business_engine, make_invoice):
+    payroll, business = create_engine(f"sqlite:///{tmp_path / 'payroll.db'}"), business_engine
+    BasePayroll.metadata.create_all(payroll)
+    BaseBusiness.metadata.create_all(business)
+
+    with ManagedSessionProvider(payroll)() as session:
+        session.add_all(SalaryComponentModel(name=name, display_name=name, type=kind,
+                                             is_base_for_insurance_calculation=insured)
+                        for name, kind, insured in COMPONENTS)
+        session.add_all([
+            SystemConstantModel(year=1403, code="MIN_DAILY_WAGE_RIAL", name="min wage", value=Decimal("2000000")),
+            SystemConstantModel(year=1403, code="HOUSING_ALLOWANCE_RIAL", name="housing", value=Decimal("9000000")),
+            TaxBracketModel(year=1403, lower_bound_rials=Decimal(0), upper_bound_rials=Decimal("1200000000"),
+                            rate=Decimal(0)),
+            TaxBracketModel(year=1403, lower_bound_rials=Decimal("1200000000"), upper_bound_rials=None,
+                            rate=Decimal("0.1")),
+        ])
+        session.add_all([
+            _employee("100", "Full", EmploymentType.FULL_TIME, base_salary_rials=Decimal("2500000"), children_count=1),
+            _employee("200", "Commission", EmploymentType.COMMISSION, commission_rate_pct=Decimal("0.4")),
+            _employee("300", "Part", EmploymentType.PART_TIME, hourly_rate_rials=Decimal("500000")),
+        ])
+
+    with ManagedSessionProvider(business)() as session:
+        session.add(TranslationOfficeDataModel(license_key="k", name="دارالترجمه", reg_no="123", representative="r", manager="m"))
+        for number, day in (("1", 2), ("2", 15), ("3", 40)):  # the last one is outside Farvardin 1403
+            issue_date = datetime(2024, 3, 20 + day) if day < 12 else datetime(2024, 4, day - 11)
+            session.add(make_invoice(number, "Commission Test", issue_date, amount=100000))
+    return payroll, business
+
+
+def _repository():
+    return WageCalculatorRepository(UsersRepository(), InvoicesRepository(), PayrollRepository())
+
+
+def test_month_run_saves_all_payslips_in_one_batch_and_renders_pdfs(engines, tmp_path):
+    payroll, business = engines
+    runner = PayrollRunner(_repository(), ManagedSessionProvider(payroll), ManagedSessionProvider(business),
+                           pdf_root=tmp_path / "payslips", max_workers=0)
+    progress = []
+
+    report = runner.run(1403, 1, progress=lambda done, total: progress.append((done, total)))
+
+    assert report.total == 2 and len(report.saved) == 2 and progress[-1] == (2, 2)
+    assert list(report.failures.values()) == ["ساعات کارکرد کارمند پاره‌وقت وارد نشده است."]
+    for path in report.pdfs.values():
+        assert path.endswith(".pdf") and open(path, "rb").read(4) == b"%PDF"
+    assert sorted(p.name for p in (tmp_path / "payslips" / "1403-01").iterdir()) == ["100.pdf", "200.pdf"]
+
+    with ManagedSessionProvider(payroll)() as session:
+        records = {r.employee.employee_code: r for r in session.query(PayrollRecordModel)}
+        assert set(records) == {"100", "200"}
+        # Two of the three invoices fall in the month: 2 * 100,000 Tomans * 10 * 40%.
+        assert records["200"].gross_income_rials == Decimal("800000")
+        assert all(r.component_details for r in records.values())
+        assert session.query(PayrollAuditLogModel).count() == 2
+
+    rerun = runner.run(1403, 1, work_metrics={records_id: Decimal(10) for records_id in report.failures})
+    assert len(rerun.skipped) == 2 and len(rerun.saved) == 1 and not rerun.failures
+
+
+@pytest.mark.parametrize("failure", ["cancelled", "save_failed"])
+def test_month_run_that_saves_nothing_leaves_no_pdfs(engines, tmp_path, monkeypatch, failure):
+    payroll, business = engines
+    runner = PayrollRunner(_repository(), ManagedSessionProvider(payroll), ManagedSessionProvider(business),
+                           pdf_root=tmp_path / "payslips", max_workers=0)
+    if failure == "save_failed":
+        def failing_save(*args):
+            raise RuntimeError("disk full")
+        monkeypatch.setattr(runner, "_save", failing_save)
+
+    with pytest.raises(ExportCancelled if failure == "cancelled" else RuntimeError):
+        runner.run(1403, 1, is_cancelled=lambda: failure == "cancelled")
+
+    assert [p.name for p in (tmp_path / "payslips").iterdir()] == ["1403-01"]
+    assert not list((tmp_path / "payslips" / "1403-01").iterdir())
+    with ManagedSessionProvider(payroll)() as session:
+        assert session.query(PayrollRecordModel).count() == 0
+
+
+def test_month_run_matches_the_single_payslip_calculation(engines, tmp_path):
+    payroll, business = engines
+    payroll_session, business_session = ManagedSessionProvider(payroll), ManagedSessionProvider(business)
+    logic = WageCalculatorLogic(_repository(), payroll_session, business_session)
+    start, end = logic._get_jalali_month_range(1403, 1)
+    with payroll_session() as session:
+        employee_id = session.query(EmployeeModel).filter_by(employee_code="100").one().employee_id
+    preview = logic.calculate_payslip_for_preview(
+        {"employee_id": employee_id, "start_date": start, "end_date": end, "overtime_hours": 12})
+
+    runner = PayrollRunner(_repository(), payroll_session, business_session, max_workers=0)
+    report = runner.run(1403, 1, work_metrics={employee_id: Decimal(12)}, render_pdfs=False)
+
+    assert not report.pdfs
+    with payroll_session() as session:
+        record = session.get(PayrollRecordModel, report.saved[employee_id])
+        assert record.net_income_rials == (preview.net_income * 10).quantize(Decimal("0.01"))
+        assert record.gross_income_rials == (preview.gross_income * 10).quantize(Decimal("0.01"))
+
+
+def test_commission_preview_lists_the_invoices_behind_the_summed_commission(engines):
+    payroll, business = engines
+    payroll_session, business_session = ManagedSessionProvider(payroll), ManagedSessionProvider(business)
+    logic = WageCalculatorLogic(_repository(), payroll_session, business_session)
+    start, end = logic._get_jalali_month_range(1403, 1)
+    with payroll_session() as session:
+        employee_id = session.query(EmployeeModel).filter_by(employee_code="200").one().employee_id
+
+    preview = logic.calculate_payslip_for_preview({"employee_id": employee_id, "start_date": start, "end_date": end})
+
+    assert [line.invoice_number for line in preview.commissions] == ["1", "2"]
+    assert sum(line.translator_share for line in preview.commissions) == Decimal("80000")
+    assert [c.amount for c in preview.components if c.name == "Commission"] == [Decimal("80000")]
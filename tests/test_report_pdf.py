@@ -0,0 +1,58 @@
+import re
+import time
+
+import pandas as pd
+
+from features.Reports.file_exporter import FileExporter, ReportChart, format_cell, register_fonts
+from shared.utils.persian_tools import to_visual_rtl
+
+
+def _page_count(path) -> int:
+    return len(re.findall(rb"/Type /Page[^s]", path.read_bytes()))
+
+
+def test_visual_rtl_joins_letters_and_keeps_numbers_in_order():
+    # س (initial) + لا ligature (final) + م (isolated), laid out right to left.
+    assert to_visual_rtl("سلام") == "ﻡﻼﺳ"
+    assert to_visual_rtl("فاکتور 1,234").startswith("1,234 ")
+    assert to_visual_rtl("Ali Reza") == "Ali Reza"
+
+
+def test_format_cell():
+    assert format_cell(1234567) == "1,234,567"
+    assert format_cell(2.5) == "2.50"
+    assert format_cell(float("nan")) == ""
+    assert format_cell(None) == ""
+
+
+def test_fonts_are_registered_once_from_resources():
+    assert register_fonts() == ("IRANSans", "IRANSans-Bold")
+    assert register_fonts() is register_fonts()
+
+
+def test_long_report_paginates_with_a_vector_chart(tmp_path):
+    rows = 5000
+    df = pd.DataFrame({
+        "نام مترجم": [f"مترجم {i}" for i in range(rows)],
+        "درآمد کل": [i * 1000 for i in range(rows)],
+        "تعداد فاکتور": [i % 50 for i in range(rows)],
+    })
+    chart = ReportChart("درآمد بر اساس مترجم", df["نام مترجم"].tolist(), df["درآمد کل"].tolist())
+    path = tmp_path / "report"
+
+    started = time.perf_counter()
+    FileExporter().to_pdf("گزارش عملکرد مترجمین", df, "گزارش از تاریخ 2024-01-01 تا 2024-12-31", str(path), chart)
+    elapsed = time.perf_counter() - started
+
+    pdf = tmp_path / "report.pdf"
+    assert pdf.read_bytes().startswith(b"%PDF")
+    assert _page_count(pdf) > 100
+    assert not list(tmp_path.glob("*.png"))
+    assert elapsed < 30
+
+
+def test_empty_chart_is_skipped(tmp_path):
+    df = pd.DataFrame({"شرح": ["درآمد کل"], "مقدار": [0]})
+    FileExporter().to_pdf("گزارش", df, "", str(tmp_path / "summary.pdf"),
+                          ReportChart("عنوان", [], [], horizontal=False))
+    assert _page_count(tmp_path / "summary.pdf") == 1
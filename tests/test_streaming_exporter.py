@@ -0,0 +1,76 @@
+import csv
+from datetime import datetime
+
+import pytest
+from openpyxl import load_workbook
+from sqlalchemy import create_engine
+
+from features.Invoice_Table.invoice_table_logic import InvoiceExportService
+from features.Invoice_Table.invoice_table_repo import RepositoryManager
+from shared.orm_models.business_models import BaseBusiness, IssuedInvoiceModel, InvoiceItemModel
+from shared.services.streaming_exporter import ExportCancelled, ExportSheet, ExportColumn, StreamingExporter
+from shared.session_provider import ManagedSessionProvider
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'business.db'}")
+    BaseBusiness.metadata.create_all(engine)
+    with ManagedSessionProvider(engine)() as session:
+        for i in range(5):
+            invoice = IssuedInvoiceModel(
+                invoice_number=f"INV-{i}", name=f"c{i}", national_id=str(i), phone="0912",
+                issue_date=datetime(2024, 3, 20 + i), delivery_date=datetime(2024, 4, 1),
+                translator="t", total_items=1, total_amount=1000 * i, final_amount=1000 * i,
+                source_language="fa", target_language="en",
+            )
+            invoice.items.append(InvoiceItemModel(service_id=1, service_name="s", quantity=i + 1, total_price=1))
+            session.add(invoice)
+    return engine
+
+
+def _service(engine, batch_size=2):
+    return InvoiceExportService(RepositoryManager(), StreamingExporter(engine, batch_size=batch_size))
+
+
+def test_csv_export_streams_selected_columns_with_jalali_dates(engine, tmp_path):
+    path = tmp_path / "invoices.csv"
+    progress = []
+
+    rows = _service(engine).export(["INV-0", "INV-1", "INV-3"], str(path),
+                                   column_keys=["invoice_number", "issue_date", "document_count"],
+                                   progress=lambda done, total: progress.append((done, total)))
+
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        content = list(csv.reader(f))
+    assert rows == 3
+    assert content == [["شماره فاکتور", "تاریخ صدور", "تعداد اسناد"],
+                       ["INV-0", "1403/01/01", "1"], ["INV-1", "1403/01/02", "2"], ["INV-3", "1403/01/04", "4"]]
+    assert progress == [(2, 3), (3, 3)]
+
+
+def test_xlsx_export_writes_every_sheet(engine, tmp_path):
+    path = tmp_path / "invoices.xlsx"
+    exporter = StreamingExporter(engine)
+    service = _service(engine)
+    columns = InvoiceExportService.COLUMNS[:2]
+    statement = RepositoryManager().get_business_repository().invoice_export_statement(
+        [column.expression for column in columns])
+
+    exporter.export(str(path), [ExportSheet("فاکتورها", columns, statement),
+                                ExportSheet("خلاصه", [ExportColumn("k", "کلید")], rows=[["a"], ["b"]])])
+
+    workbook = load_workbook(path, read_only=True)
+    assert workbook.sheetnames == ["فاکتورها", "خلاصه"]
+    assert len(list(workbook["فاکتورها"].values)) == 6
+    assert list(workbook["خلاصه"].values) == [("کلید",), ("a",), ("b",)]
+    assert service.export(None, str(tmp_path / "all.xlsx")) == 5
+
+
+def test_cancelled_export_leaves_no_file(engine, tmp_path):
+    path = tmp_path / "invoices.csv"
+
+    with pytest.raises(ExportCancelled):
+        _service(engine).export(None, str(path), is_cancelled=lambda: True)
+
+    assert list(tmp_path.glob("invoices.csv*")) == [] and list(tmp_path.glob(".invoices*")) == []
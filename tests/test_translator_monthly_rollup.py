@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from features.Admin_Panel.admin_dashboard.admin_dashboard_repo import AdminDashboardRepository
+from features.Admin_Panel.wage_calculator.wage_calculator_repo import InvoicesRepository
+from shared.orm_models.business_models import (BaseBusiness, IssuedInvoiceModel, TranslatorModel,
+                                               TranslatorMonthlyStatsModel)
+from shared.services.translator_monthly_rollup import TranslatorMonthlyRollup
+from shared.session_provider import ManagedSessionProvider
+
+
+@pytest.fixture
+def session_provider(business_engine, make_invoice):
+    BaseBusiness.metadata.create_all(business_engine)
+    provider = ManagedSessionProvider(business_engine)
+    with provider() as session:
+        session.add_all([
+            make_invoice("1", "Ali", datetime(2024, 3, 20, 9), items=2, amount=100),  # 1 Farvardin 1403
+            make_invoice("2", "Ali", datetime(2024, 4, 19, 18), items=3, amount=200),  # last day of Farvardin
+            make_invoice("3", "Sara", datetime(2024, 4, 1), items=9, amount=50),
+            make_invoice("4", "Sara", datetime(2024, 4, 20), items=4, amount=400),  # 1 Ordibehesht
+        ])
+    return provider
+
+
+def _ids(session):
+    return {name: translator_id for translator_id, name in session.query(TranslatorModel.id, TranslatorModel.full_name)}
+
+
+def test_month_stats_cover_the_whole_jalali_month(session_provider):
+    rollup = TranslatorMonthlyRollup()
+    with session_provider() as session:
+        ids = _ids(session)
+        stats = rollup.month_stats(session, 1403, 1)
+        ali, sara = stats[ids["Ali"]], stats[ids["Sara"]]
+        assert (ali.translator, ali.invoice_count, ali.document_count, ali.translation_total) == ("Ali", 2, 5, 300)
+        assert (sara.invoice_count, sara.translation_total) == (1, 50)
+        assert [row.translator for row in rollup.top_translators(session, 1403, 1)] == ["Sara", "Ali"]
+        assert [row.translator for row in rollup.top_translators(session, 1403, 1, order_by="translation_total")] \
+            == ["Ali", "Sara"]
+
+
+def test_month_is_only_recomputed_when_its_invoices_change(session_provider):
+    rollup = TranslatorMonthlyRollup()
+    with session_provider() as session:
+        assert rollup.refresh_month(session, 1403, 1)
+        assert not rollup.refresh_month(session, 1403, 1)
+
+    with session_provider() as session:
+        invoice = session.query(IssuedInvoiceModel).filter_by(invoice_number="3").one()
+        invoice.translator = "Ali"
+    with session_provider() as session:
+        assert rollup.month_stats(session, 1403, 1)[_ids(session)["Ali"]].invoice_count == 3
+
+    with session_provider() as session:
+        session.delete(session.query(IssuedInvoiceModel).filter_by(invoice_number="1").one())
+    with session_provider() as session:
+        assert rollup.month_stats(session, 1403, 1)[_ids(session)["Ali"]].translation_total == 250
+        assert session.query(TranslatorMonthlyStatsModel).filter_by(jalali_month=1).count() == 1
+
+
+def test_payroll_and_dashboard_read_the_rollup(session_provider):
+    rollup = TranslatorMonthlyRollup()
+    with session_provider() as session:
+        ali = _ids(session)["Ali"]
+        totals = InvoicesRepository(rollup).get_translators_monthly_totals(session, [ali, 999], 1403, 1)
+        assert totals == {ali: 300, 999: 0}
+        assert session.query(TranslatorMonthlyStatsModel).count() == 2
+
+        rollup.rebuild(session)
+        assert session.query(TranslatorMonthlyStatsModel).count() == 3
+        top = AdminDashboardRepository(rollup).get_top_translators_this_month(session)
+        assert all(hasattr(row, "translator") and hasattr(row, "document_count") for row in top)
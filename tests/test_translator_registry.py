@@ -0,0 +1,75 @@
+from sqlalchemy import text
+
+from core.database_migrations import SchemaMigrator, SCHEMA_COMPONENT
+from shared.orm_models.business_models import BaseBusiness, IssuedInvoiceModel, TranslatorModel
+from shared.services.translator_monthly_rollup import TranslatorMonthlyRollup
+from shared.services.translator_registry import TranslatorRegistry, translator_name_key
+from shared.session_provider import ManagedSessionProvider
+
+
+def test_name_variants_share_one_translator_id(business_engine, make_invoice):
+    BaseBusiness.metadata.create_all(business_engine)
+    with ManagedSessionProvider(business_engine)() as session:
+        session.add_all([make_invoice("1", "علي رضايي"), make_invoice("2", " علی  رضایی"),
+                         make_invoice("3", "نامشخص")])
+
+    with ManagedSessionProvider(business_engine)() as session:
+        ids = dict(session.query(IssuedInvoiceModel.invoice_number, IssuedInvoiceModel.translator_employee_id))
+        assert ids["1"] == ids["2"] is not None and ids["3"] is None
+        assert session.query(TranslatorModel).count() == 1
+
+        invoice = session.query(IssuedInvoiceModel).filter_by(invoice_number="3").one()
+        invoice.translator = "Sara"
+    with ManagedSessionProvider(business_engine)() as session:
+        sara = session.query(TranslatorModel).filter_by(name_key=translator_name_key("Sara")).one()
+        assert session.query(IssuedInvoiceModel).filter_by(invoice_number="3").one().translator_employee_id == sara.id
+
+
+def test_reconcile_links_employees_and_renames_keep_invoice_ids(business_engine, make_invoice):
+    BaseBusiness.metadata.create_all(business_engine)
+    registry = TranslatorRegistry()
+    with ManagedSessionProvider(business_engine)() as session:
+        session.add_all([make_invoice("1", "Ali Test"), make_invoice("2", "Guest Translator"),
+                         make_invoice("3", "Ali New")])
+
+    with ManagedSessionProvider(business_engine)() as session:
+        report = registry.reconcile(session, [("e-1", "Ali Test"), ("e-2", "Sara Test"), ("e-3", "Twin"),
+                                              ("e-4", "Twin")])
+        assert report.linked == {"Ali Test": "e-1"}
+        assert report.unmatched == ["Ali New", "Guest Translator"] and report.ambiguous == ["Twin"]
+        ali_id = session.query(TranslatorModel.id).filter_by(employee_id="e-1").scalar()
+
+    with ManagedSessionProvider(business_engine)() as session:
+        report = registry.reconcile(session, [("e-1", "Ali New")])
+        # The unlinked "Ali New" row is merged into the employee's row.
+        assert report.renamed == {"Ali Test": "Ali New"}
+        assert {row.translator_employee_id for row in session.query(IssuedInvoiceModel)
+                if row.invoice_number in ("1", "3")} == {ali_id}
+        stats = TranslatorMonthlyRollup().month_stats(session, 1403, 1)
+        assert (stats[ali_id].translator, stats[ali_id].invoice_count) == ("Ali New", 2)
+
+
+def test_migration_backfills_translator_ids_and_rebuilds_the_rollup(business_engine):
+    migrator = SchemaMigrator()
+    with business_engine.begin() as conn:
+        # The v5 issued_invoices columns the backfill and the rollup read; no translator ids yet.
+        conn.execute(text(
+            "CREATE TABLE issued_invoices (id INTEGER PRIMARY KEY, invoice_number TEXT, issue_date DATETIME, "
+            "translator TEXT, total_items INTEGER, total_translation_price INTEGER, "
+            "revision INTEGER NOT NULL DEFAULT 1)"
+        ))
+        conn.execute(text(
+            "INSERT INTO issued_invoices (invoice_number, issue_date, translator, total_items, "
+            "total_translation_price) VALUES ('1', '2024-04-01 10:00:00', 'Ali', 2, 10), "
+            "('2', '2024-04-01 11:00:00', 'نامشخص', 1, 10)"
+        ))
+    migrator.stamp(business_engine, SCHEMA_COMPONENT, 5)
+
+    migrator.upgrade(business_engine, "business", BaseBusiness.metadata)
+
+    with business_engine.connect() as conn:
+        ids = dict(conn.execute(text("SELECT invoice_number, translator_employee_id FROM issued_invoices")).all())
+        assert ids["1"] is not None and ids["2"] is None
+        assert conn.execute(text(
+            "SELECT translator_id, document_count FROM translator_monthly_stats WHERE translator_id IS NOT NULL"
+        )).all() == [(ids["1"], 2)]
@@ -0,0 +1,133 @@
+import pytest
+from sqlalchemy import create_engine, event
+
+from features.Workspace.workspace_logic import ChatLogic
+from features.Workspace.workspace_repo import ChatRepository, UserRepository
+from shared.enums import ChatType
+from shared.orm_models.users_models import BaseUsers, UsersModel
+from shared.orm_models.workspace_models import (BaseWorkspace, ChatModel, ChatParticipantModel, ChatReadWatermarkModel,
+                                                MessageModel)
+from shared.session_provider import ManagedSessionProvider
+
+
+@pytest.fixture
+def workspace_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'workspace.db'}")
+    BaseWorkspace.metadata.create_all(engine)
+    with ManagedSessionProvider(engine)() as session:
+        session.add_all([ChatModel(id=1, name="team", type=ChatType.GROUP),
+                         ChatModel(id=2, name="other", type=ChatType.GROUP)])
+        session.flush()
+        session.add_all([ChatParticipantModel(chat_id=chat_id, user_id=user_id)
+                         for chat_id, user_id in ((1, 1), (1, 2), (1, 3), (2, 1))])
+        session.add_all([MessageModel(id=n, chat_id=1, sender_id=1, content=f"m{n}") for n in range(1, 8)])
+        session.add(MessageModel(id=8, chat_id=2, sender_id=1, content="elsewhere"))
+        session.add_all([ChatReadWatermarkModel(chat_id=1, user_id=2, last_read_message_id=6),
+                         ChatReadWatermarkModel(chat_id=1, user_id=3, last_read_message_id=7)])
+    return engine
+
+
+@pytest.fixture
+def logic(workspace_engine, tmp_path):
+    users_engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    BaseUsers.metadata.create_all(users_engine)
+    with ManagedSessionProvider(users_engine)() as session:
+        session.add_all([UsersModel(id=user_id, username=name, password_hash=b"x", role="clerk", display_name=name)
+                         for user_id, name in ((1, "ali"), (2, "sara"), (3, "reza"))])
+    return ChatLogic(UserRepository(), ChatRepository(), ManagedSessionProvider(users_engine),
+                     ManagedSessionProvider(workspace_engine), client=RecordingClient())
+
+
+class RecordingClient:
+    def __init__(self):
+        self.read_receipts = []
+
+    def send_read_receipt(self, chat_id, message_id):
+        self.read_receipts.append((chat_id, message_id))
+
+    def disconnect(self):
+        pass
+
+
+def test_history_pages_walk_back_by_message_id(logic):
+    newest = logic.get_chat_history(1, limit=3)
+    assert [message.id for message in newest] == [5, 6, 7]
+    older = logic.get_chat_history(1, before_id=newest[0].id, limit=3)
+    assert [message.id for message in older] == [2, 3, 4]
+    assert [message.id for message in logic.get_chat_history(1, before_id=2, limit=3)] == [1]
+    assert logic.get_chat_history(1, before_id=1, limit=3) == []
+
+
+def test_receipts_are_derived_from_read_watermarks(workspace_engine, logic):
+    statements = []
+    event.listen(workspace_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    history = logic.get_chat_history(1, limit=5)
+    assert sum("FROM chat_read_watermarks" in statement for statement in statements) == 1
+    readers = {message.id: sorted(receipt.user.name for receipt in message.read_receipts) for message in history}
+    assert readers == {3: ["reza", "sara"], 4: ["reza", "sara"], 5: ["reza", "sara"], 6: ["reza", "sara"], 7: ["reza"]}
+
+
+def test_watermarks_advance_in_bulk_and_never_move_back(logic):
+    assert logic.get_unread_counts(1) == {1: 7, 2: 1}
+    logic.mark_chats_read(1, {1: 5, 2: 8})
+    assert logic.get_unread_counts(1) == {1: 2, 2: 0}
+    logic.mark_chat_read(1, 1, 3)
+    assert logic.get_unread_counts(1) == {1: 2, 2: 0}
+    assert logic.get_unread_counts(2) == {1: 1}
+    assert logic._client.read_receipts == [(1, 5), (2, 8), (1, 3)]
+
+
+def test_history_query_uses_the_chat_index(workspace_engine):
+    with workspace_engine.connect() as connection:
+        plan = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id FROM messages WHERE chat_id = 1 AND id < 5 ORDER BY id DESC LIMIT 3"
+        ).fetchall()
+    assert any("idx_messages_chat_id" in row[-1] for row in plan)
+
+
+def test_chat_list_comes_from_one_workspace_query(workspace_engine, logic):
+    statements = []
+    event.listen(workspace_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    [team] = logic.get_chats_for_user(2)
+    assert len(statements) == 1
+    assert (team.id, team.unread_count, team.last_message.content, team.last_message.sender.name) == (1, 1, "m7", "ali")
+    assert [user.name for user in team.participants] == ["ali", "sara", "reza"]
+    assert [chat.id for chat in logic.get_chats_for_user(1)] == [2, 1]  # most recent message first
+
+
+def test_chat_list_cache_follows_broker_events(workspace_engine, logic):
+    logic.get_chats_for_user(2)
+    statements = []
+    event.listen(workspace_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    updated = logic.apply_chat_event(2, {"type": "new_message", "chat_id": 1, "offset": 3, "payload": {
+        "id": 9, "content": "m9", "sender_id": 3, "sender_name": "reza", "created_at": "2024-05-01T10:00:00"}})
+    assert (updated.unread_count, updated.last_message.content) == (2, "m9")
+    assert logic.apply_chat_event(2, {"type": "new_message", "chat_id": 5, "payload": {"id": 10}}) is None
+
+    # Read on another of the user's workstations
+    read_elsewhere = {"type": "events", "chat_id": 1, "user_id": 2, "events": [{"type": "read", "chat_id": 1, "message_id": 9}]}
+    assert logic.apply_chat_event(2, read_elsewhere).unread_count == 0
+    assert logic.get_chats_for_user(2)[0].last_message.id == 9
+    assert statements == []
+
+
+def test_incomplete_resume_reloads_the_chat_list(workspace_engine, logic):
+    from PySide6.QtWidgets import QApplication
+    from features.Workspace.workspace_controller import ChatController
+    from features.Workspace.workspace_view import ChatView
+
+    app = QApplication.instance() or QApplication([])
+    view = ChatView(current_user_id=2)
+    controller = ChatController(view, logic, current_user_id=2, client=logic._client)
+    view.display_chat_list(logic.get_chats_for_user(2))
+    with ManagedSessionProvider(workspace_engine)() as session:
+        session.add(MessageModel(id=20, chat_id=1, sender_id=3, content="missed"))
+
+    controller.on_new_message_received({"type": "resume_incomplete", "chat_id": 1, "last_offset": 2500})
+
+    assert view.chat_list_widget.item(0).text() == "team (2)\nreza: missed"
+    view.deleteLater()